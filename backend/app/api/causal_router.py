@@ -1,25 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from app.services.causal_service import CausalService
-from app.services.news_extraction_service import NewsExtractionService
-from app.services.summary_service import SummaryGenerationService
-from app.services.target_research_service import TargetResearchService
-from app.services.streaming_research_service import StreamingTargetResearchService
-from app.services.node_sensing_service import NodeSensingService
-from app.services.enhanced_research_service import EnhancedTargetResearchService
-from app.services.two_pass_causal_service import TwoPassCausalService
+from typing import List, Literal, Optional, Dict, Any
+from app.services.service_registry import services
+from app.services.graph_store import GRAPH_KIND_TWO_PASS, GRAPH_KIND_SENSING
+from app.services.stream_run_registry import StreamRunRegistry
+from app.utils import codec
+from app.utils.http_cache import conditional_response
 
 router = APIRouter()
-causal_service = CausalService()
-news_extraction_service = NewsExtractionService()
-summary_service = SummaryGenerationService()
-target_research_service = TargetResearchService()
-streaming_research_service = StreamingTargetResearchService()
-node_sensing_service = NodeSensingService()
-enhanced_research_service = EnhancedTargetResearchService()
-two_pass_service = TwoPassCausalService()
+# 服务经 services 注册表在首次请求时构建（见 app/services/service_registry.py）
+stream_run_registry = StreamRunRegistry()
 
 class CausalQuery(BaseModel):
     """因果推演查询请求"""
@@ -36,6 +27,10 @@ class TargetResearchRequest(BaseModel):
     """标的研究请求"""
     target: str = Field(..., description="标的名称（如：中证1000指数）", min_length=2)
 
+class BatchTargetResearchRequest(BaseModel):
+    """批量标的研究请求"""
+    targets: List[str] = Field(..., description="标的名称列表", min_length=1, max_length=100)
+
 class CausalNode(BaseModel):
     """因果图节点"""
     id: str
@@ -67,7 +62,7 @@ class CausalGraph(BaseModel):
     explanation: str
 
 @router.post("/analyze", response_model=CausalGraph)
-async def analyze_causal_chain(query: CausalQuery):
+async def analyze_causal_chain(query: CausalQuery, causal_service=Depends(services.dependency("causal"))):
     """
     分析因果链（旧版本，保持兼容）
     """
@@ -82,7 +77,12 @@ async def analyze_causal_chain(query: CausalQuery):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/analyze-v2")
-async def analyze_causal_chain_v2(query: CausalQuery):
+async def analyze_causal_chain_v2(
+    query: CausalQuery,
+    two_pass_service=Depends(services.dependency("two_pass")),
+    graph_store=Depends(services.dependency("graph_store")),
+    graph_layout_service=Depends(services.dependency("graph_layout"))
+):
     """
     双阶段因果分析（推荐使用）
     
@@ -127,18 +127,28 @@ async def analyze_causal_chain_v2(query: CausalQuery):
     - ✅ 严格数据溯源
     - ✅ Mock 模式支持（无需真实 API 即可测试）
     - ✅ 并发处理提升性能
+    - ✅ 返回 graph_id，可通过 POST /graphs/{graph_id}/refresh 增量刷新
+    - ✅ 节点带分层布局坐标 position，布局信息见 layout（按拓扑哈希缓存）
     """
     try:
         result = await two_pass_service.analyze_two_pass(
             query.query,
             query.context
         )
+        await graph_layout_service.apply(result)
+        result["graph_id"] = await graph_store.save(result, GRAPH_KIND_TWO_PASS, query.query)
+        result["version"] = 1
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/extract-causality")
-async def extract_causality(request: NewsExtractionRequest):
+async def extract_causality(
+    request: NewsExtractionRequest,
+    news_extraction_service=Depends(services.dependency("news_extraction")),
+    summary_service=Depends(services.dependency("summary")),
+    graph_layout_service=Depends(services.dependency("graph_layout"))
+):
     """
     从新闻文本中提取因果关系（支持动态生成摘要）
     
@@ -168,8 +178,8 @@ async def extract_causality(request: NewsExtractionRequest):
         if request.generate_summary:
             result = await summary_service.generate_causal_summary_safe(result)
         
-        # 3. 返回结果（包含可选的 summary 字段）
-        return result
+        # 3. 计算布局，返回结果（包含可选的 summary 字段）
+        return await graph_layout_service.apply(result)
         
     except ValueError as e:
         # 参数验证错误或 JSON 解析错误
@@ -184,12 +194,23 @@ async def extract_causality(request: NewsExtractionRequest):
             detail=f"因果关系提取失败: {str(e)}"
         )
 
+# SSE 响应头：禁用缓存与 Nginx 缓冲
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
 @router.post("/research-target/stream")
-async def research_target_stream(request: TargetResearchRequest):
+async def research_target_stream(
+    request: TargetResearchRequest,
+    http_request: Request,
+    streaming_research_service=Depends(services.dependency("streaming_research"))
+):
     """
     标的逆向推演与实时分析（流式版本）
     
-    使用 Server-Sent Events (SSE) 实时推送分析进度
+    使用 Server-Sent Events (SSE) 实时推送分析进度，支持断线续传
     
     执行三步走 Pipeline：
     1. 逆向因子提取与关键词生成
@@ -200,48 +221,123 @@ async def research_target_stream(request: TargetResearchRequest):
         request: 包含 target 字段的请求体
         
     Returns:
-        StreamingResponse: text/event-stream 格式的流式响应
+        StreamingResponse: text/event-stream 格式的流式响应，响应头 X-Run-Id 为运行 ID
+        
+    事件格式（标准 SSE 帧）：
+        id: <run_id>:<seq>
+        data: {"status": "...", "message": "...", "data": {...}, "timestamp": ...}
         
-    事件格式：
-        每行一个 JSON 对象，包含：
         - status: 状态标识 (start, step1_start, step1_complete, step2_start, 
                   step2_complete, step3_start, step3_complete, success, error)
-        - message: 进度消息
-        - data: 可选的数据负载
-        - timestamp: 时间戳
+        - 空闲时发送 ": heartbeat" 注释帧
+        
+    断线续传：
+        Pipeline 在后台运行，与连接无关。重连时携带 Last-Event-ID 请求头
+        （POST 本接口或 GET /research-target/stream/{run_id}），补发错过的事件后继续跟随。
+        Last-Event-ID 指向的运行不在本进程（已过期或由其他 worker 执行）时返回 404，不会重新执行 Pipeline。
         
     最终成功事件：
         {"status": "success", "message": "...", "data": {...完整的AnalysisResult...}}
     """
+    run_id, after_seq = stream_run_registry.parse_last_event_id(
+        http_request.headers.get("last-event-id")
+    )
+    if run_id:
+        # 续传请求：运行登记表是进程内的，未知的 run_id 不能静默开始新的运行（客户端会以为已续传）
+        run = stream_run_registry.get(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail=f"流式运行不存在或已过期: {run_id}")
+    else:
+        run = stream_run_registry.start(
+            streaming_research_service.stream_research_target(request.target)
+        )
+        after_seq = 0
     
-    async def event_generator():
-        """生成 SSE 事件流"""
+    return StreamingResponse(
+        stream_run_registry.follow(run, after_seq),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Run-Id": run.run_id}
+    )
+
+@router.get("/research-target/stream/{run_id}")
+async def resume_research_target_stream(
+    run_id: str,
+    http_request: Request,
+    last_event_id: Optional[str] = None
+):
+    """
+    续传流式研究事件
+    
+    兼容 EventSource 自动重连：从 Last-Event-ID 请求头（或 last_event_id 查询参数）
+    之后的事件开始补发，Pipeline 仍在运行时继续跟随直至结束。
+    运行结束超过 STREAM_RUN_TTL 秒后缓冲区被清理，返回 404。
+    """
+    run = stream_run_registry.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"流式运行不存在或已过期: {run_id}")
+    
+    _, after_seq = stream_run_registry.parse_last_event_id(
+        http_request.headers.get("last-event-id") or last_event_id
+    )
+    
+    return StreamingResponse(
+        stream_run_registry.follow(run, after_seq),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Run-Id": run.run_id}
+    )
+
+@router.post("/research-target/batch")
+async def research_target_batch(
+    request: BatchTargetResearchRequest,
+    batch_research_service=Depends(services.dependency("batch_research"))
+):
+    """
+    批量标的研究（NDJSON 流式返回）
+    
+    适用于每日固定研究 30-100 个标的（指数、商品、外汇）的场景：
+    1. 多个标的合并到一次 LLM 调用中提取因果图谱（含每个节点的搜索查询）
+    2. 对所有图谱的节点取并集，共享节点（如美元指数、美联储利率）只感知一次
+    3. 每个标的完成后立即返回一行 JSON，LLM 批次与节点感知均限制并发
+    
+    Args:
+        request: 包含 targets 列表的请求体
+        
+    Returns:
+        StreamingResponse: application/x-ndjson，每行一个事件
+        
+    事件格式：
+        {"status": "success", "target": "黄金价格", "data": {...AnalysisResult...}}
+        {"status": "error", "target": "...", "message": "..."}
+        最后一行：{"status": "complete", "total": 30, "succeeded": 29, "failed": 1,
+                   "node_refs": 150, "unique_nodes": 42, "total_time": 95.3}
+    """
+    
+    async def ndjson_generator():
         try:
-            async for event in streaming_research_service.stream_research_target(request.target):
-                # 发送事件数据
-                yield f"data: {event}\n\n"
+            async for event in batch_research_service.research_targets_stream(request.targets):
+                yield codec.dumps(event) + "\n"
         except Exception as e:
-            # 发送错误事件
-            import json
-            error_event = json.dumps({
+            error_event = codec.dumps({
                 "status": "error",
-                "message": f"流式处理失败: {str(e)}",
-                "timestamp": __import__('time').time()
-            }, ensure_ascii=False)
-            yield f"data: {error_event}\n\n"
+                "message": f"批量研究失败: {str(e)}"
+            })
+            yield error_event + "\n"
     
     return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
+        ndjson_generator(),
+        media_type="application/x-ndjson",
         headers={
             "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"  # 禁用 Nginx 缓冲
+            "X-Accel-Buffering": "no"
         }
     )
 
 @router.post("/research-target")
-async def research_target(request: TargetResearchRequest):
+async def research_target(
+    request: TargetResearchRequest,
+    target_research_service=Depends(services.dependency("target_research")),
+    graph_layout_service=Depends(services.dependency("graph_layout"))
+):
     """
     标的逆向推演与实时分析（非流式版本，保持向后兼容）
     
@@ -268,7 +364,7 @@ async def research_target(request: TargetResearchRequest):
         # 执行完整的研究 Pipeline
         result = await target_research_service.research_target(request.target)
         
-        return result
+        return await graph_layout_service.apply(result)
         
     except ValueError as e:
         # 参数验证错误
@@ -284,7 +380,12 @@ async def research_target(request: TargetResearchRequest):
         )
 
 @router.post("/research-target-enhanced")
-async def research_target_enhanced(request: TargetResearchRequest):
+async def research_target_enhanced(
+    request: TargetResearchRequest,
+    enhanced_research_service=Depends(services.dependency("enhanced_research")),
+    graph_store=Depends(services.dependency("graph_store")),
+    graph_layout_service=Depends(services.dependency("graph_layout"))
+):
     """
     增强型标的研究 - 自动感知节点实时状态（推荐使用）
     
@@ -318,6 +419,7 @@ async def research_target_enhanced(request: TargetResearchRequest):
         - edges: 因果图边
         - explanation: 综合分析报告（结合实时数据）
         - metadata: 元数据（包含耗时、状态更新统计等）
+        - graph_id / version: 图谱 ID 与版本，用于增量刷新
         
     Raises:
         HTTPException 400: 请求参数无效
@@ -328,6 +430,9 @@ async def research_target_enhanced(request: TargetResearchRequest):
         result = await enhanced_research_service.research_target_with_sensing(
             request.target
         )
+        await graph_layout_service.apply(result)
+        result["graph_id"] = await graph_store.save(result, GRAPH_KIND_SENSING, request.target)
+        result["version"] = 1
         
         return result
         
@@ -345,9 +450,13 @@ async def research_target_enhanced(request: TargetResearchRequest):
 class NodeEnrichmentRequest(BaseModel):
     """节点状态更新请求"""
     nodes: List[Dict[str, Any]] = Field(..., description="需要更新状态的节点列表")
+    force_refresh: bool = Field(default=False, description="跳过状态缓存与负结果缓存，强制重新感知")
 
 @router.post("/enrich-nodes")
-async def enrich_nodes(request: NodeEnrichmentRequest):
+async def enrich_nodes(
+    request: NodeEnrichmentRequest,
+    node_sensing_service=Depends(services.dependency("node_sensing"))
+):
     """
     节点自主感知 - 批量更新节点实时状态
     
@@ -392,7 +501,10 @@ async def enrich_nodes(request: NodeEnrichmentRequest):
             raise ValueError("节点列表不能为空")
         
         # 批量并发处理节点状态更新
-        enriched_nodes = await node_sensing_service.enrich_nodes_batch(request.nodes)
+        enriched_nodes = await node_sensing_service.enrich_nodes_batch(
+            request.nodes,
+            force_refresh=request.force_refresh
+        )
         
         return {
             "success": True,
@@ -411,34 +523,175 @@ async def enrich_nodes(request: NodeEnrichmentRequest):
             detail=f"节点状态更新失败: {str(e)}"
         )
 
-@router.get("/examples")
-async def get_examples():
+# ================================================================
+# 图谱存储与增量刷新
+# ================================================================
+
+class GraphAnalysisRequest(BaseModel):
+    """图谱结构分析请求（graph_ids 与 graphs 可同时提供，多张图谱合并后分析）"""
+    graph_ids: Optional[List[str]] = Field(None, description="已保存图谱的 ID 列表", max_length=200)
+    graphs: Optional[List[Dict[str, Any]]] = Field(None, description="直接提交的图谱（含 nodes / edges）", max_length=200)
+    target: Optional[str] = Field(None, description="目标节点 ID 或标签，默认取入边最多的叶节点")
+    k: int = Field(5, ge=1, le=100, description="返回的最强路径数量")
+    transitive_reduction: bool = Field(True, description="是否计算冗余边（传递归约）")
+
+@router.post("/graphs/analysis")
+async def analyze_graph_structure(
+    request: GraphAnalysisRequest,
+    graph_analysis_service=Depends(services.dependency("graph_analysis"))
+):
     """
-    获取示例查询
+    图谱结构分析
+    
+    多张图谱按规范节点 ID 合并后，返回结构校验（悬空边、重复、环、孤立节点）、
+    冗余边（传递归约）与到目标节点的 top-k 最强因果路径（edge.strength × node.confidence 之积）
+    
+    Returns:
+        {
+            "validation": {"nodes": 12, "edges": 15, "acyclic": true, "cycles": [], "issues": [...], ...},
+            "target": {"id": "n6", "label": "黄金价格"},
+            "paths": [{"nodes": ["n1", "n3", "n6"], "labels": [...], "score": 0.4131}],
+            "broken_edges": [],
+            "redundant_edges": [{"source": "n1", "target": "n6"}],
+            "elapsed_ms": 1.8
+        }
     """
-    return {
-        "examples": [
-            "全球变暖会导致什么后果？",
-            "经济衰退的原因是什么？",
-            "人工智能发展对就业市场的影响"
-        ],
-        "target_examples": [
-            "中证1000指数",
-            "比特币",
-            "特斯拉股票",
-            "黄金期货",
-            "人民币汇率"
-        ],
-        "node_sensing_example": {
-            "id": "n1",
-            "label": "美联储利率",
-            "type": "cause",
-            "sensing_config": {
-                "auto_queries": [
-                    "美联储最新利率决议 2024",
-                    "Federal Reserve interest rate latest"
-                ]
-            }
+    try:
+        graphs = await graph_analysis_service.load(request.graph_ids or [])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"图谱不存在: {e.args[0]}")
+    graphs.extend(request.graphs or [])
+    
+    try:
+        return await graph_analysis_service.analyze(
+            graphs,
+            target=request.target,
+            k=request.k,
+            reduce=request.transitive_reduction
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"参数验证失败: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"图谱分析失败: {str(e)}")
+
+class GraphLayoutRequest(BaseModel):
+    """图谱布局请求"""
+    nodes: List[Dict[str, Any]] = Field(..., description="节点（需含 id）")
+    edges: List[Dict[str, Any]] = Field(default_factory=list, description="边（需含 source / target）")
+    direction: Literal["LR", "RL", "TB", "BT"] = Field("LR", description="布局方向")
+
+@router.post("/graphs/layout")
+async def layout_graph(
+    request: GraphLayoutRequest,
+    http_request: Request,
+    graph_layout_service=Depends(services.dependency("graph_layout"))
+):
+    """
+    计算分层布局（Sugiyama）
+    
+    结果按拓扑哈希（节点 ID + 边端点，与顺序和富化字段无关）缓存；
+    响应带强 ETag，同一拓扑的重复请求携带 If-None-Match 时返回 304
+    
+    Returns:
+        {
+            "hash": "…", "direction": "LR", "algorithm": "sugiyama",
+            "width": 1280.0, "height": 387.5,
+            "positions": {"n1": [20.0, 65.0], ...},
+            "cached": false
+        }
+    """
+    layout = await graph_layout_service.layout(request.model_dump(), request.direction)
+    layout.pop("cached")
+    return conditional_response(http_request, layout)
+
+@router.get("/graphs/{graph_id}")
+async def get_graph(
+    graph_id: str,
+    request: Request,
+    graph_refresh_service=Depends(services.dependency("graph_refresh"))
+):
+    """
+    获取已保存的图谱（含 graph_id 与 version）
+    
+    响应带强 ETag（图谱规范哈希），客户端携带 If-None-Match 且图谱未变化时返回 304
+    """
+    graph = await graph_refresh_service.get_graph(graph_id)
+    if graph is None:
+        raise HTTPException(status_code=404, detail=f"图谱不存在: {graph_id}")
+    return conditional_response(request, graph)
+
+@router.post("/graphs/{graph_id}/refresh")
+async def refresh_graph(
+    graph_id: str,
+    since_version: Optional[int] = None,
+    graph_refresh_service=Depends(services.dependency("graph_refresh"))
+):
+    """
+    增量刷新图谱
+    
+    只对状态超过新鲜度有效期的节点重新富化（规范状态存储中仍新鲜的节点直接复用），
+    以 JSON Patch (RFC 6902) 返回发生变化的节点状态，路径以 GET /graphs/{graph_id} 的文档为根。
+    
+    Args:
+        graph_id: 图谱 ID（由 /analyze-v2 或 /research-target-enhanced 返回）
+        since_version: 客户端当前持有的版本；与服务端不一致时响应额外包含完整图谱 graph
+        
+    刷新会修改图谱（版本号递增），不做条件请求处理（不返回 ETag / 304）；
+    客户端需要条件读取时使用 GET /graphs/{graph_id}
+        
+    Returns:
+        {
+            "graph_id": "...",
+            "base_version": 3,
+            "version": 4,
+            "refreshed_nodes": ["n2", "n5"],
+            "reused_nodes": 6,
+            "patch": [
+                {"op": "replace", "path": "/nodes/1/realtime_state/latest_value", "value": "104.2"},
+                {"op": "replace", "path": "/version", "value": 4}
+            ]
+        }
+    """
+    try:
+        result = await graph_refresh_service.refresh(graph_id, since_version=since_version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"图谱刷新失败: {str(e)}")
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"图谱不存在: {graph_id}")
+    
+    return result
+
+# 示例查询（静态内容，ETag 稳定）
+EXAMPLES = {
+    "examples": [
+        "全球变暖会导致什么后果？",
+        "经济衰退的原因是什么？",
+        "人工智能发展对就业市场的影响"
+    ],
+    "target_examples": [
+        "中证1000指数",
+        "比特币",
+        "特斯拉股票",
+        "黄金期货",
+        "人民币汇率"
+    ],
+    "node_sensing_example": {
+        "id": "n1",
+        "label": "美联储利率",
+        "type": "cause",
+        "sensing_config": {
+            "auto_queries": [
+                "美联储最新利率决议 2024",
+                "Federal Reserve interest rate latest"
+            ]
         }
     }
+}
 
+@router.get("/examples")
+async def get_examples(request: Request):
+    """
+    获取示例查询（支持 If-None-Match 条件请求）
+    """
+    return conditional_response(request, EXAMPLES)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException
+from typing import Dict, Any, List
+from app.utils.tracing import slow_trace_buffer, to_chrome_trace, critical_path
+
+router = APIRouter()
+
+
+async def _get_trace(trace_id: str) -> Dict[str, Any]:
+    trace = await slow_trace_buffer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"追踪记录不存在或已被覆盖: {trace_id}")
+    return trace
+
+
+@router.get("/traces")
+async def list_traces() -> Dict[str, Any]:
+    """
+    列出环形缓冲区中的慢请求（按时间倒序）
+
+    只有耗时超过 TRACE_SLOW_MS 的请求会被记录
+    """
+    traces: List[Dict[str, Any]] = slow_trace_buffer.list()
+    return {
+        "slow_threshold_ms": slow_trace_buffer.slow_ms,
+        "capacity": slow_trace_buffer.capacity,
+        "traces": traces
+    }
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str) -> Dict[str, Any]:
+    """
+    获取完整 Span 树（Chrome Trace Event 格式）
+
+    保存为 .json 后可直接在 chrome://tracing 或 https://ui.perfetto.dev 中打开
+    """
+    return to_chrome_trace(await _get_trace(trace_id))
+
+
+@router.get("/traces/{trace_id}/critical-path")
+async def get_critical_path(trace_id: str) -> Dict[str, Any]:
+    """
+    关键路径报告：逐层沿最后结束的子 Span 向下，定位拖慢请求的节点 / 搜索 / LLM 调用
+    """
+    return critical_path(await _get_trace(trace_id))
@@ -0,0 +1,220 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, ValidationError
+from typing import Dict, Any
+from app.services.job_service import JobService
+from app.services.graph_store import GRAPH_KIND_TWO_PASS, GRAPH_KIND_SENSING
+from app.services.service_registry import services
+from app.api.causal_router import (
+    CausalQuery,
+    NewsExtractionRequest,
+    TargetResearchRequest,
+    NodeEnrichmentRequest,
+)
+
+router = APIRouter()
+job_service = JobService()
+
+
+class JobSubmitRequest(BaseModel):
+    """后台任务提交请求"""
+    pipeline: str = Field(..., description="Pipeline 名称（如：analyze-v2、research-target-enhanced）")
+    payload: Dict[str, Any] = Field(..., description="与同步接口一致的请求体")
+
+
+# ============================================================
+# Pipeline 注册：与同步接口共享同一套服务实例
+# ============================================================
+
+async def _run_analyze(payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    query = CausalQuery.model_validate(payload)
+    causal_service = await services.aget("causal")
+    progress("analyze", "running")
+    result = await causal_service.analyze(query.query, query.context, query.max_depth)
+    progress("analyze", "completed")
+    return result
+
+
+async def _run_analyze_v2(payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    query = CausalQuery.model_validate(payload)
+    two_pass_service = await services.aget("two_pass")
+    graph_store = await services.aget("graph_store")
+    graph_layout_service = await services.aget("graph_layout")
+    result = await two_pass_service.analyze_two_pass(
+        query.query,
+        query.context,
+        progress_callback=progress
+    )
+    await graph_layout_service.apply(result)
+    result["graph_id"] = await graph_store.save(result, GRAPH_KIND_TWO_PASS, query.query)
+    result["version"] = 1
+    return result
+
+
+async def _run_extract_causality(payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    request = NewsExtractionRequest.model_validate(payload)
+    news_extraction_service = await services.aget("news_extraction")
+    summary_service = await services.aget("summary")
+    graph_layout_service = await services.aget("graph_layout")
+
+    progress("extract_causality", "running")
+    result = await news_extraction_service.extract_causality(request.news_text)
+    progress("extract_causality", "completed")
+
+    if request.generate_summary:
+        progress("summary", "running")
+        result = await summary_service.generate_causal_summary_safe(result)
+        progress("summary", "completed")
+
+    return await graph_layout_service.apply(result)
+
+
+async def _run_research_target(payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    request = TargetResearchRequest.model_validate(payload)
+    target_research_service = await services.aget("target_research")
+    graph_layout_service = await services.aget("graph_layout")
+    progress("research_target", "running")
+    result = await target_research_service.research_target(request.target)
+    progress("research_target", "completed")
+    return await graph_layout_service.apply(result)
+
+
+async def _run_research_target_enhanced(payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    request = TargetResearchRequest.model_validate(payload)
+    enhanced_research_service = await services.aget("enhanced_research")
+    graph_store = await services.aget("graph_store")
+    graph_layout_service = await services.aget("graph_layout")
+    result = await enhanced_research_service.research_target_with_sensing(
+        request.target,
+        progress_callback=progress
+    )
+    await graph_layout_service.apply(result)
+    result["graph_id"] = await graph_store.save(result, GRAPH_KIND_SENSING, request.target)
+    result["version"] = 1
+    return result
+
+
+async def _run_enrich_nodes(payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    request = NodeEnrichmentRequest.model_validate(payload)
+    if not request.nodes:
+        raise ValueError("节点列表不能为空")
+
+    node_sensing_service = await services.aget("node_sensing")
+    progress("state_sensing", "running")
+    enriched_nodes = await node_sensing_service.enrich_nodes_batch(
+        request.nodes,
+        force_refresh=request.force_refresh
+    )
+    progress("state_sensing", "completed")
+
+    return {
+        "success": True,
+        "total": len(enriched_nodes),
+        "nodes": enriched_nodes
+    }
+
+
+PIPELINE_MODELS = {
+    "analyze": (CausalQuery, _run_analyze),
+    "analyze-v2": (CausalQuery, _run_analyze_v2),
+    "extract-causality": (NewsExtractionRequest, _run_extract_causality),
+    "research-target": (TargetResearchRequest, _run_research_target),
+    "research-target-enhanced": (TargetResearchRequest, _run_research_target_enhanced),
+    "enrich-nodes": (NodeEnrichmentRequest, _run_enrich_nodes),
+}
+
+for _name, (_model, _handler) in PIPELINE_MODELS.items():
+    job_service.register_pipeline(_name, _handler)
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: JobSubmitRequest):
+    """
+    提交后台任务（适用于耗时 40-120 秒的长 Pipeline）
+
+    立即返回 job_id，由独立的有界工作池异步执行，
+    避免长时间占用 HTTP 连接导致代理超时。
+
+    支持的 pipeline：
+        analyze, analyze-v2, extract-causality, research-target,
+        research-target-enhanced, enrich-nodes
+
+    请求示例：
+        {
+            "pipeline": "research-target-enhanced",
+            "payload": {"target": "黄金价格"}
+        }
+
+    Returns:
+        任务记录：job_id、status (queued)、stages、created_at
+
+    Raises:
+        HTTPException 400: 未知 pipeline 或 payload 校验失败
+        HTTPException 503: 任务队列已满
+    """
+    entry = PIPELINE_MODELS.get(request.pipeline)
+    if entry is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知的 Pipeline: {request.pipeline}，可选: {', '.join(PIPELINE_MODELS)}"
+        )
+
+    # 提交前校验 payload，避免无效任务进入队列
+    model, _ = entry
+    try:
+        model.model_validate(request.payload)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"参数验证失败: {str(e)}"
+        )
+
+    try:
+        return await job_service.submit(request.pipeline, request.payload)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    查询任务状态与分阶段进度
+
+    Returns:
+        {
+            "job_id": "...",
+            "pipeline": "analyze-v2",
+            "status": "queued|running|completed|failed",
+            "stages": [
+                {"name": "pass1_topology", "status": "completed", "elapsed": 12.3, ...},
+                {"name": "pass2_enrichment", "status": "running", ...}
+            ],
+            "error": null,
+            ...
+        }
+    """
+    job = await job_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return job
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    获取已完成任务的结果（从 SQLite 持久化存储读取）
+
+    Raises:
+        HTTPException 404: 任务不存在
+        HTTPException 409: 任务尚未完成或执行失败
+    """
+    job = await job_service.get_result(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+
+    if job["status"] == "failed":
+        raise HTTPException(status_code=409, detail=f"任务执行失败: {job['error']}")
+
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"任务尚未完成，当前状态: {job['status']}")
+
+    return job["result"]
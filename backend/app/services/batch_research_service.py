@@ -0,0 +1,307 @@
+"""
+批量标的研究服务
+一次请求研究多个标的（指数、商品、外汇等）：
+- 多个标的合并到一次 LLM 调用中提取因果图谱与搜索查询
+- 对所有图谱的节点取并集，共享节点（如美元指数、美联储利率）只感知一次
+- 按标的逐个流式返回结果，全程并发受限
+"""
+
+from openai import AsyncOpenAI
+import os
+import time
+import asyncio
+from typing import Dict, Any, List, AsyncGenerator
+from app.services.graph_layout_service import GraphLayoutService
+from app.services.llm_gateway import llm_gateway
+from app.services.node_sensing_service import NodeSensingService
+from app.utils import codec
+from app.utils.metrics import timed_semaphore
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTargetResearchService:
+    """批量标的研究服务 - 批量因子提取 + 共享节点感知"""
+
+    def __init__(
+        self,
+        sensing_service: NodeSensingService = None,
+        layout_service: GraphLayoutService = None
+    ):
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        )
+        self.model = os.getenv("OPENAI_MODEL", "deepseek-reasoner")
+        self.sensing_service = sensing_service or NodeSensingService()
+        self.layout_service = layout_service or GraphLayoutService()
+
+        # 每次 LLM 调用合并的标的数量
+        self.targets_per_call = int(os.getenv("BATCH_RESEARCH_TARGETS_PER_CALL", "5"))
+        # 并发的 LLM 批次数量
+        self.max_concurrent_calls = int(os.getenv("BATCH_RESEARCH_CONCURRENCY", "3"))
+
+    async def research_targets_stream(
+        self,
+        targets: List[str]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        批量研究多个标的，按完成顺序逐个产出结果
+
+        Args:
+            targets: 标的名称列表
+
+        Yields:
+            每个标的一条事件：
+            - {"status": "success", "target": ..., "data": {nodes, edges, explanation, metadata}}
+            - {"status": "error", "target": ..., "message": ...}
+            最后一条为汇总事件 {"status": "complete", ...}
+        """
+        pipeline_start = time.time()
+
+        # 去重并保持顺序
+        unique_targets = list(dict.fromkeys(t.strip() for t in targets if t and t.strip()))
+        chunks = [
+            unique_targets[i:i + self.targets_per_call]
+            for i in range(0, len(unique_targets), self.targets_per_call)
+        ]
+
+        logger.info(
+            "[批量研究] 开始处理 %s 个标的，分 %s 批 LLM 调用",
+            len(unique_targets), len(chunks)
+        )
+
+        llm_semaphore = asyncio.Semaphore(self.max_concurrent_calls)
+        sensing_semaphore = asyncio.Semaphore(self.sensing_service.max_concurrent_searches)
+
+        # 共享节点感知任务：节点键 -> Task，保证同一节点在整个批次内只感知一次
+        node_tasks: Dict[str, asyncio.Task] = {}
+        # 无标签节点的感知任务（不参与共享）
+        unshared_tasks: List[asyncio.Task] = []
+        node_refs = 0
+
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def enrich_shared(node: Dict[str, Any]) -> Dict[str, Any]:
+            async with timed_semaphore(sensing_semaphore, "batch_research.sensing"):
+                return await self.sensing_service.enrich_node_state(dict(node))
+
+        async def build_target(target: str, graph: Dict[str, Any]):
+            nonlocal node_refs
+            tasks = []
+            for node in graph["nodes"]:
+                key = self._node_key(node.get("label") or "")
+                if not key:
+                    # 无标签节点无法判断是否同一节点（节点 ID 只在单个图谱内唯一），单独感知、不共享
+                    unshared_tasks.append(asyncio.create_task(enrich_shared(node)))
+                    tasks.append(unshared_tasks[-1])
+                    node_refs += 1
+                    continue
+                if key not in node_tasks:
+                    node_tasks[key] = asyncio.create_task(enrich_shared(node))
+                tasks.append(node_tasks[key])
+                node_refs += 1
+
+            enriched = await asyncio.gather(*tasks, return_exceptions=True)
+
+            nodes = []
+            for node, shared in zip(graph["nodes"], enriched):
+                node = dict(node)
+                if isinstance(shared, Exception):
+                    node["current_state"] = self.sensing_service._create_unknown_state()
+                else:
+                    node["current_state"] = shared.get("current_state")
+                    node["last_updated"] = shared.get("last_updated")
+                nodes.append(node)
+
+            data = {
+                "nodes": nodes,
+                "edges": graph["edges"],
+                "explanation": graph.get("explanation", ""),
+                "metadata": {
+                    "target": target,
+                    "total_nodes": len(nodes),
+                    "nodes_with_state": sum(
+                        1 for n in nodes
+                        if (n.get("current_state") or {}).get("value") != "unknown"
+                    )
+                }
+            }
+            await self.layout_service.apply(data)
+
+            await results.put({
+                "status": "success",
+                "target": target,
+                "data": data
+            })
+
+        async def process_chunk(chunk: List[str]):
+            try:
+                async with timed_semaphore(llm_semaphore, "batch_research.llm"):
+                    graphs = await self._extract_graphs_batch(chunk)
+            except Exception as e:
+                logger.error("[批量研究] 批次 %s 因子提取失败: %s", chunk, e)
+                for target in chunk:
+                    await results.put({
+                        "status": "error",
+                        "target": target,
+                        "message": f"因子提取失败: {str(e)}"
+                    })
+                return
+
+            async def build_or_report(target: str):
+                graph = graphs.get(target)
+                if graph is None:
+                    await results.put({
+                        "status": "error",
+                        "target": target,
+                        "message": "LLM 未返回该标的的因果图谱"
+                    })
+                    return
+                try:
+                    await build_target(target, graph)
+                except Exception as e:
+                    await results.put({
+                        "status": "error",
+                        "target": target,
+                        "message": f"图谱构建失败: {str(e)}"
+                    })
+
+            await asyncio.gather(*[build_or_report(target) for target in chunk])
+
+        chunk_tasks = [asyncio.create_task(process_chunk(chunk)) for chunk in chunks]
+
+        succeeded = 0
+        failed = 0
+        try:
+            for _ in range(len(unique_targets)):
+                event = await results.get()
+                if event["status"] == "success":
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield event
+        finally:
+            # 客户端断开时取消剩余任务
+            for task in chunk_tasks + list(node_tasks.values()) + unshared_tasks:
+                if not task.done():
+                    task.cancel()
+
+        total_elapsed = time.time() - pipeline_start
+        logger.info(
+            "[批量研究] 完成: %s 成功 / %s 失败，节点引用 %s 个，实际感知 %s 个，总耗时 %.2f秒",
+            succeeded, failed, node_refs, len(node_tasks) + len(unshared_tasks), total_elapsed
+        )
+
+        yield {
+            "status": "complete",
+            "total": len(unique_targets),
+            "succeeded": succeeded,
+            "failed": failed,
+            "node_refs": node_refs,
+            "unique_nodes": len(node_tasks) + len(unshared_tasks),
+            "total_time": total_elapsed
+        }
+
+    async def _extract_graphs_batch(self, targets: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        在一次 LLM 调用中为多个标的提取因果图谱
+
+        每个节点同时生成 auto_queries，省去逐节点的查询配置调用
+
+        Returns:
+            标的名称 -> {nodes, edges, explanation}
+        """
+        system_prompt = """你是一个资深的宏观经济分析师。用户会给出多个目标资产，请分别分析影响每个资产的核心因果因子，构建因果传导链条。
+
+【输出格式】
+必须严格输出以下 JSON 格式：
+{
+    "results": [
+        {
+            "target": "目标资产名称（与输入完全一致）",
+            "nodes": [
+                {
+                    "id": "n1",
+                    "label": "节点标签（如：美元指数）",
+                    "type": "cause|effect|intermediate",
+                    "description": "节点详细描述",
+                    "confidence": 0.9,
+                    "auto_queries": ["精准搜索词（中文）", "精准搜索词（英文）"]
+                }
+            ],
+            "edges": [
+                {
+                    "source": "n1",
+                    "target": "n2",
+                    "label": "因果关系类型",
+                    "description": "传导机制说明",
+                    "strength": 0.85
+                }
+            ],
+            "explanation": "整体因果关系的综合分析"
+        }
+    ]
+}
+
+【分析要求】
+1. 每个目标资产识别 3-7 个核心影响因子
+2. 不同资产共有的因子必须使用完全相同的 label（如"美元指数"、"美联储利率"）
+3. 节点 label 必须简洁明确
+4. auto_queries 包含 2 个带时间限定词（如"最新"、"latest"）的搜索词"""
+
+        targets_text = "\n".join(f"- {target}" for target in targets)
+        user_prompt = f"""【目标资产列表】
+{targets_text}
+
+请为列表中的每个资产输出因果图 JSON 数据。"""
+
+        response = await llm_gateway.chat(
+            self.client,
+            "BatchTargetResearchService.extract_graphs_batch",
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.5,
+            response_format={"type": "json_object"}
+        )
+
+        content = response.choices[0].message.content
+        result = codec.loads(content)
+
+        if "results" not in result or not isinstance(result["results"], list):
+            raise ValueError("LLM 返回缺少 results 字段")
+
+        graphs = {}
+        for item in result["results"]:
+            target = item.get("target", "").strip()
+            if target not in targets:
+                continue
+            if "nodes" not in item or "edges" not in item:
+                continue
+
+            # 丢弃引用不存在节点的边
+            node_ids = {node.get("id") for node in item["nodes"]}
+            item["edges"] = [
+                edge for edge in item["edges"]
+                if edge.get("source") in node_ids and edge.get("target") in node_ids
+            ]
+
+            for node in item["nodes"]:
+                queries = node.pop("auto_queries", None) or []
+                if not queries:
+                    label = node.get("label", "")
+                    queries = [f"{label} 最新", f"{label} latest"]
+                node["sensing_config"] = {"auto_queries": queries}
+
+            graphs[target] = item
+
+        return graphs
+
+    @staticmethod
+    def _node_key(label: str) -> str:
+        """节点去重键：忽略大小写与空白（空标签返回空串，调用方不做共享）"""
+        return "".join(label.lower().split())
@@ -1,8 +1,14 @@
 from openai import AsyncOpenAI
 import os
-import json
 from typing import Optional
 
+from app.services.llm_gateway import llm_gateway
+from app.services.topology_cache import SemanticTopologyCache
+from app.utils import codec
+
+# 因果图缓存：同义表述的问题直接复用已生成的图谱
+_analysis_cache = SemanticTopologyCache(name="causal_analysis")
+
 class CausalService:
     """因果推演服务"""
     
@@ -16,13 +22,25 @@ class CausalService:
     async def analyze(self, query: str, context: Optional[str] = None, max_depth: int = 3):
         """
         分析因果关系并生成因果图
+        
+        结果按 (context, max_depth) 作用域语义缓存
         """
+        return await _analysis_cache.get_or_compute(
+            query,
+            lambda: self._generate(query, context, max_depth),
+            scope=((context or "").strip(), max_depth)
+        )
+    
+    async def _generate(self, query: str, context: Optional[str], max_depth: int):
+        """调用大模型生成因果图（不经过缓存）"""
         
         # 构建提示词
         prompt = self._build_prompt(query, context, max_depth)
         
         # 调用大模型
-        response = await self.client.chat.completions.create(
+        response = await llm_gateway.chat(
+            self.client,
+            "CausalService.generate",
             model=self.model,
             messages=[
                 {
@@ -39,7 +57,7 @@ class CausalService:
         )
         
         # 解析响应
-        result = json.loads(response.choices[0].message.content)
+        result = codec.loads(response.choices[0].message.content)
         
         return result
     
@@ -5,12 +5,15 @@
 
 from openai import AsyncOpenAI
 import os
-import json
 import time
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
+from app.services.llm_gateway import llm_gateway
 from app.services.search_service import SearchService
 from app.services.node_sensing_service import NodeSensingService
 from app.prompts.system_prompts import NEWS_CAUSALITY_EXTRACTION_PROMPT
+from app.utils import codec
+from app.utils.metrics import observe_stage
+from app.utils.tracing import traced
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,7 +31,11 @@ class EnhancedTargetResearchService:
         self.search_service = SearchService()
         self.sensing_service = NodeSensingService()
     
-    async def research_target_with_sensing(self, target: str) -> Dict[str, Any]:
+    async def research_target_with_sensing(
+        self,
+        target: str,
+        progress_callback: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, Any]:
         """
         完整的标的研究 Pipeline（带自动状态感知）
         
@@ -40,6 +47,7 @@ class EnhancedTargetResearchService:
         
         Args:
             target: 标的名称（如"黄金价格"）
+            progress_callback: 可选的阶段进度回调 (stage, status)，供后台任务上报进度
             
         Returns:
             完整的分析结果，包含：
@@ -48,31 +56,38 @@ class EnhancedTargetResearchService:
             - explanation: 综合分析
             - metadata: 元数据
         """
-        logger.info(f"\n{'='*80}")
-        logger.info(f"开始增强型标的研究: {target}")
-        logger.info(f"{'='*80}")
+        logger.info("\n%s", '='*80)
+        logger.info("开始增强型标的研究: %s", target)
+        logger.info("%s", '='*80)
         
         pipeline_start = time.time()
         
+        def report(stage: str, status: str):
+            if progress_callback:
+                progress_callback(stage, status)
+        
         try:
             # ============================================
             # 步骤 1: 因果分析 - 识别影响因子
             # ============================================
-            logger.info(f"\n[步骤 1] 开始因果分析，识别影响 {target} 的关键因子")
+            logger.info("\n[步骤 1] 开始因果分析，识别影响 %s 的关键因子", target)
             step1_start = time.time()
+            report("causal_analysis", "running")
             
             causal_graph = await self._analyze_causal_factors(target)
             
             step1_elapsed = time.time() - step1_start
-            logger.info(f"[步骤 1] 完成，耗时: {step1_elapsed:.2f}秒")
-            logger.info(f"  - 识别节点: {len(causal_graph['nodes'])} 个")
-            logger.info(f"  - 识别关系: {len(causal_graph['edges'])} 条")
+            report("causal_analysis", "completed")
+            logger.info("[步骤 1] 完成，耗时: %.2f秒", step1_elapsed)
+            logger.info("  - 识别节点: %s 个", len(causal_graph['nodes']))
+            logger.info("  - 识别关系: %s 条", len(causal_graph['edges']))
             
             # ============================================
             # 步骤 2: 自动配置搜索查询
             # ============================================
-            logger.info(f"\n[步骤 2] 为关键节点自动配置搜索查询")
+            logger.info("\n[步骤 2] 为关键节点自动配置搜索查询")
             step2_start = time.time()
+            report("query_configuration", "running")
             
             nodes_with_queries = await self._auto_configure_queries(
                 causal_graph['nodes'],
@@ -80,34 +95,38 @@ class EnhancedTargetResearchService:
             )
             
             step2_elapsed = time.time() - step2_start
-            logger.info(f"[步骤 2] 完成，耗时: {step2_elapsed:.2f}秒")
-            logger.info(f"  - 配置查询的节点: {len(nodes_with_queries)} 个")
+            report("query_configuration", "completed")
+            logger.info("[步骤 2] 完成，耗时: %.2f秒", step2_elapsed)
+            logger.info("  - 配置查询的节点: %s 个", len(nodes_with_queries))
             
             # ============================================
             # 步骤 3: 并发获取节点实时状态
             # ============================================
-            logger.info(f"\n[步骤 3] 并发获取所有节点的实时状态")
+            logger.info("\n[步骤 3] 并发获取所有节点的实时状态")
             step3_start = time.time()
+            report("state_sensing", "running")
             
             enriched_nodes = await self.sensing_service.enrich_nodes_batch(
                 nodes_with_queries
             )
             
             step3_elapsed = time.time() - step3_start
-            logger.info(f"[步骤 3] 完成，耗时: {step3_elapsed:.2f}秒")
+            report("state_sensing", "completed")
+            logger.info("[步骤 3] 完成，耗时: %.2f秒", step3_elapsed)
             
             # 统计状态更新情况
             updated_count = sum(
                 1 for node in enriched_nodes 
                 if node.get('current_state', {}).get('value') != 'unknown'
             )
-            logger.info(f"  - 成功更新状态: {updated_count}/{len(enriched_nodes)} 个节点")
+            logger.info("  - 成功更新状态: %s/%s 个节点", updated_count, len(enriched_nodes))
             
             # ============================================
             # 步骤 4: 生成综合分析报告
             # ============================================
-            logger.info(f"\n[步骤 4] 生成综合分析报告")
+            logger.info("\n[步骤 4] 生成综合分析报告")
             step4_start = time.time()
+            report("report_generation", "running")
             
             enhanced_explanation = await self._generate_enhanced_explanation(
                 target=target,
@@ -117,7 +136,8 @@ class EnhancedTargetResearchService:
             )
             
             step4_elapsed = time.time() - step4_start
-            logger.info(f"[步骤 4] 完成，耗时: {step4_elapsed:.2f}秒")
+            report("report_generation", "completed")
+            logger.info("[步骤 4] 完成，耗时: %.2f秒", step4_elapsed)
             
             # ============================================
             # 组装最终结果
@@ -142,20 +162,25 @@ class EnhancedTargetResearchService:
                 }
             }
             
-            logger.info(f"\n{'='*80}")
-            logger.info(f"Pipeline 完成，总耗时: {total_elapsed:.2f}秒")
-            logger.info(f"{'='*80}\n")
+            for stage, elapsed in final_result["metadata"]["pipeline_steps"].items():
+                observe_stage("research_target_enhanced", stage, elapsed)
+            observe_stage("research_target_enhanced", "total", total_elapsed)
+            
+            logger.info("\n%s", '='*80)
+            logger.info("Pipeline 完成，总耗时: %.2f秒", total_elapsed)
+            logger.info("%s\n", '='*80)
             
             return final_result
             
         except Exception as e:
             total_elapsed = time.time() - pipeline_start
-            logger.error(f"\n{'='*80}")
-            logger.error(f"Pipeline 失败，总耗时: {total_elapsed:.2f}秒")
-            logger.error(f"错误: {str(e)}")
-            logger.error(f"{'='*80}\n")
+            logger.error("\n%s", '='*80)
+            logger.error("Pipeline 失败，总耗时: %.2f秒", total_elapsed)
+            logger.error("错误: %s", e)
+            logger.error("%s\n", '='*80)
             raise
     
+    @traced("causal_analysis")
     async def _analyze_causal_factors(self, target: str) -> Dict[str, Any]:
         """
         步骤 1: 分析影响标的的因果因子
@@ -205,7 +230,9 @@ class EnhancedTargetResearchService:
 
 输出标准的因果图 JSON 数据。"""
 
-        response = await self.client.chat.completions.create(
+        response = await llm_gateway.chat(
+            self.client,
+            "EnhancedTargetResearchService.analyze_causal_factors",
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -216,7 +243,7 @@ class EnhancedTargetResearchService:
         )
         
         content = response.choices[0].message.content
-        result = json.loads(content)
+        result = codec.loads(content)
         
         # 验证必需字段
         if "nodes" not in result or "edges" not in result:
@@ -224,6 +251,7 @@ class EnhancedTargetResearchService:
         
         return result
     
+    @traced("query_configuration")
     async def _auto_configure_queries(
         self, 
         nodes: List[Dict[str, Any]], 
@@ -234,7 +262,7 @@ class EnhancedTargetResearchService:
         
         使用 LLM 为每个节点生成精准的搜索关键词
         """
-        logger.info(f"[查询配置] 开始为 {len(nodes)} 个节点配置搜索查询")
+        logger.info("[查询配置] 开始为 %s 个节点配置搜索查询", len(nodes))
         
         system_prompt = """你是一个搜索查询优化专家。请为给定的经济/金融节点生成精准的搜索关键词。
 
@@ -274,7 +302,9 @@ class EnhancedTargetResearchService:
 请生成该节点的搜索查询关键词。"""
 
             try:
-                response = await self.client.chat.completions.create(
+                response = await llm_gateway.chat(
+                    self.client,
+                    "EnhancedTargetResearchService.auto_configure_queries",
                     model=self.model,
                     messages=[
                         {"role": "system", "content": system_prompt},
@@ -285,17 +315,17 @@ class EnhancedTargetResearchService:
                 )
                 
                 content = response.choices[0].message.content
-                result = json.loads(content)
+                result = codec.loads(content)
                 
                 # 注入 sensing_config
                 node["sensing_config"] = {
                     "auto_queries": result.get("queries", [])
                 }
                 
-                logger.info(f"[查询配置] 节点 '{node_label}' 配置完成: {len(result.get('queries', []))} 个查询")
+                logger.info("[查询配置] 节点 '%s' 配置完成: %s 个查询", node_label, len(result.get('queries', [])))
                 
             except Exception as e:
-                logger.warning(f"[查询配置] 节点 '{node_label}' 配置失败: {str(e)}")
+                logger.warning("[查询配置] 节点 '%s' 配置失败: %s", node_label, e)
                 # 降级：使用节点标签作为查询
                 node["sensing_config"] = {
                     "auto_queries": [f"{node_label} 最新", f"{node_label} latest"]
@@ -318,6 +348,7 @@ class EnhancedTargetResearchService:
         
         return valid_nodes
     
+    @traced("report_generation")
     async def _generate_enhanced_explanation(
         self,
         target: str,
@@ -370,7 +401,9 @@ class EnhancedTargetResearchService:
 请撰写综合分析报告。"""
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await llm_gateway.chat(
+                self.client,
+                "EnhancedTargetResearchService.generate_enhanced_explanation",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -384,7 +417,7 @@ class EnhancedTargetResearchService:
             return enhanced_explanation
             
         except Exception as e:
-            logger.error(f"[报告生成] 失败: {str(e)}")
+            logger.error("[报告生成] 失败: %s", e)
             # 降级：返回原始分析 + 状态摘要
             return f"{original_explanation}\n\n【实时状态】\n{node_states_text}"
 
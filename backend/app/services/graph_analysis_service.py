@@ -0,0 +1,214 @@
+"""
+图谱结构分析服务 (Graph Analysis)
+对单张或多张图谱（已保存的 graph_id 或请求中直接提交的图谱）做结构分析：
+- 多张图谱按规范节点 ID（NodeStateStore.resolve，别名同样归并）合并为一张图，
+  重复节点取最高 confidence，重复边取最高 strength
+- 结构校验：悬空边、重复节点 / 边、自环、环、孤立节点
+- 传递归约：可由其他路径推出的冗余边
+- 到目标节点的最强因果路径（strength × confidence 之积）
+
+计算部分在 app/utils/graph_core.py（CSR 数组），在线程中执行，不阻塞事件循环。
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+from app.services.graph_store import GraphStore
+from app.services.node_state_store import node_state_store
+from app.utils.graph_core import CausalGraphCore
+
+logger = logging.getLogger(__name__)
+
+
+def merge_graphs(graphs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    按规范节点 ID 合并多张图谱
+
+    Returns:
+        {"nodes": [...], "edges": [...]}，节点 id 为规范 ID，附带 occurrences（出现在几张图谱中）
+    """
+    nodes: Dict[str, Dict[str, Any]] = {}
+    edges: Dict[tuple, Dict[str, Any]] = {}
+
+    for graph in graphs:
+        local_ids: Dict[str, str] = {}
+        for node in graph.get("nodes") or []:
+            if "id" not in node:
+                continue
+            canonical_id = node_state_store.resolve(node.get("label") or str(node["id"]))
+            local_ids[str(node["id"])] = canonical_id
+
+            merged = nodes.get(canonical_id)
+            if merged is None:
+                nodes[canonical_id] = {
+                    "id": canonical_id,
+                    "label": node.get("label", canonical_id),
+                    "type": node.get("type"),
+                    "confidence": node.get("confidence"),
+                    "occurrences": 1
+                }
+                continue
+            merged["occurrences"] += 1
+            if (node.get("confidence") or 0) > (merged["confidence"] or 0):
+                merged["confidence"] = node["confidence"]
+
+        for edge in graph.get("edges") or []:
+            # 悬空边原样保留（端点为原 ID），由校验报告统一指出
+            source = local_ids.get(str(edge.get("source")), edge.get("source"))
+            target = local_ids.get(str(edge.get("target")), edge.get("target"))
+            merged = edges.get((source, target))
+            if merged is None:
+                edges[(source, target)] = {
+                    "source": source,
+                    "target": target,
+                    "label": edge.get("label"),
+                    "strength": edge.get("strength")
+                }
+            elif (edge.get("strength") or 0) > (merged["strength"] or 0):
+                merged["strength"] = edge["strength"]
+
+    return {"nodes": list(nodes.values()), "edges": list(edges.values())}
+
+
+class GraphAnalysisService:
+    """图谱结构分析服务"""
+
+    def __init__(self, graph_store: GraphStore):
+        self.graph_store = graph_store
+
+    async def load(self, graph_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        读取已保存的图谱
+
+        Raises:
+            KeyError: 图谱不存在时（参数为缺失的 graph_id）
+        """
+        records = await asyncio.gather(*(self.graph_store.get(graph_id) for graph_id in graph_ids))
+        for graph_id, record in zip(graph_ids, records):
+            if record is None:
+                raise KeyError(graph_id)
+        return [record["graph"] for record in records]
+
+    async def analyze(
+        self,
+        graphs: List[Dict[str, Any]],
+        target: Optional[str] = None,
+        k: int = 5,
+        reduce: bool = True
+    ) -> Dict[str, Any]:
+        """
+        分析图谱结构
+
+        Args:
+            graphs: 图谱列表（多于一张时先合并）
+            target: 目标节点 ID 或标签；默认取入边最多的叶节点
+            k: 返回的最强路径数量
+            reduce: 是否计算传递归约
+
+        Returns:
+            {
+                "validation": {...},
+                "target": {"id", "label"} 或 None,
+                "paths": [{"nodes": [id...], "labels": [...], "score": 0.42}],
+                "broken_edges": [{"source", "target", "strength"}],
+                "redundant_edges": [{"source", "target"}] 或 None（有环时）,
+                "merged": {"graphs": 2, "nodes": [...], "edges": [...]}（仅多张图谱时）,
+                "elapsed_ms": 3.2
+            }
+
+        Raises:
+            ValueError: 图谱为空或指定的目标节点不存在时
+        """
+        if not graphs:
+            raise ValueError("至少需要一张图谱")
+        merged = len(graphs) > 1
+        graph = merge_graphs(graphs) if merged else graphs[0]
+        labels = {
+            str(node["id"]): node.get("label", str(node["id"]))
+            for node in graph.get("nodes") or [] if isinstance(node, dict) and "id" in node
+        }
+        # 规范 ID 在事件循环上解析（NodeStateStore 的同义词表只在事件循环中读写），线程中只做 CSR 计算
+        canonical = None
+        if target:
+            canonical = {
+                "target": node_state_store.resolve(target),
+                "labels": {node_id: node_state_store.resolve(label) for node_id, label in labels.items()}
+            }
+        result = await asyncio.to_thread(self._analyze, graph, labels, target, canonical, k, reduce)
+        if merged:
+            result["merged"] = {"graphs": len(graphs), **graph}
+        return result
+
+    def _analyze(
+        self,
+        graph: Dict[str, Any],
+        labels: Dict[str, str],
+        target: Optional[str],
+        canonical: Optional[Dict[str, Any]],
+        k: int,
+        reduce: bool
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        core = CausalGraphCore.from_graph(graph, strict=False)
+
+        result: Dict[str, Any] = {"validation": core.validate()}
+
+        target_index = self._resolve_target(core, labels, target, canonical)
+        result["target"] = None
+        result["paths"] = []
+        result["broken_edges"] = []
+        if target_index is not None:
+            target_id = core.node_ids[target_index]
+            result["target"] = {"id": target_id, "label": labels.get(target_id, target_id)}
+            paths, broken = core.top_paths(target_index, k)
+            result["paths"] = [
+                {
+                    "nodes": [core.node_ids[i] for i in path["nodes"]],
+                    "labels": [labels.get(core.node_ids[i], core.node_ids[i]) for i in path["nodes"]],
+                    "score": round(path["score"], 6)
+                }
+                for path in paths
+            ]
+            result["broken_edges"] = [
+                {**self._edge(core, edge), "strength": float(core.strength[edge])} for edge in broken
+            ]
+
+        result["redundant_edges"] = None
+        if reduce and result["validation"]["acyclic"]:
+            result["redundant_edges"] = [self._edge(core, edge) for edge in core.transitive_reduction()]
+
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(
+            "[GraphAnalysis] 节点 %d / 边 %d，环 %d 个，路径 %d 条，耗时 %.1fms",
+            core.node_count, core.edge_count, len(result["validation"]["cycles"]),
+            len(result["paths"]), result["elapsed_ms"]
+        )
+        return result
+
+    @staticmethod
+    def _edge(core: CausalGraphCore, edge: int) -> Dict[str, str]:
+        return {"source": core.node_ids[int(core.src[edge])], "target": core.node_ids[int(core.dst[edge])]}
+
+    @staticmethod
+    def _resolve_target(
+        core: CausalGraphCore,
+        labels: Dict[str, str],
+        target: Optional[str],
+        canonical: Optional[Dict[str, Any]]
+    ) -> Optional[int]:
+        """目标节点：按 ID、标签或规范 ID（canonical，事件循环上预先解析）匹配；未指定时取入边最多的叶节点"""
+        if target:
+            if target in core.index:
+                return core.index[target]
+            for node_id, label in labels.items():
+                if label == target or canonical["labels"][node_id] == canonical["target"]:
+                    return core.index[node_id]
+            raise ValueError(f"目标节点不存在: {target}")
+
+        in_degree = core.in_degree()
+        sinks = (core.out_degree() == 0) & (in_degree > 0)
+        if not sinks.any():
+            return None
+        return int((in_degree * sinks).argmax())
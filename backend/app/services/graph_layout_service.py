@@ -0,0 +1,121 @@
+"""
+图谱布局服务 (Graph Layout)
+在后端计算分层布局（app/utils/graph_layout.py），节点坐标随图谱一起返回，前端无需在主线程运行 dagre：
+- 缓存键为拓扑哈希：节点 ID 集合 + 边 (source, target) 集合的规范 JSON 的 SHA-256（与顺序无关）
+  节点状态、标签、说明等富化字段不参与哈希，富化 / 增量刷新后的图谱直接命中缓存，不会重新布局
+- 布局按规范顺序（节点、边按 ID 排序）计算，同一拓扑无论输入顺序如何都得到相同布局
+- 坐标写入 node["position"]（左上角 {x, y}），布局信息写入 graph["layout"]；
+  坐标随图谱保存，GET /graphs/{graph_id} 与刷新 patch 中保持不变
+
+配置（环境变量）：GRAPH_LAYOUT_TTL（默认 86400 秒）
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Any, Optional
+
+from app.utils import codec
+from app.utils.graph_core import CausalGraphCore
+from app.utils.graph_layout import layered_layout
+from app.utils.ttl_cache import TTLCache
+from app.utils.cache_backend import is_shared
+
+logger = logging.getLogger(__name__)
+
+# 超过该节点数的图谱在线程中计算布局，避免阻塞事件循环
+THREAD_THRESHOLD = 200
+
+
+def canonical_topology(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """只保留拓扑（节点 ID 与边端点），按 ID 排序"""
+    node_ids = sorted({str(node["id"]) for node in graph.get("nodes") or [] if isinstance(node, dict) and "id" in node})
+    edges = sorted({
+        (str(edge["source"]), str(edge["target"]))
+        for edge in graph.get("edges") or []
+        if isinstance(edge, dict) and "source" in edge and "target" in edge
+    })
+    return {"nodes": [{"id": node_id} for node_id in node_ids], "edges": [{"source": s, "target": t} for s, t in edges]}
+
+
+def topology_hash(graph: Dict[str, Any]) -> str:
+    """图谱拓扑的规范哈希"""
+    return hashlib.sha256(codec.dumps_canonical(canonical_topology(graph))).hexdigest()[:32]
+
+
+class GraphLayoutService:
+    """图谱布局服务（按拓扑哈希缓存）"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self._cache = TTLCache(
+            name="graph_layout",
+            default_ttl=ttl if ttl is not None else float(os.getenv("GRAPH_LAYOUT_TTL", "86400")),
+            max_size=512
+        )
+
+    def compute(self, graph: Dict[str, Any], direction: str = "LR") -> Dict[str, Any]:
+        """
+        计算（或从缓存读取）布局
+
+        Returns:
+            {
+                "hash": "拓扑哈希", "direction": "LR", "algorithm": "sugiyama",
+                "width": 1240.0, "height": 860.0,
+                "positions": {"n1": [20.0, 140.0], ...},
+                "cached": true
+            }
+
+        Raises:
+            ValueError: 布局方向不支持时
+        """
+        topology = canonical_topology(graph)
+        digest = hashlib.sha256(codec.dumps_canonical(topology)).hexdigest()[:32]
+        key = [digest, direction]
+        cached = self._cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        start = time.perf_counter()
+        core = CausalGraphCore.from_graph(topology, strict=False)
+        positions, width, height = layered_layout(core, direction)
+        layout = {
+            "hash": digest,
+            "direction": direction,
+            "algorithm": "sugiyama",
+            "width": round(width, 1),
+            "height": round(height, 1),
+            "positions": {
+                node_id: [round(x, 1), round(y, 1)]
+                for node_id, (x, y) in zip(core.node_ids, positions.tolist())
+            }
+        }
+        self._cache.set(key, layout)
+        logger.info(
+            "[GraphLayout] 布局完成: 节点 %d / 边 %d，耗时 %.1fms",
+            core.node_count, core.edge_count, (time.perf_counter() - start) * 1000
+        )
+        return {**layout, "cached": False}
+
+    async def layout(self, graph: Dict[str, Any], direction: str = "LR") -> Dict[str, Any]:
+        """异步计算布局（大图或缓存为共享后端时在线程中执行）"""
+        if len(graph.get("nodes") or []) > THREAD_THRESHOLD or is_shared(self._cache.backend):
+            return await asyncio.to_thread(self.compute, graph, direction)
+        return self.compute(graph, direction)
+
+    async def apply(self, graph: Dict[str, Any], direction: str = "LR") -> Dict[str, Any]:
+        """为图谱节点写入 position，并附加 graph["layout"]（原地修改并返回）"""
+        layout = await self.layout(graph, direction)
+        positions = layout["positions"]
+        for node in graph.get("nodes") or []:
+            if isinstance(node, dict) and str(node.get("id")) in positions:
+                x, y = positions[str(node["id"])]
+                node["position"] = {"x": x, "y": y}
+        graph["layout"] = {
+            key: layout[key] for key in ("hash", "direction", "algorithm", "width", "height")
+        }
+        return graph
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
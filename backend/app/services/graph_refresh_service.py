@@ -0,0 +1,147 @@
+"""
+图谱增量刷新服务 (Incremental Graph Refresh)
+仪表盘按分钟轮询已持有的图谱时，只对状态超过新鲜度有效期的节点重新富化，
+并以 JSON Patch (RFC 6902) 返回发生变化的节点状态：
+- 规范状态存储中仍新鲜的节点直接复用（可能已被其他图谱或预热任务更新），不发起外部调用
+- 过期节点按图谱类型走原有富化路径（Yahoo 直连 / 两阶段共识验证）
+- 只有实际变化的字段进入 patch，图谱版本号随之递增
+"""
+
+import copy
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+
+from app.services.graph_store import GraphStore, GRAPH_KIND_TWO_PASS, GRAPH_KIND_SENSING
+from app.services.node_sensing_service import NodeSensingService
+from app.services.node_state_store import node_state_store
+from app.services.two_pass_causal_service import TwoPassCausalService
+from app.utils.json_patch import make_patch
+
+logger = logging.getLogger(__name__)
+
+# 各图谱类型的节点状态字段
+STATE_FIELDS = {
+    GRAPH_KIND_TWO_PASS: "realtime_state",
+    GRAPH_KIND_SENSING: "current_state"
+}
+
+
+class GraphRefreshService:
+    """图谱增量刷新服务"""
+
+    def __init__(
+        self,
+        graph_store: GraphStore,
+        two_pass_service: TwoPassCausalService,
+        sensing_service: NodeSensingService
+    ):
+        self.graph_store = graph_store
+        self.two_pass_service = two_pass_service
+        self.sensing_service = sensing_service
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get_graph(self, graph_id: str) -> Optional[Dict[str, Any]]:
+        """获取图谱文档（patch 路径以此文档为根）"""
+        record = await self.graph_store.get(graph_id)
+        if record is None:
+            return None
+        return self._document(record["graph"], graph_id, record["version"])
+
+    @staticmethod
+    def _document(graph: Dict[str, Any], graph_id: str, version: int) -> Dict[str, Any]:
+        return {**graph, "graph_id": graph_id, "version": version}
+
+    async def refresh(self, graph_id: str, since_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        增量刷新图谱
+
+        Args:
+            graph_id: 图谱 ID
+            since_version: 客户端持有的版本；与服务端不一致时无法基于其生成 patch，
+                刷新后返回完整图谱
+
+        Returns:
+            {"graph_id", "base_version", "version", "refreshed_nodes", "reused_nodes", "patch"}，
+            版本不一致时额外包含 "graph"；图谱不存在返回 None
+        """
+        lock = self._locks.setdefault(graph_id, asyncio.Lock())
+        async with lock:
+            record = await self.graph_store.get(graph_id)
+            if record is None:
+                return None
+
+            kind = record["kind"]
+            state_field = STATE_FIELDS[kind]
+            graph = record["graph"]
+            base_version = record["version"]
+
+            new_graph = copy.deepcopy(graph)
+            nodes = new_graph["nodes"]
+
+            # 1. 按规范状态存储划分：新鲜节点直接复用，过期节点重新富化
+            stale_indices = []
+            for i, node in enumerate(nodes):
+                entry = await node_state_store.aget(node.get("label", ""))
+                if entry is None:
+                    stale_indices.append(i)
+                elif kind == GRAPH_KIND_TWO_PASS:
+                    node[state_field] = node_state_store.to_realtime_state(entry)
+                else:
+                    node[state_field] = node_state_store.to_current_state(entry)
+                    node["last_updated"] = entry["last_updated"]
+
+            # 2. 并发富化过期节点
+            results = await asyncio.gather(
+                *[self._enrich(kind, nodes[i]) for i in stale_indices],
+                return_exceptions=True
+            )
+            for i, result in zip(stale_indices, results):
+                if isinstance(result, Exception):
+                    logger.error("[GraphRefresh] 节点 %s 刷新失败: %s", nodes[i].get('id'), result)
+                else:
+                    nodes[i] = result
+
+            # 有历史观测的节点：趋势按本地批量计算（复用与刷新的节点一并计算）
+            node_state_store.annotate_trends(nodes, state_field)
+
+            # 3. 只比较节点状态字段
+            patch: List[Dict[str, Any]] = []
+            for i, (old_node, new_node) in enumerate(zip(graph["nodes"], nodes)):
+                for field in (state_field, "last_updated"):
+                    if field not in old_node and field not in new_node:
+                        continue
+                    path = f"/nodes/{i}/{field}"
+                    if field not in old_node:
+                        patch.append({"op": "add", "path": path, "value": new_node[field]})
+                    else:
+                        patch.extend(make_patch(old_node[field], new_node.get(field), path))
+
+            version = base_version
+            if patch:
+                version = base_version + 1
+                patch.append({"op": "replace", "path": "/version", "value": version})
+                await self.graph_store.update(graph_id, new_graph, version)
+
+            logger.info(
+                "[GraphRefresh] 图谱 %s: 刷新 %s 个过期节点，复用 %s 个，patch %s 条",
+                graph_id, len(stale_indices), len(nodes) - len(stale_indices), len(patch)
+            )
+
+            response = {
+                "graph_id": graph_id,
+                "base_version": base_version,
+                "version": version,
+                "refreshed_nodes": [nodes[i].get("id") for i in stale_indices],
+                "reused_nodes": len(nodes) - len(stale_indices),
+                "patch": patch
+            }
+            if since_version is not None and since_version != base_version:
+                response["graph"] = self._document(new_graph, graph_id, version)
+
+            return response
+
+    async def _enrich(self, kind: str, node: Dict[str, Any]) -> Dict[str, Any]:
+        if kind == GRAPH_KIND_TWO_PASS:
+            return await self.two_pass_service._enrich_single_node(node)
+        return await self.sensing_service.enrich_node_state(node)
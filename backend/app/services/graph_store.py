@@ -0,0 +1,109 @@
+"""
+图谱存储服务 (Graph Store)
+持久化 /analyze-v2 与 /research-target-enhanced 生成的图谱，并分配 graph_id，
+客户端据此调用 POST /graphs/{id}/refresh 做增量刷新，无需重建整张图谱。
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+from app.utils import codec
+
+logger = logging.getLogger(__name__)
+
+# 图谱类型：决定节点状态字段与富化方式
+GRAPH_KIND_TWO_PASS = "two_pass"      # realtime_state，经 TwoPassCausalService 富化
+GRAPH_KIND_SENSING = "sensing"        # current_state，经 NodeSensingService 富化
+
+
+class GraphStore:
+    """图谱存储 - SQLite（WAL 模式，与任务存储同目录）"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        default_path = Path(__file__).parent.parent.parent / "data" / "graphs.db"
+        self.db_path = Path(db_path or os.getenv("GRAPH_STORE_PATH", str(default_path)))
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS graphs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    graph TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+        logger.info("[GraphStore] 图谱存储: %s", self.db_path)
+
+    # ================================================================
+    # 同步存储操作（经 asyncio.to_thread 调用）
+    # ================================================================
+
+    def _insert(self, graph_id: str, kind: str, query: str, graph: Dict[str, Any]):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO graphs (id, kind, query, graph, version, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?)",
+                (graph_id, kind, query, codec.dumps(graph), now, now)
+            )
+
+    def _update(self, graph_id: str, graph: Dict[str, Any], version: int):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE graphs SET graph = ?, version = ?, updated_at = ? WHERE id = ?",
+                (codec.dumps(graph), version, time.time(), graph_id)
+            )
+
+    def _load(self, graph_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM graphs WHERE id = ?", (graph_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "graph_id": row["id"],
+            "kind": row["kind"],
+            "query": row["query"],
+            "graph": codec.loads(row["graph"]),
+            "version": row["version"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+    # ================================================================
+    # 公共接口
+    # ================================================================
+
+    async def save(self, graph: Dict[str, Any], kind: str, query: str) -> str:
+        """保存新图谱，返回 graph_id"""
+        graph_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._insert, graph_id, kind, query, graph)
+        return graph_id
+
+    async def update(self, graph_id: str, graph: Dict[str, Any], version: int):
+        await asyncio.to_thread(self._update, graph_id, graph, version)
+
+    async def get(self, graph_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._load, graph_id)
@@ -0,0 +1,403 @@
+"""
+后台任务服务 (Background Job Service)
+将耗时 40-120 秒的 Pipeline 从 HTTP 连接中剥离：
+- 提交即返回 job_id
+- 有界工作池异步执行（并发数独立于 API worker）
+- 分阶段进度与结果持久化到 SQLite
+- 任务租约：所属进程定期续期 lease_until，租约过期的任务由任一进程接管（启动时及每次续期时检查）：
+  queued 重新入队，running 标记为失败
+"""
+
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from app.utils import codec
+from app.utils.logging_setup import bind_request_id, reset_request_id
+
+logger = logging.getLogger(__name__)
+
+# Pipeline 处理函数签名：handler(payload, progress) -> result
+# progress(stage, status) 用于上报阶段进度，status 取值 running / completed / failed
+ProgressCallback = Callable[[str, str], None]
+PipelineHandler = Callable[[Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]]
+
+
+class JobService:
+    """后台任务服务 - 有界工作池 + SQLite 任务存储"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_queue_size: Optional[int] = None
+    ):
+        default_path = Path(__file__).parent.parent.parent / "data" / "jobs.db"
+        self.db_path = Path(db_path or os.getenv("JOB_STORE_PATH", str(default_path)))
+
+        # 工作池大小与 uvicorn --workers 相互独立
+        self.max_workers = max_workers or int(os.getenv("JOB_WORKERS", "2"))
+        self.max_queue_size = max_queue_size or int(os.getenv("JOB_QUEUE_SIZE", "100"))
+        # 租约有效期；续期间隔为其 1/3，进程退出后最迟一个租约期内被接管
+        self.lease_seconds = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+        self._pipelines: Dict[str, PipelineHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+
+        # 任务归属：主机 + 进程号 + 启动标识（仅用于排查；存活与否只看租约）
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._init_db()
+
+    # ================================================================
+    # 存储层
+    # ================================================================
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        """初始化任务表（WAL 模式，允许多个 API worker 并发读取）"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    pipeline TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stages TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    owner TEXT,
+                    lease_until REAL
+                )
+                """
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            if "lease_until" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+
+        logger.info("[JobService] 任务存储: %s，工作池大小: %s", self.db_path, self.max_workers)
+
+    def _insert_job(self, job: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, pipeline, payload, status, stages, created_at, owner, lease_until) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job["id"],
+                    job["pipeline"],
+                    codec.dumps(job["payload"]),
+                    job["status"],
+                    codec.dumps(job["stages"]),
+                    job["created_at"],
+                    self.owner,
+                    time.time() + self.lease_seconds
+                )
+            )
+
+    def _update_job(self, job_id: str, **fields):
+        if not fields:
+            return
+
+        for key in ("stages", "result"):
+            if key in fields and fields[key] is not None:
+                fields[key] = codec.dumps(fields[key])
+
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def _load_job(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        job = {
+            "job_id": row["id"],
+            "pipeline": row["pipeline"],
+            "status": row["status"],
+            "stages": codec.loads(row["stages"]),
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
+
+        if include_result:
+            job["result"] = codec.loads(row["result"]) if row["result"] else None
+
+        return job
+
+    def _renew_leases(self) -> int:
+        """续期本进程持有的未完成任务的租约"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                (time.time() + self.lease_seconds, self.owner)
+            )
+            return cursor.rowcount
+
+    def _claim_orphans(self) -> List[Dict[str, Any]]:
+        """
+        接管租约已过期的遗留任务（所属进程已退出，不论在哪台主机上）
+
+        接管以条件更新完成（租约仍过期才写入新的 owner），多个进程同时检查时每个任务只会被接管一次
+
+        Returns:
+            需要重新入队的 queued 任务（running 任务直接标记为失败）
+        """
+        requeue: List[Dict[str, Any]] = []
+        now = time.time()
+        expired = "(lease_until IS NULL OR lease_until < ?)"
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, pipeline, payload, status, stages, created_at "
+                f"FROM jobs WHERE status IN ('queued', 'running') AND owner IS NOT ? AND {expired}",
+                (self.owner, now)
+            ).fetchall()
+
+            for row in rows:
+                if row["status"] == "queued" and row["pipeline"] in self._pipelines:
+                    claimed = conn.execute(
+                        f"UPDATE jobs SET owner = ?, lease_until = ? WHERE id = ? AND status = 'queued' AND {expired}",
+                        (self.owner, now + self.lease_seconds, row["id"], now)
+                    ).rowcount
+                    if claimed:
+                        requeue.append({
+                            "id": row["id"],
+                            "pipeline": row["pipeline"],
+                            "payload": codec.loads(row["payload"]),
+                            "status": "queued",
+                            "stages": [],
+                            "created_at": row["created_at"]
+                        })
+                    continue
+
+                stages = codec.loads(row["stages"]) if row["stages"] else []
+                for entry in stages:
+                    if entry.get("status") == "running":
+                        entry["status"] = "failed"
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', stages = ?, error = ?, finished_at = ?, owner = ?, "
+                    f"lease_until = NULL WHERE id = ? AND status IN ('queued', 'running') AND {expired}",
+                    (codec.dumps(stages), "服务重启，任务中断", now, self.owner, row["id"], now)
+                )
+
+        return requeue
+
+    # ================================================================
+    # Pipeline 注册与工作池
+    # ================================================================
+
+    def register_pipeline(self, name: str, handler: PipelineHandler):
+        """注册可通过 POST /jobs 提交的 Pipeline"""
+        self._pipelines[name] = handler
+
+    @property
+    def pipelines(self) -> List[str]:
+        return list(self._pipelines.keys())
+
+    async def start(self):
+        """启动工作池（幂等）"""
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker_loop(i))
+            for i in range(self.max_workers)
+        ]
+        logger.info("[JobService] 工作池已启动: %s 个 worker", self.max_workers)
+
+        await self._requeue_orphans()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def _requeue_orphans(self):
+        """接管租约过期的任务，queued 任务放入本进程队列"""
+        try:
+            orphans = await asyncio.to_thread(self._claim_orphans)
+        except Exception as e:
+            logger.error("[JobService] 接管遗留任务失败: %s", e)
+            return
+
+        for job in orphans:
+            if self._queue.full():
+                await asyncio.to_thread(
+                    self._update_job, job["id"],
+                    status="failed", error="任务队列已满，遗留任务未能重新入队", finished_at=time.time()
+                )
+                continue
+            self._queue.put_nowait(job)
+
+        if orphans:
+            logger.info("[JobService] 已重新入队遗留任务: %s 个", len(orphans))
+
+    async def _heartbeat_loop(self):
+        """定期续期本进程的租约，并接管其他进程（含其他主机）遗留的过期任务"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._renew_leases)
+            except Exception as e:
+                logger.warning("[JobService] 租约续期失败: %s", e)
+            await self._requeue_orphans()
+
+    async def stop(self):
+        """停止工作池"""
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._heartbeat = None
+        self._workers = []
+        self._queue = None
+
+    async def submit(self, pipeline: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        提交任务，立即返回任务记录
+
+        Raises:
+            ValueError: 未知的 Pipeline
+            RuntimeError: 任务队列已满
+        """
+        if pipeline not in self._pipelines:
+            raise ValueError(f"未知的 Pipeline: {pipeline}")
+
+        await self.start()
+
+        if self._queue.full():
+            raise RuntimeError("任务队列已满，请稍后重试")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "pipeline": pipeline,
+            "payload": payload,
+            "status": "queued",
+            "stages": [],
+            "created_at": time.time()
+        }
+
+        await asyncio.to_thread(self._insert_job, job)
+        self._queue.put_nowait(job)
+
+        logger.info("[JobService] 任务入队: %s (%s)", job['id'], pipeline)
+
+        return await self.get_job(job["id"])
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务状态与分阶段进度（不含结果）"""
+        return await asyncio.to_thread(self._load_job, job_id)
+
+    async def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务状态与结果"""
+        return await asyncio.to_thread(self._load_job, job_id, True)
+
+    async def _worker_loop(self, worker_index: int):
+        while True:
+            job = await self._queue.get()
+            # 任务执行期间的日志以 job_id 作为 request_id
+            token = bind_request_id(f"job:{job['id']}")
+            try:
+                await self._run_job(job)
+            except Exception as e:
+                logger.error("[JobService] worker %s 执行异常: %s", worker_index, e)
+            finally:
+                reset_request_id(token)
+                self._queue.task_done()
+
+    async def _run_job(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        stages: List[Dict[str, Any]] = []
+
+        # 阶段进度在线程中写入；写入期间的多次更新合并为一次（始终写最新快照，保证顺序）
+        flush_state: Dict[str, Any] = {"dirty": False, "task": None}
+
+        async def flush_stages():
+            while flush_state["dirty"]:
+                flush_state["dirty"] = False
+                snapshot = [dict(entry) for entry in stages]
+                try:
+                    await asyncio.to_thread(self._update_job, job_id, stages=snapshot)
+                except Exception as e:
+                    logger.warning("[JobService] 阶段进度写入失败: %s - %s", job_id, e)
+
+        def progress(stage: str, status: str):
+            now = time.time()
+            entry = next((s for s in stages if s["name"] == stage), None)
+
+            if entry is None:
+                entry = {"name": stage, "status": status, "started_at": now, "finished_at": None}
+                stages.append(entry)
+            else:
+                entry["status"] = status
+
+            if status in ("completed", "failed"):
+                entry["finished_at"] = now
+                entry["elapsed"] = now - entry["started_at"]
+
+            flush_state["dirty"] = True
+            task = flush_state["task"]
+            if task is None or task.done():
+                flush_state["task"] = asyncio.create_task(flush_stages())
+
+        async def finish(**fields):
+            # 等待未完成的进度写入，避免旧快照覆盖最终状态
+            task = flush_state["task"]
+            if task is not None and not task.done():
+                await asyncio.gather(task, return_exceptions=True)
+            await asyncio.to_thread(self._update_job, job_id, stages=stages, finished_at=time.time(), **fields)
+
+        def mark_running_failed():
+            for entry in stages:
+                if entry["status"] == "running":
+                    entry["status"] = "failed"
+
+        await asyncio.to_thread(self._update_job, job_id, status="running", started_at=time.time())
+        logger.info("[JobService] 开始执行: %s (%s)", job_id, job['pipeline'])
+
+        try:
+            handler = self._pipelines[job["pipeline"]]
+            result = await handler(job["payload"], progress)
+
+            await finish(status="completed", result=result)
+            logger.info("[JobService] ✓ 任务完成: %s", job_id)
+
+        except asyncio.CancelledError:
+            # 工作池停止（服务关闭）时任务被取消：记录为失败，避免永久停留在 running
+            mark_running_failed()
+            try:
+                await finish(status="failed", error="任务被取消（服务关闭）")
+            except Exception as e:
+                logger.error("[JobService] 取消状态写入失败: %s - %s", job_id, e)
+            logger.warning("[JobService] ✗ 任务被取消: %s", job_id)
+            raise
+
+        except Exception as e:
+            mark_running_failed()
+            await finish(status="failed", error=str(e))
+            logger.error("[JobService] ✗ 任务失败: %s - %s", job_id, e)
@@ -0,0 +1,91 @@
+"""
+LLM 调用网关 (LLM Gateway)
+所有服务的 chat.completions 调用统一经由本网关，集中记录：
+- 延迟直方图（按模型 / 调用点 / 结果）
+- Prompt 与 Completion Token 数
+- 进行中调用数与错误计数
+- 录制 / 回放（CASSETTE_MODE，见 app/utils/cassette.py）
+- 上游配额限速（跨 worker 共享的令牌桶，见 app/utils/rate_limiter.py；回放不消耗配额）
+  令牌在计时与录制之前获取，排队等待不计入延迟直方图、追踪 Span 与磁带
+"""
+
+import time
+import logging
+from typing import Any
+
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from app.utils.metrics import registry
+from app.utils.tracing import span
+from app.utils.cassette import cassette
+from app.utils.rate_limiter import rate_limiter, RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+LLM_LATENCY_SECONDS = registry.histogram(
+    "llm_latency_seconds", "LLM 调用延迟（秒）", ["model", "call_site", "outcome"]
+)
+LLM_TOKENS_TOTAL = registry.counter(
+    "llm_tokens_total", "LLM Token 消耗", ["model", "call_site", "kind"]
+)
+LLM_IN_FLIGHT = registry.gauge("llm_in_flight", "进行中的 LLM 调用数", ["model"])
+LLM_ERRORS_TOTAL = registry.counter(
+    "llm_errors_total", "LLM 调用失败次数", ["model", "call_site", "error"]
+)
+
+
+class LLMGateway:
+    """LLM 调用网关"""
+
+    async def chat(self, client: AsyncOpenAI, call_site: str, **kwargs) -> Any:
+        """
+        调用 client.chat.completions.create 并记录指标
+
+        Args:
+            client: 调用方的 AsyncOpenAI 客户端（各服务可能使用不同的 base_url / key）
+            call_site: 调用点标识，如 "TwoPassCausalService.pass1_topology"
+            **kwargs: 透传给 chat.completions.create 的参数
+
+        Returns:
+            原始响应对象
+        """
+        model = kwargs.get("model", "unknown")
+        if cassette.is_live("llm", kwargs):
+            try:
+                await rate_limiter.acquire("llm")
+            except RateLimitExceeded as e:
+                LLM_ERRORS_TOTAL.inc(model=model, call_site=call_site, error=type(e).__name__)
+                raise
+
+        start = time.perf_counter()
+        outcome = "error"
+
+        with LLM_IN_FLIGHT.track_inprogress(model=model), span(f"llm:{call_site}", model=model):
+            try:
+                response = await cassette.run(
+                    "llm",
+                    kwargs,
+                    lambda: client.chat.completions.create(**kwargs),
+                    encode=lambda completion: completion.model_dump(mode="json"),
+                    decode=ChatCompletion.model_validate
+                )
+                outcome = "ok"
+            except Exception as e:
+                LLM_ERRORS_TOTAL.inc(model=model, call_site=call_site, error=type(e).__name__)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                LLM_LATENCY_SECONDS.observe(elapsed, model=model, call_site=call_site, outcome=outcome)
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            LLM_TOKENS_TOTAL.inc(usage.prompt_tokens or 0, model=model, call_site=call_site, kind="prompt")
+            LLM_TOKENS_TOTAL.inc(usage.completion_tokens or 0, model=model, call_site=call_site, kind="completion")
+
+        logger.debug("[LLMGateway] %s (%s) 耗时 %.2f秒", call_site, model, elapsed)
+        return response
+
+
+# 全局实例
+llm_gateway = LLMGateway()
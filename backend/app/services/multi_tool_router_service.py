@@ -2,6 +2,7 @@
 多路由数据获取服务 (Multi-Tool Router)
 根据节点类型智能选择数据源：结构化 API 或新闻搜索
 """
+import asyncio
 import logging
 import json
 from typing import Dict, Any, Optional, List
@@ -38,8 +39,8 @@ class MultiToolRouterService:
             self.config = json.load(f)
         
         logger.info("[MultiToolRouter] 初始化完成")
-        logger.info(f"  - 结构化 API: {len(self.config['structured_apis'])} 个")
-        logger.info(f"  - 搜索域名白名单: {len(self._get_all_search_domains())} 个")
+        logger.info("  - 结构化 API: %s 个", len(self.config['structured_apis']))
+        logger.info("  - 搜索域名白名单: %s 个", len(self._get_all_search_domains()))
     
     def _get_all_search_domains(self) -> List[str]:
         """获取所有搜索域名白名单"""
@@ -68,7 +69,7 @@ class MultiToolRouterService:
             return rules[node_type]
         
         # 默认规则：使用新闻搜索
-        logger.warning(f"[Router] 节点类型 {node_type} 无匹配规则，使用默认策略（新闻搜索）")
+        logger.warning("[Router] 节点类型 %s 无匹配规则，使用默认策略（新闻搜索）", node_type)
         
         # 获取所有域名并分配到 tier_1 和 tier_2
         all_domains = self._get_all_search_domains()
@@ -103,13 +104,13 @@ class MultiToolRouterService:
                 "updated_at": "ISO 时间戳"
             }
         """
-        logger.info(f"[Router] 路由节点: {node_label} (类型: {node_type})")
+        logger.info("[Router] 路由节点: %s (类型: %s)", node_label, node_type)
         
         # 获取路由规则
         rule = self._get_routing_rule(node_type)
         primary_strategy = rule.get("primary_strategy", "news_search")
         
-        logger.info(f"[Router] 主策略: {primary_strategy}")
+        logger.info("[Router] 主策略: %s", primary_strategy)
         
         # 策略 A: 结构化 API
         if primary_strategy == "structured_api":
@@ -118,7 +119,7 @@ class MultiToolRouterService:
                 return result
             
             # Fallback 到新闻搜索
-            logger.warning(f"[Router] 结构化 API 失败，回退到新闻搜索")
+            logger.warning("[Router] 结构化 API 失败，回退到新闻搜索")
             return await self._try_news_search(node_label, search_query, rule)
         
         # 策略 B: 新闻搜索
@@ -133,48 +134,94 @@ class MultiToolRouterService:
     ) -> Optional[Dict[str, Any]]:
         """
         尝试使用结构化 API 获取数据
-        
+
+        首选 API 同时发起，按 preferred_apis 的顺序择优：
+        排在前面的 API 返回即采用；排在后面的先返回时，最多再等待 priority_grace_seconds，
+        期间前面的 API 成功则采用前者，否则采用已返回的结果。选定后取消其余调用。
+
         Returns:
             成功返回数据字典，失败返回 None
         """
         preferred_apis = rule.get("preferred_apis", [])
-        
+
         if not preferred_apis:
-            logger.warning(f"[Router] 节点类型 {node_type} 无首选 API")
+            logger.warning("[Router] 节点类型 %s 无首选 API", node_type)
             return None
-        
-        # 尝试每个首选 API
-        for api_name in preferred_apis:
-            try:
-                logger.info(f"[Router] 尝试 API: {api_name}")
-                
-                data = await self.structured_api_service.fetch_data(
-                    api_name=api_name,
-                    node_label=node_label,
-                    node_type=node_type
-                )
-                
-                if data:
-                    # 转换为统一格式
-                    return {
-                        "latest_value": data["value"],
-                        "sources": [{
-                            "title": f"{data['source']} - {node_label}",
-                            "url": self._get_api_url(api_name),
-                            "domain": self._get_api_domain(api_name),
-                            "type": "structured_api",
-                            "metadata": data.get("metadata", {})
-                        }],
-                        "strategy_used": "structured_api",
-                        "updated_at": data["timestamp"]
-                    }
-            
-            except Exception as e:
-                logger.error(f"[Router] API {api_name} 调用失败: {str(e)}")
-                continue
-        
-        return None
-    
+
+        logger.info("[Router] 并发尝试 API: %s", ', '.join(preferred_apis))
+        tasks = [
+            asyncio.ensure_future(self._fetch_structured(api_name, node_label, node_type))
+            for api_name in preferred_apis
+        ]
+        grace = float(self.structured_api_service.settings.get("priority_grace_seconds", 0.5))
+        loop = asyncio.get_running_loop()
+        try:
+            best: Optional[int] = None
+            deadline: Optional[float] = None
+            while True:
+                # 当前结果之前的 API 均已结束，或宽限期已过
+                if best is not None and (
+                    all(task.done() for task in tasks[:best]) or loop.time() >= deadline
+                ):
+                    break
+                pending = [task for task in (tasks if best is None else tasks[:best]) if not task.done()]
+                if not pending:
+                    break
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for index, task in enumerate(tasks if best is None else tasks[:best]):
+                    if task.done() and task.result() is not None:
+                        if best is None:
+                            deadline = loop.time() + grace
+                        best = index
+                        break
+
+            if best is None:
+                return None
+            logger.info("[Router] 采用 API: %s", preferred_apis[best])
+            return tasks[best].result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _fetch_structured(
+        self,
+        api_name: str,
+        node_label: str,
+        node_type: str
+    ) -> Optional[Dict[str, Any]]:
+        """调用单个结构化 API 并转换为统一格式，失败返回 None"""
+        try:
+            data = await self.structured_api_service.fetch_data(
+                api_name=api_name,
+                node_label=node_label,
+                node_type=node_type
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("[Router] API %s 调用失败: %s", api_name, e)
+            return None
+
+        if not data:
+            return None
+
+        # 转换为统一格式
+        return {
+            "latest_value": data["value"],
+            "sources": [{
+                "title": f"{data['source']} - {node_label}",
+                "url": self._get_api_url(api_name),
+                "domain": self._get_api_domain(api_name),
+                "type": "structured_api",
+                "metadata": data.get("metadata", {})
+            }],
+            "strategy_used": "structured_api",
+            "updated_at": data["timestamp"]
+        }
+
     async def _try_news_search(
         self,
         node_label: str,
@@ -200,13 +247,13 @@ class MultiToolRouterService:
         # ============================================================
         # Attempt 1: 白名单搜索（Tier 1 + Tier 2）
         # ============================================================
-        logger.info(f"[Waterfall] Attempt 1: 白名单搜索 (7天窗口)")
+        logger.info("[Waterfall] Attempt 1: 白名单搜索 (7天窗口)")
         
         tier_1_domains = rule.get("tier_1_domains", [])
         tier_2_domains = rule.get("tier_2_domains", [])
         combined_whitelist = tier_1_domains + tier_2_domains
         
-        logger.info(f"[Waterfall] 白名单域名: {len(combined_whitelist)} 个")
+        logger.info("[Waterfall] 白名单域名: %s 个", len(combined_whitelist))
         
         # 调用搜索服务
         search_results_attempt1 = await self.search_service.search(search_query)
@@ -218,8 +265,8 @@ class MultiToolRouterService:
         )
         
         logger.info(
-            f"[Waterfall] Attempt 1 结果: "
-            f"{len(search_results_attempt1)} 条 -> 白名单过滤后: {len(filtered_results_attempt1)} 条"
+            "[Waterfall] Attempt 1 结果: %s 条 -> 白名单过滤后: %s 条",
+            len(search_results_attempt1), len(filtered_results_attempt1)
         )
         
         # 如果有结果，尝试提取
@@ -233,25 +280,25 @@ class MultiToolRouterService:
             
             # 如果成功提取到非 unknown 值，直接返回
             if result.get("latest_value") != "unknown":
-                logger.info(f"[Waterfall] ✓ Attempt 1 成功: {result['latest_value']}")
+                logger.info("[Waterfall] ✓ Attempt 1 成功: %s", result['latest_value'])
                 return result
             else:
-                logger.warning(f"[Waterfall] Attempt 1 提取失败: LLM 返回 unknown")
+                logger.warning("[Waterfall] Attempt 1 提取失败: LLM 返回 unknown")
         else:
-            logger.warning(f"[Waterfall] Attempt 1 无结果")
+            logger.warning("[Waterfall] Attempt 1 无结果")
         
         # ============================================================
         # Attempt 2: 全网搜索（无域名限制 + LLM 权威性判断）
         # ============================================================
-        logger.info(f"[Waterfall] Attempt 2: 全网搜索 (30天窗口 + 权威性判断)")
+        logger.info("[Waterfall] Attempt 2: 全网搜索 (30天窗口 + 权威性判断)")
         
         # 重新搜索（实际场景中可能需要调整搜索参数，如时间窗口）
         search_results_attempt2 = await self.search_service.search(search_query)
         
-        logger.info(f"[Waterfall] Attempt 2 结果: {len(search_results_attempt2)} 条（全网）")
+        logger.info("[Waterfall] Attempt 2 结果: %s 条（全网）", len(search_results_attempt2))
         
         if not search_results_attempt2:
-            logger.error(f"[Waterfall] Attempt 2 无结果，返回空")
+            logger.error("[Waterfall] Attempt 2 无结果，返回空")
             return self._empty_result()
         
         # 使用 LLM 权威性判断
@@ -263,9 +310,9 @@ class MultiToolRouterService:
         )
         
         if result.get("latest_value") != "unknown":
-            logger.info(f"[Waterfall] ✓ Attempt 2 成功: {result['latest_value']}")
+            logger.info("[Waterfall] ✓ Attempt 2 成功: %s", result['latest_value'])
         else:
-            logger.warning(f"[Waterfall] ✗ Attempt 2 失败: 全网搜索仍无法提取有效数据")
+            logger.warning("[Waterfall] ✗ Attempt 2 失败: 全网搜索仍无法提取有效数据")
         
         return result
     
@@ -356,10 +403,10 @@ class MultiToolRouterService:
             for whitelist_domain in whitelist_domains:
                 if domain.endswith(whitelist_domain):
                     filtered.append(result)
-                    logger.debug(f"[Router] ✓ 白名单匹配: {domain} -> {whitelist_domain}")
+                    logger.debug("[Router] ✓ 白名单匹配: %s -> %s", domain, whitelist_domain)
                     break
             else:
-                logger.debug(f"[Router] ✗ 白名单拒绝: {domain}")
+                logger.debug("[Router] ✗ 白名单拒绝: %s", domain)
         
         return filtered
     
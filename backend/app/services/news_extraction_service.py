@@ -1,8 +1,13 @@
 from openai import AsyncOpenAI
 import os
 import json
+import logging
 from typing import Optional, Dict, Any
+from app.services.llm_gateway import llm_gateway
 from app.prompts.system_prompts import NEWS_CAUSALITY_EXTRACTION_PROMPT
+from app.utils import codec
+
+logger = logging.getLogger(__name__)
 
 class NewsExtractionService:
     """新闻因果关系提取服务"""
@@ -48,7 +53,9 @@ class NewsExtractionService:
         
         try:
             # 调用大模型 API
-            response = await self.client.chat.completions.create(
+            response = await llm_gateway.chat(
+                self.client,
+                "NewsExtractionService.extract_causality",
                 model=self.model,
                 messages=[
                     {
@@ -72,52 +79,61 @@ class NewsExtractionService:
             
             # 解析 JSON
             try:
-                result = json.loads(content)
+                result = codec.loads(content)
             except json.JSONDecodeError as e:
                 raise ValueError(f"JSON 解析失败: {str(e)}\n原始内容: {content[:200]}...")
             
-            # 验证必需字段
-            if "nodes" not in result:
-                raise ValueError("返回结果缺少 'nodes' 字段")
-            if "edges" not in result:
-                raise ValueError("返回结果缺少 'edges' 字段")
-            if "explanation" not in result:
-                raise ValueError("返回结果缺少 'explanation' 字段")
-            
-            # 验证数据类型
-            if not isinstance(result["nodes"], list):
-                raise ValueError("'nodes' 必须是数组")
-            if not isinstance(result["edges"], list):
-                raise ValueError("'edges' 必须是数组")
-            if not isinstance(result["explanation"], str):
-                raise ValueError("'explanation' 必须是字符串")
-            
-            # 验证节点和边不为空
-            if len(result["nodes"]) == 0:
-                raise ValueError("节点列表不能为空")
-            
-            # 验证节点结构
-            for i, node in enumerate(result["nodes"]):
-                if "id" not in node or "label" not in node or "type" not in node:
-                    raise ValueError(f"节点 {i} 缺少必需字段 (id, label, type)")
-            
-            # 验证边的引用
-            node_ids = {node["id"] for node in result["nodes"]}
-            for i, edge in enumerate(result["edges"]):
-                if "source" not in edge or "target" not in edge:
-                    raise ValueError(f"边 {i} 缺少必需字段 (source, target)")
-                if edge["source"] not in node_ids:
-                    raise ValueError(f"边 {i} 引用了不存在的源节点: {edge['source']}")
-                if edge["target"] not in node_ids:
-                    raise ValueError(f"边 {i} 引用了不存在的目标节点: {edge['target']}")
+            self._validate_result(result)
             
             return result
             
         except Exception as e:
             # 记录错误日志（生产环境中应使用专业的日志系统）
-            print(f"因果关系提取失败: {str(e)}")
+            logger.error("[NewsExtraction] 因果关系提取失败: %s", e)
             raise
 
+    def _validate_result(self, result: Dict[str, Any]):
+        """
+        校验 LLM 返回的因果图结构（必需字段、类型、节点字段与边引用）
+        
+        Raises:
+            ValueError: 结构不合法时
+        """
+        # 验证必需字段
+        if "nodes" not in result:
+            raise ValueError("返回结果缺少 'nodes' 字段")
+        if "edges" not in result:
+            raise ValueError("返回结果缺少 'edges' 字段")
+        if "explanation" not in result:
+            raise ValueError("返回结果缺少 'explanation' 字段")
+        
+        # 验证数据类型
+        if not isinstance(result["nodes"], list):
+            raise ValueError("'nodes' 必须是数组")
+        if not isinstance(result["edges"], list):
+            raise ValueError("'edges' 必须是数组")
+        if not isinstance(result["explanation"], str):
+            raise ValueError("'explanation' 必须是字符串")
+        
+        # 验证节点和边不为空
+        if len(result["nodes"]) == 0:
+            raise ValueError("节点列表不能为空")
+        
+        # 验证节点结构
+        for i, node in enumerate(result["nodes"]):
+            if "id" not in node or "label" not in node or "type" not in node:
+                raise ValueError(f"节点 {i} 缺少必需字段 (id, label, type)")
+        
+        # 验证边的引用（环检测等结构分析见 POST /graphs/analysis，不在请求路径上执行）
+        node_ids = {node["id"] for node in result["nodes"]}
+        for i, edge in enumerate(result["edges"]):
+            if "source" not in edge or "target" not in edge:
+                raise ValueError(f"边 {i} 缺少必需字段 (source, target)")
+            if edge["source"] not in node_ids:
+                raise ValueError(f"边 {i} 引用了不存在的源节点: {edge['source']}")
+            if edge["target"] not in node_ids:
+                raise ValueError(f"边 {i} 引用了不存在的目标节点: {edge['target']}")
+
 
 
 
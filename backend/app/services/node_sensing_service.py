@@ -13,18 +13,30 @@ import os
 import json
 import asyncio
 import aiohttp
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from urllib.parse import urlparse
 from pathlib import Path
 import logging
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s'
-)
+from app.services.llm_gateway import llm_gateway
+from app.utils.tracing import span, traced
+from app.services.node_state_store import node_state_store, negative_result_cache
+from app.utils.trend_engine import trend_engine
+from app.utils import codec
+from app.utils.metrics import timed_search, timed_semaphore
+from app.utils.cassette import cassette_search
+from app.utils.search_cache import cached_search
+from app.utils.rate_limiter import rate_limited
+from app.utils.logging_setup import sampled_logger
+
 logger = logging.getLogger(__name__)
+# 逐节点 / 逐搜索的过程性日志按 LOG_SAMPLE_RATE 抽样；结果类日志（命中、采信、失败）始终输出
+node_logger = sampled_logger(logger)
+
+
+class SearchUnavailableError(Exception):
+    """没有可用的搜索引擎（均调用失败或未配置），区别于搜索成功但无结果"""
 
 
 class NodeSensingService:
@@ -39,11 +51,11 @@ class NodeSensingService:
         
         # Tavily API 配置（优先）
         self.tavily_api_key = os.getenv("TAVILY_API_KEY")
-        self.tavily_base_url = "https://api.tavily.com/search"
+        self.tavily_search_url = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com").rstrip("/") + "/search"
         
         # Serper API 配置（备用）
         self.serper_api_key = os.getenv("SERPER_API_KEY")
-        self.serper_base_url = "https://google.serper.dev/search"
+        self.serper_search_url = os.getenv("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/") + "/search"
         
         # 并发控制
         self.max_concurrent_searches = 5
@@ -69,18 +81,27 @@ class NodeSensingService:
                 if isinstance(category_data, dict) and "domains" in category_data:
                     self.whitelist_domains.extend(category_data["domains"])
             
-            logger.info(f"[白名单配置] 加载完成，共 {len(self.whitelist_domains)} 个权威域名")
+            logger.info("[白名单配置] 加载完成，共 %s 个权威域名", len(self.whitelist_domains))
             
         except Exception as e:
-            logger.error(f"[白名单配置] 加载失败: {str(e)}")
+            logger.error("[白名单配置] 加载失败: %s", e)
             self.whitelist_domains = []
         
-    async def enrich_node_state(self, node_json: Dict[str, Any]) -> Dict[str, Any]:
+    @traced("sense_node", attrs=lambda self, node_json, *args, **kwargs: {"node": node_json.get("label")})
+    async def enrich_node_state(
+        self,
+        node_json: Dict[str, Any],
+        force_refresh: bool = False,
+        cache_ttl: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         为单个节点补充实时状态信息（两阶段共识验证版本）
         
         Args:
             node_json: 节点对象，包含 sensing_config.auto_queries
+                （可选 sensing_config.state_type：price/macro/policy/sentiment，决定状态有效期）
+            force_refresh: 跳过规范状态存储与负结果缓存，强制重新搜索
+            cache_ttl: 覆盖新鲜度策略的状态有效期（秒）
             
         Returns:
             更新后的节点对象，包含 current_state 字段
@@ -100,7 +121,7 @@ class NodeSensingService:
         node_id = node_json.get("id", "unknown")
         node_label = node_json.get("label", "unknown")
         
-        logger.info(f"[节点感知 2.0] 开始处理节点: {node_id} ({node_label})")
+        node_logger.info("[节点感知 2.0] 开始处理节点: %s (%s)", node_id, node_label, extra={"node": node_label})
         
         try:
             # 1. 提取搜索查询配置
@@ -108,25 +129,60 @@ class NodeSensingService:
             auto_queries = sensing_config.get("auto_queries", [])
             
             if not auto_queries:
-                logger.warning(f"[节点感知] 节点 {node_id} 缺少 auto_queries 配置，跳过")
+                logger.warning("[节点感知] 节点 %s 缺少 auto_queries 配置，跳过", node_id, extra={"node": node_label})
                 return node_json
             
-            logger.info(f"[节点感知] 节点 {node_id} 配置了 {len(auto_queries)} 个搜索查询")
+            node_logger.info(
+                "[节点感知] 节点 %s 配置了 %d 个搜索查询", node_id, len(auto_queries), extra={"node": node_label}
+            )
+            
+            # 规范状态存储：同一经济变量（含同义标签）在有效期内直接复用，不发起搜索/LLM
+            state_type = sensing_config.get("state_type")
+            if not force_refresh:
+                entry = await node_state_store.aget(node_label)
+                if entry is not None:
+                    logger.info(
+                        "[节点感知] ✓ 规范状态命中: %s -> %s", node_label, entry["canonical_id"],
+                        extra={"node": node_label, "event": "state_store_hit"}
+                    )
+                    node_json["current_state"] = node_state_store.to_current_state(entry)
+                    node_json["last_updated"] = entry["last_updated"]
+                    return node_json
+                
+                # 负结果缓存：同一节点 + 查询集合近期已走完瀑布流仍为 unknown，TTL 内不再重试
+                negative = await negative_result_cache.aget(node_label, auto_queries)
+                if negative is not None:
+                    logger.info(
+                        "[节点感知] ✓ 负结果缓存命中: %s (reason=%s, stage1=%s)",
+                        node_label, negative["reason"], negative["stage1_reason"],
+                        extra={"node": node_label, "event": "negative_cache_hit"}
+                    )
+                    node_json["current_state"] = self._create_unknown_state(
+                        narrative=f"近期感知未获得有效数据（{negative['reason']}），暂不重试"
+                    )
+                    node_json["current_state"]["negative_cache"] = {
+                        "reason": negative["reason"],
+                        "stage1_reason": negative["stage1_reason"],
+                        "expires_at": datetime.utcfromtimestamp(negative["expires_at"]).isoformat()
+                    }
+                    return node_json
             
             # ============================================================
             # Stage 1: 白名单优先搜索
             # ============================================================
-            logger.info(f"[Stage 1] 白名单优先搜索 - 节点: {node_label}")
+            node_logger.info("[Stage 1] 白名单优先搜索 - 节点: %s", node_label, extra={"node": node_label})
             
-            stage1_results = await self._perform_searches(auto_queries)
+            with span("stage1_search", node=node_label):
+                stage1_results, _ = await self._perform_searches(auto_queries)
+            stage1_reason = "no_search_results"
             
             if stage1_results:
                 # 白名单过滤
                 whitelist_results = self._filter_by_whitelist(stage1_results)
                 
-                logger.info(
-                    f"[Stage 1] 搜索结果: {len(stage1_results)} 条 "
-                    f"→ 白名单过滤后: {len(whitelist_results)} 条"
+                node_logger.info(
+                    "[Stage 1] 搜索结果: %d 条 → 白名单过滤后: %d 条",
+                    len(stage1_results), len(whitelist_results), extra={"node": node_label}
                 )
                 
                 if whitelist_results:
@@ -138,35 +194,55 @@ class NodeSensingService:
                     
                     if current_state["value"] != "unknown":
                         logger.info(
-                            f"[Stage 1] ✓ 白名单直接采信: {current_state['value']} "
-                            f"(confidence: whitelist_direct)"
+                            "[Stage 1] ✓ 白名单直接采信: %s (confidence: whitelist_direct)",
+                            current_state["value"],
+                            extra={"node": node_label, "event": "whitelist_direct"}
                         )
                         
                         # 注入状态
                         node_json["current_state"] = current_state
                         node_json["last_updated"] = datetime.utcnow().isoformat()
+                        await node_state_store.aput(
+                            node_label,
+                            current_state=current_state,
+                            node_type=state_type,
+                            ttl=cache_ttl
+                        )
+                        await negative_result_cache.ainvalidate(node_label, auto_queries)
                         return node_json
                     else:
-                        logger.warning(f"[Stage 1] LLM 返回 unknown，进入 Stage 2")
+                        stage1_reason = "extraction_unknown"
+                        logger.warning("[Stage 1] LLM 返回 unknown，进入 Stage 2", extra={"node": node_label})
                 else:
-                    logger.warning(f"[Stage 1] 白名单过滤后无结果，进入 Stage 2")
+                    stage1_reason = "no_whitelist_hits"
+                    logger.warning("[Stage 1] 白名单过滤后无结果，进入 Stage 2", extra={"node": node_label})
             else:
-                logger.warning(f"[Stage 1] 搜索无结果，进入 Stage 2")
+                logger.warning("[Stage 1] 搜索无结果，进入 Stage 2", extra={"node": node_label})
             
             # ============================================================
             # Stage 2: 全网兜底与三方交叉验证
             # ============================================================
-            logger.info(f"[Stage 2] 全网搜索 + 三方交叉验证 - 节点: {node_label}")
+            node_logger.info("[Stage 2] 全网搜索 + 三方交叉验证 - 节点: %s", node_label, extra={"node": node_label})
             
             # 重新搜索（全网，Top-10）
-            stage2_results = await self._perform_searches(auto_queries, max_results=10)
+            with span("stage2_search", node=node_label):
+                stage2_results, stage2_unavailable = await self._perform_searches(auto_queries, max_results=10)
             
             if not stage2_results:
-                logger.error(f"[Stage 2] 全网搜索无结果，返回 unknown")
                 node_json["current_state"] = self._create_unknown_state()
+                if stage2_unavailable:
+                    # 搜索引擎故障属于瞬时故障，不写入负结果缓存
+                    logger.error("[Stage 2] 搜索引擎不可用，返回 unknown（不缓存）", extra={"node": node_label})
+                    return node_json
+                logger.error("[Stage 2] 全网搜索无结果，返回 unknown", extra={"node": node_label})
+                await negative_result_cache.aput(
+                    node_label, auto_queries,
+                    reason="no_search_results",
+                    stage1_reason=stage1_reason
+                )
                 return node_json
             
-            logger.info(f"[Stage 2] 全网搜索结果: {len(stage2_results)} 条")
+            node_logger.info("[Stage 2] 全网搜索结果: %d 条", len(stage2_results), extra={"node": node_label})
             
             # LLM 三方交叉验证
             current_state = await self._extract_state_stage2(
@@ -176,42 +252,69 @@ class NodeSensingService:
             
             if current_state["value"] != "unknown":
                 logger.info(
-                    f"[Stage 2] ✓ 三方交叉验证通过: {current_state['value']} "
-                    f"(confidence: cross_validated, sources: {len(current_state.get('sources', []))})"
+                    "[Stage 2] ✓ 三方交叉验证通过: %s (confidence: cross_validated, sources: %d)",
+                    current_state["value"], len(current_state.get("sources", [])),
+                    extra={"node": node_label, "event": "cross_validated"}
                 )
             else:
-                logger.warning(f"[Stage 2] ✗ 三方交叉验证失败，返回 unknown")
+                logger.warning("[Stage 2] ✗ 三方交叉验证失败，返回 unknown", extra={"node": node_label})
+            
+            # LLM 调用异常属于瞬时故障，不写入负结果缓存
+            transient = current_state.pop("_transient", False)
             
             # 注入状态
             node_json["current_state"] = current_state
             node_json["last_updated"] = datetime.utcnow().isoformat()
             
+            if current_state["value"] != "unknown":
+                await node_state_store.aput(
+                    node_label,
+                    current_state=current_state,
+                    node_type=state_type,
+                    ttl=cache_ttl
+                )
+                await negative_result_cache.ainvalidate(node_label, auto_queries)
+            elif not transient:
+                await negative_result_cache.aput(
+                    node_label, auto_queries,
+                    reason="cross_validation_failed",
+                    stage1_reason=stage1_reason
+                )
+            
             return node_json
             
         except Exception as e:
-            logger.error(f"[节点感知] 节点 {node_id} 处理失败: {str(e)}")
+            logger.error("[节点感知] 节点 %s 处理失败: %s", node_id, e, extra={"node": node_label})
             # 降级处理：返回 unknown 状态
             node_json["current_state"] = self._create_unknown_state()
             return node_json
     
-    async def enrich_nodes_batch(self, nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    @traced("sense_batch")
+    async def enrich_nodes_batch(
+        self,
+        nodes: List[Dict[str, Any]],
+        force_refresh: bool = False,
+        cache_ttl: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
         """
         批量并发处理多个节点的状态更新
         
         Args:
             nodes: 节点列表
+            force_refresh: 跳过规范状态存储与负结果缓存，强制重新搜索
+            cache_ttl: 覆盖新鲜度策略的状态有效期（秒）
             
         Returns:
             更新后的节点列表
         """
-        logger.info(f"[批量感知] 开始处理 {len(nodes)} 个节点")
+        logger.info("[批量感知] 开始处理 %s 个节点", len(nodes))
         
         # 使用 asyncio.gather 并发处理，限制并发数
         semaphore = asyncio.Semaphore(self.max_concurrent_searches)
         
         async def process_with_limit(node):
-            async with semaphore:
-                return await self.enrich_node_state(node)
+            async with timed_semaphore(semaphore, "node_sensing.batch"):
+                return await self.enrich_node_state(node, force_refresh, cache_ttl)
         
         enriched_nodes = await asyncio.gather(
             *[process_with_limit(node) for node in nodes],
@@ -222,17 +325,24 @@ class NodeSensingService:
         valid_nodes = []
         for i, result in enumerate(enriched_nodes):
             if isinstance(result, Exception):
-                logger.error(f"[批量感知] 节点 {i} 处理异常: {str(result)}")
+                logger.error("[批量感知] 节点 %s 处理异常: %s", i, result)
                 # 使用原始节点 + unknown 状态
                 nodes[i]["current_state"] = self._create_unknown_state()
                 valid_nodes.append(nodes[i])
             else:
                 valid_nodes.append(result)
         
-        logger.info(f"[批量感知] 批量处理完成，成功 {len(valid_nodes)} 个节点")
+        # 有历史观测的节点：趋势改由本地批量计算
+        node_state_store.annotate_trends(valid_nodes, "current_state")
+        
+        logger.info("[批量感知] 批量处理完成，成功 %s 个节点", len(valid_nodes))
         return valid_nodes
     
-    async def _perform_searches(self, queries: List[str], max_results: int = 3) -> List[Dict[str, Any]]:
+    async def _perform_searches(
+        self,
+        queries: List[str],
+        max_results: int = 3
+    ) -> Tuple[List[Dict[str, Any]], bool]:
         """
         并发执行多个搜索查询
         
@@ -241,9 +351,9 @@ class NodeSensingService:
             max_results: 每个查询返回的最大结果数
             
         Returns:
-            搜索结果列表
+            (搜索结果列表, 是否所有查询均因搜索引擎故障失败)
         """
-        logger.info(f"[搜索引擎] 开始执行 {len(queries)} 个搜索查询 (max_results={max_results})")
+        node_logger.info("[搜索引擎] 开始执行 %d 个搜索查询 (max_results=%d)", len(queries), max_results)
         
         # 并发执行所有查询
         search_tasks = [self._search_single_query(q, max_results) for q in queries]
@@ -251,16 +361,18 @@ class NodeSensingService:
         
         # 合并所有有效结果
         all_snippets = []
+        failed = 0
         for i, result in enumerate(results):
             if isinstance(result, Exception):
-                logger.warning(f"[搜索引擎] 查询 '{queries[i]}' 失败: {str(result)}")
+                logger.warning("[搜索引擎] 查询 '%s' 失败: %s", queries[i], result)
+                failed += 1
                 continue
             if result:
                 all_snippets.extend(result)
         
-        logger.info(f"[搜索引擎] 搜索完成，获取 {len(all_snippets)} 条有效结果")
+        node_logger.info("[搜索引擎] 搜索完成，获取 %d 条有效结果", len(all_snippets))
         
-        return all_snippets
+        return all_snippets, bool(queries) and failed == len(queries)
     
     async def _search_single_query(self, query: str, max_results: int = 3) -> List[Dict[str, Any]]:
         """
@@ -274,26 +386,33 @@ class NodeSensingService:
             
         Returns:
             搜索结果片段列表
+            
+        Raises:
+            SearchUnavailableError: 没有可用的搜索引擎（均失败或未配置）
         """
-        logger.debug(f"[搜索引擎] 执行查询: {query}")
+        logger.debug("[搜索引擎] 执行查询: %s", query)
         
         # 优先使用 Tavily
         if self.tavily_api_key:
             try:
                 return await self._search_tavily(query, max_results)
             except Exception as e:
-                logger.warning(f"[搜索引擎] Tavily 搜索失败，尝试 Serper: {str(e)}")
+                logger.warning("[搜索引擎] Tavily 搜索失败，尝试 Serper: %s", e)
         
         # 降级到 Serper
         if self.serper_api_key:
             try:
                 return await self._search_serper(query, max_results)
             except Exception as e:
-                logger.error(f"[搜索引擎] Serper 搜索也失败: {str(e)}")
+                logger.error("[搜索引擎] Serper 搜索也失败: %s", e)
         
-        logger.error(f"[搜索引擎] 所有搜索引擎均不可用")
-        return []
+        logger.error("[搜索引擎] 所有搜索引擎均不可用")
+        raise SearchUnavailableError(f"所有搜索引擎均不可用: {query}")
     
+    @cached_search("tavily")
+    @rate_limited("tavily")
+    @timed_search("tavily")
+    @cassette_search("tavily")
     async def _search_tavily(self, query: str, max_results: int = 3) -> List[Dict[str, Any]]:
         """调用 Tavily API"""
         async with aiohttp.ClientSession() as session:
@@ -304,7 +423,7 @@ class NodeSensingService:
                 "max_results": max_results
             }
             
-            async with session.post(self.tavily_base_url, json=payload) as resp:
+            async with session.post(self.tavily_search_url, json=payload) as resp:
                 if resp.status != 200:
                     raise Exception(f"Tavily API 返回错误: {resp.status}")
                 
@@ -322,6 +441,10 @@ class NodeSensingService:
                     for r in results
                 ]
     
+    @cached_search("serper")
+    @rate_limited("serper")
+    @timed_search("serper")
+    @cassette_search("serper")
     async def _search_serper(self, query: str, max_results: int = 3) -> List[Dict[str, Any]]:
         """调用 Serper API"""
         async with aiohttp.ClientSession() as session:
@@ -332,7 +455,7 @@ class NodeSensingService:
             payload = {"q": query, "num": max_results}
             
             async with session.post(
-                self.serper_base_url, 
+                self.serper_search_url, 
                 json=payload, 
                 headers=headers
             ) as resp:
@@ -377,13 +500,14 @@ class NodeSensingService:
             for whitelist_domain in self.whitelist_domains:
                 if domain.endswith(whitelist_domain) or domain == whitelist_domain:
                     filtered.append(result)
-                    logger.debug(f"[白名单过滤] ✓ 匹配: {domain} -> {whitelist_domain}")
+                    logger.debug("[白名单过滤] ✓ 匹配: %s -> %s", domain, whitelist_domain)
                     break
             else:
-                logger.debug(f"[白名单过滤] ✗ 拒绝: {domain}")
+                logger.debug("[白名单过滤] ✗ 拒绝: %s", domain)
         
         return filtered
     
+    @traced("stage1_extract", attrs=lambda self, node_label, *args, **kwargs: {"node": node_label})
     async def _extract_state_stage1(
         self, 
         node_label: str, 
@@ -399,7 +523,7 @@ class NodeSensingService:
         Returns:
             结构化状态对象: {value, trend, narrative_context, confidence, sources}
         """
-        logger.info(f"[Stage 1 LLM] 开始解析节点 '{node_label}' 的状态（白名单直接提取）")
+        node_logger.info("[Stage 1 LLM] 开始解析节点 '%s' 的状态（白名单直接提取）", node_label, extra={"node": node_label})
         
         # 构建上下文
         context = self._build_search_context(search_results)
@@ -431,7 +555,7 @@ class NodeSensingService:
 
 2. trend 字段：
    - 只能是 "rising"（上升）、"falling"（下降）、"stable"（稳定）三者之一
-   - 基于搜索结果中的趋势词判断
+   - 基于搜索结果中的趋势词判断；提供了【本地历史观测】时以其计算出的趋势为准
 
 3. sources 字段：
    - 列出所有支持该数值的搜索结果（最多3条）
@@ -456,12 +580,14 @@ class NodeSensingService:
 
 【搜索结果（来自权威白名单域名）】
 {context}
-
+{self._history_context(node_label)}
 请提取该节点的实时状态，严格按照 JSON 格式输出。"""
 
         try:
             # 调用 LLM
-            response = await self.client.chat.completions.create(
+            response = await llm_gateway.chat(
+                self.client,
+                "NodeSensingService.extract_state_stage1",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -472,7 +598,7 @@ class NodeSensingService:
             )
             
             content = response.choices[0].message.content
-            state = json.loads(content)
+            state = codec.loads(content)
             
             # 验证必需字段
             required_fields = ["value", "trend", "narrative_context", "confidence", "sources"]
@@ -483,20 +609,21 @@ class NodeSensingService:
             # 验证 trend 枚举值
             valid_trends = ["rising", "falling", "stable"]
             if state["trend"] not in valid_trends:
-                logger.warning(f"[Stage 1 LLM] trend 值无效: {state['trend']}，修正为 stable")
+                logger.warning("[Stage 1 LLM] trend 值无效: %s，修正为 stable", state['trend'])
                 state["trend"] = "stable"
             
-            logger.info(
-                f"[Stage 1 LLM] 节点 '{node_label}' 解析成功: "
-                f"value={state['value']}, sources={len(state.get('sources', []))}"
+            node_logger.info(
+                "[Stage 1 LLM] 节点 '%s' 解析成功: value=%s, sources=%d",
+                node_label, state["value"], len(state.get("sources", [])), extra={"node": node_label}
             )
             
             return state
             
         except Exception as e:
-            logger.error(f"[Stage 1 LLM] 节点 '{node_label}' 解析失败: {str(e)}")
+            logger.error("[Stage 1 LLM] 节点 '%s' 解析失败: %s", node_label, e)
             return self._create_unknown_state(confidence="whitelist_direct")
     
+    @traced("stage2_cross_validate", attrs=lambda self, node_label, *args, **kwargs: {"node": node_label})
     async def _extract_state_stage2(
         self, 
         node_label: str, 
@@ -517,7 +644,7 @@ class NodeSensingService:
             2. sources 数组必须严格列出这 3 个支持该数值的独立网页
             3. 如果满足该数值的独立域名少于 3 个，返回 unknown
         """
-        logger.info(f"[Stage 2 LLM] 开始解析节点 '{node_label}' 的状态（三方交叉验证）")
+        node_logger.info("[Stage 2 LLM] 开始解析节点 '%s' 的状态（三方交叉验证）", node_label, extra={"node": node_label})
         
         # 构建上下文（包含域名信息）
         context = self._build_search_context_with_domains(search_results)
@@ -599,12 +726,14 @@ class NodeSensingService:
 
 【搜索结果（全网，需要三方交叉验证）】
 {context}
-
+{self._history_context(node_label)}
 请严格执行三方交叉验证规则，提取该节点的实时状态。如果无法满足三方验证，必须返回 unknown。"""
 
         try:
             # 调用 LLM
-            response = await self.client.chat.completions.create(
+            response = await llm_gateway.chat(
+                self.client,
+                "NodeSensingService.extract_state_stage2",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -615,7 +744,7 @@ class NodeSensingService:
             )
             
             content = response.choices[0].message.content
-            state = json.loads(content)
+            state = codec.loads(content)
             
             # 验证必需字段
             required_fields = ["value", "trend", "narrative_context", "confidence", "sources"]
@@ -636,8 +765,8 @@ class NodeSensingService:
                 
                 if len(unique_domains) < 3:
                     logger.warning(
-                        f"[Stage 2 LLM] 三方验证失败: 只有 {len(unique_domains)} 个独立域名，"
-                        f"不满足 ≥3 的要求，强制返回 unknown"
+                        "[Stage 2 LLM] 三方验证失败: 只有 %s 个独立域名，"
+                        "不满足 ≥3 的要求，强制返回 unknown", len(unique_domains)
                     )
                     return self._create_unknown_state(
                         confidence="cross_validated",
@@ -647,20 +776,32 @@ class NodeSensingService:
             # 验证 trend 枚举值
             valid_trends = ["rising", "falling", "stable"]
             if state["trend"] not in valid_trends:
-                logger.warning(f"[Stage 2 LLM] trend 值无效: {state['trend']}，修正为 stable")
+                logger.warning("[Stage 2 LLM] trend 值无效: %s，修正为 stable", state['trend'])
                 state["trend"] = "stable"
             
-            logger.info(
-                f"[Stage 2 LLM] 节点 '{node_label}' 解析成功: "
-                f"value={state['value']}, sources={len(state.get('sources', []))} "
-                f"(unique_domains={len(set(s.get('domain', '') for s in state.get('sources', [])))})"
+            node_logger.info(
+                "[Stage 2 LLM] 节点 '%s' 解析成功: value=%s, sources=%d",
+                node_label, state["value"], len(state.get("sources", [])), extra={"node": node_label}
             )
             
             return state
             
         except Exception as e:
-            logger.error(f"[Stage 2 LLM] 节点 '{node_label}' 解析失败: {str(e)}")
-            return self._create_unknown_state(confidence="cross_validated")
+            logger.error("[Stage 2 LLM] 节点 '%s' 解析失败: %s", node_label, e)
+            state = self._create_unknown_state(confidence="cross_validated")
+            state["_transient"] = True
+            return state
+    
+    def _history_context(self, node_label: str) -> str:
+        """本地历史观测的统计摘要（供 LLM 判断 trend，而非从新闻措辞推测）；历史不足或不可靠时为空"""
+        canonical_id = node_state_store.resolve(node_label)
+        stats = node_state_store.reliable_trends([canonical_id]).get(canonical_id)
+        if stats is None:
+            return ""
+        return (
+            f"\n【本地历史观测】\n{trend_engine.describe(stats)}\n"
+            f"trend 字段请直接采用历史观测计算出的趋势（{stats['trend']}）；value 仍以搜索结果为准。\n"
+        )
     
     def _build_search_context(self, search_results: List[Dict[str, Any]]) -> str:
         """将搜索结果格式化为 LLM 上下文（简化版）"""
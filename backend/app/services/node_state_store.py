@@ -0,0 +1,439 @@
+"""
+规范节点状态存储 (Canonical Node-State Store)
+同一经济变量（美元指数 / DXY / US Dollar Index，美联储利率 / Fed funds rate）
+出现在大多数图谱中，状态按规范节点身份统一存储、跨图谱共享：
+- 同义词表由 YahooFinanceService.TICKER_MAPPING 与配置文件生成，并从已见过的标签中学习
+- 保存 current_state / realtime_state、数据源、置信度与时间戳
+- 按节点类型执行新鲜度策略（价格分钟级，宏观/政策小时级）
+节点富化在发起任何搜索或 LLM 调用之前先查询本存储。
+状态条目经缓存后端读写，CACHE_BACKEND=sqlite / redis 时多个 worker 共享（学习到的同义词仍为进程内）。
+状态条目与学习到的同义词均有容量上限（NODE_STATE_MAX_ENTRIES / NODE_STATE_MAX_ALIASES），超出时淘汰最久未使用的条目；
+配置与 Ticker 映射生成的同义词为固定集合，不参与淘汰。
+每次写入的数值同时按规范 ID 记入时间序列存储（timeseries_store.py），annotate_trends() 据此批量计算图谱节点的趋势。
+行情（ticker:*）等上游数值序列的趋势直接采用；label:* 序列的数值来自 LLM 对搜索结果的提取，
+只有观测点足够、变化幅度在合理范围内时才采用（NODE_TREND_MIN_POINTS / NODE_TREND_MAX_CHANGE_PCT）。
+
+同时提供负结果缓存 (NegativeResultCache)，避免 unknown 节点反复走完整条瀑布流。
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+from app.services.timeseries_store import timeseries_store
+from app.services.yahoo_finance_service import YahooFinanceService
+from app.utils.ttl_cache import TTLCache
+from app.utils.cache_backend import CacheBackend, backend_for
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_label(label: str) -> str:
+    """标签归一化：全角转半角、小写、去除空白与标点"""
+    label = unicodedata.normalize("NFKC", label or "")
+    return _PUNCTUATION.sub("", label.lower())
+
+
+class NodeStateStore:
+    """规范节点状态存储"""
+
+    NAMESPACE = "node_state_store"
+
+    def __init__(self, config_path: Optional[str] = None, backend: Optional[CacheBackend] = None):
+        default_path = Path(__file__).parent.parent.parent / "config" / "node_state_store.json"
+        self.config_path = Path(config_path or os.getenv("NODE_STATE_STORE_CONFIG", str(default_path)))
+
+        self.max_entries = int(os.getenv("NODE_STATE_MAX_ENTRIES", "8192"))
+        # label:* 序列（LLM 提取的数值）的趋势采用门槛
+        self.trend_min_points = int(os.getenv("NODE_TREND_MIN_POINTS", "5"))
+        self.trend_max_change_pct = float(os.getenv("NODE_TREND_MAX_CHANGE_PCT", "50"))
+        self.max_aliases = int(os.getenv("NODE_STATE_MAX_ALIASES", "4096"))
+
+        # 归一化标签 -> 规范 ID（配置与 Ticker 映射，固定集合）
+        self._synonyms: Dict[str, str] = {}
+        # 运行中学习到的同义词（LRU，超出 max_aliases 时淘汰最久未使用的）
+        self._learned: "OrderedDict[str, str]" = OrderedDict()
+        # 规范 ID -> 状态条目（后端有效期与条目 ttl 一致，进程内后端超出 max_entries 时按 LRU 淘汰）
+        self._entries = backend or backend_for(self.NAMESPACE, max_entries=self.max_entries)
+
+        self.hits = 0
+        self.misses = 0
+        registry.register_cache(self)
+
+        self._load_config()
+
+    def _load_config(self):
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except Exception as e:
+            logger.error("[NodeStateStore] 配置加载失败: %s", e)
+            config = {}
+
+        self.freshness_policy = {
+            key: float(value)
+            for key, value in config.get("freshness_policy", {"default": 1800}).items()
+            if key != "description"
+        }
+        self.type_aliases = {
+            key: value
+            for key, value in config.get("type_aliases", {}).items()
+            if key != "description"
+        }
+
+        # 行情类节点：同一 Ticker 的所有标签归入同一规范身份
+        for label, ticker in YahooFinanceService.TICKER_MAPPING.items():
+            self._synonyms[normalize_label(label)] = f"ticker:{ticker}"
+
+        # 非行情类节点：配置中的同义词组
+        for group in config.get("synonyms", {}).get("groups", []):
+            canonical_id = f"label:{normalize_label(group[0])}"
+            for label in group:
+                self._synonyms[normalize_label(label)] = canonical_id
+
+        logger.info("[NodeStateStore] 同义词表加载完成，共 %s 个标签", len(self._synonyms))
+
+    # ================================================================
+    # 规范身份解析
+    # ================================================================
+
+    def resolve(self, label: str) -> str:
+        """将节点标签解析为规范 ID（未收录的标签以归一化标签作为身份）"""
+        key = normalize_label(label)
+        canonical_id = self._learned.get(key)
+        if canonical_id is not None:
+            self._learned.move_to_end(key)
+            return canonical_id
+        return self._synonyms.get(key, f"label:{key}")
+
+    def register_alias(self, label: str, canonical_id: str):
+        """学习新标签（如模糊匹配到 Ticker 的标签），后续直接命中同一身份"""
+        key = normalize_label(label)
+        if not key or self.resolve(label) == canonical_id:
+            return
+
+        self._learned[key] = canonical_id
+        self._learned.move_to_end(key)
+        while len(self._learned) > self.max_aliases:
+            self._learned.popitem(last=False)
+        logger.debug("[NodeStateStore] 学习同义词: %s -> %s", label, canonical_id)
+
+    def freshness_type(self, canonical_id: str, node_type: Optional[str] = None) -> str:
+        """确定新鲜度类型：行情类固定为 price，其余按类型提示映射"""
+        if canonical_id.startswith("ticker:"):
+            return "price"
+        if node_type:
+            node_type = self.type_aliases.get(node_type, node_type)
+            if node_type in self.freshness_policy:
+                return node_type
+        return "default"
+
+    # ================================================================
+    # 读写
+    # ================================================================
+
+    def get(self, label: str) -> Optional[Dict[str, Any]]:
+        """
+        获取节点的新鲜状态
+
+        Returns:
+            未过期的状态条目；不存在或已过期返回 None
+        """
+        return self._fresh_or_none(self._entries.get(self.NAMESPACE, self.resolve(label)))
+
+    async def aget(self, label: str) -> Optional[Dict[str, Any]]:
+        """get 的异步版本（共享后端的读取在线程中执行）"""
+        return self._fresh_or_none(await self._entries.aget(self.NAMESPACE, self.resolve(label)))
+
+    def _fresh_or_none(self, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if entry is None or not self.is_fresh(entry):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["updated_at"] <= entry["ttl"]
+
+    def put(
+        self,
+        label: str,
+        current_state: Optional[Dict[str, Any]] = None,
+        realtime_state: Optional[Dict[str, Any]] = None,
+        node_type: Optional[str] = None,
+        ttl: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        写入节点状态（current_state 与 realtime_state 至少提供一个）
+
+        Args:
+            label: 节点标签
+            current_state: NodeSensingService 格式的状态
+            realtime_state: TwoPassCausalService 格式的状态
+            node_type: 节点类型提示（price / macro / policy / 路由规则类型）
+            ttl: 覆盖新鲜度策略的有效期（秒）
+        """
+        canonical_id = self.resolve(label)
+        entry = self._merge_entry(
+            self._entries.get(self.NAMESPACE, canonical_id), canonical_id, label,
+            current_state, realtime_state, node_type, ttl
+        )
+        self._entries.set(self.NAMESPACE, canonical_id, entry, entry["ttl"])
+        self._record_history(canonical_id, current_state, realtime_state)
+        return entry
+
+    async def aput(
+        self,
+        label: str,
+        current_state: Optional[Dict[str, Any]] = None,
+        realtime_state: Optional[Dict[str, Any]] = None,
+        node_type: Optional[str] = None,
+        ttl: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """put 的异步版本（共享后端的读写在线程中执行）"""
+        canonical_id = self.resolve(label)
+        entry = self._merge_entry(
+            await self._entries.aget(self.NAMESPACE, canonical_id), canonical_id, label,
+            current_state, realtime_state, node_type, ttl
+        )
+        await self._entries.aset(self.NAMESPACE, canonical_id, entry, entry["ttl"])
+        if self._records_history(canonical_id):
+            await timeseries_store.aappend(canonical_id, self._history_value(current_state, realtime_state))
+        return entry
+
+    def _merge_entry(
+        self,
+        entry: Optional[Dict[str, Any]],
+        canonical_id: str,
+        label: str,
+        current_state: Optional[Dict[str, Any]],
+        realtime_state: Optional[Dict[str, Any]],
+        node_type: Optional[str],
+        ttl: Optional[float]
+    ) -> Dict[str, Any]:
+        """在已有条目上合并本次写入的状态"""
+        freshness_type = self.freshness_type(canonical_id, node_type)
+
+        entry = entry or {"canonical_id": canonical_id, "labels": []}
+        if label not in entry["labels"]:
+            entry["labels"].append(label)
+
+        state = current_state or realtime_state or {}
+        entry.update({
+            "current_state": dict(current_state) if current_state else None,
+            "realtime_state": dict(realtime_state) if realtime_state else None,
+            "sources": state.get("sources", []),
+            "confidence": state.get("confidence", "unknown"),
+            "node_type": freshness_type,
+            "updated_at": time.time(),
+            "last_updated": datetime.utcnow().isoformat(),
+            "ttl": ttl if ttl is not None else self.freshness_policy.get(
+                freshness_type, self.freshness_policy.get("default", 1800.0)
+            )
+        })
+        return entry
+
+    def _record_history(
+        self,
+        canonical_id: str,
+        current_state: Optional[Dict[str, Any]],
+        realtime_state: Optional[Dict[str, Any]]
+    ):
+        if self._records_history(canonical_id):
+            timeseries_store.append(canonical_id, self._history_value(current_state, realtime_state))
+
+    @staticmethod
+    def _records_history(canonical_id: str) -> bool:
+        # 观测历史：行情类节点由 YahooFinanceService 按 Ticker 记录（带交易所时间），此处只记录其余节点
+        return not canonical_id.startswith("ticker:")
+
+    @staticmethod
+    def _history_value(current_state: Optional[Dict[str, Any]], realtime_state: Optional[Dict[str, Any]]) -> Any:
+        state = current_state or realtime_state or {}
+        return current_state.get("value") if current_state else state.get("latest_value")
+
+    def annotate_trends(self, nodes: List[Dict[str, Any]], state_field: str) -> int:
+        """
+        按历史观测批量计算图谱中所有节点的趋势，覆盖 state["trend"] 并附加 state["trend_stats"]
+
+        历史不足或不可靠（见 reliable_trends）的节点保留原有趋势（行情单点比较或 LLM 判断）
+
+        Args:
+            nodes: 图谱节点列表
+            state_field: 状态字段（realtime_state / current_state）
+
+        Returns:
+            按历史观测确定趋势的节点数
+        """
+        targets = []
+        for node in nodes:
+            state = node.get(state_field)
+            if isinstance(state, dict) and state.get(
+                "latest_value" if state_field == "realtime_state" else "value", "unknown"
+            ) != "unknown":
+                targets.append((state, self.resolve(node.get("label", ""))))
+        if not targets:
+            return 0
+
+        trends = self.reliable_trends(canonical_id for _, canonical_id in targets)
+        annotated = 0
+        for state, canonical_id in targets:
+            stats = trends.get(canonical_id)
+            if stats is None:
+                continue
+            state["trend"] = stats["trend"]
+            state["trend_stats"] = stats
+            annotated += 1
+
+        if annotated:
+            logger.info("[NodeStateStore] 按历史观测计算趋势: %s/%s 个节点", annotated, len(nodes))
+        return annotated
+
+    def reliable_trends(self, canonical_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        按历史观测计算趋势，只返回可直接采用的序列
+
+        ticker:* 等上游数值序列直接采用；label:* 序列（LLM 从搜索结果中提取的数值）
+        需要至少 trend_min_points 个观测点，区间变化、最新一步变化与波动率均不超过 trend_max_change_pct
+        """
+        trends = timeseries_store.trends(canonical_ids)
+        return {
+            canonical_id: stats
+            for canonical_id, stats in trends.items()
+            if not canonical_id.startswith("label:") or self._plausible(stats)
+        }
+
+    def _plausible(self, stats: Dict[str, Any]) -> bool:
+        """观测点足够，且区间变化、最新一步变化与波动率都在上限内（单次提取错误会造成数量级跳变）"""
+        if stats["points"] < self.trend_min_points:
+            return False
+        bounds = (stats.get("change_pct"), stats.get("return_pct"), stats.get("volatility_pct"))
+        return all(value is not None and abs(value) <= self.trend_max_change_pct for value in bounds)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        usage = self._entries.usage(self.NAMESPACE)
+        return {
+            "name": self.NAMESPACE,
+            "backend": self._entries.kind,
+            "size": usage[0] if usage else 0,
+            "synonyms": len(self._synonyms),
+            "learned_synonyms": len(self._learned),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
+
+    # ================================================================
+    # 状态格式转换
+    # ================================================================
+
+    @staticmethod
+    def to_current_state(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """转换为 NodeSensingService 的 current_state 格式"""
+        if entry.get("current_state"):
+            return dict(entry["current_state"])
+
+        realtime_state = entry["realtime_state"]
+        return {
+            "value": realtime_state.get("latest_value", "unknown"),
+            "trend": realtime_state.get("trend", "stable"),
+            "narrative_context": realtime_state.get("narrative_context", ""),
+            "confidence": realtime_state.get("confidence", "unknown"),
+            "sources": realtime_state.get("sources", [])
+        }
+
+    @staticmethod
+    def to_realtime_state(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """转换为 TwoPassCausalService 的 realtime_state 格式"""
+        if entry.get("realtime_state"):
+            return dict(entry["realtime_state"])
+
+        current_state = entry["current_state"]
+        return {
+            "latest_value": current_state.get("value", "unknown"),
+            "trend": current_state.get("trend", "stable"),
+            "narrative_context": current_state.get("narrative_context", ""),
+            "sources": current_state.get("sources", []),
+            "updated_at": entry["last_updated"],
+            "strategy_used": "two_stage_consensus",
+            "confidence": current_state.get("confidence", "unknown")
+        }
+
+
+# 全局实例：所有服务与关注列表预热共享
+node_state_store = NodeStateStore()
+
+
+class NegativeResultCache:
+    """
+    负结果缓存：记录完整走完两阶段瀑布流仍为 unknown 的节点
+
+    定性节点（如市场情绪、地缘政治风险）通常经过 Stage 1 搜索、LLM 提取、
+    Stage 2 全网搜索与交叉验证后仍返回 unknown。按规范标签 + 查询集合缓存该结果及原因，
+    在 TTL 内跳过重复尝试，除非调用方强制刷新。
+    """
+
+    def __init__(self, store: NodeStateStore, ttl: Optional[float] = None):
+        self.store = store
+        self._cache = TTLCache(
+            name="negative_result",
+            default_ttl=ttl or float(os.getenv("NEGATIVE_CACHE_TTL", "1800")),
+            max_size=4096
+        )
+
+    def _key(self, label: str, queries: List[str]) -> tuple:
+        canonical_id = self.store.resolve(label)
+        return (canonical_id, tuple(sorted({normalize_label(q) for q in queries})))
+
+    def get(self, label: str, queries: List[str]) -> Optional[Dict[str, Any]]:
+        """获取未过期的负结果记录"""
+        return self._cache.get(self._key(label, queries))
+
+    async def aget(self, label: str, queries: List[str]) -> Optional[Dict[str, Any]]:
+        return await self._cache.aget(self._key(label, queries))
+
+    def put(self, label: str, queries: List[str], reason: str, stage1_reason: Optional[str] = None):
+        """
+        记录负结果
+
+        Args:
+            reason: Stage 2 失败原因（no_search_results / cross_validation_failed）
+            stage1_reason: Stage 1 失败原因（no_search_results / no_whitelist_hits / extraction_unknown）
+        """
+        self._cache.set(self._key(label, queries), self._record(reason, stage1_reason))
+
+    async def aput(self, label: str, queries: List[str], reason: str, stage1_reason: Optional[str] = None):
+        await self._cache.aset(self._key(label, queries), self._record(reason, stage1_reason))
+
+    def _record(self, reason: str, stage1_reason: Optional[str]) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "reason": reason,
+            "stage1_reason": stage1_reason,
+            "cached_at": now,
+            "expires_at": now + self._cache.default_ttl
+        }
+
+    def invalidate(self, label: str, queries: List[str]):
+        self._cache.delete(self._key(label, queries))
+
+    async def ainvalidate(self, label: str, queries: List[str]):
+        await self._cache.adelete(self._key(label, queries))
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+negative_result_cache = NegativeResultCache(node_state_store)
@@ -5,9 +5,16 @@
 
 import os
 import asyncio
+import logging
 import aiohttp
 from typing import List, Dict, Any, Optional
 import json
+from app.utils.metrics import timed_search
+from app.utils.cassette import cassette_search
+from app.utils.search_cache import cached_search
+from app.utils.rate_limiter import rate_limited
+
+logger = logging.getLogger(__name__)
 
 class SearchService:
     """搜索服务 - 支持多种搜索引擎"""
@@ -16,6 +23,9 @@ class SearchService:
         # 支持的搜索引擎配置
         self.tavily_api_key = os.getenv("TAVILY_API_KEY")
         self.serper_api_key = os.getenv("SERPER_API_KEY")
+        # 可指向本地替身服务（standins/）做离线压测与故障注入
+        self.tavily_base_url = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com").rstrip("/")
+        self.serper_base_url = os.getenv("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/")
         
         # 默认使用的搜索引擎
         self.default_engine = os.getenv("SEARCH_ENGINE", "tavily")
@@ -23,6 +33,10 @@ class SearchService:
         # 超时设置
         self.timeout = 30
     
+    @cached_search("tavily")
+    @rate_limited("tavily")
+    @timed_search("tavily")
+    @cassette_search("tavily")
     async def _search_tavily(self, query: str) -> List[Dict[str, Any]]:
         """
         使用 Tavily Search API
@@ -31,7 +45,7 @@ class SearchService:
         if not self.tavily_api_key:
             raise ValueError("TAVILY_API_KEY 未配置")
         
-        url = "https://api.tavily.com/search"
+        url = self.tavily_base_url + "/search"
         
         payload = {
             "api_key": self.tavily_api_key,
@@ -61,6 +75,10 @@ class SearchService:
                 
                 return results
     
+    @cached_search("serper")
+    @rate_limited("serper")
+    @timed_search("serper")
+    @cassette_search("serper")
     async def _search_serper(self, query: str) -> List[Dict[str, Any]]:
         """
         使用 Serper.dev API
@@ -69,7 +87,7 @@ class SearchService:
         if not self.serper_api_key:
             raise ValueError("SERPER_API_KEY 未配置")
         
-        url = "https://google.serper.dev/search"
+        url = self.serper_base_url + "/search"
         
         headers = {
             "X-API-KEY": self.serper_api_key,
@@ -102,6 +120,10 @@ class SearchService:
                 
                 return results
     
+    @cached_search("duckduckgo")
+    @rate_limited("duckduckgo")
+    @timed_search("duckduckgo")
+    @cassette_search("duckduckgo")
     async def _search_duckduckgo(self, query: str) -> List[Dict[str, Any]]:
         """
         使用 DuckDuckGo (免费，无需 API Key)
@@ -150,7 +172,7 @@ class SearchService:
             else:
                 raise ValueError(f"不支持的搜索引擎: {engine}")
         except Exception as e:
-            print(f"搜索失败 [{query}]: {str(e)}")
+            logger.warning("[搜索] 搜索失败 [%s]: %s", query, e)
             return []
     
     async def perform_search(self, queries: List[str], engine: Optional[str] = None) -> str:
@@ -167,22 +189,35 @@ class SearchService:
         if not queries:
             return ""
         
-        print(f"开始并发搜索，共 {len(queries)} 个查询...")
+        logger.info("[搜索] 开始并发搜索，共 %d 个查询", len(queries))
         
         # 并发执行所有搜索
         tasks = [self.search_single(query, engine) for query in queries]
         all_results = await asyncio.gather(*tasks, return_exceptions=True)
         
-        # 合并所有搜索结果
+        context = self.build_context(queries, all_results)
+        
+        logger.info("[搜索] 搜索完成，获取到 %d 字符的上下文", len(context))
+        
+        return context
+    
+    def build_context(self, queries: List[str], all_results: List[Any]) -> str:
+        """
+        将各查询的搜索结果合并为 LLM 上下文文本
+        
+        Args:
+            queries: 搜索关键词列表
+            all_results: 与 queries 一一对应的结果列表（或异常）
+        """
         context_parts = []
         
         for i, (query, results) in enumerate(zip(queries, all_results), 1):
             if isinstance(results, Exception):
-                print(f"查询 {i} 失败: {query} - {str(results)}")
+                logger.warning("[搜索] 查询 %d 失败: %s - %s", i, query, results)
                 continue
             
             if not results:
-                print(f"查询 {i} 无结果: {query}")
+                logger.info("[搜索] 查询 %d 无结果: %s", i, query)
                 continue
             
             # 添加查询标题
@@ -202,11 +237,7 @@ class SearchService:
                 context_parts.append("")
         
         # 合并成一个长字符串
-        context = "\n".join(context_parts)
-        
-        print(f"搜索完成，获取到 {len(context)} 字符的上下文")
-        
-        return context
+        return "\n".join(context_parts)
     
     def format_search_results(self, results: List[Dict[str, Any]]) -> str:
         """
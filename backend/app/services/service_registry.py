@@ -0,0 +1,216 @@
+"""
+服务注册表 (Lazy Service Registry)
+各服务在首次使用时才构建，连带的重量级依赖（openai、aiohttp、yfinance → pandas）也随之推迟导入，
+只服务部分接口的进程（如仅 /analyze 的 worker）冷启动时不必承担全部服务的导入与初始化开销：
+- 路由通过 FastAPI 依赖获取服务：service=Depends(services.dependency("two_pass"))
+- 后台任务等非请求上下文使用 await services.aget(name)
+- 服务之间的依赖在工厂函数中通过 registry.get() 解析，保证全进程单例
+- 可选预热：SERVICE_WARMUP=all 或逗号分隔的服务名，启动时构建并执行预热钩子（如提前导入 yfinance）
+"""
+
+import os
+import time
+import asyncio
+import threading
+import logging
+from typing import Dict, Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """按名称注册工厂函数，首次获取时构建并缓存实例"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[["ServiceRegistry"], Any]] = {}
+        self._warmers: Dict[str, Callable[[Any], None]] = {}
+        self._instances: Dict[str, Any] = {}
+        # 可重入：工厂函数内会递归获取依赖的服务
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[["ServiceRegistry"], Any],
+        warm: Optional[Callable[[Any], None]] = None
+    ):
+        """
+        注册服务
+
+        Args:
+            name: 服务名
+            factory: 接收注册表、返回服务实例的工厂函数（在函数内导入服务模块）
+            warm: 预热钩子，接收服务实例，在 warm_up() 时调用
+        """
+        self._factories[name] = factory
+        if warm is not None:
+            self._warmers[name] = warm
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    def get(self, name: str) -> Any:
+        """获取服务实例（必要时同步构建）"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                if name not in self._factories:
+                    raise KeyError(f"未注册的服务: {name}")
+                start = time.perf_counter()
+                instance = self._factories[name](self)
+                self._instances[name] = instance
+                logger.info("[ServiceRegistry] 构建服务 %s，耗时 %.0fms", name, (time.perf_counter() - start) * 1000)
+            return instance
+
+    async def aget(self, name: str) -> Any:
+        """异步获取：已构建时直接返回，否则在线程池中构建，避免模块导入阻塞事件循环"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        return await asyncio.to_thread(self.get, name)
+
+    def dependency(self, name: str) -> Callable[[], Any]:
+        """返回 FastAPI 依赖函数"""
+
+        async def provide():
+            return await self.aget(name)
+
+        provide.__name__ = f"get_{name}_service"
+        return provide
+
+    async def warm_up(self, names: Optional[List[str]] = None):
+        """
+        构建指定服务并执行预热钩子
+
+        Args:
+            names: 服务名列表，默认读取 SERVICE_WARMUP（all 表示全部，空表示不预热）
+        """
+        if names is None:
+            setting = os.getenv("SERVICE_WARMUP", "").strip()
+            if not setting:
+                return
+            names = self.names if setting == "all" else [n.strip() for n in setting.split(",") if n.strip()]
+
+        start = time.perf_counter()
+        for name in names:
+            instance = await self.aget(name)
+            warm = self._warmers.get(name)
+            if warm is not None:
+                await asyncio.to_thread(warm, instance)
+        logger.info(
+            "[ServiceRegistry] 预热完成: %s，耗时 %.0fms", ", ".join(names), (time.perf_counter() - start) * 1000
+        )
+
+
+# ================================================================
+# 服务注册（工厂函数内导入，模块级不引入服务依赖）
+# ================================================================
+
+def _preload_yfinance(_service):
+    from app.services.yahoo_finance_service import load_yfinance
+    load_yfinance()
+
+
+def _causal(registry: ServiceRegistry):
+    from app.services.causal_service import CausalService
+    return CausalService()
+
+
+def _news_extraction(registry: ServiceRegistry):
+    from app.services.news_extraction_service import NewsExtractionService
+    return NewsExtractionService()
+
+
+def _summary(registry: ServiceRegistry):
+    from app.services.summary_service import SummaryGenerationService
+    return SummaryGenerationService()
+
+
+def _target_research(registry: ServiceRegistry):
+    from app.services.target_research_service import TargetResearchService
+    return TargetResearchService()
+
+
+def _streaming_research(registry: ServiceRegistry):
+    from app.services.streaming_research_service import StreamingTargetResearchService
+    return StreamingTargetResearchService(layout_service=registry.get("graph_layout"))
+
+
+def _node_sensing(registry: ServiceRegistry):
+    from app.services.node_sensing_service import NodeSensingService
+    return NodeSensingService()
+
+
+def _enhanced_research(registry: ServiceRegistry):
+    from app.services.enhanced_research_service import EnhancedTargetResearchService
+    return EnhancedTargetResearchService()
+
+
+def _two_pass(registry: ServiceRegistry):
+    from app.services.two_pass_causal_service import TwoPassCausalService
+    return TwoPassCausalService()
+
+
+def _batch_research(registry: ServiceRegistry):
+    from app.services.batch_research_service import BatchTargetResearchService
+    return BatchTargetResearchService(
+        sensing_service=registry.get("node_sensing"),
+        layout_service=registry.get("graph_layout")
+    )
+
+
+def _graph_store(registry: ServiceRegistry):
+    from app.services.graph_store import GraphStore
+    return GraphStore()
+
+
+def _graph_refresh(registry: ServiceRegistry):
+    from app.services.graph_refresh_service import GraphRefreshService
+    return GraphRefreshService(
+        graph_store=registry.get("graph_store"),
+        two_pass_service=registry.get("two_pass"),
+        sensing_service=registry.get("node_sensing")
+    )
+
+
+def _graph_layout(registry: ServiceRegistry):
+    from app.services.graph_layout_service import GraphLayoutService
+    return GraphLayoutService()
+
+
+def _graph_analysis(registry: ServiceRegistry):
+    from app.services.graph_analysis_service import GraphAnalysisService
+    return GraphAnalysisService(graph_store=registry.get("graph_store"))
+
+
+def _watchlist_scheduler(registry: ServiceRegistry):
+    from app.services.watchlist_service import WatchlistScheduler
+    return WatchlistScheduler(
+        two_pass_service=registry.get("two_pass"),
+        sensing_service=registry.get("node_sensing")
+    )
+
+
+services = ServiceRegistry()
+services.register("causal", _causal)
+services.register("news_extraction", _news_extraction)
+services.register("summary", _summary)
+services.register("target_research", _target_research)
+services.register("streaming_research", _streaming_research)
+services.register("node_sensing", _node_sensing, warm=_preload_yfinance)
+services.register("enhanced_research", _enhanced_research, warm=_preload_yfinance)
+services.register("two_pass", _two_pass, warm=_preload_yfinance)
+services.register("batch_research", _batch_research, warm=_preload_yfinance)
+services.register("graph_store", _graph_store)
+services.register("graph_refresh", _graph_refresh)
+services.register("graph_analysis", _graph_analysis)
+services.register("graph_layout", _graph_layout)
+services.register("watchlist_scheduler", _watchlist_scheduler)
@@ -0,0 +1,192 @@
+"""
+流式运行登记表 (Stream Run Registry)
+让 /research-target/stream 支持断线续传：
+- 每次运行分配 run_id，Pipeline 在后台任务中执行，与 HTTP 连接解耦（客户端断开不会中断 Pipeline）
+- 事件按单调递增序号写入短时缓冲区，SSE 事件 id 为 "<run_id>:<seq>"
+- 客户端携带 Last-Event-ID 重连时，先补发错过的事件，再继续跟随仍在运行的 Pipeline
+- 空闲时定期发送心跳注释，防止代理与移动网络断开空闲连接
+- 运行结束后缓冲区保留 STREAM_RUN_TTL 秒，过期清理
+
+登记表是进程内的：多 worker 部署时续传请求必须回到执行该运行的 worker（单 worker 或按 X-Run-Id 粘性路由），
+否则续传接口返回 404。
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+
+from app.utils import codec
+from app.utils.metrics import registry, Gauge
+
+logger = logging.getLogger(__name__)
+
+
+class StreamRun:
+    """单次流式运行的事件缓冲区"""
+
+    def __init__(self, run_id: str, max_events: int):
+        self.run_id = run_id
+        self.max_events = max_events
+        self.events: List[Tuple[int, str]] = []  # (seq, data)
+        self.done = False
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        return self.events[-1][0] if self.events else 0
+
+    async def append(self, data: str):
+        async with self._changed:
+            self.events.append((self.last_seq + 1, data))
+            if len(self.events) > self.max_events:
+                del self.events[0]
+            self._changed.notify_all()
+
+    async def finish(self):
+        async with self._changed:
+            self.done = True
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    async def wait_for_events(self, after_seq: int, timeout: float) -> bool:
+        """等待序号大于 after_seq 的事件或运行结束；超时返回 False"""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self.last_seq > after_seq or self.done),
+                    timeout=timeout
+                )
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+
+class StreamRunRegistry:
+    """流式运行登记表"""
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        max_events: int = 1000
+    ):
+        self.ttl = ttl if ttl is not None else float(os.getenv("STREAM_RUN_TTL", "300"))
+        self.heartbeat_seconds = heartbeat_seconds if heartbeat_seconds is not None else float(
+            os.getenv("STREAM_HEARTBEAT_SECONDS", "15")
+        )
+        # 客户端断线后重连的建议等待时间（毫秒），写入首个 SSE 帧的 retry 字段
+        self.retry_ms = int(os.getenv("STREAM_RETRY_MS", "3000"))
+        self.max_events = max_events
+        self._runs: Dict[str, StreamRun] = {}
+        registry.register_collector(self._collect_metrics)
+
+    # ================================================================
+    # 运行管理
+    # ================================================================
+
+    def start(self, events: AsyncIterator[Any]) -> StreamRun:
+        """
+        启动一次运行：在后台任务中消费事件源并写入缓冲区
+
+        Args:
+            events: Pipeline 的事件异步迭代器（str 原样写入，其他对象按 JSON 编码）
+        """
+        self._purge_expired()
+
+        run = StreamRun(uuid.uuid4().hex[:16], self.max_events)
+        run.task = asyncio.create_task(self._consume(run, events))
+        self._runs[run.run_id] = run
+
+        logger.info("[StreamRun] 运行开始: %s", run.run_id)
+        return run
+
+    async def _consume(self, run: StreamRun, events: AsyncIterator[Any]):
+        try:
+            async for event in events:
+                data = event if isinstance(event, str) else codec.dumps(event)
+                await run.append(data.strip())
+        except Exception as e:
+            logger.error("[StreamRun] 运行 %s 失败: %s", run.run_id, e)
+            await run.append(codec.dumps({
+                "status": "error",
+                "message": f"流式处理失败: {str(e)}",
+                "timestamp": time.time()
+            }))
+        finally:
+            await run.finish()
+            logger.info("[StreamRun] 运行结束: %s，共 %s 个事件", run.run_id, run.last_seq)
+
+    def get(self, run_id: str) -> Optional[StreamRun]:
+        self._purge_expired()
+        return self._runs.get(run_id)
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [
+            run_id for run_id, run in self._runs.items()
+            if run.done and now - run.finished_at > self.ttl
+        ]
+        for run_id in expired:
+            del self._runs[run_id]
+
+    @staticmethod
+    def parse_last_event_id(last_event_id: Optional[str]) -> Tuple[Optional[str], int]:
+        """解析 Last-Event-ID（"<run_id>:<seq>"，也接受纯序号），返回 (run_id, seq)"""
+        if not last_event_id:
+            return None, 0
+        if ":" not in last_event_id:
+            return None, int(last_event_id) if last_event_id.strip().isdigit() else 0
+        run_id, _, seq = last_event_id.strip().rpartition(":")
+        try:
+            return run_id, int(seq)
+        except ValueError:
+            return run_id, 0
+
+    # ================================================================
+    # SSE 输出
+    # ================================================================
+
+    async def follow(self, run: StreamRun, after_seq: int = 0) -> AsyncIterator[str]:
+        """
+        生成 SSE 帧：补发 after_seq 之后的事件，并持续跟随直至运行结束
+
+        空闲超过心跳间隔时输出注释帧（": heartbeat"），EventSource 与 fetch 客户端均会忽略
+        """
+        yield f"retry: {self.retry_ms}\n\n"
+
+        if run.events and after_seq < run.events[0][0] - 1:
+            logger.warning(
+                "[StreamRun] 运行 %s 的缓冲区已丢弃序号 %s 之前的事件", run.run_id, run.events[0][0]
+            )
+
+        while True:
+            for seq, data in list(run.events):
+                if seq > after_seq:
+                    yield f"id: {run.run_id}:{seq}\ndata: {data}\n\n"
+                    after_seq = seq
+
+            if run.done and after_seq >= run.last_seq:
+                return
+
+            if not await run.wait_for_events(after_seq, self.heartbeat_seconds):
+                yield f": heartbeat {int(time.time())}\n\n"
+
+    def _collect_metrics(self) -> List[Gauge]:
+        stats = self.stats()
+        runs = Gauge("stream_runs", "流式运行缓冲区数量", ["state"])
+        runs.set(stats["running"], state="running")
+        runs.set(stats["runs"] - stats["running"], state="finished")
+        return [runs]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": "stream_runs",
+            "runs": len(self._runs),
+            "running": sum(1 for run in self._runs.values() if not run.done)
+        }
@@ -5,22 +5,27 @@
 
 from openai import AsyncOpenAI
 import os
-import json
 import time
 import asyncio
 from typing import Dict, Any, List, AsyncGenerator
+from app.services.graph_layout_service import GraphLayoutService
+from app.services.llm_gateway import llm_gateway
 from app.services.search_service import SearchService
+from app.utils import codec
+from app.utils.metrics import observe_stage
+from app.utils.tracing import traced
 
 class StreamingTargetResearchService:
     """流式标的逆向推演与实时分析服务"""
     
-    def __init__(self):
+    def __init__(self, layout_service: GraphLayoutService = None):
         self.client = AsyncOpenAI(
             api_key=os.getenv("OPENAI_API_KEY"),
             base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
         )
         self.model = os.getenv("OPENAI_MODEL", "deepseek-reasoner")
         self.search_service = SearchService()
+        self.layout_service = layout_service or GraphLayoutService()
     
     async def _send_progress(self, status: str, message: str, data: Any = None) -> str:
         """
@@ -43,7 +48,7 @@ class StreamingTargetResearchService:
         if data is not None:
             event["data"] = data
         
-        return json.dumps(event, ensure_ascii=False) + "\n"
+        return codec.dumps(event) + "\n"
     
     async def stream_research_target(self, target: str) -> AsyncGenerator[str, None]:
         """
@@ -82,6 +87,7 @@ class StreamingTargetResearchService:
                 search_queries = step1_result["search_queries"]
                 
                 step1_elapsed = time.time() - step1_start
+                observe_stage("research_target_stream", "extract_factors", step1_elapsed)
                 
                 yield await self._send_progress(
                     "step1_complete",
@@ -114,6 +120,7 @@ class StreamingTargetResearchService:
                 context = await self._step2_perform_search(search_queries)
                 
                 step2_elapsed = time.time() - step2_start
+                observe_stage("research_target_stream", "search", step2_elapsed)
                 
                 yield await self._send_progress(
                     "step2_complete",
@@ -150,6 +157,7 @@ class StreamingTargetResearchService:
                 )
                 
                 step3_elapsed = time.time() - step3_start
+                observe_stage("research_target_stream", "generate_analysis", step3_elapsed)
                 
                 yield await self._send_progress(
                     "step3_complete",
@@ -172,6 +180,7 @@ class StreamingTargetResearchService:
             # 完成：发送最终结果
             # ============================================
             total_elapsed = time.time() - pipeline_start
+            observe_stage("research_target_stream", "total", total_elapsed)
             
             final_result = {
                 **analysis_result,
@@ -183,6 +192,7 @@ class StreamingTargetResearchService:
                     "total_time": total_elapsed
                 }
             }
+            await self.layout_service.apply(final_result)
             
             yield await self._send_progress(
                 "success",
@@ -197,6 +207,7 @@ class StreamingTargetResearchService:
                 f"Pipeline 执行失败: {str(e)}"
             )
     
+    @traced("extract_factors")
     async def _step1_extract_factors(self, target: str) -> Dict[str, Any]:
         """步骤 1: 逆向因子提取"""
         
@@ -211,7 +222,9 @@ class StreamingTargetResearchService:
 
         user_prompt = f"请分析以下标的：{target}\n\n请输出：1. 影响该标的的核心因子 2. 用于搜索最新动态的精准关键词"
 
-        response = await self.client.chat.completions.create(
+        response = await llm_gateway.chat(
+            self.client,
+            "StreamingTargetResearchService.step1_extract_factors",
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -222,17 +235,19 @@ class StreamingTargetResearchService:
         )
         
         content = response.choices[0].message.content
-        result = json.loads(content)
+        result = codec.loads(content)
         
         if "factors" not in result or "search_queries" not in result:
             raise ValueError("LLM 返回缺少必需字段")
         
         return result
     
+    @traced("search")
     async def _step2_perform_search(self, search_queries: List[str]) -> str:
         """步骤 2: 并发搜索"""
         return await self.search_service.perform_search(search_queries)
     
+    @traced("generate_analysis")
     async def _step3_generate_analysis(
         self,
         target: str,
@@ -257,7 +272,9 @@ class StreamingTargetResearchService:
 
 请分析上述最新事件如何影响目标资产，构建完整的因果传导路径。"""
 
-        response = await self.client.chat.completions.create(
+        response = await llm_gateway.chat(
+            self.client,
+            "StreamingTargetResearchService.step3_generate_analysis",
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -268,7 +285,7 @@ class StreamingTargetResearchService:
         )
         
         content = response.choices[0].message.content
-        result = json.loads(content)
+        result = codec.loads(content)
         
         if "nodes" not in result or "edges" not in result:
             raise ValueError("LLM 返回缺少必需字段")
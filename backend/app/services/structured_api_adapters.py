@@ -0,0 +1,430 @@
+"""
+结构化 API 适配器 (Structured API Adapters)
+FRED、Tushare、SEC EDGAR、CCXT、Polygon 统一为异步适配器：
+- resolve()：节点标签 -> 序列定义（config/structured_apis.json）
+- fetch_batch()：一次上游调用获取多条序列（上游支持时；否则 batch_size=1）
+- 未配置凭据（credential_env）时返回 Mock 数据，行为与接入前一致
+
+SeriesBatcher 把短时间窗口（batch_window_ms）内对同一适配器的并发请求合并为批量调用，
+相同序列的并发请求共享同一次调用。各上游的基础 URL 可用 <NAME>_BASE_URL 覆盖（指向 standins/ 替身服务）。
+"""
+
+import os
+import json
+import random
+import asyncio
+import logging
+import aiohttp
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple, Hashable
+
+from app.utils.metrics import registry
+from app.utils.rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+STRUCTURED_API_CALLS_TOTAL = registry.counter(
+    "structured_api_calls_total", "结构化 API 上游调用次数", ["api", "outcome"]
+)
+STRUCTURED_API_BATCH_SIZE = registry.histogram(
+    "structured_api_batch_size", "每次上游调用包含的序列数", ["api"], buckets=(1, 2, 5, 10, 20, 50, 100)
+)
+
+CONFIG_DIR = Path(__file__).parent.parent.parent / "config"
+
+
+def _utc_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def format_value(raw: Any, unit: str) -> str:
+    """按单位格式化数值（百分比附加 %，其余保留两位小数）"""
+    try:
+        number = float(raw)
+    except (TypeError, ValueError):
+        return str(raw)
+    if unit == "percentage":
+        return f"{number:.2f}%"
+    return f"{number:.2f}"
+
+
+class StructuredAPIAdapter:
+    """适配器基类：标签解析、Mock 数据与批量获取的公共逻辑"""
+
+    name = ""
+    display_name = ""
+
+    def __init__(self, config: Dict[str, Any], api_info: Dict[str, Any], timeout: float):
+        self.config = config
+        self.series: Dict[str, Dict[str, Any]] = config.get("series", {})
+        self.batch_size = max(1, int(config.get("batch_size", 1)))
+        self.credential = os.getenv(config.get("credential_env") or "", "")
+        self.mock = not self.credential
+
+        base_url = api_info.get("base_url", "")
+        if not base_url.startswith("http"):
+            base_url = config.get("default_base_url", "")
+        self.base_url = os.getenv(f"{self.name.upper()}_BASE_URL", base_url).rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    # ================================================================
+    # 序列解析
+    # ================================================================
+
+    def resolve(self, node_label: str) -> Optional[Dict[str, Any]]:
+        """节点标签 -> 序列定义（标签包含配置的关键词即命中）；空标签或真实模式下未收录的标签返回 None"""
+        node_label = (node_label or "").strip()
+        if not node_label:
+            return None
+        for keyword, series in self.series.items():
+            if keyword and keyword in node_label:
+                return {**series, "keyword": keyword}
+        if self.mock:
+            return {**self.config.get("default", {}), "id": "default", "frequency": "daily"}
+        return None
+
+    def batch_key(self, series: Dict[str, Any]) -> Hashable:
+        """批量键：相同键的序列可在一次上游调用中获取"""
+        return None
+
+    # ================================================================
+    # 获取
+    # ================================================================
+
+    async def fetch_batch(self, series_list: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        获取一批序列的最新观测值
+
+        Returns:
+            序列 ID -> {"value", "unit", "timestamp", "metadata"}；上游无数据的序列为 None
+        """
+        if self.mock:
+            return {series["id"]: self.mock_observation(series) for series in series_list}
+
+        await rate_limiter.acquire(self.name)
+        STRUCTURED_API_BATCH_SIZE.observe(len(series_list), api=self.name)
+        outcome = "error"
+        try:
+            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+                results = await self._fetch_live(session, series_list)
+            outcome = "ok"
+            return results
+        finally:
+            STRUCTURED_API_CALLS_TOTAL.inc(api=self.name, outcome=outcome)
+
+    async def _fetch_live(
+        self,
+        session: aiohttp.ClientSession,
+        series_list: List[Dict[str, Any]]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def mock_observation(self, series: Dict[str, Any]) -> Dict[str, Any]:
+        if "mock_value" in series:
+            value = series["mock_value"]
+        elif "value" in series:
+            value = series["value"]
+        else:
+            value = series.get("format", "{:.2f}").format(random.uniform(series["min"], series["max"]))
+
+        metadata = dict(series.get("metadata", {}))
+        if series["id"] != "default":
+            metadata.setdefault("series_id", series["id"])
+            if series.get("description"):
+                metadata.setdefault("description", series["description"])
+        return {
+            "value": value,
+            "unit": series.get("unit", ""),
+            "timestamp": datetime.utcnow().isoformat(),
+            "metadata": metadata
+        }
+
+    @staticmethod
+    async def _get_json(session: aiohttp.ClientSession, method: str, url: str, **kwargs) -> Any:
+        async with session.request(method, url, **kwargs) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+
+# ================================================================
+# 各上游适配器
+# ================================================================
+
+class FredAdapter(StructuredAPIAdapter):
+    """FRED：series/observations 每次只接受一个序列"""
+
+    name = "fred"
+    display_name = "FRED"
+
+    async def _fetch_live(self, session, series_list):
+        results = {}
+        for series in series_list:
+            data = await self._get_json(
+                session, "GET", f"{self.base_url}/series/observations",
+                params={
+                    "series_id": series["id"],
+                    "api_key": self.credential,
+                    "file_type": "json",
+                    "sort_order": "desc",
+                    "limit": "5"
+                }
+            )
+            # 缺失值以 "." 表示，取最近一个有效观测
+            observation = next(
+                (o for o in data.get("observations", []) if o.get("value") not in (None, "", ".")), None
+            )
+            results[series["id"]] = None if observation is None else {
+                "value": format_value(observation["value"], series["unit"]),
+                "unit": series["unit"],
+                "timestamp": observation["date"],
+                "metadata": {"series_id": series["id"], "description": series.get("description", "")}
+            }
+        return results
+
+
+class TushareAdapter(StructuredAPIAdapter):
+    """Tushare Pro：同一接口（如 daily）的多个 ts_code 可逗号拼接为一次调用；月度宏观接口无 ts_code"""
+
+    name = "tushare"
+    display_name = "Tushare"
+
+    def batch_key(self, series):
+        if series.get("api") in self.config.get("batch_apis", []):
+            return series["api"]
+        return series["id"]
+
+    async def _fetch_live(self, session, series_list):
+        api_name = series_list[0]["api"]
+        macro = series_list[0].get("date_field") == "month"
+        params = {} if macro else {"ts_code": ",".join(s["id"] for s in series_list)}
+        data = await self._get_json(
+            session, "POST", self.base_url,
+            json={"api_name": api_name, "token": self.credential, "params": params, "fields": ""}
+        )
+        if data.get("code") != 0:
+            raise RuntimeError(f"Tushare {api_name} 返回错误: {data.get('msg')}")
+
+        fields = data["data"]["fields"]
+        rows = [dict(zip(fields, item)) for item in data["data"]["items"]]
+
+        results = {}
+        for series in series_list:
+            date_field = series.get("date_field", "trade_date")
+            candidates = rows if macro else [row for row in rows if row.get("ts_code") == series["id"]]
+            candidates = [row for row in candidates if row.get(series["value_field"]) is not None]
+            if not candidates:
+                results[series["id"]] = None
+                continue
+            latest = max(candidates, key=lambda row: str(row.get(date_field, "")))
+            metadata = {"ts_code": series["id"], "api_name": api_name}
+            if series.get("change_field") and latest.get(series["change_field"]) is not None:
+                metadata["change_pct"] = f"{float(latest[series['change_field']]):+.2f}%"
+            results[series["id"]] = {
+                "value": format_value(latest[series["value_field"]], series["unit"]),
+                "unit": series["unit"],
+                "timestamp": str(latest.get(date_field, "")),
+                "metadata": metadata
+            }
+        return results
+
+
+class SecEdgarAdapter(StructuredAPIAdapter):
+    """SEC EDGAR：submissions 按公司（CIK）获取，需要标识调用方的 User-Agent"""
+
+    name = "sec_edgar"
+    display_name = "SEC EDGAR"
+
+    async def _fetch_live(self, session, series_list):
+        results = {}
+        for series in series_list:
+            data = await self._get_json(
+                session, "GET", f"{self.base_url}/submissions/CIK{series['id']}.json",
+                headers={"User-Agent": self.credential}
+            )
+            recent = data.get("filings", {}).get("recent", {})
+            forms = series.get("forms", ["10-K"])
+            results[series["id"]] = None
+            for i, form in enumerate(recent.get("form", [])):
+                if form in forms:
+                    filing_date = recent["filingDate"][i]
+                    results[series["id"]] = {
+                        "value": f"最新 {form} 已披露 ({filing_date})",
+                        "unit": series["unit"],
+                        "timestamp": filing_date,
+                        "metadata": {
+                            "filing_type": form,
+                            "cik": series["id"],
+                            "company": data.get("name", ""),
+                            "accession_number": recent.get("accessionNumber", [""] * (i + 1))[i]
+                        }
+                    }
+                    break
+        return results
+
+
+class CcxtAdapter(StructuredAPIAdapter):
+    """加密货币行情：交易所公开行情接口（Binance 兼容 /api/v3/ticker/24hr，symbols 参数一次获取多个交易对）"""
+
+    name = "ccxt"
+    display_name = "CCXT"
+
+    def __init__(self, config, api_info, timeout):
+        super().__init__(config, api_info, timeout)
+        # 公开接口无需凭据，设置 CCXT_BASE_URL 即启用
+        self.base_url = (self.credential or self.base_url).rstrip("/")
+
+    async def _fetch_live(self, session, series_list):
+        symbols = json.dumps([s["id"] for s in series_list], separators=(",", ":"))
+        data = await self._get_json(session, "GET", f"{self.base_url}/api/v3/ticker/24hr", params={"symbols": symbols})
+        tickers = {item["symbol"]: item for item in data}
+
+        results = {}
+        for series in series_list:
+            ticker = tickers.get(series["id"])
+            results[series["id"]] = None if ticker is None else {
+                "value": format_value(ticker["lastPrice"], series["unit"]),
+                "unit": series["unit"],
+                "timestamp": _utc_iso(ticker["closeTime"] / 1000),
+                "metadata": {
+                    "symbol": series.get("symbol", series["id"]),
+                    "change_24h": f"{float(ticker['priceChangePercent']):+.2f}%"
+                }
+            }
+        return results
+
+
+class PolygonAdapter(StructuredAPIAdapter):
+    """Polygon.io：股票快照接口的 tickers 参数一次获取多个代码"""
+
+    name = "polygon"
+    display_name = "Polygon.io"
+
+    async def _fetch_live(self, session, series_list):
+        data = await self._get_json(
+            session, "GET", f"{self.base_url}/v2/snapshot/locale/us/markets/stocks/tickers",
+            params={"tickers": ",".join(s["id"] for s in series_list), "apiKey": self.credential}
+        )
+        snapshots = {item["ticker"]: item for item in data.get("tickers", [])}
+
+        results = {}
+        for series in series_list:
+            snapshot = snapshots.get(series["id"])
+            price = None
+            if snapshot is not None:
+                price = (
+                    (snapshot.get("lastTrade") or {}).get("p")
+                    or (snapshot.get("day") or {}).get("c")
+                    or (snapshot.get("prevDay") or {}).get("c")
+                )
+            results[series["id"]] = None if not price else {
+                "value": format_value(price, series["unit"]),
+                "unit": series["unit"],
+                "timestamp": _utc_iso(snapshot["updated"] / 1e9) if snapshot.get("updated") else datetime.utcnow().isoformat(),
+                "metadata": {
+                    "ticker": series["id"],
+                    "change_pct": f"{float(snapshot.get('todaysChangePerc', 0)):+.2f}%"
+                }
+            }
+        return results
+
+
+ADAPTER_CLASSES = {
+    adapter.name: adapter
+    for adapter in (FredAdapter, TushareAdapter, SecEdgarAdapter, CcxtAdapter, PolygonAdapter)
+}
+
+
+def load_adapters(config_path: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, StructuredAPIAdapter]]:
+    """
+    读取适配器配置并构建适配器
+
+    Returns:
+        (全局设置, 名称 -> 适配器)
+    """
+    path = Path(config_path or os.getenv("STRUCTURED_API_CONFIG", str(CONFIG_DIR / "structured_apis.json")))
+    with open(path, "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    with open(CONFIG_DIR / "financial_sources.json", "r", encoding="utf-8") as f:
+        api_infos = json.load(f).get("structured_apis", {})
+
+    adapters = {}
+    for name, config in settings.get("adapters", {}).items():
+        if name == "description":
+            continue
+        adapter_class = ADAPTER_CLASSES.get(name)
+        if adapter_class is None:
+            logger.warning("[StructuredAPI] 未知的适配器: %s", name)
+            continue
+        adapters[name] = adapter_class(config, api_infos.get(name, {}), float(settings.get("timeout_seconds", 10)))
+    return settings, adapters
+
+
+# ================================================================
+# 批量合并
+# ================================================================
+
+class SeriesBatcher:
+    """
+    合并短时间窗口内对同一适配器的并发请求
+
+    第一个请求到达后等待 window 秒，期间到达的请求按 batch_key 分组、按 batch_size 切分为批量调用；
+    同一序列的并发请求（包括已在调用中的）共享结果。上游失败时相关请求得到 None
+    """
+
+    def __init__(self, adapter: StructuredAPIAdapter, window: float):
+        self.adapter = adapter
+        self.window = window
+        self._pending: Dict[str, Tuple[Dict[str, Any], asyncio.Future]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_scheduled = False
+        self._tasks: set = set()
+
+    async def get(self, series: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        series_id = series["id"]
+        future = self._inflight.get(series_id)
+        if future is None and series_id in self._pending:
+            future = self._pending[series_id][1]
+
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[series_id] = (series, future)
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                loop.call_later(self.window, self._flush)
+
+        # shield：某个等待方被取消（如竞速中落败）不影响共享同一结果的其他请求
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+
+        groups: Dict[Hashable, List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        for series, future in pending.values():
+            groups.setdefault(self.adapter.batch_key(series), []).append((series, future))
+
+        for items in groups.values():
+            for i in range(0, len(items), self.adapter.batch_size):
+                chunk = items[i:i + self.adapter.batch_size]
+                for series, future in chunk:
+                    self._inflight[series["id"]] = future
+                task = asyncio.ensure_future(self._run(chunk))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, chunk: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        results: Dict[str, Any] = {}
+        try:
+            results = await self.adapter.fetch_batch([series for series, _ in chunk])
+        except Exception as e:
+            logger.warning(
+                "[StructuredAPI] %s 批量获取失败 (%s): %s",
+                self.adapter.name, ", ".join(series["id"] for series, _ in chunk), e
+            )
+        finally:
+            for series, future in chunk:
+                self._inflight.pop(series["id"], None)
+                if not future.done():
+                    future.set_result(results.get(series["id"]))
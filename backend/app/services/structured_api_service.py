@@ -1,42 +1,79 @@
 """
-结构化 API 服务 - Mock 实现
+结构化 API 服务
 用于获取精确的宏观经济数据和金融市场数据
+
+各上游的调用细节见 structured_api_adapters.py；本服务负责：
+- 节点标签 -> 适配器序列（config/structured_apis.json）
+- 按序列缓存观测值，有效期由序列的更新频率决定（frequency_ttl）
+- 并发请求经 SeriesBatcher 合并为批量上游调用
+- 真实模式下每次上游观测按 <api>:<序列 ID> 记入时间序列存储（history=false 的适配器除外）
+未配置凭据的适配器返回 Mock 数据（source 标注 "(Mock)"）
 """
+import asyncio
 import logging
+from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
-import random
+
+from app.services.structured_api_adapters import SeriesBatcher, load_adapters
+from app.services.timeseries_store import timeseries_store
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 
+def observation_time(text: str) -> Optional[float]:
+    """观测时间戳（2026-10-19 / 20261019 / 202610 / ISO 格式，无时区按 UTC）-> Unix 秒"""
+    for fmt in ("%Y%m%d", "%Y%m"):
+        try:
+            return datetime.strptime(text, fmt).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            pass
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+
+
 class StructuredAPIService:
     """
     结构化 API 服务
-    当前阶段：所有 API 均为 Mock 实现，返回模拟数据
-    未来阶段：逐步接入真实 API
+    统一的 fetch_data 接口，按适配器获取、缓存与批量合并
     """
-    
-    def __init__(self):
-        self.mock_mode = True
-        logger.info("[StructuredAPI] 初始化（Mock 模式）")
-    
+
+    def __init__(self, config_path: Optional[str] = None):
+        self.settings, self.adapters = load_adapters(config_path)
+        window = float(self.settings.get("batch_window_ms", 10)) / 1000
+        self._batchers = {name: SeriesBatcher(adapter, window) for name, adapter in self.adapters.items()}
+
+        self.frequency_ttl = {
+            key: float(value) for key, value in self.settings.get("frequency_ttl", {}).items()
+            if key != "description"
+        }
+        self._cache = TTLCache(name="structured_api", default_ttl=3600, max_size=4096)
+
+        self.mock_mode = all(adapter.mock for adapter in self.adapters.values())
+        logger.info(
+            "[StructuredAPI] 初始化: %s",
+            ", ".join(f"{name}={'Mock' if adapter.mock else '真实'}" for name, adapter in self.adapters.items())
+        )
+
     async def fetch_data(
-        self, 
-        api_name: str, 
+        self,
+        api_name: str,
         node_label: str,
         node_type: str,
         **kwargs
     ) -> Optional[Dict[str, Any]]:
         """
         统一的数据获取接口
-        
+
         Args:
             api_name: API 名称 (fred, tushare, sec_edgar, ccxt, polygon)
             node_label: 节点标签
             node_type: 节点类型
             **kwargs: 额外参数
-            
+
         Returns:
             {
                 "value": "数值或状态",
@@ -45,241 +82,70 @@ class StructuredAPIService:
                 "source": "数据源",
                 "metadata": {...}
             }
+            未知 API、标签无对应序列或上游失败时返回 None
         """
-        logger.info(f"[StructuredAPI] 调用 {api_name} 获取 {node_label} 数据")
-        
-        if api_name == "fred":
-            return await self._fetch_fred(node_label, node_type)
-        elif api_name == "tushare":
-            return await self._fetch_tushare(node_label, node_type)
-        elif api_name == "sec_edgar":
-            return await self._fetch_sec_edgar(node_label, node_type)
-        elif api_name == "ccxt":
-            return await self._fetch_ccxt(node_label, node_type)
-        elif api_name == "polygon":
-            return await self._fetch_polygon(node_label, node_type)
-        else:
-            logger.warning(f"[StructuredAPI] 未知 API: {api_name}")
+        adapter = self.adapters.get(api_name)
+        if adapter is None:
+            logger.warning("[StructuredAPI] 未知 API: %s", api_name)
             return None
-    
-    async def _fetch_fred(self, node_label: str, node_type: str) -> Dict[str, Any]:
-        """
-        FRED API Mock
-        
-        TODO: 接入真实 FRED API
-        - 申请 API Key: https://fred.stlouisfed.org/docs/api/api_key.html
-        - 使用 requests 或 aiohttp 调用
-        - 示例: https://api.stlouisfed.org/fred/series/observations?series_id=DFF&api_key=YOUR_KEY
-        """
-        logger.info(f"[FRED Mock] 获取 {node_label}")
-        
-        # Mock 数据映射
-        mock_data = {
-            "美联储利率": {
-                "value": "5.25%-5.50%",
-                "unit": "percentage",
-                "series_id": "DFF",
-                "description": "Federal Funds Effective Rate"
-            },
-            "美国通胀": {
-                "value": "3.2%",
-                "unit": "percentage",
-                "series_id": "CPIAUCSL",
-                "description": "Consumer Price Index for All Urban Consumers"
-            },
-            "美国失业率": {
-                "value": "3.7%",
-                "unit": "percentage",
-                "series_id": "UNRATE",
-                "description": "Unemployment Rate"
-            },
-            "美国GDP": {
-                "value": "27.36万亿美元",
-                "unit": "trillion_usd",
-                "series_id": "GDP",
-                "description": "Gross Domestic Product"
-            }
-        }
-        
-        # 模糊匹配
-        for key, data in mock_data.items():
-            if key in node_label or node_label in key:
-                return {
-                    "value": data["value"],
-                    "unit": data["unit"],
-                    "timestamp": (datetime.utcnow() - timedelta(days=1)).isoformat(),
-                    "source": "FRED (Mock)",
-                    "metadata": {
-                        "series_id": data["series_id"],
-                        "description": data["description"],
-                        "api": "fred"
-                    }
-                }
-        
-        # 默认返回
-        return {
-            "value": f"{random.uniform(2.0, 5.0):.2f}%",
-            "unit": "percentage",
-            "timestamp": datetime.utcnow().isoformat(),
-            "source": "FRED (Mock)",
-            "metadata": {"api": "fred"}
-        }
-    
-    async def _fetch_tushare(self, node_label: str, node_type: str) -> Dict[str, Any]:
-        """
-        Tushare API Mock
-        
-        TODO: 接入真实 Tushare Pro API
-        - 注册获取 Token: https://tushare.pro/register
-        - 安装: pip install tushare
-        - 示例代码:
-            import tushare as ts
-            ts.set_token('YOUR_TOKEN')
-            pro = ts.pro_api()
-            df = pro.index_daily(ts_code='000001.SH')
-        """
-        logger.info(f"[Tushare Mock] 获取 {node_label}")
-        
-        mock_data = {
-            "上证指数": {
-                "value": "3245.18",
-                "unit": "points",
-                "ts_code": "000001.SH",
-                "change_pct": "+1.23%"
-            },
-            "人民币汇率": {
-                "value": "7.24",
-                "unit": "CNY/USD",
-                "ts_code": "USDCNY",
-                "change_pct": "-0.15%"
-            },
-            "中国CPI": {
-                "value": "0.2%",
-                "unit": "percentage",
-                "ts_code": "CPI",
-                "change_pct": "+0.1%"
-            },
-            "社融规模": {
-                "value": "3.2万亿元",
-                "unit": "trillion_cny",
-                "ts_code": "SOCIAL_FINANCING",
-                "change_pct": "+5.6%"
-            }
-        }
-        
-        for key, data in mock_data.items():
-            if key in node_label or node_label in key:
-                return {
-                    "value": data["value"],
-                    "unit": data["unit"],
-                    "timestamp": (datetime.utcnow() - timedelta(hours=16)).isoformat(),
-                    "source": "Tushare (Mock)",
-                    "metadata": {
-                        "ts_code": data["ts_code"],
-                        "change_pct": data["change_pct"],
-                        "api": "tushare"
-                    }
-                }
-        
+
+        series = adapter.resolve(node_label)
+        if series is None:
+            logger.debug("[StructuredAPI] %s 无 %s 对应的序列", api_name, node_label)
+            return None
+
+        logger.info("[StructuredAPI] 调用 %s 获取 %s 数据 (%s)", api_name, node_label, series['id'])
+        observation = await self._get_observation(api_name, series)
+        if observation is None:
+            return None
+
         return {
-            "value": f"{random.uniform(3000, 3500):.2f}",
-            "unit": "points",
-            "timestamp": datetime.utcnow().isoformat(),
-            "source": "Tushare (Mock)",
-            "metadata": {"api": "tushare"}
+            "value": observation["value"],
+            "unit": observation["unit"],
+            "timestamp": observation["timestamp"],
+            "source": f"{adapter.display_name} (Mock)" if adapter.mock else adapter.display_name,
+            "metadata": {**observation.get("metadata", {}), "api": api_name}
         }
-    
-    async def _fetch_sec_edgar(self, node_label: str, node_type: str) -> Dict[str, Any]:
-        """
-        SEC EDGAR API Mock
-        
-        TODO: 接入真实 SEC EDGAR API
-        - 官方文档: https://www.sec.gov/edgar/sec-api-documentation
-        - 需要设置 User-Agent 头
-        - 示例: https://data.sec.gov/submissions/CIK0000320193.json (Apple)
-        """
-        logger.info(f"[SEC EDGAR Mock] 获取 {node_label}")
-        
+
+    async def fetch_many(
+        self,
+        api_name: str,
+        node_labels: List[str],
+        node_type: str = ""
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """批量获取多个节点的数据（同时发起，由 SeriesBatcher 合并为批量上游调用）"""
+        results = await asyncio.gather(
+            *(self.fetch_data(api_name, label, node_type) for label in node_labels)
+        )
+        return dict(zip(node_labels, results))
+
+    def ttl_for(self, series: Dict[str, Any]) -> float:
+        return self.frequency_ttl.get(series.get("frequency", ""), self._cache.default_ttl)
+
+    async def _get_observation(self, api_name: str, series: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        adapter = self.adapters[api_name]
+        if adapter.mock:
+            return adapter.mock_observation(series)
+
+        key = [api_name, series["id"]]
+        cached = await self._cache.aget(key)
+        if cached is not None:
+            return cached
+
+        observation = await self._batchers[api_name].get(series)
+        if observation is not None:
+            await self._cache.aset(key, observation, ttl=self.ttl_for(series))
+            if adapter.config.get("history", True):
+                await timeseries_store.aappend(
+                    f"{api_name}:{series['id']}", observation["value"], observation_time(observation["timestamp"])
+                )
+        return observation
+
+    def stats(self) -> Dict[str, Any]:
         return {
-            "value": "最新 10-K 已披露",
-            "unit": "filing_status",
-            "timestamp": (datetime.utcnow() - timedelta(days=7)).isoformat(),
-            "source": "SEC EDGAR (Mock)",
-            "metadata": {
-                "filing_type": "10-K",
-                "cik": "0000320193",
-                "api": "sec_edgar"
-            }
-        }
-    
-    async def _fetch_ccxt(self, node_label: str, node_type: str) -> Dict[str, Any]:
-        """
-        CCXT API Mock
-        
-        TODO: 接入真实 CCXT
-        - 安装: pip install ccxt
-        - 示例代码:
-            import ccxt
-            exchange = ccxt.binance()
-            ticker = exchange.fetch_ticker('BTC/USDT')
-        """
-        logger.info(f"[CCXT Mock] 获取 {node_label}")
-        
-        mock_data = {
-            "比特币": {
-                "value": "43250.00",
-                "unit": "USDT",
-                "symbol": "BTC/USDT",
-                "change_24h": "+2.34%"
+            "adapters": {
+                name: {"mock": adapter.mock, "base_url": adapter.base_url, "batch_size": adapter.batch_size}
+                for name, adapter in self.adapters.items()
             },
-            "以太坊": {
-                "value": "2280.50",
-                "unit": "USDT",
-                "symbol": "ETH/USDT",
-                "change_24h": "+1.87%"
-            }
-        }
-        
-        for key, data in mock_data.items():
-            if key in node_label or node_label in key:
-                return {
-                    "value": data["value"],
-                    "unit": data["unit"],
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "source": "CCXT (Mock)",
-                    "metadata": {
-                        "symbol": data["symbol"],
-                        "change_24h": data["change_24h"],
-                        "api": "ccxt"
-                    }
-                }
-        
-        return {
-            "value": f"{random.uniform(40000, 50000):.2f}",
-            "unit": "USDT",
-            "timestamp": datetime.utcnow().isoformat(),
-            "source": "CCXT (Mock)",
-            "metadata": {"api": "ccxt"}
+            "cache": self._cache.stats()
         }
-    
-    async def _fetch_polygon(self, node_label: str, node_type: str) -> Dict[str, Any]:
-        """
-        Polygon.io API Mock
-        
-        TODO: 接入真实 Polygon.io API
-        - 申请 API Key: https://polygon.io/
-        - 示例: https://api.polygon.io/v2/aggs/ticker/AAPL/prev?apiKey=YOUR_KEY
-        """
-        logger.info(f"[Polygon Mock] 获取 {node_label}")
-        
-        return {
-            "value": f"{random.uniform(150, 200):.2f}",
-            "unit": "USD",
-            "timestamp": datetime.utcnow().isoformat(),
-            "source": "Polygon.io (Mock)",
-            "metadata": {
-                "ticker": "AAPL",
-                "api": "polygon"
-            }
-        }
-
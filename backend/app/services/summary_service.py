@@ -6,8 +6,14 @@
 from openai import AsyncOpenAI
 import os
 import json
+import logging
 from typing import Dict, Any, Optional, Union
 import asyncio
+from app.services.llm_gateway import llm_gateway
+from app.utils.tracing import traced
+from app.utils import codec
+
+logger = logging.getLogger(__name__)
 
 class SummaryGenerationService:
     """摘要生成服务"""
@@ -105,7 +111,9 @@ class SummaryGenerationService:
         """
         prompt = self._build_simple_prompt(analysis_result)
         
-        response = await self.client.chat.completions.create(
+        response = await llm_gateway.chat(
+            self.client,
+            "SummaryGenerationService.generate_simple_summary",
             model=self.simple_model,
             messages=[
                 {
@@ -133,7 +141,9 @@ class SummaryGenerationService:
         """
         prompt = self._build_complex_prompt(analysis_result)
         
-        response = await self.client.chat.completions.create(
+        response = await llm_gateway.chat(
+            self.client,
+            "SummaryGenerationService.generate_complex_summary",
             model=self.complex_model,
             messages=[
                 {
@@ -153,7 +163,7 @@ class SummaryGenerationService:
         content = response.choices[0].message.content
         
         try:
-            summary = json.loads(content)
+            summary = codec.loads(content)
             return summary
         except json.JSONDecodeError:
             # 如果 JSON 解析失败，返回文本格式
@@ -162,6 +172,7 @@ class SummaryGenerationService:
                 "content": content
             }
     
+    @traced("summary")
     async def generate_causal_summary(
         self, 
         analysis_result: Dict[str, Any]
@@ -211,13 +222,13 @@ class SummaryGenerationService:
             
         except asyncio.TimeoutError:
             # 超时处理
-            print(f"摘要生成超时（{self.timeout}秒）")
+            logger.warning("[Summary] 摘要生成超时（%s秒）", self.timeout)
             result["summary"] = None
             return result
             
         except Exception as e:
             # 其他错误处理
-            print(f"摘要生成失败: {str(e)}")
+            logger.error("[Summary] 摘要生成失败: %s", e)
             result["summary"] = None
             return result
     
@@ -234,7 +245,7 @@ class SummaryGenerationService:
             return await self.generate_causal_summary(analysis_result)
         except Exception as e:
             # 任何异常都不影响主体数据
-            print(f"摘要生成完全失败: {str(e)}")
+            logger.error("[Summary] 摘要生成完全失败: %s", e)
             result = analysis_result.copy()
             result["summary"] = None
             return result
@@ -5,11 +5,17 @@
 
 from openai import AsyncOpenAI
 import os
-import json
 import time
+import logging
 from typing import Dict, Any, List, Optional
+from app.services.llm_gateway import llm_gateway
 from app.services.search_service import SearchService
 from app.prompts.system_prompts import NEWS_CAUSALITY_EXTRACTION_PROMPT
+from app.utils import codec
+from app.utils.metrics import observe_stage
+from app.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 class TargetResearchService:
     """标的逆向推演与实时分析服务"""
@@ -22,6 +28,7 @@ class TargetResearchService:
         self.model = os.getenv("OPENAI_MODEL", "deepseek-reasoner")
         self.search_service = SearchService()
     
+    @traced("extract_factors")
     async def step1_extract_factors_and_queries(self, target: str) -> Dict[str, Any]:
         """
         第一步：逆向因子提取与关键词生成
@@ -35,7 +42,7 @@ class TargetResearchService:
                 "search_queries": ["查询1", "查询2", ...]
             }
         """
-        print(f"\n[步骤 1] 开始逆向因子提取: {target}")
+        logger.info("[步骤 1] 开始逆向因子提取: %s", target)
         start_time = time.time()
         
         system_prompt = """你是一个资深量化宏观研究员。用户会输入一个金融/商业标的，请分析影响该标的的最核心变量，并生成3到5个用于搜索引擎的精简 Query，以获取该标的最新动态。
@@ -70,7 +77,9 @@ class TargetResearchService:
 2. 用于搜索最新动态的精准关键词"""
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await llm_gateway.chat(
+                self.client,
+                "TargetResearchService.step1_extract_factors_and_queries",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -81,24 +90,27 @@ class TargetResearchService:
             )
             
             content = response.choices[0].message.content
-            result = json.loads(content)
+            result = codec.loads(content)
             
             # 验证必需字段
             if "factors" not in result or "search_queries" not in result:
                 raise ValueError("LLM 返回缺少必需字段")
             
             elapsed = time.time() - start_time
-            print(f"[步骤 1] 完成，耗时: {elapsed:.2f}秒")
-            print(f"  - 提取因子: {len(result['factors'])} 个")
-            print(f"  - 生成查询: {len(result['search_queries'])} 个")
+            observe_stage("research_target", "extract_factors", elapsed)
+            logger.info(
+                "[步骤 1] 完成，耗时: %.2f秒，提取因子 %d 个，生成查询 %d 个",
+                elapsed, len(result["factors"]), len(result["search_queries"])
+            )
             
             return result
             
         except Exception as e:
             elapsed = time.time() - start_time
-            print(f"[步骤 1] 失败，耗时: {elapsed:.2f}秒")
+            logger.error("[步骤 1] 失败，耗时: %.2f秒 - %s", elapsed, e)
             raise Exception(f"因子提取失败: {str(e)}")
     
+    @traced("search")
     async def step2_perform_search(self, search_queries: List[str]) -> str:
         """
         第二步：并发联网搜索
@@ -109,7 +121,7 @@ class TargetResearchService:
         Returns:
             合并后的搜索上下文文本
         """
-        print(f"\n[步骤 2] 开始并发搜索")
+        logger.info("[步骤 2] 开始并发搜索")
         start_time = time.time()
         
         try:
@@ -117,18 +129,18 @@ class TargetResearchService:
             context = await self.search_service.perform_search(search_queries)
             
             elapsed = time.time() - start_time
-            print(f"[步骤 2] 完成，耗时: {elapsed:.2f}秒")
-            print(f"  - 获取上下文: {len(context)} 字符")
+            observe_stage("research_target", "search", elapsed)
+            logger.info("[步骤 2] 完成，耗时: %.2f秒，获取上下文 %d 字符", elapsed, len(context))
             
             return context
             
         except Exception as e:
             elapsed = time.time() - start_time
-            print(f"[步骤 2] 失败，耗时: {elapsed:.2f}秒")
             # 搜索失败不应该中断整个流程
-            print(f"  - 警告: 搜索失败，将使用空上下文继续分析")
+            logger.warning("[步骤 2] 失败，耗时: %.2f秒，将使用空上下文继续分析 - %s", elapsed, e)
             return ""
     
+    @traced("generate_analysis")
     async def step3_generate_causal_analysis(
         self, 
         target: str, 
@@ -146,7 +158,7 @@ class TargetResearchService:
         Returns:
             AnalysisResult 格式的因果图数据
         """
-        print(f"\n[步骤 3] 开始综合分析与因果图生成")
+        logger.info("[步骤 3] 开始综合分析与因果图生成")
         start_time = time.time()
         
         system_prompt = """你是一个因果逻辑引擎。请阅读以下实时搜索到的 Context，分析这些最新事件如何影响目标资产。请提取出事件、传导机制，并严格按照 AnalysisResult 接口输出包含 nodes, edges 和 explanation 的 JSON 图数据结构。
@@ -200,7 +212,9 @@ class TargetResearchService:
 4. 输出标准的因果图 JSON 数据"""
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await llm_gateway.chat(
+                self.client,
+                "TargetResearchService.step3_generate_causal_analysis",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -211,37 +225,43 @@ class TargetResearchService:
             )
             
             content = response.choices[0].message.content
-            result = json.loads(content)
-            
-            # 验证必需字段
-            if "nodes" not in result or "edges" not in result:
-                raise ValueError("LLM 返回缺少必需字段")
-            
-            # 验证数据完整性
-            if not isinstance(result["nodes"], list) or not isinstance(result["edges"], list):
-                raise ValueError("nodes 和 edges 必须是数组")
+            result = codec.loads(content)
             
-            if len(result["nodes"]) == 0:
-                raise ValueError("节点列表不能为空")
-            
-            # 验证节点引用
-            node_ids = {node["id"] for node in result["nodes"]}
-            for edge in result["edges"]:
-                if edge["source"] not in node_ids or edge["target"] not in node_ids:
-                    raise ValueError(f"边引用了不存在的节点")
+            self._validate_analysis(result)
             
             elapsed = time.time() - start_time
-            print(f"[步骤 3] 完成，耗时: {elapsed:.2f}秒")
-            print(f"  - 生成节点: {len(result['nodes'])} 个")
-            print(f"  - 生成边: {len(result['edges'])} 条")
+            observe_stage("research_target", "generate_analysis", elapsed)
+            logger.info(
+                "[步骤 3] 完成，耗时: %.2f秒，生成节点 %d 个，生成边 %d 条",
+                elapsed, len(result["nodes"]), len(result["edges"])
+            )
             
             return result
             
         except Exception as e:
             elapsed = time.time() - start_time
-            print(f"[步骤 3] 失败，耗时: {elapsed:.2f}秒")
+            logger.error("[步骤 3] 失败，耗时: %.2f秒 - %s", elapsed, e)
             raise Exception(f"因果分析失败: {str(e)}")
     
+    def _validate_analysis(self, result: Dict[str, Any]):
+        """校验步骤 3 返回的图结构（必需字段、类型与边引用），不合法时抛出 ValueError"""
+        # 验证必需字段
+        if "nodes" not in result or "edges" not in result:
+            raise ValueError("LLM 返回缺少必需字段")
+        
+        # 验证数据完整性
+        if not isinstance(result["nodes"], list) or not isinstance(result["edges"], list):
+            raise ValueError("nodes 和 edges 必须是数组")
+        
+        if len(result["nodes"]) == 0:
+            raise ValueError("节点列表不能为空")
+        
+        # 验证节点引用（环检测等结构分析见 POST /graphs/analysis，不在请求路径上执行）
+        node_ids = {node["id"] for node in result["nodes"]}
+        for edge in result["edges"]:
+            if edge["source"] not in node_ids or edge["target"] not in node_ids:
+                raise ValueError(f"边引用了不存在的节点")
+    
     async def research_target(self, target: str) -> Dict[str, Any]:
         """
         完整的标的研究 Pipeline
@@ -257,9 +277,7 @@ class TargetResearchService:
         Returns:
             完整的分析结果，包含因果图和元数据
         """
-        print(f"\n{'='*80}")
-        print(f"开始标的研究 Pipeline: {target}")
-        print(f"{'='*80}")
+        logger.info("[TargetResearch] 开始标的研究 Pipeline: %s", target)
         
         pipeline_start = time.time()
         
@@ -292,18 +310,14 @@ class TargetResearchService:
             }
             
             total_elapsed = time.time() - pipeline_start
-            print(f"\n{'='*80}")
-            print(f"Pipeline 完成，总耗时: {total_elapsed:.2f}秒")
-            print(f"{'='*80}\n")
+            observe_stage("research_target", "total", total_elapsed)
+            logger.info("[TargetResearch] Pipeline 完成，总耗时: %.2f秒", total_elapsed)
             
             return final_result
             
         except Exception as e:
             total_elapsed = time.time() - pipeline_start
-            print(f"\n{'='*80}")
-            print(f"Pipeline 失败，总耗时: {total_elapsed:.2f}秒")
-            print(f"错误: {str(e)}")
-            print(f"{'='*80}\n")
+            logger.error("[TargetResearch] Pipeline 失败，总耗时: %.2f秒 - %s", total_elapsed, e)
             raise
 
 
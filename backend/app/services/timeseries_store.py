@@ -0,0 +1,395 @@
+"""
+节点时间序列存储 (Memory-Mapped Time-Series Store)
+行情与结构化数据每次获取只保留最新一个点，趋势只能由 previous_close 单点比较或交给 LLM 判断。
+本存储按序列追加记录每一次观测值，供本地计算趋势、涨跌幅与波动率，无需重新拉取历史：
+- 每个序列一个目录，列式存储：timestamps.f8 / values.f8（float64，np.memmap）与 length.i8（已写入条数）
+- 序列 ID 为规范节点身份（ticker:GC=F、label:美联储利率，见 NodeStateStore.resolve）或上游序列（fred:DFF）
+- 只追加：时间戳必须非递减；与最后一点时间戳和数值都相同的观测视为重复，不再写入
+- 范围读取按时间戳二分定位，返回映射文件上的只读切片（零拷贝）
+
+多个 worker 写同一目录时，追加经文件锁（fcntl.flock）串行化；先写数据、最后更新 length，
+读方不加锁也只会看到完整写入的点。记录为尽力而为：磁盘错误只记日志，不影响取数流程。
+
+配置：TIMESERIES_PATH（默认 data/timeseries）· TIMESERIES_ENABLED（默认 true）
+"""
+
+import os
+import re
+import json
+import math
+import time
+import asyncio
+import hashlib
+import threading
+import unicodedata
+import logging
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+from app.utils.metrics import registry
+from app.utils.trend_engine import TrendEngine, trend_engine
+
+try:
+    import fcntl
+except ImportError:  # Windows：仅进程内加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TIMESERIES_POINTS_TOTAL = registry.counter(
+    "timeseries_points_total", "时间序列存储收到的观测点", ["result"]
+)
+
+# 单个数值 + 可选的货币符号 / 数量级 / 单位 / 百分号，整串匹配："2025.30 USD"、"$1,234"、"5.25%"、"3.5万亿元"
+_NUMBER = re.compile(
+    r"^[$¥€£]?\s*(?P<number>[-+]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?)"
+    r"\s*(?P<scale>万亿|千亿|百亿|亿|千万|百万|万|千)?"
+    r"\s*(?P<unit>%|[^\d\s%+\-.,~～至到—/]{1,8}(?:/[^\d\s]{1,4})?)?$"
+)
+
+_SCALES = {
+    "千": 1e3, "万": 1e4, "百万": 1e6, "千万": 1e7,
+    "亿": 1e8, "百亿": 1e10, "千亿": 1e11, "万亿": 1e12,
+}
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """
+    从状态值中解析数值（"2025.30 USD" -> 2025.3，"1,234" -> 1234，"3.5万亿元" -> 3.5e12）
+
+    只接受"单个数值 + 可选单位"：区间（"5.25%-5.50%"）、多个数值或夹带文字的描述
+    （"约 2000 点，较上周上涨 3%"）返回 None，不写入序列，避免从 LLM 叙述中取错数
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else None
+    match = _NUMBER.match(unicodedata.normalize("NFKC", str(value or "")).strip())
+    if match is None:
+        return None
+    number = float(match.group("number").replace(",", ""))
+    scale = match.group("scale")
+    return number * _SCALES[scale] if scale else number
+
+
+@contextmanager
+def _file_lock(path: Path):
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SeriesColumns:
+    """单个序列的列文件，容量不足时按倍数扩展文件并重新映射"""
+
+    INITIAL_CAPACITY = 256
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._ts_path = directory / "timestamps.f8"
+        self._values_path = directory / "values.f8"
+        self._length = np.memmap(directory / "length.i8", dtype=np.int64, mode="r+", shape=(1,))
+        self._capacity = 0
+        self._remap()
+
+    @classmethod
+    def create(cls, directory: Path, series_id: str):
+        """创建空序列（调用方持有该目录的文件锁）"""
+        for name in ("timestamps.f8", "values.f8"):
+            with open(directory / name, "wb") as f:
+                f.truncate(cls.INITIAL_CAPACITY * 8)
+        with open(directory / "length.i8", "wb") as f:
+            f.write(np.zeros(1, dtype=np.int64).tobytes())
+        with open(directory / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"series_id": series_id, "created_at": time.time()}, f, ensure_ascii=False)
+
+    def _remap(self):
+        capacity = os.path.getsize(self._ts_path) // 8
+        if capacity != self._capacity:
+            self.timestamps = np.memmap(self._ts_path, dtype=np.float64, mode="r+", shape=(capacity,))
+            self.values = np.memmap(self._values_path, dtype=np.float64, mode="r+", shape=(capacity,))
+            self._capacity = capacity
+
+    def __len__(self) -> int:
+        return int(self._length[0])
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """已写入部分的只读视图"""
+        length = len(self)
+        if length > self._capacity:
+            # 其他进程扩容后追加
+            self._remap()
+        timestamps = self.timestamps[:length].view(np.ndarray)
+        values = self.values[:length].view(np.ndarray)
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray):
+        """追加（调用方持有文件锁，并已保证时间戳非递减）"""
+        start = len(self)
+        end = start + len(values)
+        self._remap()
+        if end > self._capacity:
+            capacity = max(end, self._capacity * 2)
+            for path in (self._ts_path, self._values_path):
+                os.truncate(path, capacity * 8)
+            self._remap()
+
+        self.timestamps[start:end] = timestamps
+        self.values[start:end] = values
+        # 最后更新长度：读方只会看到完整写入的点
+        self._length[0] = end
+
+
+class TimeSeriesStore:
+    """按序列 ID 索引的只追加时间序列存储"""
+
+    def __init__(self, root: Optional[str] = None, enabled: Optional[bool] = None):
+        default_path = Path(__file__).parent.parent.parent / "data" / "timeseries"
+        self.root = Path(root or os.getenv("TIMESERIES_PATH", str(default_path)))
+        self.enabled = enabled if enabled is not None else os.getenv("TIMESERIES_ENABLED", "true").lower() == "true"
+
+        self._series: Dict[str, SeriesColumns] = {}
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            self.root.mkdir(parents=True, exist_ok=True)
+            logger.info("[TimeSeries] 时间序列存储: %s", self.root)
+
+    # ================================================================
+    # 序列定位
+    # ================================================================
+
+    def _directory(self, series_id: str) -> Path:
+        # 序列 ID 含 ^ = / 等字符，目录名取哈希；原始 ID 记录在 meta.json
+        return self.root / hashlib.sha1(series_id.encode("utf-8")).hexdigest()[:20]
+
+    def _open(self, series_id: str, create: bool = False) -> Optional[SeriesColumns]:
+        series = self._series.get(series_id)
+        if series is not None:
+            return series
+
+        directory = self._directory(series_id)
+        if not (directory / "length.i8").exists():
+            if not create:
+                return None
+            directory.mkdir(parents=True, exist_ok=True)
+            with _file_lock(directory / "lock"):
+                if not (directory / "length.i8").exists():
+                    SeriesColumns.create(directory, series_id)
+
+        series = SeriesColumns(directory)
+        self._series[series_id] = series
+        return series
+
+    def series_ids(self) -> List[str]:
+        """已记录的全部序列 ID"""
+        ids = []
+        for meta_path in self.root.glob("*/meta.json"):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    ids.append(json.load(f)["series_id"])
+            except (OSError, ValueError, KeyError):
+                continue
+        return sorted(ids)
+
+    # ================================================================
+    # 写入
+    # ================================================================
+
+    def append(self, series_id: str, value: Any, timestamp: Optional[float] = None) -> bool:
+        """
+        记录一次观测
+
+        Args:
+            series_id: 序列 ID（规范节点身份或上游序列）
+            value: 数值或可解析出数值的字符串（见 parse_number）
+            timestamp: 观测时间（Unix 秒），默认为写入时刻（在文件锁内取值，并发写入不会出现时间倒退）
+
+        Returns:
+            是否写入（无法解析、重复或时间倒退时为 False）
+        """
+        point = self._point(value, timestamp)
+        if point is None:
+            return False
+        return self._append(series_id, *point) > 0
+
+    async def aappend(self, series_id: str, value: Any, timestamp: Optional[float] = None) -> bool:
+        """append 的异步版本（文件锁与 memmap 写入在线程中执行，事件循环中使用）"""
+        point = self._point(value, timestamp)
+        if point is None or not self.enabled:
+            return False
+        outcomes = await asyncio.to_thread(self._write, series_id, *point)
+        return self._count(outcomes) > 0
+
+    def append_many(self, series_id: str, timestamps: Iterable[float], values: Iterable[float]) -> int:
+        """
+        批量追加（按时间戳排序后写入）
+
+        Returns:
+            实际写入的点数
+        """
+        timestamps = np.asarray(list(timestamps), dtype=np.float64)
+        values = np.asarray(list(values), dtype=np.float64)
+        valid = np.isfinite(timestamps) & np.isfinite(values)
+        if not valid.all():
+            TIMESERIES_POINTS_TOTAL.inc(int((~valid).sum()), result="invalid")
+            timestamps, values = timestamps[valid], values[valid]
+        order = np.argsort(timestamps, kind="stable")
+        return self._append(series_id, timestamps[order], values[order])
+
+    @staticmethod
+    def _point(value: Any, timestamp: Optional[float]) -> Optional[Tuple[Optional[np.ndarray], np.ndarray]]:
+        number = parse_number(value)
+        if number is None:
+            TIMESERIES_POINTS_TOTAL.inc(result="invalid")
+            return None
+        timestamps = None if timestamp is None else np.array([timestamp], dtype=np.float64)
+        return timestamps, np.array([number], dtype=np.float64)
+
+    def _append(self, series_id: str, timestamps: Optional[np.ndarray], values: np.ndarray) -> int:
+        if not self.enabled or len(values) == 0:
+            return 0
+        return self._count(self._write(series_id, timestamps, values))
+
+    @staticmethod
+    def _count(outcomes: Dict[str, int]) -> int:
+        """记录写入结果指标（在调用方线程 / 事件循环中执行），返回写入点数"""
+        for result, count in outcomes.items():
+            if count:
+                TIMESERIES_POINTS_TOTAL.inc(count, result=result)
+        return outcomes.get("appended", 0)
+
+    def _write(self, series_id: str, timestamps: Optional[np.ndarray], values: np.ndarray) -> Dict[str, int]:
+        """加锁写入（可在线程中执行，不更新指标），返回各结果的点数"""
+        outcomes: Dict[str, int] = {}
+        try:
+            with self._lock:
+                series = self._open(series_id, create=True)
+                with _file_lock(series.directory / "lock"):
+                    if timestamps is None:
+                        timestamps = np.full(len(values), time.time())
+                    existing_ts, existing_values = series.columns()
+                    if len(existing_ts):
+                        last_ts, last_value = existing_ts[-1], existing_values[-1]
+                        stale = timestamps < last_ts
+                        duplicate = (timestamps == last_ts) & (values == last_value)
+                        outcomes["out_of_order"] = int(stale.sum())
+                        outcomes["duplicate"] = int(duplicate.sum())
+                        keep = ~(stale | duplicate)
+                        timestamps, values = timestamps[keep], values[keep]
+                    if len(values) == 0:
+                        return outcomes
+                    series.append(timestamps, values)
+        except OSError as e:
+            logger.warning("[TimeSeries] 写入失败 %s: %s", series_id, e)
+            outcomes["error"] = len(values)
+            return outcomes
+
+        outcomes["appended"] = len(values)
+        return outcomes
+
+    # ================================================================
+    # 读取
+    # ================================================================
+
+    def read(
+        self,
+        series_id: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        读取 [start, end] 时间范围内的观测（零拷贝只读视图）
+
+        Returns:
+            (timestamps, values)；序列不存在时为两个空数组
+        """
+        series = self._open(series_id) if self.enabled else None
+        if series is None:
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty
+
+        timestamps, values = series.columns()
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="right"))
+        return timestamps[lo:hi], values[lo:hi]
+
+    def last(self, series_id: str) -> Optional[Tuple[float, float]]:
+        """最近一次观测 (timestamp, value)"""
+        timestamps, values = self.read(series_id)
+        if len(values) == 0:
+            return None
+        return float(timestamps[-1]), float(values[-1])
+
+    def summary(
+        self,
+        series_ids: Iterable[str],
+        window: float = 86400.0,
+        now: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        各序列在最近 window 秒内的变化概况（少于两个点的序列不返回）
+
+        Returns:
+            序列 ID -> {"points", "first", "last", "change", "change_pct", "volatility", "trend"}
+            volatility 为逐点收益率的标准差（百分比）；trend 沿用 ±0.1% 的阈值
+        """
+        now = time.time() if now is None else now
+        results = {}
+        for series_id in series_ids:
+            _, values = self.read(series_id, start=now - window, end=now)
+            if len(values) < 2:
+                continue
+
+            first, last = float(values[0]), float(values[-1])
+            change = last - first
+            change_pct = change / abs(first) * 100 if first else 0.0
+            base = values[:-1]
+            returns = np.divide(np.diff(values), np.abs(base), out=np.zeros(len(base)), where=base != 0)
+            results[series_id] = {
+                "points": int(len(values)),
+                "first": first,
+                "last": last,
+                "change": change,
+                "change_pct": change_pct,
+                "volatility": float(returns.std() * 100),
+                "trend": "rising" if change_pct > 0.1 else "falling" if change_pct < -0.1 else "stable"
+            }
+        return results
+
+    def trends(self, series_ids: Iterable[str], engine: Optional[TrendEngine] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        批量计算各序列的趋势、z-score 与状态标记（最近 lookback 个点，见 TrendEngine.compute）
+
+        Returns:
+            序列 ID -> 统计结果；观测点不足的序列不返回
+        """
+        engine = engine or trend_engine
+        columns = {}
+        for series_id in set(series_ids):
+            _, values = self.read(series_id)
+            if len(values) >= engine.min_points:
+                columns[series_id] = values[-engine.lookback:]
+        return engine.compute(columns)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": str(self.root),
+            "open_series": len(self._series),
+            "points": sum(len(series) for series in self._series.values())
+        }
+
+
+# 全局实例：行情、结构化数据与节点状态写入同一存储
+timeseries_store = TimeSeriesStore()
@@ -0,0 +1,379 @@
+"""
+语义拓扑缓存 (Semantic Topology Cache)
+同一问题的不同表述（"黄金价格的影响因素" / "影响黄金价格的因素有哪些"）
+生成的因果拓扑基本一致，按归一化查询 + 字符 n-gram 相似度复用已生成的拓扑：
+- 查询归一化：全角转半角、小写、去除标点与语气/疑问虚词
+- 近似查找：本地字符 1-gram + 2-gram 倒排索引，余弦相似度超过阈值，且两者只差语序时才命中：
+  按因果 / 关系词切分后，实体片段的先后顺序必须完全一致，只允许关系词本身移动位置
+  （"黄金价格影响因素" ≈ "影响黄金价格因素"）；数字一致、不含方向性关系词；
+  "深证指数" / "上证指数"、"中证500" / "中证1000"、"欧元兑人民币" / "美元兑人民币"、
+  "中国出口影响美国" / "美国出口影响中国" 均不会互相命中
+- 过期策略：拓扑结构变化缓慢，使用较长 TTL；过期后在宽限期内先返回旧拓扑，
+  同时在后台重新生成（stale-while-revalidate）
+
+CACHE_BACKEND=sqlite / redis 时，精确匹配的条目同时写入共享后端，本进程未命中时先查共享后端
+（相似查找仍只在本进程内进行；get_or_compute 中的共享后端读写在线程中执行）。
+
+节点实时状态不进入本缓存，由 NodeStateStore 按节点类型以更短的有效期单独管理。
+"""
+
+import os
+import re
+import copy
+import math
+import time
+import asyncio
+import logging
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, Hashable
+
+from app.utils.metrics import registry
+from app.utils.cache_backend import backend_kind, shared_backend
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[\s\W_]+", re.UNICODE)
+
+# 不影响问题语义的虚词与句式词，按长度降序匹配，避免 "是什么" 被 "什么" 截断
+_STOPWORDS = sorted(
+    [
+        "有哪些", "是哪些", "是什么", "有什么", "分析一下", "请分析", "请问",
+        "主要", "哪些", "什么", "如何", "怎样", "一下", "分析",
+        "的", "了", "吗", "呢", "吧", "啊", "请", "与", "和", "及",
+    ],
+    key=len,
+    reverse=True
+)
+_STOPWORD_PATTERN = re.compile("|".join(re.escape(word) for word in _STOPWORDS))
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+# 方向性关系词：两侧实体交换位置即为不同问题（"美元兑人民币" / "人民币兑美元"），只允许精确命中
+_DIRECTIONAL = re.compile(r"兑|对|到|至|向|比|vs|versus")
+
+# 因果 / 关系词：切分实体片段的边界，关系词可以移动位置，实体片段的顺序不能改变
+_RELATION_WORDS = re.compile(
+    r"影响|导致|引起|引发|推动|带动|造成|传导|决定|驱动|作用|"
+    r"因素|原因|关系|关联|机制|路径"
+)
+
+
+def normalize_query(query: str) -> str:
+    """查询归一化：全角转半角、小写、去除标点与虚词"""
+    query = unicodedata.normalize("NFKC", query or "").lower()
+    query = _PUNCTUATION.sub("", query)
+    normalized = _STOPWORD_PATTERN.sub("", query)
+    # 查询全部由虚词组成时保留原文，避免不同问题归一化为空串后互相命中
+    return normalized or query
+
+
+def _terms(text: str) -> List[str]:
+    """按关系词切分出的实体片段（保持原顺序）"""
+    return [term for term in _RELATION_WORDS.split(text) if term]
+
+
+def _same_terms(a: str, b: str) -> bool:
+    """
+    两个归一化查询是否只差语序
+
+    归一化已去除虚词；按因果 / 关系词切分后，实体片段必须按相同顺序出现，
+    关系词集合一致（只允许关系词移动位置，字符不能跨越实体边界调换）；
+    数字按完整数值比较，含方向性关系词的查询不允许调换语序
+    """
+    if a == b:
+        return True
+    if _terms(a) != _terms(b):
+        return False
+    if sorted(_RELATION_WORDS.findall(a)) != sorted(_RELATION_WORDS.findall(b)):
+        return False
+    if _NUMBER.findall(a) != _NUMBER.findall(b):
+        return False
+    return not (_DIRECTIONAL.search(a) or _DIRECTIONAL.search(b))
+
+
+def _ngrams(text: str) -> Counter:
+    """字符 1-gram + 2-gram 词频向量"""
+    grams = Counter(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class SemanticTopologyCache:
+    """
+    语义拓扑缓存
+
+    条目按作用域（context 等必须严格一致的参数）隔离，
+    同一作用域内按归一化查询精确命中，未命中时再做 n-gram 相似度查找。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        threshold: Optional[float] = None,
+        max_size: int = 512
+    ):
+        self.name = name
+        self.ttl = ttl if ttl is not None else float(os.getenv("TOPOLOGY_CACHE_TTL", "21600"))
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(
+            os.getenv("TOPOLOGY_STALE_TTL", "86400")
+        )
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv("TOPOLOGY_SIMILARITY_THRESHOLD", "0.85")
+        )
+        self.max_size = max_size
+        kind = backend_kind(name)
+        self._shared = shared_backend(kind) if kind != "memory" else None
+
+        # (scope, normalized) -> 条目
+        self._entries: "OrderedDict[Tuple[Hashable, str], Dict[str, Any]]" = OrderedDict()
+        # scope -> n-gram -> 包含该 n-gram 的归一化查询集合
+        self._index: Dict[Hashable, Dict[str, set]] = {}
+        # 后台重新生成中的条目，避免重复触发
+        self._revalidating: Dict[Tuple[Hashable, str], asyncio.Task] = {}
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.similar_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        registry.register_cache(self)
+
+    # ================================================================
+    # 查找
+    # ================================================================
+
+    def lookup(self, query: str, scope: Hashable = None) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存条目（不计入统计）
+
+        Returns:
+            {"key", "value", "stale", "similarity", "matched_query"}；
+            未命中或已超出宽限期返回 None
+        """
+        normalized = normalize_query(query)
+        key = (scope, normalized)
+        similarity = 1.0
+
+        if key not in self._entries:
+            key, similarity = self._find_similar(normalized, scope)
+            if key is None:
+                return None
+
+        entry = self._entries[key]
+        now = time.time()
+        if now > entry["expires_at"] + self.stale_ttl:
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return {
+            "key": key,
+            "value": entry["value"],
+            "stale": now > entry["expires_at"],
+            "similarity": similarity,
+            "matched_query": entry["query"]
+        }
+
+    def _find_similar(self, normalized: str, scope: Hashable) -> Tuple[Optional[Tuple], float]:
+        """
+        在同一作用域内按字符 n-gram 余弦相似度查找最相近的查询
+
+        只考虑与当前查询只差语序的候选（_same_terms），相似度仅用于在其中排序与设定下限
+        """
+        index = self._index.get(scope)
+        if not index or not normalized:
+            return None, 0.0
+
+        grams = _ngrams(normalized)
+        candidates = set()
+        for gram in grams:
+            candidates.update(index.get(gram, ()))
+
+        best_key, best_score = None, 0.0
+        norm = math.sqrt(sum(v * v for v in grams.values()))
+        for candidate in candidates:
+            if not _same_terms(normalized, candidate):
+                continue
+            entry = self._entries[(scope, candidate)]
+            dot = sum(count * entry["grams"].get(gram, 0) for gram, count in grams.items())
+            score = dot / (norm * entry["norm"])
+            if score > best_score:
+                best_key, best_score = (scope, candidate), score
+
+        if best_score >= self.threshold:
+            return best_key, best_score
+        return None, best_score
+
+    # ================================================================
+    # 写入
+    # ================================================================
+
+    async def _lookup_shared(self, query: str, scope: Hashable) -> Optional[Dict[str, Any]]:
+        """在共享后端中按归一化查询精确查找，命中后写入本进程缓存"""
+        if self._shared is None:
+            return None
+        normalized = normalize_query(query)
+        entry = await self._shared.aget(self.name, (scope, normalized))
+        if entry is None:
+            return None
+
+        now = time.time()
+        if now > entry["expires_at"] + self.stale_ttl:
+            return None
+        self._set_local(entry["query"], entry["value"], scope, entry["expires_at"])
+        return {
+            "key": (scope, normalized),
+            "value": entry["value"],
+            "stale": now > entry["expires_at"],
+            "similarity": 1.0,
+            "matched_query": entry["query"]
+        }
+
+    def set(self, query: str, value: Any, scope: Hashable = None, ttl: Optional[float] = None):
+        """写入拓扑（覆盖同一归一化查询的旧条目），启用共享后端时同时写入"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._set_local(query, value, scope, expires_at)
+        if self._shared is not None:
+            self._shared.set(self.name, *self._shared_item(query, value, scope, expires_at))
+
+    async def aset(self, query: str, value: Any, scope: Hashable = None, ttl: Optional[float] = None):
+        """set 的异步版本（共享后端的写入在线程中执行）"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._set_local(query, value, scope, expires_at)
+        if self._shared is not None:
+            await self._shared.aset(self.name, *self._shared_item(query, value, scope, expires_at))
+
+    def _shared_item(self, query: str, value: Any, scope: Hashable, expires_at: float) -> Tuple[Any, Dict[str, Any], float]:
+        """共享后端条目：(键, 值, 有效期)，宽限期内仍保留"""
+        return (
+            (scope, normalize_query(query)),
+            {"query": query, "value": value, "expires_at": expires_at},
+            expires_at - time.time() + self.stale_ttl
+        )
+
+    def _set_local(self, query: str, value: Any, scope: Hashable, expires_at: float):
+        normalized = normalize_query(query)
+        key = (scope, normalized)
+        if key in self._entries:
+            self._remove(key)
+
+        grams = _ngrams(normalized)
+        self._entries[key] = {
+            "query": query,
+            "value": value,
+            "grams": grams,
+            "norm": math.sqrt(sum(v * v for v in grams.values())) or 1.0,
+            "expires_at": expires_at
+        }
+        index = self._index.setdefault(scope, {})
+        for gram in grams:
+            index.setdefault(gram, set()).add(normalized)
+
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[Hashable, str]):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        scope, normalized = key
+        index = self._index.get(scope, {})
+        for gram in entry["grams"]:
+            bucket = index.get(gram)
+            if bucket is not None:
+                bucket.discard(normalized)
+                if not bucket:
+                    del index[gram]
+
+    def clear(self):
+        self._entries.clear()
+        self._index.clear()
+
+    # ================================================================
+    # 读穿透 + 后台重新生成
+    # ================================================================
+
+    async def get_or_compute(
+        self,
+        query: str,
+        compute: Callable[[], Awaitable[Any]],
+        scope: Hashable = None,
+        force_refresh: bool = False,
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        获取拓扑：新鲜命中直接返回，过期命中返回旧值并后台重新生成，未命中同步生成
+
+        调用方可能修改返回的图谱，因此始终返回副本
+        """
+        if not force_refresh:
+            cached = self.lookup(query, scope)
+            if cached is None or cached["stale"]:
+                # 其他 worker 可能已生成更新的拓扑
+                shared = await self._lookup_shared(query, scope)
+                if shared is not None and (cached is None or not shared["stale"]):
+                    cached = shared
+                    self.shared_hits += 1
+            if cached is not None:
+                if cached["similarity"] < 1.0:
+                    self.similar_hits += 1
+                    logger.info(
+                        "[TopologyCache:%s] ✓ 相似查询命中: %s ≈ %s (similarity=%.2f)",
+                        self.name, query, cached["matched_query"], cached["similarity"]
+                    )
+                else:
+                    logger.info("[TopologyCache:%s] ✓ 缓存命中: %s", self.name, query)
+
+                if cached["stale"]:
+                    self.stale_hits += 1
+                    self._schedule_revalidation(cached["key"], cached["matched_query"], compute, scope, ttl)
+                else:
+                    self.hits += 1
+                return copy.deepcopy(cached["value"])
+
+        self.misses += 1
+        value = await compute()
+        await self.aset(query, value, scope=scope, ttl=ttl)
+        return copy.deepcopy(value)
+
+    def _schedule_revalidation(
+        self,
+        key: Tuple[Hashable, str],
+        query: str,
+        compute: Callable[[], Awaitable[Any]],
+        scope: Hashable,
+        ttl: Optional[float]
+    ):
+        if key in self._revalidating:
+            return
+
+        async def revalidate():
+            try:
+                value = await compute()
+                await self.aset(query, value, scope=scope, ttl=ttl)
+                logger.info("[TopologyCache:%s] 后台重新生成完成: %s", self.name, query)
+            except Exception as e:
+                logger.warning("[TopologyCache:%s] 后台重新生成失败: %s - %s", self.name, query, e)
+            finally:
+                self._revalidating.pop(key, None)
+
+        logger.info("[TopologyCache:%s] 返回过期拓扑，后台重新生成: %s", self.name, query)
+        self._revalidating[key] = asyncio.create_task(revalidate())
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.hits + self.stale_hits
+        total = hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "hits": hits,
+            "shared_hits": self.shared_hits,
+            "similar_hits": self.similar_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "revalidating": len(self._revalidating),
+            "hit_ratio": hits / total if total else 0.0
+        }
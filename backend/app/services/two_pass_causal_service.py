@@ -6,18 +6,31 @@ Pass 2: 动态富化节点 + 数据溯源（使用多路由工具调用）
 
 from openai import AsyncOpenAI
 import os
-import json
 import asyncio
 import aiohttp
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 from datetime import datetime
 import logging
 from urllib.parse import urlparse
 
+from app.services.llm_gateway import llm_gateway
 from app.services.multi_tool_router_service import MultiToolRouterService
 from app.services.yahoo_finance_service import YahooFinanceService
+from app.services.node_state_store import node_state_store
+from app.services.topology_cache import SemanticTopologyCache
+from app.utils import codec
+from app.utils.metrics import timed_search, PIPELINE_STAGE_SECONDS
+from app.utils.cassette import cassette_search
+from app.utils.search_cache import cached_search
+from app.utils.rate_limiter import rate_limited
+from app.utils.tracing import span, traced
+from app.utils.logging_setup import sampled_logger
 
 logger = logging.getLogger(__name__)
+node_logger = sampled_logger(logger)
+
+# Pass 1 拓扑缓存（模块级共享：关注列表预热后交互请求直接命中，同义表述按相似度复用）
+_topology_cache = SemanticTopologyCache(name="two_pass_topology")
 
 
 class SearchService:
@@ -30,6 +43,9 @@ class SearchService:
         
         self.tavily_api_key = os.getenv("TAVILY_API_KEY")
         self.serper_api_key = os.getenv("SERPER_API_KEY")
+        # 可指向本地替身服务（standins/）做离线压测与故障注入
+        self.tavily_base_url = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com").rstrip("/")
+        self.serper_base_url = os.getenv("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/")
         self.use_mock = not (self.tavily_api_key or self.serper_api_key)
         
         if self.use_mock:
@@ -52,9 +68,10 @@ class SearchService:
         
         return []
     
+    @timed_search("mock")
     async def _mock_search(self, query: str) -> List[Dict[str, Any]]:
         """Mock 搜索"""
-        logger.info(f"[Mock Search] 模拟搜索: {query}")
+        node_logger.info("[Mock Search] 模拟搜索: %s", query)
         await asyncio.sleep(0.5)
         
         mock_results = [
@@ -70,7 +87,7 @@ class SearchService:
             }
         ]
         
-        logger.info(f"[Mock Search] 返回 {len(mock_results)} 条模拟结果")
+        node_logger.info("[Mock Search] 返回 %s 条模拟结果", len(mock_results))
         return mock_results
     
     async def _tavily_search(self, query: str) -> List[Dict[str, Any]]:
@@ -96,6 +113,11 @@ class TwoPassCausalService:
         
         # 初始化搜索服务
         self.search_service = SearchService()
+        self.use_mock = self.search_service.use_mock
+        self.tavily_api_key = self.search_service.tavily_api_key
+        self.serper_api_key = self.search_service.serper_api_key
+        self.tavily_base_url = self.search_service.tavily_base_url
+        self.serper_base_url = self.search_service.serper_base_url
         
         # 初始化多路由服务
         self.router = MultiToolRouterService(search_service=self.search_service)
@@ -108,7 +130,8 @@ class TwoPassCausalService:
     async def analyze_two_pass(
         self, 
         query: str, 
-        context: Optional[str] = None
+        context: Optional[str] = None,
+        progress_callback: Optional[Callable[[str, str], None]] = None
     ) -> Dict[str, Any]:
         """
         双阶段因果分析主流程
@@ -116,54 +139,98 @@ class TwoPassCausalService:
         Args:
             query: 分析查询（如"黄金价格的影响因素"）
             context: 可选的背景信息
+            progress_callback: 可选的阶段进度回调 (stage, status)，供后台任务上报进度
             
         Returns:
             完整的因果图谱（包含实时状态和数据溯源）
         """
-        logger.info(f"\n{'='*80}")
-        logger.info(f"[双阶段分析] 开始分析: {query}")
-        logger.info(f"{'='*80}")
+        logger.info("\n%s", '='*80)
+        logger.info("[双阶段分析] 开始分析: %s", query)
+        logger.info("%s", '='*80)
         
         # ============================================
         # Pass 1: 生成拓扑结构
         # ============================================
-        logger.info(f"\n[Pass 1] 生成因果图谱拓扑结构")
-        topology = await self._pass1_generate_topology(query, context)
+        logger.info("\n[Pass 1] 生成因果图谱拓扑结构")
+        if progress_callback:
+            progress_callback("pass1_topology", "running")
+        
+        with PIPELINE_STAGE_SECONDS.time(pipeline="analyze_v2", stage="pass1_topology"), span("pass1_topology"):
+            topology = await self._pass1_generate_topology(query, context)
+        
+        if progress_callback:
+            progress_callback("pass1_topology", "completed")
         
-        logger.info(f"[Pass 1] 完成")
-        logger.info(f"  - 节点数: {len(topology['nodes'])}")
-        logger.info(f"  - 边数: {len(topology['edges'])}")
+        logger.info("[Pass 1] 完成")
+        logger.info("  - 节点数: %s", len(topology['nodes']))
+        logger.info("  - 边数: %s", len(topology['edges']))
         
         # ============================================
         # Pass 2: 动态富化 + 数据溯源
         # ============================================
-        logger.info(f"\n[Pass 2] 动态富化节点状态并追溯数据源")
-        enriched_graph = await self._pass2_enrich_with_provenance(topology)
+        logger.info("\n[Pass 2] 动态富化节点状态并追溯数据源")
+        if progress_callback:
+            progress_callback("pass2_enrichment", "running")
+        
+        with PIPELINE_STAGE_SECONDS.time(pipeline="analyze_v2", stage="pass2_enrichment"), span("pass2_enrichment"):
+            enriched_graph = await self._pass2_enrich_with_provenance(topology)
+        
+        if progress_callback:
+            progress_callback("pass2_enrichment", "completed")
         
         # 统计溯源数据
         total_sources = sum(
             len(node.get('realtime_state', {}).get('sources', []))
             for node in enriched_graph['nodes']
         )
-        logger.info(f"[Pass 2] 完成")
-        logger.info(f"  - 获取数据源: {total_sources} 条")
+        logger.info("[Pass 2] 完成")
+        logger.info("  - 获取数据源: %s 条", total_sources)
         
-        logger.info(f"\n{'='*80}")
-        logger.info(f"[双阶段分析] 完成")
-        logger.info(f"{'='*80}\n")
+        logger.info("\n%s", '='*80)
+        logger.info("[双阶段分析] 完成")
+        logger.info("%s\n", '='*80)
         
         return enriched_graph
     
+    async def warm_target(self, query: str, cache_ttl: Optional[float] = None):
+        """
+        预热热门标的：强制刷新 Pass 1 拓扑，并为其节点填充行情/状态缓存
+        
+        供关注列表调度器在后台调用，结果不返回给客户端
+        """
+        topology = await self._pass1_generate_topology(
+            query,
+            None,
+            force_refresh=True,
+            cache_ttl=cache_ttl
+        )
+        await self._pass2_enrich_with_provenance(topology)
+    
     async def _pass1_generate_topology(
         self, 
         query: str, 
-        context: Optional[str]
+        context: Optional[str],
+        force_refresh: bool = False,
+        cache_ttl: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Pass 1: 生成因果图谱拓扑结构
         
         关键：每个节点必须包含 search_query 字段
+        
+        拓扑按语义缓存：context 必须一致，query 按归一化 + 相似度匹配；
+        缓存过期后先返回旧拓扑并在后台重新生成
         """
+        return await _topology_cache.get_or_compute(
+            query,
+            lambda: self._generate_topology(query, context),
+            scope=(context or "").strip(),
+            force_refresh=force_refresh,
+            ttl=cache_ttl
+        )
+    
+    async def _generate_topology(self, query: str, context: Optional[str]) -> Dict[str, Any]:
+        """调用 LLM 生成拓扑结构（不经过缓存）"""
         system_prompt = """你是一个专业的因果分析专家。请分析问题的因果关系，构建因果图谱。
 
 【输出格式】
@@ -230,7 +297,9 @@ search_query: "gold price per ounce current 2026" （英文）
 请生成因果图谱，确保每个节点都包含 search_query 字段。
 """
 
-        response = await self.client.chat.completions.create(
+        response = await llm_gateway.chat(
+            self.client,
+            "TwoPassCausalService.generate_topology",
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -241,7 +310,7 @@ search_query: "gold price per ounce current 2026" （英文）
         )
         
         content = response.choices[0].message.content
-        result = json.loads(content)
+        result = codec.loads(content)
         
         # 验证必需字段
         if "nodes" not in result or "edges" not in result:
@@ -250,7 +319,7 @@ search_query: "gold price per ounce current 2026" （英文）
         # 验证每个节点是否包含 search_query
         for node in result["nodes"]:
             if "search_query" not in node:
-                logger.warning(f"[Pass 1] 节点 {node.get('id')} 缺少 search_query，自动生成")
+                logger.warning("[Pass 1] 节点 %s 缺少 search_query，自动生成", node.get('id'))
                 node["search_query"] = f"{node.get('label', '')} latest news"
         
         return result
@@ -280,11 +349,14 @@ search_query: "gold price per ounce current 2026" （英文）
         valid_nodes = []
         for i, result in enumerate(enriched_nodes):
             if isinstance(result, Exception):
-                logger.error(f"[Pass 2] 节点 {i} 富化失败: {str(result)}")
+                logger.error("[Pass 2] 节点 %s 富化失败: %s", i, result)
                 valid_nodes.append(nodes[i])  # 使用原始节点
             else:
                 valid_nodes.append(result)
         
+        # 有历史观测的节点：趋势改由本地批量计算（替代单点比较 / LLM 判断）
+        node_state_store.annotate_trends(valid_nodes, "realtime_state")
+        
         # 返回富化后的图谱
         return {
             "nodes": valid_nodes,
@@ -292,11 +364,13 @@ search_query: "gold price per ounce current 2026" （英文）
             "explanation": topology["explanation"]
         }
     
+    @traced("enrich_node", attrs=lambda self, node, *args, **kwargs: {"node": node.get("label")})
     async def _enrich_single_node(self, node: Dict[str, Any]) -> Dict[str, Any]:
         """
         富化单个节点的实时状态（集成两阶段共识验证）
         
         路由优先级：
+        0. 规范节点状态存储（同义节点跨图谱共享，新鲜则直接复用）
         1. Yahoo Finance 直连（资产价格类节点）
         2. 两阶段共识验证（白名单 + 三方交叉验证）
         
@@ -312,19 +386,28 @@ search_query: "gold price per ounce current 2026" （英文）
         search_query = node.get("search_query", "")
         
         if not search_query:
-            logger.warning(f"[Pass 2] 节点 {node_id} 缺少 search_query，跳过富化")
+            logger.warning("[Pass 2] 节点 %s 缺少 search_query，跳过富化", node_id)
             return node
         
-        logger.info(f"[Pass 2] 富化节点: {node_label} (类型: {node_type})")
+        node_logger.info("[Pass 2] 富化节点: %s (类型: %s)", node_label, node_type)
         
         try:
+            # ============================================================
+            # 路由决策 0: 规范节点状态存储（无需任何外部调用）
+            # ============================================================
+            entry = await node_state_store.aget(node_label)
+            if entry is not None:
+                logger.info("[Pass 2] ✓ 规范状态命中: %s -> %s", node_label, entry["canonical_id"])
+                node["realtime_state"] = node_state_store.to_realtime_state(entry)
+                return node
+            
             # ============================================================
             # 路由决策 1: Yahoo Finance 直连旁路（最高优先级）
             # ============================================================
             yahoo_result = await self.yahoo_finance.fetch_by_node_label(node_label)
             
             if yahoo_result:
-                logger.info(f"[Pass 2] ✓ Yahoo Finance 直连成功: {node_label}")
+                logger.info("[Pass 2] ✓ Yahoo Finance 直连成功: %s", node_label)
                 
                 # 构建 realtime_state
                 realtime_state = {
@@ -340,11 +423,16 @@ search_query: "gold price per ounce current 2026" （英文）
                 
                 node["realtime_state"] = realtime_state
                 
+                # 学习同义词：模糊匹配到 Ticker 的标签归入该 Ticker 的规范身份
+                ticker = realtime_state["metadata"].get("ticker")
+                if ticker:
+                    node_state_store.register_alias(node_label, f"ticker:{ticker}")
+                await node_state_store.aput(node_label, realtime_state=realtime_state, node_type="price")
+                
                 logger.info(
-                    f"[Pass 2] 节点 {node_label} 富化完成: "
-                    f"value={realtime_state['latest_value']}, "
-                    f"trend={realtime_state['trend']}, "
-                    f"strategy=yahoo_finance_direct"
+                    "[Pass 2] 节点 %s 富化完成: value=%s, trend=%s, strategy=yahoo_finance_direct",
+                    node_label, realtime_state["latest_value"], realtime_state["trend"],
+                    extra={"node": node_label}
                 )
                 
                 return node
@@ -352,7 +440,7 @@ search_query: "gold price per ounce current 2026" （英文）
             # ============================================================
             # 路由决策 2: 两阶段共识验证（白名单 + 三方交叉验证）
             # ============================================================
-            logger.info(f"[Pass 2] Yahoo Finance 未匹配，启动两阶段共识验证")
+            node_logger.info("[Pass 2] Yahoo Finance 未匹配，启动两阶段共识验证")
             
             # 调用 NodeSensingService 的两阶段验证
             from app.services.node_sensing_service import NodeSensingService
@@ -388,16 +476,15 @@ search_query: "gold price per ounce current 2026" （英文）
             node["realtime_state"] = realtime_state
             
             logger.info(
-                f"[Pass 2] 节点 {node_label} 富化完成: "
-                f"value={realtime_state['latest_value']}, "
-                f"confidence={realtime_state['confidence']}, "
-                f"sources={len(realtime_state['sources'])}"
+                "[Pass 2] 节点 %s 富化完成: value=%s, confidence=%s, sources=%d",
+                node_label, realtime_state["latest_value"], realtime_state["confidence"],
+                len(realtime_state["sources"]), extra={"node": node_label}
             )
             
             return node
             
         except Exception as e:
-            logger.error(f"[Pass 2] 节点 {node_id} 富化失败: {str(e)}")
+            logger.error("[Pass 2] 节点 %s 富化失败: %s", node_id, e)
             # 返回带有 unknown 状态的节点
             node["realtime_state"] = {
                 "latest_value": "unknown",
@@ -431,13 +518,14 @@ search_query: "gold price per ounce current 2026" （英文）
         
         return []
     
+    @timed_search("mock")
     async def _mock_search_api(self, query: str) -> List[Dict[str, Any]]:
         """
         Mock 搜索引擎 API（模拟网络延迟）
         
         用于开发/测试环境，模拟真实搜索结果
         """
-        logger.info(f"[Mock Search] 模拟搜索: {query}")
+        node_logger.info("[Mock Search] 模拟搜索: %s", query)
         
         # 模拟网络延迟 (500ms - 1500ms)
         import random
@@ -501,9 +589,13 @@ search_query: "gold price per ounce current 2026" （英文）
                 }
             ]
         
-        logger.info(f"[Mock Search] 返回 {len(mock_results)} 条模拟结果")
+        node_logger.info("[Mock Search] 返回 %s 条模拟结果", len(mock_results))
         return mock_results
     
+    @cached_search("tavily")
+    @rate_limited("tavily")
+    @timed_search("tavily")
+    @cassette_search("tavily")
     async def _search_tavily(self, query: str) -> List[Dict[str, Any]]:
         """调用 Tavily API"""
         async with aiohttp.ClientSession() as session:
@@ -515,7 +607,7 @@ search_query: "gold price per ounce current 2026" （英文）
             }
             
             async with session.post(
-                "https://api.tavily.com/search", 
+                self.tavily_base_url + "/search", 
                 json=payload
             ) as resp:
                 if resp.status != 200:
@@ -533,6 +625,10 @@ search_query: "gold price per ounce current 2026" （英文）
                     for r in results
                 ]
     
+    @cached_search("serper")
+    @rate_limited("serper")
+    @timed_search("serper")
+    @cassette_search("serper")
     async def _search_serper(self, query: str) -> List[Dict[str, Any]]:
         """调用 Serper API"""
         async with aiohttp.ClientSession() as session:
@@ -543,7 +639,7 @@ search_query: "gold price per ounce current 2026" （英文）
             payload = {"q": query, "num": 3}
             
             async with session.post(
-                "https://google.serper.dev/search",
+                self.serper_base_url + "/search",
                 json=payload,
                 headers=headers
             ) as resp:
@@ -629,7 +725,9 @@ Attempt {attempt_number} {"(白名单搜索)" if attempt_number == 1 else "(全
 请提取该节点的最新状态。"""
 
         try:
-            response = await self.client.chat.completions.create(
+            response = await llm_gateway.chat(
+                self.client,
+                "TwoPassCausalService.parse_search_results_with_llm",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -640,19 +738,18 @@ Attempt {attempt_number} {"(白名单搜索)" if attempt_number == 1 else "(全
             )
             
             content = response.choices[0].message.content
-            result = json.loads(content)
+            result = codec.loads(content)
             
             extracted_value = result.get("latest_value", "unknown")
             
             logger.info(
-                f"[LLM 解析] Attempt {attempt_number} 完成: "
-                f"{node_label} = {extracted_value}"
+                "[LLM 解析] Attempt %s 完成: %s = %s", attempt_number, node_label, extracted_value
             )
             
             return extracted_value
             
         except Exception as e:
-            logger.error(f"[LLM 解析] 失败: {str(e)}")
+            logger.error("[LLM 解析] 失败: %s", e)
             return "unknown"
 
 
@@ -0,0 +1,222 @@
+"""
+关注列表预热服务 (Watchlist Pre-warming)
+后台按节点类型的刷新周期预计算热门标的的 Pass 1 拓扑与节点状态，
+使交互请求直接命中热缓存：
+- 价格类节点：分钟级，经 YahooFinanceService 直连刷新
+- 宏观/政策类节点：小时级，经 NodeSensingService.enrich_nodes_batch 刷新
+- 热门标的：定期刷新 Pass 1 拓扑并填充其节点缓存
+
+刷新任务低优先级串行执行，交互负载高时自动暂停。
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from app.services.node_sensing_service import NodeSensingService
+from app.services.two_pass_causal_service import TwoPassCausalService
+from app.utils.load_monitor import load_monitor
+
+logger = logging.getLogger(__name__)
+
+
+class WatchlistScheduler:
+    """关注列表预热调度器"""
+
+    def __init__(
+        self,
+        two_pass_service: TwoPassCausalService,
+        sensing_service: NodeSensingService,
+        config_path: Optional[str] = None
+    ):
+        self.two_pass_service = two_pass_service
+        self.sensing_service = sensing_service
+        self.yahoo_finance = two_pass_service.yahoo_finance
+
+        # 默认关闭：预热会消耗 LLM 与搜索配额
+        self.enabled = os.getenv("WATCHLIST_ENABLED", "false").lower() == "true"
+        self.tick_seconds = float(os.getenv("WATCHLIST_TICK_SECONDS", "30"))
+        self.item_pause = float(os.getenv("WATCHLIST_ITEM_PAUSE", "1"))
+        self.batch_size = int(os.getenv("WATCHLIST_BATCH_SIZE", "2"))
+
+        default_path = Path(__file__).parent.parent.parent / "config" / "watchlist.json"
+        self.config_path = Path(config_path or os.getenv("WATCHLIST_CONFIG", str(default_path)))
+        self._load_config()
+
+        self._next_run: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _load_config(self):
+        """加载关注列表配置"""
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except Exception as e:
+            logger.error("[Watchlist] 配置加载失败: %s", e)
+            config = {}
+
+        self.intervals = {
+            key: float(value)
+            for key, value in config.get("intervals", {}).items()
+            if key != "description"
+        }
+        self.targets: List[str] = config.get("targets", [])
+        self.nodes: List[Dict[str, Any]] = config.get("nodes", [])
+
+        logger.info(
+            "[Watchlist] 配置加载完成: %s 个标的, %s 个节点", len(self.targets), len(self.nodes)
+        )
+
+    def _interval_for(self, node_type: str) -> float:
+        return self.intervals.get(node_type, self.intervals.get("macro", 3600.0))
+
+    def _cache_ttl_for(self, interval: float) -> float:
+        """缓存有效期覆盖一个刷新周期外加调度余量，避免两次刷新之间出现空窗"""
+        return interval + 2 * self.tick_seconds
+
+    # ================================================================
+    # 生命周期
+    # ================================================================
+
+    async def start(self):
+        if not self.enabled:
+            logger.info("[Watchlist] 未启用（设置 WATCHLIST_ENABLED=true 开启）")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info("[Watchlist] 调度器已启动，调度间隔 %s 秒", self.tick_seconds)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("[Watchlist] 预热轮次失败: %s", e)
+            await asyncio.sleep(self.tick_seconds)
+
+    # ================================================================
+    # 预热逻辑
+    # ================================================================
+
+    def _is_due(self, key: str, now: float) -> bool:
+        return self._next_run.get(key, 0.0) <= now
+
+    def _mark_done(self, key: str, interval: float):
+        self._next_run[key] = time.time() + interval
+
+    async def _yield_to_interactive(self) -> bool:
+        """
+        让出事件循环；交互负载高时返回 False，中止本轮预热
+        未完成的条目保持到期状态，下一轮继续
+        """
+        await asyncio.sleep(self.item_pause)
+        if load_monitor.is_busy():
+            logger.info(
+                "[Watchlist] 交互负载较高 (in_flight=%s)，暂停预热", load_monitor.in_flight
+            )
+            return False
+        return True
+
+    async def run_once(self) -> int:
+        """
+        执行一轮预热，只处理已到期的条目
+
+        Returns:
+            本轮刷新的条目数
+        """
+        now = time.time()
+        refreshed = 0
+
+        price_nodes = []
+        sensing_nodes = []
+        for node in self.nodes:
+            key = f"node:{node['label']}"
+            if not self._is_due(key, now):
+                continue
+            if node.get("type") == "price" and self.yahoo_finance.match_ticker(node["label"]):
+                price_nodes.append(node)
+            else:
+                sensing_nodes.append(node)
+
+        # 1. 价格类节点（Yahoo 直连，成本最低，优先刷新）
+        for node in price_nodes:
+            if not await self._yield_to_interactive():
+                return refreshed
+
+            interval = self._interval_for("price")
+            await self.yahoo_finance.fetch_by_node_label(
+                node["label"],
+                force_refresh=True,
+                cache_ttl=self._cache_ttl_for(interval)
+            )
+            self._mark_done(f"node:{node['label']}", interval)
+            refreshed += 1
+
+        # 2. 宏观/政策类节点（搜索 + LLM，按类型分组小批量刷新）
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for node in sensing_nodes:
+            by_type.setdefault(node.get("type", "macro"), []).append(node)
+
+        for node_type, group in by_type.items():
+            interval = self._interval_for(node_type)
+            for i in range(0, len(group), self.batch_size):
+                if not await self._yield_to_interactive():
+                    return refreshed
+
+                batch = group[i:i + self.batch_size]
+                await self.sensing_service.enrich_nodes_batch(
+                    [self._to_sensing_node(node) for node in batch],
+                    force_refresh=True,
+                    cache_ttl=self._cache_ttl_for(interval)
+                )
+                for node in batch:
+                    self._mark_done(f"node:{node['label']}", interval)
+                refreshed += len(batch)
+
+        # 3. 热门标的拓扑
+        topology_interval = self._interval_for("topology")
+        for target in self.targets:
+            key = f"target:{target}"
+            if not self._is_due(key, now):
+                continue
+            if not await self._yield_to_interactive():
+                return refreshed
+
+            try:
+                await self.two_pass_service.warm_target(
+                    target,
+                    cache_ttl=self._cache_ttl_for(topology_interval)
+                )
+            except Exception as e:
+                logger.warning("[Watchlist] 标的预热失败: %s - %s", target, e)
+            self._mark_done(key, topology_interval)
+            refreshed += 1
+
+        if refreshed:
+            logger.info("[Watchlist] 本轮预热完成: %s 个条目", refreshed)
+
+        return refreshed
+
+    @staticmethod
+    def _to_sensing_node(node: Dict[str, Any]) -> Dict[str, Any]:
+        """转换为 NodeSensingService 的节点输入格式"""
+        label = node["label"]
+        queries = node.get("queries") or [f"{label} 最新", f"{label} latest"]
+        return {
+            "id": f"watchlist:{label}",
+            "label": label,
+            "sensing_config": {
+                "auto_queries": queries,
+                "state_type": node.get("type")
+            }
+        }
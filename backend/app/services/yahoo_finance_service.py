@@ -2,13 +2,33 @@
 Yahoo Finance 直连服务 (Direct API Bypass)
 用于绕过付费墙，直接获取资产价格和宏观指标的实时数据
 """
+import os
 import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
-import yfinance as yf
+
+from app.services.timeseries_store import timeseries_store
+from app.utils.ttl_cache import TTLCache
+from app.utils.metrics import registry
+from app.utils.rate_limiter import rate_limiter
+from app.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+YAHOO_LATENCY_SECONDS = registry.histogram(
+    "yahoo_latency_seconds", "Yahoo Finance 单次行情请求延迟（秒）"
+)
+
+
+def load_yfinance():
+    """
+    导入 yfinance（连带 pandas / numpy，约 0.4 秒、数十 MiB）
+    
+    推迟到首次取行情时，只服务 /analyze 等接口的进程不必承担；可在预热阶段提前调用
+    """
+    import yfinance
+    return yfinance
+
 
 class YahooFinanceService:
     """
@@ -87,8 +107,14 @@ class YahooFinanceService:
         "corn": "ZC=F",
     }
     
+    # 行情缓存（类级别共享：交互请求与关注列表预热命中同一份数据）
+    _quote_cache = TTLCache(
+        name="yahoo_quote",
+        default_ttl=float(os.getenv("YAHOO_QUOTE_TTL", "60"))
+    )
+    
     def __init__(self):
-        logger.info(f"[YahooFinance] 初始化完成，支持 {len(self.TICKER_MAPPING)} 个资产映射")
+        logger.info("[YahooFinance] 初始化完成，支持 %s 个资产映射", len(self.TICKER_MAPPING))
     
     def match_ticker(self, node_label: str) -> Optional[str]:
         """
@@ -105,23 +131,26 @@ class YahooFinanceService:
         # 精确匹配
         if node_label_lower in self.TICKER_MAPPING:
             ticker = self.TICKER_MAPPING[node_label_lower]
-            logger.info(f"[YahooFinance] ✓ 精确匹配: {node_label} -> {ticker}")
+            logger.info("[YahooFinance] ✓ 精确匹配: %s -> %s", node_label, ticker)
             return ticker
         
         # 模糊匹配（包含关系）
         for key, ticker in self.TICKER_MAPPING.items():
             if key in node_label_lower or node_label_lower in key:
-                logger.info(f"[YahooFinance] ✓ 模糊匹配: {node_label} -> {ticker} (via {key})")
+                logger.info("[YahooFinance] ✓ 模糊匹配: %s -> %s (via %s)", node_label, ticker, key)
                 return ticker
         
-        logger.debug(f"[YahooFinance] ✗ 未匹配: {node_label}")
+        logger.debug("[YahooFinance] ✗ 未匹配: %s", node_label)
         return None
     
+    @traced("yahoo:quote", attrs=lambda self, ticker, *args, **kwargs: {"ticker": ticker})
     async def fetch_financial_data(
         self, 
         ticker: str,
         node_label: str = "",
-        max_retries: int = 3
+        max_retries: int = 3,
+        force_refresh: bool = False,
+        cache_ttl: Optional[float] = None
     ) -> Optional[Dict[str, Any]]:
         """
         获取金融资产的实时数据（带重试和延迟）
@@ -130,34 +159,46 @@ class YahooFinanceService:
             ticker: Yahoo Finance Ticker（如 "GC=F"）
             node_label: 节点标签（用于日志）
             max_retries: 最大重试次数
+            force_refresh: 跳过缓存，强制重新获取（用于预热）
+            cache_ttl: 写入缓存的有效期（秒），默认 YAHOO_QUOTE_TTL
             
         Returns:
             金融数据字典或 None
         """
         import asyncio
         
-        logger.info(f"[YahooFinance] 获取数据: {ticker} ({node_label})")
+        if not force_refresh:
+            cached = await self._quote_cache.aget(ticker)
+            if cached is not None:
+                logger.debug("[YahooFinance] 缓存命中: %s", ticker)
+                return cached
+        
+        logger.info("[YahooFinance] 获取数据: %s (%s)", ticker, node_label)
         
         for attempt in range(max_retries):
             try:
                 # 添加延迟避免速率限制（第一次请求不延迟）
                 if attempt > 0:
                     delay = 2 ** attempt  # 指数退避: 2s, 4s, 8s
-                    logger.info(f"[YahooFinance] 重试 {attempt + 1}/{max_retries}，等待 {delay}秒")
+                    logger.info("[YahooFinance] 重试 %s/%s，等待 %s秒", attempt + 1, max_retries, delay)
                     await asyncio.sleep(delay)
                 
+                # 账户级配额：所有 worker 共享同一令牌桶，避免多进程叠加触发 429
+                await rate_limiter.acquire("yahoo")
+                
                 # 调用 yfinance
-                stock = yf.Ticker(ticker)
-                info = stock.info
+                with YAHOO_LATENCY_SECONDS.time():
+                    stock = load_yfinance().Ticker(ticker)
+                    info = stock.info
                 
                 # 获取当前价格
                 current_price = info.get("regularMarketPrice") or info.get("currentPrice")
                 if current_price is None:
                     if attempt < max_retries - 1:
-                        logger.warning(f"[YahooFinance] 无法获取价格: {ticker}，将重试")
+                        logger.warning("[YahooFinance] 无法获取价格: %s，将重试", ticker)
                         continue
                     else:
-                        logger.warning(f"[YahooFinance] 无法获取价格: {ticker}，已达最大重试次数")
+                        logger.warning("[YahooFinance] 无法获取价格: %s，已达最大重试次数", ticker)
                         return None
                 
                 # 获取昨日收盘价
@@ -205,10 +246,18 @@ class YahooFinanceService:
                 }
                 
                 logger.info(
-                    f"[YahooFinance] ✓ 成功: {ticker} = {result['latest_value']} "
-                    f"({result['trend']}, {result['change_percent']})"
+                    "[YahooFinance] ✓ 成功: %s = %s (%s, %s)",
+                    ticker, result["latest_value"], result["trend"], result["change_percent"]
                 )
                 
+                # 观测历史：以交易所行情时间为时间戳，休市期间重复获取的同一价格不会重复记录
+                market_time = info.get("regularMarketTime")
+                await timeseries_store.aappend(
+                    f"ticker:{ticker}", current_price,
+                    market_time if isinstance(market_time, (int, float)) else None
+                )
+                
+                await self._quote_cache.aset(ticker, result, ttl=cache_ttl)
                 return result
                 
             except Exception as e:
@@ -218,27 +267,34 @@ class YahooFinanceService:
                 if "429" in error_msg or "Too Many Requests" in error_msg:
                     if attempt < max_retries - 1:
                         delay = 2 ** (attempt + 1)
-                        logger.warning(f"[YahooFinance] 速率限制 (429): {ticker}，将在 {delay}秒后重试")
+                        logger.warning("[YahooFinance] 速率限制 (429): %s，将在 %s秒后重试", ticker, delay)
                         continue
                     else:
-                        logger.error(f"[YahooFinance] 速率限制 (429): {ticker}，已达最大重试次数")
+                        logger.error("[YahooFinance] 速率限制 (429): %s，已达最大重试次数", ticker)
                         return None
                 else:
-                    logger.error(f"[YahooFinance] 获取失败: {ticker} - {error_msg}")
+                    logger.error("[YahooFinance] 获取失败: %s - %s", ticker, error_msg)
                     if attempt < max_retries - 1:
                         continue
                     return None
         
         # 所有重试都失败
-        logger.error(f"[YahooFinance] 所有重试失败: {ticker}")
+        logger.error("[YahooFinance] 所有重试失败: %s", ticker)
         return None
     
-    async def fetch_by_node_label(self, node_label: str) -> Optional[Dict[str, Any]]:
+    async def fetch_by_node_label(
+        self,
+        node_label: str,
+        force_refresh: bool = False,
+        cache_ttl: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         根据节点标签直接获取数据（自动匹配 Ticker）
         
         Args:
             node_label: 节点标签
+            force_refresh: 跳过缓存，强制重新获取
+            cache_ttl: 写入缓存的有效期（秒）
             
         Returns:
             金融数据字典，未匹配返回 None
@@ -247,5 +303,10 @@ class YahooFinanceService:
         if not ticker:
             return None
         
-        return await self.fetch_financial_data(ticker, node_label)
+        return await self.fetch_financial_data(
+            ticker,
+            node_label,
+            force_refresh=force_refresh,
+            cache_ttl=cache_ttl
+        )
 
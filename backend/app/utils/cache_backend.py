@@ -0,0 +1,693 @@
+"""
+缓存后端 (Cache Backend)
+多 worker 部署时进程内缓存只在同一 worker 再次接到请求时命中。行情、节点状态、搜索结果与 LLM 拓扑缓存
+经本层读写，可在以下后端之间切换：
+- memory：进程内 LRU（默认，与原行为一致）
+- sqlite：同一主机上多个 worker 共享的 SQLite 文件（WAL 模式）
+- redis：Redis 协议（RESP）服务，可指向真实 Redis 或本地替身 standins.resp_server
+
+所有后端存储同一种序列化结果（codec JSON 字节串），条目大小按字节计；读出的值总是新对象，
+调用方修改返回值不会影响缓存内容。命中 / 未命中 / 读写字节数按 (backend, cache) 统计并导出到 /metrics。
+
+后端选择：CACHE_BACKEND=memory|sqlite|redis，单个缓存可用 CACHE_BACKEND_<NAME> 覆盖
+（如 CACHE_BACKEND_NEGATIVE_RESULT=memory）。共享后端不可用时按未命中处理，并在一段时间内跳过该后端。
+
+sqlite / redis 的读写是阻塞 I/O：请求路径上的异步代码使用 aget / aset / adelete / aupdate，
+共享后端在线程中执行，不阻塞事件循环；进程内后端直接调用，没有线程切换开销。
+"""
+
+import os
+import time
+import asyncio
+import socket
+import weakref
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Hashable, Callable
+from urllib.parse import urlparse, unquote
+
+from app.utils import codec
+from app.utils.metrics import registry, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+BACKEND_KINDS = ("memory", "sqlite", "redis")
+
+
+def make_key(key: Hashable) -> str:
+    """缓存键规范化：字符串原样使用，其他（元组等）按规范 JSON 编码，跨进程得到相同的键"""
+    if isinstance(key, str):
+        return key
+    return codec.dumps_canonical(key).decode("utf-8")
+
+
+class CacheBackendError(Exception):
+    """共享后端读写失败（调用方按未命中处理）"""
+
+
+class CacheBackend:
+    """
+    缓存后端基类
+
+    子类实现字节串读写（_get_raw / _set_raw / _delete_raw / _clear_raw）与占用统计（usage），
+    序列化、过期时间换算、统计与故障退避在基类中统一处理
+    """
+
+    kind = "base"
+    # 读写失败后跳过该后端的时间（秒）
+    retry_after = 5.0
+    # 读写是否为阻塞 I/O（异步接口据此决定是否在线程中执行）
+    blocking = True
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        self._disabled_until = 0.0
+        _backends.add(self)
+
+    # ================================================================
+    # 对外接口
+    # ================================================================
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Any]:
+        """读取未过期的值，未命中或后端不可用返回 None"""
+        raw = self._call("get", namespace, self._get_raw, namespace, make_key(key))
+        if raw is None:
+            self._count(namespace, "misses")
+            return None
+        self._count(namespace, "hits")
+        self._count(namespace, "bytes_read", len(raw))
+        return codec.loads(raw)
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: float):
+        """写入（ttl 秒后过期）"""
+        raw = codec.dumps_bytes(value)
+        if self._call("set", namespace, self._set_raw, namespace, make_key(key), raw, ttl) is not False:
+            self._count(namespace, "sets")
+            self._count(namespace, "bytes_written", len(raw))
+
+    def delete(self, namespace: str, key: Hashable):
+        self._call("delete", namespace, self._delete_raw, namespace, make_key(key))
+
+    def update(self, namespace: str, key: Hashable, func: Callable[[Optional[Any]], Tuple[Optional[Any], Any, float]]) -> Any:
+        """
+        原子读改写（跨进程一致，用于共享计数器 / 令牌桶状态）
+
+        Args:
+            func: 接收当前值（不存在时为 None），返回 (新值或 None 表示不写入, 返回给调用方的结果, 有效期秒)；
+                  共享后端在并发冲突时可能多次调用 func，func 不应有副作用
+
+        Raises:
+            与后端通信失败时抛出原始异常（不经故障退避，由调用方决定降级方式）
+        """
+
+        def apply(raw: Optional[bytes]) -> Tuple[Optional[bytes], float, Any]:
+            value, result, ttl = func(codec.loads(raw) if raw is not None else None)
+            return (codec.dumps_bytes(value) if value is not None else None), ttl, result
+
+        return self._update_raw(namespace, make_key(key), apply)
+
+    def clear(self, namespace: str):
+        self._call("clear", namespace, self._clear_raw, namespace)
+
+    def usage(self, namespace: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """
+        当前占用
+
+        Returns:
+            (条目数, 字节数)；namespace 为空时统计全部；后端无法低成本统计时返回 None
+        """
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._stats_lock:
+            return {namespace: dict(values) for namespace, values in self._stats.items()}
+
+    # ================================================================
+    # 异步接口（事件循环中使用）
+    # ================================================================
+
+    async def _offload(self, func, *args):
+        if not self.blocking:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    async def aget(self, namespace: str, key: Hashable) -> Optional[Any]:
+        return await self._offload(self.get, namespace, key)
+
+    async def aset(self, namespace: str, key: Hashable, value: Any, ttl: float):
+        await self._offload(self.set, namespace, key, value, ttl)
+
+    async def adelete(self, namespace: str, key: Hashable):
+        await self._offload(self.delete, namespace, key)
+
+    async def aupdate(
+        self, namespace: str, key: Hashable, func: Callable[[Optional[Any]], Tuple[Optional[Any], Any, float]]
+    ) -> Any:
+        return await self._offload(self.update, namespace, key, func)
+
+    # ================================================================
+    # 子类实现
+    # ================================================================
+
+    def _get_raw(self, namespace: str, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _set_raw(self, namespace: str, key: str, raw: bytes, ttl: float):
+        raise NotImplementedError
+
+    def _delete_raw(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def _clear_raw(self, namespace: str):
+        raise NotImplementedError
+
+    def _update_raw(self, namespace: str, key: str, apply: Callable[[Optional[bytes]], Tuple]) -> Any:
+        raise NotImplementedError
+
+    # ================================================================
+    # 统计与故障退避
+    # ================================================================
+
+    def _count(self, namespace: str, field: str, amount: int = 1):
+        with self._stats_lock:
+            stats = self._stats.get(namespace)
+            if stats is None:
+                stats = self._stats[namespace] = {
+                    "hits": 0, "misses": 0, "sets": 0, "errors": 0, "bytes_read": 0, "bytes_written": 0
+                }
+            stats[field] += amount
+
+    def _call(self, operation: str, namespace: str, func, *args):
+        """执行后端操作；失败时计数、记录日志并在 retry_after 秒内跳过后端，返回 False"""
+        if self._disabled_until and time.monotonic() < self._disabled_until:
+            return False if operation != "get" else None
+        try:
+            return func(*args)
+        except Exception as e:
+            self._count(namespace, "errors")
+            self._disabled_until = time.monotonic() + self.retry_after
+            logger.warning(
+                "[CacheBackend:%s] %s 失败，%.0f 秒内按未命中处理: %s", self.kind, operation, self.retry_after, e
+            )
+            return False if operation != "get" else None
+
+
+# 所有已创建的后端（用于指标汇总），弱引用避免阻止回收
+_backends: "weakref.WeakSet[CacheBackend]" = weakref.WeakSet()
+
+
+# ================================================================
+# 进程内 LRU
+# ================================================================
+
+class MemoryBackend(CacheBackend):
+    """进程内 LRU：超出 max_entries 或 max_bytes 时淘汰最久未使用的条目"""
+
+    kind = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # (namespace, key) -> (字节串, 过期时间)
+        self._data: "OrderedDict[Tuple[str, str], Tuple[bytes, float]]" = OrderedDict()
+        self._entries: Dict[str, int] = {}
+        self._bytes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        super().__init__()
+
+    def _get_raw(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at < time.time():
+                self._pop((namespace, key))
+                return None
+            self._data.move_to_end((namespace, key))
+            return raw
+
+    def _set_raw(self, namespace: str, key: str, raw: bytes, ttl: float):
+        with self._lock:
+            self._store((namespace, key), raw, ttl)
+
+    def _delete_raw(self, namespace: str, key: str):
+        with self._lock:
+            self._pop((namespace, key))
+
+    def _update_raw(self, namespace: str, key: str, apply: Callable[[Optional[bytes]], Tuple]) -> Any:
+        # 锁内直接操作 _data，不可调用会再次加锁的 _get_raw / _set_raw
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            current = entry[0] if entry is not None and entry[1] >= time.time() else None
+            raw, ttl, result = apply(current)
+            if raw is not None:
+                self._store((namespace, key), raw, ttl)
+            return result
+
+    def _clear_raw(self, namespace: str):
+        with self._lock:
+            for item in [item for item in self._data if item[0] == namespace]:
+                self._pop(item)
+
+    def _store(self, item: Tuple[str, str], raw: bytes, ttl: float):
+        """写入并按容量淘汰（调用方持有锁）"""
+        namespace = item[0]
+        self._pop(item)
+        self._data[item] = (raw, time.time() + ttl)
+        self._entries[namespace] = self._entries.get(namespace, 0) + 1
+        self._bytes[namespace] = self._bytes.get(namespace, 0) + len(raw)
+        self._total_bytes += len(raw)
+
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            self._pop(next(iter(self._data)))
+
+    def _pop(self, item: Tuple[str, str]):
+        entry = self._data.pop(item, None)
+        if entry is not None:
+            namespace = item[0]
+            self._entries[namespace] -= 1
+            self._bytes[namespace] -= len(entry[0])
+            self._total_bytes -= len(entry[0])
+
+    def usage(self, namespace: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            if namespace is None:
+                return len(self._data), self._total_bytes
+            return self._entries.get(namespace, 0), self._bytes.get(namespace, 0)
+
+
+# ================================================================
+# SQLite（同主机多 worker 共享）
+# ================================================================
+
+class SQLiteBackend(CacheBackend):
+    """
+    SQLite 文件后端（WAL 模式，读不阻塞写）
+
+    每个线程一个连接；过期条目在读取时跳过，每 purge_every 次写入清理一次过期条目，
+    总字节数超出 max_bytes 时优先淘汰最早过期的条目
+    """
+
+    kind = "sqlite"
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None, purge_every: int = 256):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        super().__init__()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        with self._init_lock:
+            if not self._initialized:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None：每条语句自动提交，避免读事务长期持有 WAL 快照
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS cache_entries (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        value BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        expires_at REAL NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    ) WITHOUT ROWID
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries(expires_at)")
+                self._initialized = True
+                logger.info("[CacheBackend:sqlite] 共享缓存文件: %s", self.path)
+        self._local.conn = conn
+        return conn
+
+    def _get_raw(self, namespace: str, key: str) -> Optional[bytes]:
+        row = self._connect().execute(
+            "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at >= ?",
+            (namespace, key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def _set_raw(self, namespace: str, key: str, raw: bytes, ttl: float):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, raw, len(raw), time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self._purge(conn)
+
+    def _purge(self, conn: sqlite3.Connection):
+        """清理过期条目并执行容量上限"""
+        conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),))
+        if self.max_bytes is None:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        rows = conn.execute("SELECT namespace, key, size FROM cache_entries ORDER BY expires_at").fetchall()
+        evicted = []
+        for namespace, key, size in rows:
+            if excess <= 0:
+                break
+            evicted.append((namespace, key))
+            excess -= size
+        conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", evicted)
+        logger.info("[CacheBackend:sqlite] 超出容量上限，淘汰 %s 个条目", len(evicted))
+
+    def _delete_raw(self, namespace: str, key: str):
+        self._connect().execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _update_raw(self, namespace: str, key: str, apply: Callable[[Optional[bytes]], Tuple]) -> Any:
+        conn = self._connect()
+        # IMMEDIATE：事务开始即取得写锁，其他 worker 的读改写在此排队（busy timeout 内等待）
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at >= ?",
+                (namespace, key, now)
+            ).fetchone()
+            raw, ttl, result = apply(bytes(row[0]) if row else None)
+            if raw is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, raw, len(raw), now + ttl)
+                )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _clear_raw(self, namespace: str):
+        self._connect().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+
+    def usage(self, namespace: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        try:
+            conn = self._connect()
+            sql = "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE expires_at >= ?"
+            params: tuple = (time.time(),)
+            if namespace is not None:
+                sql += " AND namespace = ?"
+                params += (namespace,)
+            count, size = conn.execute(sql, params).fetchone()
+            return count, size
+        except sqlite3.Error:
+            return None
+
+
+# ================================================================
+# Redis 协议（RESP）
+# ================================================================
+
+class RedisBackend(CacheBackend):
+    """
+    Redis 协议后端：内置最小 RESP2 客户端（GET / SET PX / DEL / SCAN），不依赖 redis 包
+
+    键格式为 <prefix><namespace>:<key>，过期由服务端处理。每个线程一个阻塞连接，
+    超时较短（CACHE_REDIS_TIMEOUT），适合同机房 / 本机部署；条目数与占用不做统计（usage 返回 None）
+    """
+
+    kind = "redis"
+    max_update_attempts = 20
+
+    def __init__(self, url: str, prefix: str = "cache:", timeout: float = 0.2):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", ""):
+            raise ValueError(f"不支持的 Redis URL: {url}")
+        self.url = url
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+        super().__init__()
+
+    # ---------------- 连接与协议 ----------------
+
+    def _connection(self) -> Tuple[socket.socket, Any]:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = self._local.conn = (sock, sock.makefile("rb"))
+        try:
+            if self.password:
+                self._command("AUTH", self.password)
+            if self.db:
+                self._command("SELECT", str(self.db))
+        except Exception:
+            self._close()
+            raise
+        logger.info("[CacheBackend:redis] 已连接 %s:%s/%s", self.host, self.port, self.db)
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def _command(self, *parts) -> Any:
+        sock, reader = self._connection()
+        payload = [f"*{len(parts)}\r\n".encode()]
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            payload.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            sock.sendall(b"".join(payload))
+            return self._read_reply(reader)
+        except (OSError, CacheBackendError):
+            # 连接状态未知（可能残留未读回复），丢弃后由下次调用重连
+            self._close()
+            raise
+
+    def _read_reply(self, reader) -> Any:
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise CacheBackendError("连接已关闭")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body.decode("utf-8")
+        if prefix == b"-":
+            raise CacheBackendError(body.decode("utf-8", "replace"))
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(body)
+            return None if length < 0 else [self._read_reply(reader) for _ in range(length)]
+        raise CacheBackendError(f"无法解析的回复: {line[:32]!r}")
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    # ---------------- 读写 ----------------
+
+    def _get_raw(self, namespace: str, key: str) -> Optional[bytes]:
+        return self._command("GET", self._key(namespace, key))
+
+    def _set_raw(self, namespace: str, key: str, raw: bytes, ttl: float):
+        self._command("SET", self._key(namespace, key), raw, "PX", str(max(1, int(ttl * 1000))))
+
+    def _delete_raw(self, namespace: str, key: str):
+        self._command("DEL", self._key(namespace, key))
+
+    def _update_raw(self, namespace: str, key: str, apply: Callable[[Optional[bytes]], Tuple]) -> Any:
+        """乐观事务：WATCH → GET → MULTI / SET / EXEC，键在期间被修改时 EXEC 返回空并重试"""
+        full_key = self._key(namespace, key)
+        for _ in range(self.max_update_attempts):
+            self._command("WATCH", full_key)
+            raw, ttl, result = apply(self._command("GET", full_key))
+            if raw is None:
+                self._command("UNWATCH")
+                return result
+            self._command("MULTI")
+            self._command("SET", full_key, raw, "PX", str(max(1, int(ttl * 1000))))
+            if self._command("EXEC") is not None:
+                return result
+        raise CacheBackendError(f"读改写冲突重试 {self.max_update_attempts} 次仍未成功: {full_key}")
+
+    def _clear_raw(self, namespace: str):
+        pattern = self._key(namespace, "*")
+        cursor = "0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", pattern, "COUNT", "500")
+            cursor = cursor.decode() if isinstance(cursor, bytes) else cursor
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == "0":
+                break
+
+
+# ================================================================
+# 后端选择
+# ================================================================
+
+_shared: Dict[str, CacheBackend] = {}
+_shared_lock = threading.Lock()
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
+def backend_kind(name: Optional[str] = None) -> str:
+    """缓存使用的后端类型：CACHE_BACKEND_<NAME> 优先，其次 CACHE_BACKEND"""
+    kind = ""
+    if name:
+        kind = os.getenv(f"CACHE_BACKEND_{name.upper()}", "")
+    kind = (kind or os.getenv("CACHE_BACKEND", "memory")).strip().lower()
+    if kind not in BACKEND_KINDS:
+        logger.warning("[CacheBackend] 未知的后端类型 %s，使用 memory", kind)
+        return "memory"
+    return kind
+
+
+def shared_backend(kind: str) -> CacheBackend:
+    """进程内共享的 sqlite / redis 后端实例（首次使用时创建，连接延迟到首次读写）"""
+    backend = _shared.get(kind)
+    if backend is not None:
+        return backend
+
+    with _shared_lock:
+        backend = _shared.get(kind)
+        if backend is None:
+            if kind == "sqlite":
+                default_path = Path(__file__).parent.parent.parent / "data" / "cache.db"
+                backend = SQLiteBackend(
+                    os.getenv("CACHE_SQLITE_PATH", str(default_path)),
+                    max_bytes=_env_int("CACHE_MAX_BYTES")
+                )
+            elif kind == "redis":
+                backend = RedisBackend(
+                    os.getenv("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0"),
+                    prefix=os.getenv("CACHE_REDIS_PREFIX", "cache:"),
+                    timeout=float(os.getenv("CACHE_REDIS_TIMEOUT", "0.2"))
+                )
+            else:
+                raise ValueError(f"{kind} 不是共享后端")
+            _shared[kind] = backend
+        return backend
+
+
+def backend_for(name: str, max_entries: int = 1024) -> CacheBackend:
+    """
+    为指定缓存创建 / 获取后端
+
+    memory 时每个缓存独立一个 LRU（各自的容量上限），sqlite / redis 时所有缓存共用一个后端，按名称分区
+    """
+    kind = backend_kind(name)
+    if kind == "memory":
+        return MemoryBackend(max_entries=max_entries, max_bytes=_env_int("CACHE_MAX_BYTES"))
+    return shared_backend(kind)
+
+
+def is_shared(backend: Optional[CacheBackend]) -> bool:
+    """是否为跨进程共享的后端"""
+    return backend is not None and backend.kind != "memory"
+
+
+# ================================================================
+# 指标
+# ================================================================
+
+# 阻塞型后端（sqlite / redis）的占用快照：由 refresh_usage 在线程中查询，
+# 指标渲染在事件循环上进行，只读取快照，不做 I/O
+_usage_snapshot: Dict[int, Dict[str, Optional[Tuple[int, int]]]] = {}
+
+
+def _query_usage(targets: List[Tuple[CacheBackend, List[str]]]) -> Dict[int, Dict[str, Optional[Tuple[int, int]]]]:
+    return {id(backend): {namespace: backend.usage(namespace) for namespace in namespaces} for backend, namespaces in targets}
+
+
+async def refresh_usage():
+    """在线程中刷新阻塞型后端的占用快照（/metrics 渲染前调用）"""
+    targets = [(backend, list(backend.stats())) for backend in list(_backends) if backend.blocking]
+    if not targets:
+        return
+    snapshot = await asyncio.to_thread(_query_usage, targets)
+    _usage_snapshot.clear()
+    _usage_snapshot.update(snapshot)
+
+
+def _collect_metrics() -> List[Any]:
+    requests = Counter("cache_backend_requests_total", "缓存后端读取次数", ["backend", "cache", "result"])
+    errors = Counter("cache_backend_errors_total", "缓存后端读写失败次数", ["backend", "cache"])
+    transferred = Counter("cache_backend_bytes_total", "缓存后端读写字节数", ["backend", "cache", "direction"])
+    ratio = Gauge("cache_backend_hit_ratio", "缓存后端命中率", ["backend", "cache"])
+    entries = Gauge("cache_backend_entries", "缓存后端条目数", ["backend", "cache"])
+    size = Gauge("cache_backend_size_bytes", "缓存后端占用字节数", ["backend", "cache"])
+
+    totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+    usages: Dict[Tuple[str, str], List[int]] = {}
+    for backend in list(_backends):
+        for namespace, stats in backend.stats().items():
+            total = totals.setdefault((backend.kind, namespace), dict.fromkeys(stats, 0))
+            for field, value in stats.items():
+                total[field] += value
+            if backend.blocking:
+                usage = _usage_snapshot.get(id(backend), {}).get(namespace)
+            else:
+                usage = backend.usage(namespace)
+            if usage is not None:
+                current = usages.setdefault((backend.kind, namespace), [0, 0])
+                current[0] += usage[0]
+                current[1] += usage[1]
+
+    for (kind, namespace), total in totals.items():
+        labels = {"backend": kind, "cache": namespace}
+        requests.inc(total["hits"], result="hit", **labels)
+        requests.inc(total["misses"], result="miss", **labels)
+        errors.inc(total["errors"], **labels)
+        transferred.inc(total["bytes_read"], direction="read", **labels)
+        transferred.inc(total["bytes_written"], direction="write", **labels)
+        lookups = total["hits"] + total["misses"]
+        ratio.set(total["hits"] / lookups if lookups else 0.0, **labels)
+    for (kind, namespace), (count, used) in usages.items():
+        entries.set(count, backend=kind, cache=namespace)
+        size.set(used, backend=kind, cache=namespace)
+    return [requests, errors, transferred, ratio, entries, size]
+
+
+registry.register_collector(_collect_metrics)
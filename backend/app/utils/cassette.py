@@ -0,0 +1,232 @@
+"""
+录制 / 回放磁带 (Cassette)
+在 LLM 网关与搜索提供方处截获外部调用，使 /analyze-v2、/research-target-enhanced、/extract-causality
+等 Pipeline 的性能回归测试在不同提交之间可复现：
+- record：真实调用照常执行，同时把规范化请求、响应（或异常）与耗时追加写入磁带文件（JSON Lines，在线程中写入）
+- replay：按规范化请求的哈希查找录制结果并按原始耗时 × CASSETTE_LATENCY_SCALE 等待后返回，不访问外部接口；
+  同一请求录制了多次时按出现顺序依次返回（最后一条重复使用）
+- off：默认，直接调用
+
+环境变量：
+- CASSETTE_MODE：off / record / replay
+- CASSETTE_PATH：磁带文件，默认 data/cassettes/default.jsonl
+- CASSETTE_LATENCY_SCALE：回放耗时倍率，默认 1.0（0 表示不等待）
+- CASSETTE_ON_MISS：回放未命中时的处理，error（默认，抛出 CassetteMissError）/ passthrough（执行真实调用）
+"""
+
+import os
+import re
+import time
+import asyncio
+import inspect
+import hashlib
+import functools
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from app.utils import codec
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_CALLS_TOTAL = registry.counter(
+    "cassette_calls_total", "磁带录制 / 回放次数", ["kind", "result"]
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class CassetteMissError(Exception):
+    """回放模式下磁带中没有对应请求"""
+
+
+class CassetteRecordedError(Exception):
+    """回放录制时发生的异常（保留原异常类型名与消息）"""
+
+
+def normalize_request(value: Any) -> Any:
+    """规范化请求：字符串折叠连续空白并去除首尾空白，使提示词的缩进 / 换行差异不影响匹配"""
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {str(k): normalize_request(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [normalize_request(v) for v in value]
+    return value
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """请求键：kind + 规范化请求的 SHA-256"""
+    digest = hashlib.sha256(codec.dumps_canonical([kind, normalize_request(request)])).hexdigest()
+    return f"{kind}:{digest[:32]}"
+
+
+class Cassette:
+    """磁带：线程安全的 JSON Lines 追加写入 + 内存索引"""
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        path: Optional[str] = None,
+        latency_scale: Optional[float] = None,
+        on_miss: Optional[str] = None
+    ):
+        default_path = Path(__file__).parent.parent.parent / "data" / "cassettes" / "default.jsonl"
+        self.mode = (mode or os.getenv("CASSETTE_MODE", "off")).lower()
+        self.path = Path(path or os.getenv("CASSETTE_PATH", str(default_path)))
+        self.latency_scale = (
+            latency_scale if latency_scale is not None
+            else float(os.getenv("CASSETTE_LATENCY_SCALE", "1.0"))
+        )
+        self.on_miss = (on_miss or os.getenv("CASSETTE_ON_MISS", "error")).lower()
+
+        if self.mode not in ("off", "record", "replay"):
+            raise ValueError(f"不支持的 CASSETTE_MODE: {self.mode}")
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+
+        if self.mode == "replay":
+            self._load()
+        elif self.mode == "record":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            logger.info("[Cassette] 录制模式，写入 %s", self.path)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _load(self):
+        if not self.path.exists():
+            raise FileNotFoundError(f"磁带文件不存在: {self.path}")
+
+        count = 0
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = codec.loads(line)
+                self._entries.setdefault(entry["key"], []).append(entry)
+                count += 1
+        logger.info("[Cassette] 回放模式，载入 %s 条记录（%s 个请求）: %s", count, len(self._entries), self.path)
+
+    def _append(self, entry: Dict[str, Any]):
+        """追加一条记录（阻塞文件 I/O，经 asyncio.to_thread 调用）"""
+        line = codec.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return entries[min(cursor, len(entries) - 1)]
+
+    def is_live(self, kind: str, request: Dict[str, Any]) -> bool:
+        """本次调用是否会访问真实上游（关闭、录制，或回放未命中且 on_miss=passthrough）"""
+        if self.mode != "replay":
+            return True
+        with self._lock:
+            recorded = request_key(kind, request) in self._entries
+        return not recorded and self.on_miss == "passthrough"
+
+    def rewind(self):
+        """重置回放游标（同一进程内重复运行同一场景时使用）"""
+        with self._lock:
+            self._cursors.clear()
+
+    # ================================================================
+    # 调用入口
+    # ================================================================
+
+    async def run(
+        self,
+        kind: str,
+        request: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda value: value
+    ) -> Any:
+        """
+        按当前模式执行一次外部调用
+
+        Args:
+            kind: 调用类型，如 "llm"、"search:tavily"
+            request: 决定响应的请求参数（用于计算请求键，不含 api_key 等凭据）
+            call: 执行真实调用的无参协程函数
+            encode: 响应 → 可 JSON 序列化对象
+            decode: encode 的逆操作
+        """
+        if self.mode == "off":
+            return await call()
+
+        key = request_key(kind, request)
+
+        if self.mode == "replay":
+            entry = self._next(key)
+            if entry is None:
+                CASSETTE_CALLS_TOTAL.inc(kind=kind, result="miss")
+                if self.on_miss == "passthrough":
+                    logger.warning("[Cassette] 未命中，执行真实调用: %s", key)
+                    return await call()
+                raise CassetteMissError(f"磁带中没有该请求: {key}")
+
+            CASSETTE_CALLS_TOTAL.inc(kind=kind, result="hit")
+            delay = entry.get("latency", 0.0) * self.latency_scale
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if "error" in entry:
+                raise CassetteRecordedError(f"{entry['error']['type']}: {entry['error']['message']}")
+            return decode(entry["response"])
+
+        # record
+        start = time.perf_counter()
+        entry: Dict[str, Any] = {"key": key, "kind": kind, "request": normalize_request(request)}
+        try:
+            result = await call()
+            entry["response"] = encode(result)
+            return result
+        except Exception as e:
+            entry["error"] = {"type": type(e).__name__, "message": str(e)}
+            raise
+        finally:
+            # 被取消的调用没有结果，不写入
+            if "response" in entry or "error" in entry:
+                entry["latency"] = round(time.perf_counter() - start, 4)
+                await asyncio.to_thread(self._append, entry)
+                CASSETTE_CALLS_TOTAL.inc(kind=kind, result="recorded")
+
+
+# 全局实例
+cassette = Cassette()
+
+
+def cassette_search(engine: str):
+    """
+    搜索提供方装饰器：以 (engine, 查询参数) 为请求键录制 / 回放返回的结果列表
+
+    放在 @timed_search 之下，回放时仍记录搜索指标与追踪 Span（录制的延迟不含限速排队）
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            if not cassette.enabled:
+                return await func(self, *args, **kwargs)
+            # 绑定到形参名并补全默认值，位置参数与关键字参数调用得到相同的请求键
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            request = dict(list(bound.arguments.items())[1:])
+            return await cassette.run(f"search:{engine}", request, lambda: func(self, *args, **kwargs))
+        return wrapper
+
+    return decorator
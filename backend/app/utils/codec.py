@@ -0,0 +1,157 @@
+"""
+序列化编解码层 (Codec)
+统一 API 响应、LLM 输出解析、SSE/NDJSON 事件与存储层的 JSON 编解码：
+- 默认使用 orjson（比标准库快 3-10 倍），未安装时回退到标准库 json
+- 客户端通过 Accept: application/msgpack 协商 MessagePack 响应（需安装 msgpack）
+- 输出保持 UTF-8 原文（等价于 ensure_ascii=False）
+"""
+
+import json
+import contextvars
+from typing import Any, Mapping, Optional, Union
+
+from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 可选依赖
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ACCEPT = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    JSONDecodeError = orjson.JSONDecodeError  # 继承自 json.JSONDecodeError
+else:
+    JSONDecodeError = json.JSONDecodeError
+
+
+def backend() -> str:
+    """当前使用的 JSON 实现"""
+    return "orjson" if orjson is not None else "json"
+
+
+# ================================================================
+# JSON
+# ================================================================
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """解析 JSON（LLM 输出、请求体、存储内容）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """编码为 UTF-8 JSON 字节串（紧凑格式）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """编码为 JSON 字符串（SSE / NDJSON 事件、SQLite 存储）"""
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def dumps_canonical(obj: Any) -> bytes:
+    """规范化编码（键排序），相同内容得到相同字节串，用于计算 ETag 等内容哈希"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+# ================================================================
+# MessagePack
+# ================================================================
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def packb(obj: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack 未安装")
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    if msgpack is None:
+        raise RuntimeError("msgpack 未安装")
+    return msgpack.unpackb(data, raw=False)
+
+
+# ================================================================
+# 内容协商
+# ================================================================
+
+# 当前请求是否协商为 MessagePack（由 main.py 的中间件按 Accept 头设置）
+_prefer_msgpack: contextvars.ContextVar[bool] = contextvars.ContextVar("prefer_msgpack", default=False)
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """Accept 头中显式列出 MessagePack 且服务端支持时返回 True"""
+    if not accept or msgpack is None:
+        return False
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        if media_type.lower() in _MSGPACK_ACCEPT:
+            # q=0 表示明确拒绝
+            for param in params:
+                key, _, value = param.partition("=")
+                if key.strip() == "q":
+                    try:
+                        return float(value) > 0
+                    except ValueError:
+                        return False
+            return True
+    return False
+
+
+def negotiate(accept: Optional[str]) -> contextvars.Token:
+    """为当前请求设置响应格式，返回用于复位的 token"""
+    return _prefer_msgpack.set(accepts_msgpack(accept))
+
+
+def reset(token: contextvars.Token):
+    _prefer_msgpack.reset(token)
+
+
+def prefers_msgpack() -> bool:
+    """当前请求是否协商为 MessagePack"""
+    return _prefer_msgpack.get()
+
+
+class CodecResponse(JSONResponse):
+    """
+    默认响应类：orjson 编码 JSON，客户端协商时返回 MessagePack
+
+    作为 FastAPI 的 default_response_class，所有返回 dict/list 的接口自动生效
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None
+    ):
+        # 参数须显式声明：FastAPI 生成 OpenAPI 时按签名读取 status_code 的默认值
+        self.use_msgpack = prefers_msgpack()
+        if self.use_msgpack:
+            media_type = MSGPACK_MEDIA_TYPE
+        super().__init__(content, status_code, headers, media_type, background)
+        self.headers.add_vary_header("Accept")
+
+    def render(self, content: Any) -> bytes:
+        if self.use_msgpack:
+            return packb(content)
+        return dumps_bytes(content)
@@ -0,0 +1,136 @@
+"""
+响应压缩中间件 (Compression Middleware)
+富化图谱包含每个节点的 sources、snippet 与 narrative_context，压缩率很高：
+- 按 Accept-Encoding 选择 brotli（已安装时优先）或 gzip
+- 仅压缩超过阈值的一次性响应体；SSE / NDJSON 等流式响应原样透传，避免缓冲导致事件延迟
+- 为压缩后的表示追加 ETag 后缀（强 ETag 必须区分不同编码的字节）
+"""
+
+import os
+import gzip
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+# 不压缩的内容类型：流式事件与已压缩格式
+_SKIP_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson", "image/", "video/", "application/zip")
+
+
+def _parse_accept_encoding(value: str) -> List[str]:
+    """解析 Accept-Encoding，返回客户端可接受的编码（忽略 q=0）"""
+    encodings = []
+    for part in value.split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, raw = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(raw)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            encodings.append(name.lower())
+    return encodings
+
+
+class CompressionMiddleware:
+    """gzip / brotli 压缩中间件（纯 ASGI 实现）"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None
+    ):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else int(
+            os.getenv("COMPRESSION_MIN_SIZE", "1024")
+        )
+        self.gzip_level = gzip_level if gzip_level is not None else int(
+            os.getenv("COMPRESSION_GZIP_LEVEL", "6")
+        )
+        # brotli 质量 4-5 时压缩率优于 gzip 且速度相当，适合动态响应
+        self.brotli_quality = brotli_quality if brotli_quality is not None else int(
+            os.getenv("COMPRESSION_BROTLI_QUALITY", "4")
+        )
+
+    def _select_encoding(self, scope: Scope) -> Optional[str]:
+        accepted = _parse_accept_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._select_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or content_type.startswith(_SKIP_CONTENT_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # 推迟发送响应头，待看到响应体后再决定是否压缩
+                    start_message = message
+                return
+
+            if passthrough or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            pending_start, start_message = start_message, None
+
+            # 分块流式响应或小响应：不压缩
+            if more_body or len(body) < self.minimum_size:
+                passthrough = True
+                await send(pending_start)
+                await send(message)
+                return
+
+            compressed = self._compress(encoding, body)
+            headers = MutableHeaders(raw=list(pending_start["headers"]))
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["etag"] = f'{etag[:-1]}-{encoding}"'
+            pending_start["headers"] = headers.raw
+
+            await send(pending_start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,510 @@
+"""
+因果图计算核心 (CSR Graph Core)
+把 {nodes, edges} 图谱转换为整数节点编号 + CSR 邻接数组，供校验与结构分析使用，
+多次分析合并出的数千节点图谱也能在毫秒级完成：
+- 节点按出现顺序编号为 0..n-1，边存为 (src, dst, strength) 三个数组；重复边合并、保留最大强度
+- 出边 / 入边各一份 CSR（indptr + indices + 边编号），按节点取邻居为连续切片
+- 拓扑排序：按层的 Kahn 算法，每一层的入度扣减为一次向量化运算
+- 环检测：拓扑排序剩余的节点再剪去无后继者，剩下的节点都位于环上或环之间，沿后继走即可取出环
+- 传递归约（仅限无环图）：逆拓扑序计算可达集（Python 整数位集），边 u→v 可由 u 的其他后继到达 v 即冗余
+- 最强因果路径：路径得分 = 路径上各边 strength × 各节点 confidence 之积（对数域累加）；
+  逆拓扑序为每个节点保留到目标的前 k 条后缀（只存 (得分, 边, 名次) 指针，不复制路径），
+  节点处用堆合并各出边的候选，整体 O(m + n·k·log d)
+  有环时先按加权 Eades–Lin–Smyth 启发式断开一组反馈边（弱边优先），被断开的边随结果返回
+
+缺失的 strength / confidence 视为 1.0（不折损），取值裁剪到 [0, 1]。
+"""
+
+import math
+import heapq
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_WEIGHT = 1.0
+
+
+def _weight(value: Any) -> float:
+    """strength / confidence -> [0, 1] 浮点数（缺失或非数值按 DEFAULT_WEIGHT）"""
+    try:
+        weight = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_WEIGHT
+    if math.isnan(weight):
+        return DEFAULT_WEIGHT
+    return min(max(weight, 0.0), 1.0)
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """按 keys 分组 -> (indptr, 邻居, 边编号)"""
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return indptr, values[order], order
+
+
+def _expand(indptr: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """一组节点在 CSR 中的全部位置（各节点切片拼接）"""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(total, dtype=np.int64)
+
+
+class CausalGraphCore:
+    """整数编号 + CSR 邻接数组的因果图"""
+
+    def __init__(
+        self,
+        node_ids: List[str],
+        confidence: np.ndarray,
+        src: np.ndarray,
+        dst: np.ndarray,
+        strength: np.ndarray,
+        issues: Optional[List[Dict[str, Any]]] = None
+    ):
+        self.node_ids = node_ids
+        self.index = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.confidence = confidence
+        self.src = src
+        self.dst = dst
+        self.strength = strength
+        self.issues = issues or []
+
+        n = len(node_ids)
+        self.out_indptr, self.out_indices, self.out_edges = _csr(src, dst, n)
+        self.in_indptr, self.in_indices, self.in_edges = _csr(dst, src, n)
+
+    # ================================================================
+    # 构建
+    # ================================================================
+
+    @classmethod
+    def from_graph(cls, graph: Dict[str, Any], strict: bool = True) -> "CausalGraphCore":
+        """
+        从 {nodes, edges} 构建
+
+        Args:
+            graph: 图谱（节点需含 id，边需含 source / target）
+            strict: True 时边缺少字段或引用不存在的节点抛出 ValueError（与原有校验一致）；
+                    False 时跳过这些边并记入 issues
+
+        Raises:
+            ValueError: strict 模式下结构不合法时
+        """
+        issues: List[Dict[str, Any]] = []
+
+        index: Dict[str, int] = {}
+        node_ids: List[str] = []
+        confidence: List[float] = []
+        for i, node in enumerate(graph.get("nodes") or []):
+            if not isinstance(node, dict) or "id" not in node:
+                if strict:
+                    raise ValueError(f"节点 {i} 缺少必需字段 (id)")
+                issues.append({"type": "invalid_node", "message": f"节点 {i} 缺少 id，已忽略"})
+                continue
+            node_id = str(node["id"])
+            if node_id in index:
+                issues.append({"type": "duplicate_node", "message": f"节点 ID 重复: {node_id}，保留第一个"})
+                continue
+            index[node_id] = len(node_ids)
+            node_ids.append(node_id)
+            confidence.append(_weight(node.get("confidence")))
+
+        best: Dict[Tuple[int, int], float] = {}
+        for i, edge in enumerate(graph.get("edges") or []):
+            if not isinstance(edge, dict) or "source" not in edge or "target" not in edge:
+                if strict:
+                    raise ValueError(f"边 {i} 缺少必需字段 (source, target)")
+                issues.append({"type": "invalid_edge", "message": f"边 {i} 缺少 source / target，已忽略"})
+                continue
+
+            endpoints = []
+            for field, name in (("source", "源节点"), ("target", "目标节点")):
+                position = index.get(str(edge[field]))
+                if position is None:
+                    message = f"边 {i} 引用了不存在的{name}: {edge[field]}"
+                    if strict:
+                        raise ValueError(message)
+                    issues.append({"type": "dangling_edge", "message": message})
+                endpoints.append(position)
+            if None in endpoints:
+                continue
+
+            key = (endpoints[0], endpoints[1])
+            if key[0] == key[1]:
+                issues.append({"type": "self_loop", "message": f"边 {i} 是自环: {edge['source']}，已忽略"})
+                continue
+            strength = _weight(edge.get("strength"))
+            if key in best:
+                issues.append({
+                    "type": "duplicate_edge",
+                    "message": f"重复的边: {edge['source']} -> {edge['target']}，保留最大强度"
+                })
+                strength = max(strength, best[key])
+            best[key] = strength
+
+        pairs = np.array(list(best), dtype=np.int64).reshape(-1, 2)
+        return cls(
+            node_ids,
+            np.array(confidence, dtype=np.float64),
+            pairs[:, 0].copy(),
+            pairs[:, 1].copy(),
+            np.fromiter(best.values(), dtype=np.float64, count=len(best)),
+            issues
+        )
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.src)
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.out_indptr)
+
+    def in_degree(self) -> np.ndarray:
+        return np.diff(self.in_indptr)
+
+    def successors(self, node: int) -> np.ndarray:
+        return self.out_indices[self.out_indptr[node]:self.out_indptr[node + 1]]
+
+    # ================================================================
+    # 拓扑排序与环检测
+    # ================================================================
+
+    def _kahn(self, active: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按层 Kahn 拓扑排序（active 为参与计算的边掩码）
+
+        Returns:
+            (拓扑序, 各节点层号)；位于环上或只能经环到达的节点不在拓扑序中，层号为 -1
+        """
+        n = self.node_count
+        if active is None:
+            indegree = self.in_degree().copy()
+        else:
+            indegree = np.bincount(self.dst[active], minlength=n)
+        level = np.full(n, -1, dtype=np.int64)
+        frontier = np.flatnonzero(indegree == 0)
+        layers = []
+        depth = 0
+        while frontier.size:
+            level[frontier] = depth
+            layers.append(frontier)
+            positions = _expand(self.out_indptr, frontier)
+            if active is not None:
+                positions = positions[active[self.out_edges[positions]]]
+            targets = self.out_indices[positions]
+            np.subtract.at(indegree, targets, 1)
+            frontier = np.unique(targets[indegree[targets] == 0])
+            depth += 1
+        order = np.concatenate(layers) if layers else np.zeros(0, dtype=np.int64)
+        return order, level
+
+    def topological_order(self) -> Optional[List[str]]:
+        """拓扑序（节点 ID）；有环时返回 None"""
+        order, _ = self._kahn()
+        if order.size < self.node_count:
+            return None
+        return [self.node_ids[i] for i in order.tolist()]
+
+    def levels(self) -> Optional[np.ndarray]:
+        """各节点的层号（到最远根节点的边数）；有环时返回 None"""
+        order, level = self._kahn()
+        return level if order.size == self.node_count else None
+
+    def _cyclic_nodes(self) -> np.ndarray:
+        """拓扑排序剩余节点中，再剪去（在剩余子图内）无后继的节点 -> 环上及环之间的节点掩码"""
+        _, level = self._kahn()
+        remaining = level < 0
+        if not remaining.any():
+            return remaining
+
+        edges = remaining[self.src] & remaining[self.dst]
+        outdegree = np.bincount(self.src[edges], minlength=self.node_count)
+        frontier = np.flatnonzero(remaining & (outdegree == 0))
+        while frontier.size:
+            remaining[frontier] = False
+            positions = _expand(self.in_indptr, frontier)
+            positions = positions[edges[self.in_edges[positions]]]
+            sources = self.in_indices[positions]
+            np.subtract.at(outdegree, sources, 1)
+            frontier = np.unique(sources[remaining[sources] & (outdegree[sources] == 0)])
+        return remaining
+
+    def _walk_cycle(self, start: int, cyclic: np.ndarray) -> List[int]:
+        """从环上节点出发，沿剩余子图中的后继行走直到重复 -> 环上的边编号"""
+        seen: Dict[int, int] = {}
+        path_edges: List[int] = []
+        node = start
+        while node not in seen:
+            seen[node] = len(path_edges)
+            lo, hi = self.out_indptr[node], self.out_indptr[node + 1]
+            for position in range(lo, hi):
+                edge = int(self.out_edges[position])
+                if cyclic[self.dst[edge]]:
+                    break
+            path_edges.append(edge)
+            node = int(self.dst[edge])
+        return path_edges[seen[node]:]
+
+    def find_cycles(self, limit: int = 10) -> List[List[str]]:
+        """
+        找出图中的环（最多 limit 个，互不共享起点）
+
+        Returns:
+            每个环为节点 ID 列表（首尾节点相连）；无环时为空列表
+        """
+        cyclic = self._cyclic_nodes()
+        cycles = []
+        visited = np.zeros(self.node_count, dtype=bool)
+        for start in np.flatnonzero(cyclic).tolist():
+            if len(cycles) >= limit:
+                break
+            if visited[start]:
+                continue
+            edges = self._walk_cycle(start, cyclic)
+            nodes = [int(self.src[edge]) for edge in edges]
+            visited[nodes] = True
+            cycles.append([self.node_ids[i] for i in nodes])
+        return cycles
+
+    def break_cycles(self) -> Tuple[np.ndarray, List[int]]:
+        """
+        断开反馈边使图无环（加权 Eades–Lin–Smyth 启发式，O((n+m) log n)）
+
+        只处理环上及环之间的节点：反复把汇点放到序列尾部、源点放到头部，
+        否则取 (出边强度和 - 入边强度和) 最大的节点放到头部；最后逆序的边即为断开的边，
+        强边尽量顺序保留、弱边优先被断开。
+
+        Returns:
+            (保留边的掩码, 被断开的边编号)
+        """
+        active = np.ones(self.edge_count, dtype=bool)
+        cyclic = self._cyclic_nodes()
+        if not cyclic.any():
+            return active, []
+
+        inside = cyclic[self.src] & cyclic[self.dst]
+        n = self.node_count
+        weight_out = np.bincount(self.src[inside], weights=self.strength[inside], minlength=n).tolist()
+        weight_in = np.bincount(self.dst[inside], weights=self.strength[inside], minlength=n).tolist()
+        out_count = np.bincount(self.src[inside], minlength=n).tolist()
+        in_count = np.bincount(self.dst[inside], minlength=n).tolist()
+        inside_list = inside.tolist()
+        strength = self.strength.tolist()
+
+        remaining = set(np.flatnonzero(cyclic).tolist())
+        heap = [(weight_in[node] - weight_out[node], node) for node in remaining]
+        heapq.heapify(heap)
+        sinks = [node for node in remaining if out_count[node] == 0]
+        sources = [node for node in remaining if in_count[node] == 0]
+        head: List[int] = []
+        tail: List[int] = []
+
+        def remove(node: int):
+            remaining.discard(node)
+            lo, hi = self.out_indptr[node], self.out_indptr[node + 1]
+            for edge, child in zip(self.out_edges[lo:hi].tolist(), self.out_indices[lo:hi].tolist()):
+                if inside_list[edge] and child in remaining:
+                    in_count[child] -= 1
+                    weight_in[child] -= strength[edge]
+                    if in_count[child] == 0:
+                        sources.append(child)
+                    heapq.heappush(heap, (weight_in[child] - weight_out[child], child))
+            lo, hi = self.in_indptr[node], self.in_indptr[node + 1]
+            for edge, parent in zip(self.in_edges[lo:hi].tolist(), self.in_indices[lo:hi].tolist()):
+                if inside_list[edge] and parent in remaining:
+                    out_count[parent] -= 1
+                    weight_out[parent] -= strength[edge]
+                    if out_count[parent] == 0:
+                        sinks.append(parent)
+                    heapq.heappush(heap, (weight_in[parent] - weight_out[parent], parent))
+
+        while remaining:
+            while sinks or sources:
+                if sinks:
+                    node = sinks.pop()
+                    if node in remaining:
+                        tail.append(node)
+                        remove(node)
+                else:
+                    node = sources.pop()
+                    if node in remaining:
+                        head.append(node)
+                        remove(node)
+            while heap:
+                key, node = heapq.heappop(heap)
+                # 惰性删除：已移除或键值已过期的条目跳过
+                if node in remaining and key == weight_in[node] - weight_out[node]:
+                    head.append(node)
+                    remove(node)
+                    break
+
+        position = np.zeros(n, dtype=np.int64)
+        position[head + tail[::-1]] = np.arange(len(head) + len(tail))
+        backward = inside & (position[self.src] > position[self.dst])
+        active[backward] = False
+        return active, np.flatnonzero(backward).tolist()
+
+    # ================================================================
+    # 传递归约
+    # ================================================================
+
+    def transitive_reduction(self) -> List[int]:
+        """
+        传递归约：可由其他路径推出的冗余边（u→v 且 u 经其他后继可达 v）
+
+        Returns:
+            冗余边编号列表（删除后可达关系不变）
+
+        Raises:
+            ValueError: 图中有环时（有环图的传递归约不唯一）
+        """
+        order, _ = self._kahn()
+        if order.size < self.node_count:
+            raise ValueError("图中存在环，无法计算传递归约")
+
+        # reach[u]：u 经至少一条边可达的节点位集
+        reach = [0] * self.node_count
+        redundant = []
+        for node in reversed(order.tolist()):
+            lo, hi = self.out_indptr[node], self.out_indptr[node + 1]
+            if lo == hi:
+                continue
+            via = 0
+            direct = 0
+            for child in self.out_indices[lo:hi].tolist():
+                via |= reach[child]
+                direct |= 1 << child
+            reach[node] = via | direct
+            if via:
+                for position in range(lo, hi):
+                    if (via >> int(self.out_indices[position])) & 1:
+                        redundant.append(int(self.out_edges[position]))
+        return sorted(redundant)
+
+    # ================================================================
+    # 最强因果路径
+    # ================================================================
+
+    def top_paths(
+        self,
+        target: int,
+        k: int = 5,
+        roots_only: bool = True
+    ) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        到目标节点得分最高的 k 条路径
+
+        Args:
+            target: 目标节点编号
+            k: 路径数量
+            roots_only: True 时只计入从根节点（无入边）出发的完整因果链，
+                        否则任意节点出发的路径都参与排名（短路径天然得分更高）
+
+        Returns:
+            ([{"nodes": [节点编号...], "edges": [边编号...], "score": 得分}], 为去环断开的边编号)
+        """
+        active, removed = self.break_cycles()
+        log_strength = np.full(self.edge_count, -np.inf)
+        np.log(self.strength, out=log_strength, where=self.strength > 0)
+        log_confidence = np.full(self.node_count, -np.inf)
+        np.log(self.confidence, out=log_confidence, where=self.confidence > 0)
+        usable = active & np.isfinite(log_strength)
+
+        # 目标的祖先（只沿可用边），逆拓扑序处理
+        ancestor = np.zeros(self.node_count, dtype=bool)
+        ancestor[target] = True
+        frontier = np.array([target], dtype=np.int64)
+        while frontier.size:
+            positions = _expand(self.in_indptr, frontier)
+            positions = positions[usable[self.in_edges[positions]]]
+            sources = np.unique(self.in_indices[positions])
+            frontier = sources[~ancestor[sources]]
+            ancestor[frontier] = True
+
+        order, _ = self._kahn(active)
+        # best[u]：u 到目标的前 k 条后缀 (对数得分, 出边, 后继中的名次)，得分含 u 自身的 confidence
+        best: Dict[int, List[Tuple[float, int, int]]] = {target: [(float(log_confidence[target]), -1, -1)]}
+        for node in reversed(order.tolist()):
+            if node == target or not ancestor[node] or not math.isfinite(log_confidence[node]):
+                continue
+            heap = []
+            for position in range(self.out_indptr[node], self.out_indptr[node + 1]):
+                edge = int(self.out_edges[position])
+                child = int(self.out_indices[position])
+                if usable[edge] and child in best:
+                    base = float(log_confidence[node] + log_strength[edge])
+                    heap.append((-(base + best[child][0][0]), edge, 0, base))
+            if not heap:
+                continue
+            heapq.heapify(heap)
+            suffixes = []
+            while heap and len(suffixes) < k:
+                negative, edge, rank, base = heapq.heappop(heap)
+                suffixes.append((-negative, edge, rank))
+                child_suffixes = best[int(self.dst[edge])]
+                if rank + 1 < len(child_suffixes):
+                    heapq.heappush(heap, (-(base + child_suffixes[rank + 1][0]), edge, rank + 1, base))
+            best[node] = suffixes
+
+        in_degree = np.bincount(self.dst[usable], minlength=self.node_count)
+        starts = [
+            node for node in best
+            if node != target and (not roots_only or in_degree[node] == 0)
+        ]
+        heap = [(-best[node][0][0], node, 0) for node in starts]
+        heapq.heapify(heap)
+        paths = []
+        while heap and len(paths) < k:
+            negative, node, rank = heapq.heappop(heap)
+            paths.append(self._path(best, node, rank, -negative))
+            if rank + 1 < len(best[node]):
+                heapq.heappush(heap, (-best[node][rank + 1][0], node, rank + 1))
+        return paths, removed
+
+    def _path(
+        self,
+        best: Dict[int, List[Tuple[float, int, int]]],
+        node: int,
+        rank: int,
+        log_score: float
+    ) -> Dict[str, Any]:
+        """沿 (出边, 名次) 指针还原路径"""
+        nodes = [node]
+        edges = []
+        _, edge, rank = best[node][rank]
+        while edge >= 0:
+            edges.append(edge)
+            node = int(self.dst[edge])
+            nodes.append(node)
+            _, edge, rank = best[node][rank]
+        return {"nodes": nodes, "edges": edges, "score": math.exp(log_score)}
+
+    # ================================================================
+    # 校验报告
+    # ================================================================
+
+    def validate(self, cycle_limit: int = 10) -> Dict[str, Any]:
+        """结构校验报告：规模、构建时发现的问题、环、孤立节点、根 / 叶节点数"""
+        in_degree = self.in_degree()
+        out_degree = self.out_degree()
+        cycles = self.find_cycles(cycle_limit)
+        isolated = np.flatnonzero((in_degree == 0) & (out_degree == 0)).tolist()
+        return {
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "acyclic": not cycles,
+            "cycles": cycles,
+            "isolated_nodes": [self.node_ids[i] for i in isolated],
+            "roots": int(((in_degree == 0) & (out_degree > 0)).sum()),
+            "sinks": int(((out_degree == 0) & (in_degree > 0)).sum()),
+            "issues": self.issues
+        }
@@ -0,0 +1,204 @@
+"""
+分层布局 (Sugiyama Layered Layout)
+在后端为因果图谱计算分层布局，替代前端主线程上的 dagre：
+1. 去环：按 CausalGraphCore.break_cycles 求出反馈边，布局时反向处理（不删除）
+2. 分层：最长路径分层（按层 Kahn），根节点再下拉到其最近的子节点前一层，缩短长边
+3. 虚拟节点：跨越多层的边拆成逐层相连的虚拟节点链，参与排序与坐标分配
+4. 交叉最小化：逐层重心法（barycenter），上下交替扫描
+5. 坐标分配：层内按目标位置（相邻层邻居坐标均值）做保序、满足最小间距的最小二乘放置（PAV 保序回归）
+
+节点尺寸与间距与前端 layoutUtils.js 一致（220 × 100，层内间距 80，层间距 120，边距 20），
+返回节点左上角坐标，可直接作为 React Flow 的 position。
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from app.utils.graph_core import CausalGraphCore
+
+NODE_WIDTH = 220
+NODE_HEIGHT = 100
+NODE_SEP = 80
+RANK_SEP = 120
+MARGIN = 20
+
+DIRECTIONS = ("LR", "RL", "TB", "BT")
+SWEEPS = 4
+
+
+def _layers(core: CausalGraphCore) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """去环后的边 (src, dst) 与各节点层号"""
+    active, _ = core.break_cycles()
+    src = np.where(active, core.src, core.dst)
+    dst = np.where(active, core.dst, core.src)
+    dag = CausalGraphCore(core.node_ids, core.confidence, src, dst, core.strength)
+
+    level = dag.levels()
+    if level is None:
+        # 反向后仍有环（理论上不会出现），退化为单层
+        level = np.zeros(core.node_count, dtype=np.int64)
+
+    # 无入边的根节点下拉到最近子节点的前一层
+    roots = (dag.in_degree() == 0) & (dag.out_degree() > 0)
+    nearest = np.full(core.node_count, np.iinfo(np.int64).max)
+    np.minimum.at(nearest, src, level[dst])
+    level = np.where(roots, nearest - 1, level)
+    return src, dst, level
+
+
+def _expand_long_edges(
+    src: np.ndarray, dst: np.ndarray, level: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """跨层边拆成虚拟节点链 -> (相邻层线段上端, 下端, 全部顶点层号)"""
+    n = len(level)
+    span = level[dst] - level[src]
+    total = int(span.sum())
+    segment_edge = np.repeat(np.arange(len(src)), span)
+    step = np.arange(total) - np.repeat(np.cumsum(span) - span, span)
+
+    # 每条边的虚拟节点编号从 dummy_base 开始连续分配（span - 1 个）
+    dummy_base = n + np.cumsum(span - 1) - (span - 1)
+    base = dummy_base[segment_edge]
+    upper = np.where(step == 0, src[segment_edge], base + step - 1)
+    lower = np.where(step == span[segment_edge] - 1, dst[segment_edge], base + step)
+
+    dummy_level = (level[src][segment_edge] + step)[step > 0]
+    return upper, lower, np.concatenate([level, dummy_level])
+
+
+def _group(keys: np.ndarray, count: int) -> List[np.ndarray]:
+    """按键值 0..count-1 分组的下标（组内保持原顺序）"""
+    order = np.argsort(keys, kind="stable")
+    bounds = np.searchsorted(keys[order], np.arange(count + 1))
+    return [order[bounds[i]:bounds[i + 1]] for i in range(count)]
+
+
+def _place(desired: np.ndarray, gaps: np.ndarray) -> np.ndarray:
+    """
+    保序放置：min Σ(x_i - desired_i)²，约束 x_{i+1} - x_i >= gaps_i
+
+    令 y_i = x_i - Σ_{j<i} gaps_j，约束化为 y 单调不减，即对 desired - 累计间距做保序回归（PAV）
+    """
+    offsets = np.concatenate([[0.0], np.cumsum(gaps)])
+    target = desired - offsets
+    if len(target) < 2 or (np.diff(target) >= 0).all():
+        return desired
+
+    means: List[float] = []
+    counts: List[int] = []
+    for value in target.tolist():
+        count = 1
+        while means and means[-1] > value:
+            previous_count = counts.pop()
+            value = (means.pop() * previous_count + value * count) / (previous_count + count)
+            count += previous_count
+        means.append(value)
+        counts.append(count)
+    fitted = np.repeat(means, counts)
+    return fitted + offsets
+
+
+def layered_layout(core: CausalGraphCore, direction: str = "LR") -> Tuple[np.ndarray, float, float]:
+    """
+    计算分层布局
+
+    Args:
+        core: 因果图（节点顺序即布局的初始顺序）
+        direction: LR（左到右）/ RL / TB（上到下）/ BT
+
+    Returns:
+        (各节点左上角坐标 (n, 2), 画布宽, 画布高)
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"不支持的布局方向: {direction}")
+
+    n = core.node_count
+    if n == 0:
+        return np.zeros((0, 2)), 0.0, 0.0
+
+    horizontal = direction in ("LR", "RL")
+    node_extent = NODE_HEIGHT if horizontal else NODE_WIDTH   # 层内方向上的尺寸
+    rank_step = (NODE_WIDTH if horizontal else NODE_HEIGHT) + RANK_SEP
+
+    src, dst, level = _layers(core)
+    upper, lower, vertex_level = _expand_long_edges(src, dst, level)
+    vertex_count = len(vertex_level)
+    extent = np.where(np.arange(vertex_count) < n, float(node_extent), 0.0)
+
+    # 按层分组（层内初始顺序：真实节点按输入顺序在前，虚拟节点随后）
+    layer_count = int(vertex_level.max()) + 1
+    layers = _group(vertex_level, layer_count)
+
+    # 相邻层线段按下端 / 上端所在层分组
+    segment_by_lower = _group(vertex_level[lower], layer_count)
+    segment_by_upper = _group(vertex_level[upper], layer_count)
+
+    # ---------------- 交叉最小化：重心法 ----------------
+    order = np.zeros(vertex_count, dtype=np.float64)
+    for members in layers:
+        order[members] = np.arange(len(members))
+
+    def reorder(index: int, segments: np.ndarray, own: np.ndarray, other: np.ndarray):
+        members = layers[index]
+        if not len(segments):
+            return
+        total = np.bincount(own[segments], weights=order[other[segments]], minlength=vertex_count)[members]
+        count = np.bincount(own[segments], minlength=vertex_count)[members]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            barycenter = np.where(count > 0, total / count, order[members])
+        members = members[np.lexsort((order[members], barycenter))]
+        layers[index] = members
+        order[members] = np.arange(len(members))
+
+    for sweep in range(SWEEPS):
+        if sweep % 2 == 0:
+            for index in range(1, layer_count):
+                reorder(index, segment_by_lower[index], lower, upper)
+        else:
+            for index in range(layer_count - 2, -1, -1):
+                reorder(index, segment_by_upper[index], upper, lower)
+
+    # ---------------- 坐标分配 ----------------
+    coordinate = np.zeros(vertex_count, dtype=np.float64)
+
+    def gaps_of(members: np.ndarray) -> np.ndarray:
+        sizes = extent[members]
+        real = members < n
+        separation = np.where(real[:-1] & real[1:], NODE_SEP, NODE_SEP / 2)
+        return (sizes[:-1] + sizes[1:]) / 2 + separation
+
+    for members in layers:
+        if len(members):
+            coordinate[members] = np.concatenate([[0.0], np.cumsum(gaps_of(members))])
+
+    neighbor_passes = [(lower, upper, segment_by_lower), (upper, lower, segment_by_upper)]
+    for sweep in range(SWEEPS):
+        own, other, groups = neighbor_passes[sweep % 2]
+        indices = range(layer_count) if sweep % 2 == 0 else range(layer_count - 1, -1, -1)
+        for index in indices:
+            members = layers[index]
+            segments = groups[index]
+            if not len(segments):
+                continue
+            total = np.bincount(own[segments], weights=coordinate[other[segments]], minlength=vertex_count)[members]
+            count = np.bincount(own[segments], minlength=vertex_count)[members]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                desired = np.where(count > 0, total / count, coordinate[members])
+            coordinate[members] = _place(desired, gaps_of(members))
+
+    # ---------------- 输出（真实节点左上角） ----------------
+    along = coordinate[:n] - node_extent / 2
+    along -= along.min()
+    rank = level.astype(np.float64) * rank_step
+    rank -= rank.min()
+    if direction in ("RL", "BT"):
+        rank = rank.max() - rank
+
+    if horizontal:
+        positions = np.stack([rank, along], axis=1) + MARGIN
+    else:
+        positions = np.stack([along, rank], axis=1) + MARGIN
+    width = float(positions[:, 0].max()) + NODE_WIDTH + MARGIN
+    height = float(positions[:, 1].max()) + NODE_HEIGHT + MARGIN
+    return positions, width, height
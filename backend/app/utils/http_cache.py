@@ -0,0 +1,72 @@
+"""
+HTTP 条件请求工具 (ETag / If-None-Match)
+移动端仪表盘反复拉取同一张图谱，强 ETag 由图谱的规范哈希计算，
+内容未变化时返回 304，不再重复下发完整图谱。
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from app.utils import codec
+
+# 压缩中间件会为压缩后的表示追加后缀（不同编码的字节不同，强 ETag 必须区分），比较时忽略
+_ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def compute_etag(content: Any) -> str:
+    """
+    计算强 ETag：规范 JSON（键排序）的 SHA-256
+
+    JSON 与 MessagePack 是同一内容的不同表示，ETag 需区分
+    """
+    digest = hashlib.sha256(codec.dumps_canonical(content)).hexdigest()[:32]
+    if codec.prefers_msgpack():
+        digest += "-msgpack"
+    return f'"{digest}"'
+
+
+def _strip_encoding_suffix(etag: str) -> str:
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for suffix in _ENCODING_SUFFIXES:
+        if etag.endswith(f'{suffix}"'):
+            return etag[:-len(suffix) - 1] + '"'
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（支持多个 ETag 与 *）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        _strip_encoding_suffix(candidate) == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def conditional_response(
+    request: Request,
+    content: Any,
+    etag: Optional[str] = None,
+    status_code: int = 200
+) -> Response:
+    """
+    构造支持条件请求的响应
+
+    Args:
+        request: 当前请求（读取 If-None-Match）
+        content: 响应内容
+        etag: 预先计算的 ETag（不提供则按 content 计算）
+    """
+    etag = etag or compute_etag(content)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return codec.CodecResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,44 @@
+"""
+JSON Patch (RFC 6902) 生成工具
+用于增量刷新接口：只下发发生变化的字段，而不是整张图谱
+"""
+
+from typing import Any, Dict, List
+
+
+def escape_pointer(token: str) -> str:
+    """JSON Pointer (RFC 6901) 路径片段转义"""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def make_patch(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    生成从 old 到 new 的 JSON Patch 操作列表
+
+    对象按键递归比较；数组与标量整体替换（节点状态中的数组如 sources 通常整体变化）
+
+    Args:
+        old: 原文档（片段）
+        new: 新文档（片段）
+        path: 片段在完整文档中的 JSON Pointer 路径
+
+    Returns:
+        add / remove / replace 操作列表，old 与 new 相同时为空列表
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[Dict[str, Any]] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{escape_pointer(key)}"})
+        for key, value in new.items():
+            child_path = f"{path}/{escape_pointer(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child_path, "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, child_path))
+        return ops
+
+    if old == new and type(old) is type(new):
+        return []
+
+    return [{"op": "replace", "path": path, "value": new}]
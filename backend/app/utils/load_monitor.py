@@ -0,0 +1,28 @@
+"""
+交互负载监控
+统计正在处理的交互式 API 请求数，供后台低优先级任务（如关注列表预热）让路
+"""
+
+import os
+
+
+class LoadMonitor:
+    """进程内交互请求计数器"""
+
+    def __init__(self, busy_threshold: int = None):
+        self.in_flight = 0
+        self.busy_threshold = busy_threshold or int(os.getenv("INTERACTIVE_BUSY_THRESHOLD", "4"))
+
+    def request_started(self):
+        self.in_flight += 1
+
+    def request_finished(self):
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def is_busy(self) -> bool:
+        """交互请求数达到阈值时视为高负载"""
+        return self.in_flight >= self.busy_threshold
+
+
+# 全局实例：由 main.py 中间件更新
+load_monitor = LoadMonitor()
@@ -0,0 +1,176 @@
+"""
+日志子系统 (Logging Setup)
+服务在事件循环中按节点 / 搜索 / 阶段输出大量 INFO 日志，同步写入 stderr 会阻塞事件循环：
+- 队列化：调用方只把 LogRecord 放入内存队列，格式化与 I/O 在 QueueListener 后台线程完成
+- 惰性格式化：调用方使用 %-style 参数（logger.info("... %s", x)），消息在后台线程才拼接；
+  被级别或采样丢弃的记录完全不做格式化
+- 采样：逐节点的过程性日志通过 sampled_logger() 标记，按 LOG_SAMPLE_RATE 抽样保留，WARNING 及以上始终保留
+- 请求关联：每条记录附带当前请求的 request_id（HTTP 中间件 / 后台任务绑定）
+- 结构化：LOG_FORMAT=json 时输出 JSON 行，extra 字段（node / engine 等）原样保留
+
+在 main.py 导入其他模块之前调用 configure_logging()。
+"""
+
+import os
+import sys
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from app.utils import codec
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# LogRecord 的标准属性，其余属性视为 extra 结构化字段
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "sampled"
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_sample_rate = 1.0
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def bind_request_id(request_id: str):
+    """绑定当前上下文的 request_id，返回用于 reset_request_id 的 token"""
+    return request_id_var.set(request_id)
+
+
+def reset_request_id(token):
+    request_id_var.reset(token)
+
+
+# ================================================================
+# 过滤器与格式化器
+# ================================================================
+
+class RequestIdFilter(logging.Filter):
+    """在调用方线程读取 contextvar，把 request_id 写入记录"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON 行格式：ts / level / logger / request_id / msg + extra 字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event: Dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                event[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_info:
+            event["exc"] = self.formatException(record.exc_info)
+        return codec.dumps(event)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    不在调用方线程格式化的 QueueHandler
+
+    标准 QueueHandler.prepare() 会在入队前调用 format() 拼接消息，
+    这里直接入队原始记录，由 QueueListener 线程上的处理器格式化
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _SampledAdapter(logging.LoggerAdapter):
+    """
+    采样 Logger：INFO / DEBUG 记录按 _sample_rate 抽样，WARNING 及以上始终保留
+
+    抽样发生在创建 LogRecord 之前，被丢弃的记录没有任何格式化或入队开销
+    """
+
+    def log(self, level, msg, *args, **kwargs):
+        if level < logging.WARNING and _sample_rate < 1.0 and random.random() >= _sample_rate:
+            return
+        super().log(level, msg, *args, **kwargs)
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**kwargs.get("extra", {}), "sampled": True}
+        return msg, kwargs
+
+
+def sampled_logger(logger: logging.Logger) -> logging.LoggerAdapter:
+    """
+    返回逐节点 / 逐搜索过程性日志使用的采样 Logger
+
+    例：node_logger.info("[Stage 1] 白名单优先搜索 - 节点: %s", label, extra={"node": label})
+    """
+    return _SampledAdapter(logger, {})
+
+
+# ================================================================
+# 初始化
+# ================================================================
+
+def configure_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    sample_rate: Optional[float] = None,
+    stream=None
+) -> logging.handlers.QueueListener:
+    """
+    配置根 Logger：QueueHandler（调用方） → QueueListener 线程 → StreamHandler
+
+    重复调用会先停止旧的监听线程
+
+    Args:
+        level: 日志级别，默认 LOG_LEVEL（INFO）
+        fmt: "text" 或 "json"，默认 LOG_FORMAT（text）
+        sample_rate: 采样日志保留比例，默认 LOG_SAMPLE_RATE（0.1）
+        stream: 输出流，默认 stderr
+    """
+    global _listener, _sample_rate
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.getenv("LOG_FORMAT", "text")
+    sample_rate = sample_rate if sample_rate is not None else float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+    _stop_listener()
+    _sample_rate = sample_rate
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(
+            "%(asctime)s [%(levelname)s] %(name)s [%(request_id)s]: %(message)s"
+        ))
+
+    # 无界队列：put 不阻塞事件循环；监听线程落后时积压在内存中
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    queue_handler = _LazyQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
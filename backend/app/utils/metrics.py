@@ -0,0 +1,284 @@
+"""
+进程内指标注册表 (Metrics Registry)
+以 Prometheus 文本格式暴露在 /metrics，用于定位真实瓶颈：
+- Pipeline 各阶段耗时、LLM 延迟与 Token（按模型 / 调用点）、搜索延迟（按引擎）、Yahoo 延迟
+- 所有缓存的命中/未命中次数与命中率（缓存对象注册后在抓取时汇总）
+- 进行中请求数、信号量排队等待时间
+
+无第三方依赖；指标只在事件循环线程中更新。
+"""
+
+import time
+import asyncio
+import functools
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterable
+
+from app.utils.tracing import span
+
+# 默认直方图分桶（秒）：覆盖缓存命中的毫秒级到 deepseek-reasoner 的分钟级
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """进行中计数：进入 +1，退出 -1"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["buckets"][i] += 1
+                break
+        state["sum"] += value
+        state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """计时上下文（同步与异步代码块均可使用）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, state in sorted(self._values.items()):
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表：按名称获取或创建指标，抓取时汇总缓存与收集器"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+        # 缓存对象（需提供 stats()），弱引用避免阻止回收
+        self._caches: "weakref.WeakSet" = weakref.WeakSet()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"指标 {name} 已注册为 {metric.metric_type}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def register_collector(self, collector: Callable[[], Iterable[_Metric]]):
+        """注册抓取时调用的收集器（返回临时构造的指标）"""
+        self._collectors.append(collector)
+
+    def register_cache(self, cache: Any):
+        """注册缓存对象：stats() 需返回 name / size / hits / misses"""
+        self._caches.add(cache)
+
+    def _collect_caches(self) -> List[_Metric]:
+        totals: Dict[str, Dict[str, float]] = {}
+        for cache in list(self._caches):
+            stats = cache.stats()
+            total = totals.setdefault(stats["name"], {"size": 0, "hits": 0, "misses": 0})
+            for field in total:
+                total[field] += stats.get(field, 0)
+
+        hits = Counter("cache_hits_total", "缓存命中次数", ["cache"])
+        misses = Counter("cache_misses_total", "缓存未命中次数", ["cache"])
+        size = Gauge("cache_entries", "缓存条目数", ["cache"])
+        ratio = Gauge("cache_hit_ratio", "缓存命中率", ["cache"])
+        for name, total in totals.items():
+            hits.inc(total["hits"], cache=name)
+            misses.inc(total["misses"], cache=name)
+            size.set(total["size"], cache=name)
+            lookups = total["hits"] + total["misses"]
+            ratio.set(total["hits"] / lookups if lookups else 0.0, cache=name)
+        return [hits, misses, size, ratio]
+
+    def render(self) -> str:
+        """Prometheus 文本格式 (text/plain; version=0.0.4)"""
+        metrics = list(self._metrics.values()) + self._collect_caches()
+        for collector in self._collectors:
+            metrics.extend(collector())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局注册表
+registry = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette 追加 charset=utf-8
+
+
+# ================================================================
+# 通用指标与辅助函数
+# ================================================================
+
+PIPELINE_STAGE_SECONDS = registry.histogram(
+    "pipeline_stage_seconds", "Pipeline 各阶段耗时（秒）", ["pipeline", "stage"]
+)
+SEARCH_LATENCY_SECONDS = registry.histogram(
+    "search_latency_seconds", "搜索引擎调用延迟（秒）", ["engine", "outcome"]
+)
+SEARCH_IN_FLIGHT = registry.gauge("search_in_flight", "进行中的搜索调用数", ["engine"])
+SEMAPHORE_WAIT_SECONDS = registry.histogram(
+    "semaphore_wait_seconds", "信号量排队等待时间（秒）", ["semaphore"]
+)
+SEMAPHORE_WAITING = registry.gauge("semaphore_waiting", "正在排队等待信号量的任务数", ["semaphore"])
+
+
+def observe_stage(pipeline: str, stage: str, seconds: float):
+    """记录一个已计时的 Pipeline 阶段"""
+    PIPELINE_STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=stage)
+
+
+def timed_search(engine: str):
+    """搜索调用装饰器：记录延迟（区分成功/失败）与进行中调用数，并记录追踪 Span"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            query = kwargs.get("query", args[1] if len(args) > 1 else "")
+            with SEARCH_IN_FLIGHT.track_inprogress(engine=engine), span(f"search:{engine}", query=query):
+                try:
+                    result = await func(*args, **kwargs)
+                    outcome = "ok" if result else "empty"
+                    return result
+                finally:
+                    SEARCH_LATENCY_SECONDS.observe(
+                        time.perf_counter() - start, engine=engine, outcome=outcome
+                    )
+        return wrapper
+
+    return decorator
+
+
+@asynccontextmanager
+async def timed_semaphore(semaphore: asyncio.Semaphore, name: str):
+    """获取信号量并记录排队等待时间"""
+    start = time.perf_counter()
+    with SEMAPHORE_WAITING.track_inprogress(semaphore=name):
+        await semaphore.acquire()
+    SEMAPHORE_WAIT_SECONDS.observe(time.perf_counter() - start, semaphore=name)
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -0,0 +1,218 @@
+"""
+上游配额限速 (Upstream Rate Limiter)
+Tavily、Serper、Yahoo Finance 与 LLM 提供方的配额按账户计算，进程内限速在 N 个 worker 下会放大为 N 倍配额，
+触发 YahooFinanceService 中处理的 429 重试风暴。本模块按上游维护令牌桶（GCRA 实现），
+桶状态经缓存后端的原子读改写（CacheBackend.update）保存：
+- memory：进程内（单 worker 部署）
+- sqlite：同一主机的 worker 共享（BEGIN IMMEDIATE 串行化读改写）
+- redis：跨主机共享（WATCH / MULTI / EXEC 乐观事务）
+所有后端使用同一份配置（config/rate_limits.json），无论运行多少 worker，上游总吞吐都不超过配置的配额。
+
+后端选择沿用缓存后端：CACHE_BACKEND_RATE_LIMIT 优先，其次 CACHE_BACKEND。
+共享后端不可用时临时退回进程内令牌桶（此期间总吞吐上限为 worker 数 × 配额）。
+"""
+
+import os
+import json
+import time
+import asyncio
+import inspect
+import functools
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.utils.cache_backend import CacheBackend, MemoryBackend, backend_for
+from app.utils.cassette import cassette
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_WAIT_SECONDS = registry.histogram(
+    "rate_limit_wait_seconds", "上游限速排队等待时间（秒）", ["upstream"],
+    buckets=(0, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+RATE_LIMIT_REJECTED_TOTAL = registry.counter(
+    "rate_limit_rejected_total", "预计等待超过 max_wait 而放弃的上游调用次数", ["upstream"]
+)
+RATE_LIMIT_FALLBACK_TOTAL = registry.counter(
+    "rate_limit_fallback_total", "共享状态不可用、退回进程内令牌桶的次数", ["backend"]
+)
+
+
+class RateLimitExceeded(Exception):
+    """预计排队时间超过 max_wait（调用方按上游失败处理）"""
+
+
+class TokenBucket:
+    """单个上游的令牌桶配置"""
+
+    def __init__(self, name: str, rate: float, burst: float):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"限速配置无效: {name} rate={rate} burst={burst}")
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+
+    def reserve(self, state: Optional[Dict[str, float]], cost: float, max_wait: float, now: float):
+        """
+        GCRA：state["tat"] 为理论到达时间，桶满时 tat <= now
+
+        Returns:
+            (新状态或 None, 需等待的秒数或 None 表示放弃, 状态有效期)
+        """
+        tat = max(state["tat"] if state else now, now)
+        new_tat = tat + cost / self.rate
+        wait = new_tat - self.burst / self.rate - now
+        if wait > max_wait:
+            return None, None, 0
+        # tat 过去之后桶已满，状态无需保留
+        return {"tat": new_tat}, max(0.0, wait), new_tat - now + 1
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"rate": self.rate, "burst": self.burst}
+
+
+class UpstreamRateLimiter:
+    """按上游名称限速，桶状态保存在（可共享的）缓存后端中"""
+
+    NAMESPACE = "rate_limit"
+
+    def __init__(self, config_path: Optional[str] = None, backend: Optional[CacheBackend] = None):
+        default_path = Path(__file__).parent.parent.parent / "config" / "rate_limits.json"
+        self.config_path = Path(config_path or os.getenv("RATE_LIMIT_CONFIG", str(default_path)))
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+
+        self._backend = backend or backend_for(self.NAMESPACE, max_entries=256)
+        # 共享后端不可用时的进程内退路
+        self._local = self._backend if isinstance(self._backend, MemoryBackend) else MemoryBackend(max_entries=256)
+        self._fallback_until = 0.0
+
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.max_wait = 30.0
+        self._load_config()
+
+    def _load_config(self):
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except Exception as e:
+            logger.error("[RateLimiter] 配置加载失败，不限速: %s", e)
+            config = {}
+
+        self.max_wait = float(os.getenv("RATE_LIMIT_MAX_WAIT", config.get("max_wait", 30)))
+        for name, limit in config.get("limits", {}).items():
+            if name == "description":
+                continue
+            self.buckets[name] = TokenBucket(name, float(limit["rate"]), float(limit.get("burst", 1)))
+
+        # 环境变量覆盖：RATE_LIMIT_<NAME>=rate[:burst]，rate 为 0 表示不限速
+        for name in list(self.buckets):
+            override = os.getenv(f"RATE_LIMIT_{name.upper()}", "").strip()
+            if not override:
+                continue
+            rate, _, burst = override.partition(":")
+            if float(rate) <= 0:
+                del self.buckets[name]
+            else:
+                self.buckets[name] = TokenBucket(name, float(rate), float(burst or self.buckets[name].burst))
+
+        logger.info(
+            "[RateLimiter] %s（状态后端 %s）: %s",
+            "已启用" if self.enabled else "已关闭", self._backend.kind,
+            ", ".join(f"{name}={bucket.rate:g}/s" for name, bucket in self.buckets.items())
+        )
+
+    # ================================================================
+    # 获取令牌
+    # ================================================================
+
+    def reserve(self, name: str, cost: float = 1.0, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        预留令牌（同步，不等待；共享后端为阻塞读改写，异步代码使用 acquire）
+
+        Returns:
+            需等待的秒数；未配置限速时返回 0；预计等待超过 max_wait 时返回 None（不消耗令牌）
+        """
+        bucket = self.buckets.get(name)
+        if bucket is None or not self.enabled:
+            return 0.0
+        max_wait = self.max_wait if max_wait is None else max_wait
+
+        def apply(state):
+            return bucket.reserve(state, cost, max_wait, time.time())
+
+        backend = self._backend
+        if self._fallback_until and time.monotonic() < self._fallback_until:
+            backend = self._local
+        try:
+            return backend.update(self.NAMESPACE, name, apply)
+        except Exception as e:
+            self._fallback_until = time.monotonic() + CacheBackend.retry_after
+            RATE_LIMIT_FALLBACK_TOTAL.inc(backend=backend.kind)
+            logger.warning("[RateLimiter] 共享限速状态不可用，暂时使用进程内令牌桶: %s", e)
+            return self._local.update(self.NAMESPACE, name, apply)
+
+    async def acquire(self, name: str, cost: float = 1.0, max_wait: Optional[float] = None) -> float:
+        """
+        获取令牌，必要时等待
+
+        Returns:
+            实际等待的秒数
+
+        Raises:
+            RateLimitExceeded: 预计等待超过 max_wait
+        """
+        if self._backend.blocking:
+            # sqlite 的 BEGIN IMMEDIATE / redis 的 WATCH 事务可能排队，不在事件循环中执行
+            wait = await asyncio.to_thread(self.reserve, name, cost, max_wait)
+        else:
+            wait = self.reserve(name, cost, max_wait)
+        if wait is None:
+            RATE_LIMIT_REJECTED_TOTAL.inc(upstream=name)
+            raise RateLimitExceeded(f"{name} 限速排队超过 {self.max_wait if max_wait is None else max_wait:g} 秒")
+
+        RATE_LIMIT_WAIT_SECONDS.observe(wait, upstream=name)
+        if wait > 0:
+            logger.debug("[RateLimiter] %s 限速等待 %.2f秒", name, wait)
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": self._backend.kind,
+            "max_wait": self.max_wait,
+            "limits": {name: bucket.to_dict() for name, bucket in self.buckets.items()}
+        }
+
+
+def rate_limited(upstream: str, cost: float = 1.0):
+    """
+    搜索提供方装饰器：调用前获取令牌
+
+    放在 @cached_search 之下、@timed_search 之上：排队等待不计入搜索延迟与追踪 Span，
+    也不会被录制进磁带；缓存命中与磁带回放（search:<upstream>）不消耗配额
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if cassette.enabled:
+                # 与 @cassette_search 相同的请求键：绑定形参并补全默认值，去掉 self
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                request = dict(list(bound.arguments.items())[1:])
+                if not cassette.is_live(f"search:{upstream}", request):
+                    return await func(*args, **kwargs)
+            await rate_limiter.acquire(upstream, cost)
+            return await func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# 全局实例：所有服务共享
+rate_limiter = UpstreamRateLimiter()
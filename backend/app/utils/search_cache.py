@@ -0,0 +1,51 @@
+"""
+搜索结果缓存
+相同引擎 + 相同查询参数在 SEARCH_CACHE_TTL 秒内复用结果，经缓存后端读写，
+CACHE_BACKEND=sqlite / redis 时多个 worker 共享。默认 SEARCH_CACHE_TTL=0（关闭），
+新闻类查询对时效敏感，按业务可接受的延迟开启（如 300）。空结果（多为上游失败后的降级）不缓存。
+"""
+
+import os
+import inspect
+import functools
+import logging
+
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "0"))
+
+_cache = TTLCache(name="search_results", default_ttl=SEARCH_CACHE_TTL, max_size=2048) if SEARCH_CACHE_TTL > 0 else None
+
+
+def cached_search(engine: str):
+    """
+    搜索提供方装饰器：以 (engine, 查询参数) 为键缓存返回的结果列表
+
+    放在最外层（@rate_limited / @timed_search 之上），缓存命中不消耗配额，也不计入搜索提供方的延迟与调用次数
+    """
+
+    def decorator(func):
+        if _cache is None:
+            return func
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = [engine, dict(list(bound.arguments.items())[1:])]
+
+            cached = await _cache.aget(key)
+            if cached is not None:
+                logger.debug("[SearchCache] ✓ 缓存命中: %s %s", engine, key[1])
+                return cached
+
+            results = await func(self, *args, **kwargs)
+            if results:
+                await _cache.aset(key, results)
+            return results
+        return wrapper
+
+    return decorator
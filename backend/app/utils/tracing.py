@@ -0,0 +1,412 @@
+"""
+轻量级请求追踪 (Request Tracing)
+基于 contextvars 的 Span API，用于回答"这次请求慢在哪里"：
+- 每个 HTTP 请求一个 Trace，Pipeline 阶段、节点富化、LLM / 搜索 / Yahoo 调用各记录一个 Span
+- asyncio.gather 创建的子任务自动继承当前 Span 作为父节点
+- 响应头携带 Server-Timing（顶层阶段耗时 + LLM / 搜索累计耗时）
+- 超过 TRACE_SLOW_MS 的请求保留完整 Span 树，写入磁盘环形缓冲区（TRACE_DIR，最多 TRACE_BUFFER_SIZE 条），
+  可通过 /debug/traces 以 Chrome Trace Event 格式查看，并生成关键路径报告
+
+不在请求上下文中（后台预热、任务队列）调用时 Span API 为空操作。
+"""
+
+import os
+import re
+import time
+import uuid
+import asyncio
+import functools
+import logging
+from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Callable
+
+from app.utils import codec
+
+try:
+    import fcntl
+except ImportError:  # Windows：仅进程内分配槽位
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """单个计时区间"""
+
+    __slots__ = ("span_id", "parent_id", "name", "attrs", "start", "end", "task_id")
+
+    def __init__(self, name: str, parent_id: Optional[int], span_id: int, attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        task = _current_task()
+        self.task_id = id(task) if task is not None else 0
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Trace:
+    """一次请求的全部 Span"""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self.root = self._new_span(name, None, {})
+
+    def _new_span(self, name: str, parent_id: Optional[int], attrs: Dict[str, Any]) -> Span:
+        span = Span(name, parent_id, len(self.spans), attrs)
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+    def finish(self):
+        if self.root.end is None:
+            self.root.end = time.perf_counter()
+
+    # ================================================================
+    # 导出
+    # ================================================================
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing 头：顶层阶段（同名累加）+ LLM / 搜索累计耗时 + 总耗时
+
+        LLM / 搜索的累计值是各次调用耗时之和，并发调用时会大于墙钟时间
+        """
+        top: Dict[str, float] = {}
+        for span in self.spans[1:]:
+            if span.parent_id == self.root.span_id:
+                top[span.name] = top.get(span.name, 0.0) + span.duration
+
+        entries = [f"{_timing_token(name)};dur={seconds * 1000:.1f}" for name, seconds in top.items()]
+        for category in ("llm", "search"):
+            calls = [span for span in self.spans if span.name.startswith(category + ":")]
+            if calls:
+                total = sum(span.duration for span in calls)
+                entries.append(f'{category};desc="{len(calls)} calls";dur={total * 1000:.1f}')
+        entries.append(f"total;dur={self.duration * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        base = self.root.start
+        lanes: Dict[int, int] = {}
+        spans = []
+        for span in self.spans:
+            spans.append({
+                "id": span.span_id,
+                "parent": span.parent_id,
+                "name": span.name,
+                "attrs": span.attrs,
+                "start_ms": round((span.start - base) * 1000, 3),
+                "duration_ms": round(span.duration * 1000, 3),
+                # 同一 asyncio 任务内的 Span 严格嵌套，按任务分配泳道
+                "lane": lanes.setdefault(span.task_id, len(lanes))
+            })
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": spans
+        }
+
+
+def _timing_token(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.\-]", "_", name)
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+# ================================================================
+# Span API
+# ================================================================
+
+@contextmanager
+def start_trace(name: str):
+    """开始一次请求追踪（由 HTTP 中间件调用）"""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    记录一个 Span（同步与异步代码块均可使用）
+
+    Args:
+        name: Span 名称，外部调用约定为 "<类别>:<细节>"，如 "llm:TwoPassCausalService.pass1_topology"
+        **attrs: 附加属性（节点标签、查询等），写入慢请求记录
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = trace._new_span(name, parent.span_id if parent else None, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def traced(name: str, attrs: Optional[Callable[..., Dict[str, Any]]] = None):
+    """
+    异步函数装饰器：整个调用记录为一个 Span
+
+    Args:
+        name: Span 名称
+        attrs: 可选，接收被装饰函数的参数并返回 Span 属性
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return await func(*args, **kwargs)
+            span_attrs = {}
+            if attrs is not None:
+                try:
+                    span_attrs = attrs(*args, **kwargs)
+                except Exception:
+                    span_attrs = {}
+            with span(name, **span_attrs):
+                return await func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# ================================================================
+# 导出格式与关键路径
+# ================================================================
+
+def to_chrome_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """转换为 Chrome Trace Event 格式（chrome://tracing / Perfetto 可直接打开）"""
+    events = []
+    for lane in sorted({s["lane"] for s in trace["spans"]}):
+        events.append({
+            "name": "thread_name", "ph": "M", "pid": 1, "tid": lane,
+            "args": {"name": "request" if lane == 0 else f"task-{lane}"}
+        })
+    for s in trace["spans"]:
+        events.append({
+            "name": s["name"],
+            "cat": s["name"].split(":", 1)[0],
+            "ph": "X",
+            "ts": round(s["start_ms"] * 1000, 1),
+            "dur": round(s["duration_ms"] * 1000, 1),
+            "pid": 1,
+            "tid": s["lane"],
+            "args": s["attrs"]
+        })
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "metadata": {
+            "trace_id": trace["trace_id"],
+            "name": trace["name"],
+            "started_at": trace["started_at"]
+        }
+    }
+
+
+def critical_path(trace: Dict[str, Any], top_n: int = 10) -> Dict[str, Any]:
+    """
+    关键路径报告：从根 Span 出发，每层选择最后结束的子 Span（它决定了父 Span 何时结束）
+
+    Returns:
+        {"path": [...], "bottleneck": 关键路径上自身耗时最长的 Span, "slowest": 耗时最长的叶子 Span}
+    """
+    spans = trace["spans"]
+    children: Dict[int, List[Dict[str, Any]]] = {}
+    for s in spans:
+        if s["parent"] is not None:
+            children.setdefault(s["parent"], []).append(s)
+
+    def end_of(s: Dict[str, Any]) -> float:
+        return s["start_ms"] + s["duration_ms"]
+
+    path = []
+    current = spans[0]
+    while True:
+        kids = children.get(current["id"], [])
+        critical = max(kids, key=lambda s: (end_of(s), s["duration_ms"])) if kids else None
+        # 自身耗时：父 Span 中不被关键子 Span 覆盖的部分
+        self_ms = current["duration_ms"] - (critical["duration_ms"] if critical else 0.0)
+        path.append({
+            "name": current["name"],
+            "attrs": current["attrs"],
+            "start_ms": current["start_ms"],
+            "duration_ms": current["duration_ms"],
+            "self_ms": round(max(self_ms, 0.0), 3),
+            "siblings": len(children.get(current["parent"], [])) if current["parent"] is not None else 0
+        })
+        if critical is None:
+            break
+        current = critical
+
+    leaves = [s for s in spans if s["id"] not in children]
+    slowest = sorted(leaves, key=lambda s: s["duration_ms"], reverse=True)[:top_n]
+    return {
+        "trace_id": trace["trace_id"],
+        "name": trace["name"],
+        "duration_ms": trace["duration_ms"],
+        "path": path,
+        "bottleneck": max(path[1:] or path, key=lambda s: s["self_ms"]),
+        "slowest": [
+            {"name": s["name"], "attrs": s["attrs"], "start_ms": s["start_ms"], "duration_ms": s["duration_ms"]}
+            for s in slowest
+        ]
+    }
+
+
+# ================================================================
+# 慢请求环形缓冲区
+# ================================================================
+
+class SlowTraceBuffer:
+    """
+    慢请求磁盘环形缓冲区：槽位文件 <slot>.json 循环覆盖，
+    内存中只保留摘要索引，启动时从磁盘重建
+
+    多个 worker 共用 TRACE_DIR 时，序号与槽位在文件锁（seq.lock）内按共享计数器（seq）分配，
+    各 worker 轮流写入同一个环；被其他 worker 覆盖的槽位在读取时校验 trace_id，不会返回错误的记录
+    """
+
+    def __init__(self, directory: Optional[str] = None, capacity: Optional[int] = None):
+        default_dir = Path(__file__).parent.parent.parent / "data" / "traces"
+        self.directory = Path(directory or os.getenv("TRACE_DIR", str(default_dir)))
+        self.capacity = capacity or int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+        self.slow_ms = float(os.getenv("TRACE_SLOW_MS", "3000"))
+        self._index: Dict[str, Dict[str, Any]] = {}  # trace_id -> 摘要（含 slot / seq）
+        self._seq = 0
+        self._load_index()
+
+    def _slot_path(self, slot: int) -> Path:
+        return self.directory / f"{slot:04d}.json"
+
+    def _load_index(self):
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob("*.json"):
+            try:
+                record = codec.loads(path.read_bytes())
+                self._index[record["trace_id"]] = self._summary(record)
+                self._seq = max(self._seq, record["seq"])
+            except Exception as e:
+                logger.warning("[Tracing] 跳过无法解析的追踪文件 %s: %s", path.name, e)
+
+    @staticmethod
+    def _summary(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "trace_id": record["trace_id"],
+            "name": record["name"],
+            "started_at": record["started_at"],
+            "duration_ms": record["duration_ms"],
+            "span_count": len(record["spans"]),
+            "seq": record["seq"],
+            "slot": record["slot"]
+        }
+
+    def should_keep(self, trace: Trace) -> bool:
+        return trace.duration * 1000 >= self.slow_ms
+
+    async def add(self, trace: Trace):
+        """写入一条慢请求（覆盖最旧的槽位）"""
+        record = await asyncio.to_thread(self._write, trace.to_dict())
+
+        for trace_id, summary in list(self._index.items()):
+            if summary["slot"] == record["slot"]:
+                del self._index[trace_id]
+        self._index[record["trace_id"]] = self._summary(record)
+        logger.info(
+            "[Tracing] 记录慢请求: %s %.0fms (trace_id=%s)",
+            record["name"], record["duration_ms"], record["trace_id"]
+        )
+
+    def _write(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """在文件锁内分配序号与槽位并写入（线程中执行）"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / "seq.lock", "a+b") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                seq_path = self.directory / "seq"
+                try:
+                    shared_seq = int(seq_path.read_text(encoding="utf-8") or 0)
+                except (OSError, ValueError):
+                    shared_seq = 0
+                self._seq = max(self._seq, shared_seq) + 1
+                seq_path.write_text(str(self._seq), encoding="utf-8")
+
+                record["seq"] = self._seq
+                record["slot"] = self._seq % self.capacity
+                path = self._slot_path(record["slot"])
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_text(codec.dumps(record), encoding="utf-8")
+                tmp.replace(path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        return record
+
+    def list(self) -> List[Dict[str, Any]]:
+        """按时间倒序返回摘要"""
+        return [
+            {k: v for k, v in summary.items() if k not in ("seq", "slot")}
+            for summary in sorted(self._index.values(), key=lambda s: s["seq"], reverse=True)
+        ]
+
+    async def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        summary = self._index.get(trace_id)
+        if summary is None:
+            return None
+        data = await asyncio.to_thread(self._slot_path(summary["slot"]).read_bytes)
+        record = codec.loads(data)
+        if record["trace_id"] != trace_id:
+            # 槽位已被其他 worker 覆盖
+            self._index.pop(trace_id, None)
+            return None
+        return record
+
+
+# 全局实例
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+slow_trace_buffer = SlowTraceBuffer()
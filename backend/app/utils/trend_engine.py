@@ -0,0 +1,203 @@
+"""
+趋势与异常批量计算 (Vectorized Trend Engine)
+输入图谱中所有节点的数值序列（timeseries_store 的历史观测），右对齐为一个 (节点数 × lookback) 的矩阵，
+一次向量化计算全部节点的：
+- 逐点收益率与波动率（最近 window 个点 / 整个 lookback）
+- 滚动 z-score：最新一点相对其之前 window 个点的偏离（数值水平与收益率各一个）
+- 最近 window 个点的最小二乘斜率及其 t 统计量
+- 趋势标签 rising / falling / stable 与状态（regime）标记
+
+趋势判定：拟合区间变化超过 ±threshold_pct，且斜率显著（|t| >= t_threshold）；
+点数不足 4 个时 t 统计量无意义，只按阈值判断（两点时等价于原 previous_close 比较）。
+序列按观测顺序计算，不考虑观测间隔是否均匀。
+
+配置（环境变量）：TREND_WINDOW（20）· TREND_LOOKBACK（120）· TREND_Z_THRESHOLD（2.0）· TREND_THRESHOLD_PCT（0.1）
+"""
+
+import os
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+def _row_stats(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """逐行 (有效个数, 均值, 标准差)，忽略 NaN"""
+    valid = ~np.isnan(block)
+    count = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, block, 0.0).sum(axis=1) / count
+        deviation = np.where(valid, block - mean[:, None], 0.0)
+        std = np.sqrt((deviation * deviation).sum(axis=1) / count)
+    return count, mean, std
+
+
+def _latest_zscore(matrix: np.ndarray, window: int, min_points: int) -> np.ndarray:
+    """最新一列相对其之前 window 列（滚动窗口）的 z-score"""
+    count, mean, std = _row_stats(matrix[:, -window - 1:-1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (matrix[:, -1] - mean) / std
+    return np.where((count >= min_points) & (std > 1e-12), z, np.nan)
+
+
+# 完美拟合（残差为 0）时 t 统计量为无穷大，输出时截断到该值，保证显著趋势总能报告 t_stat
+T_STAT_CAP = 1000.0
+
+
+def _column(values: np.ndarray, digits: int) -> List[Optional[float]]:
+    """数组 -> JSON 友好的列表（NaN / inf 为 None）"""
+    rounded = np.round(values.astype(np.float64), digits)
+    return [value if math.isfinite(value) else None for value in rounded.tolist()]
+
+
+class TrendEngine:
+    """按节点批量计算趋势、z-score 与状态标记"""
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        lookback: Optional[int] = None,
+        z_threshold: Optional[float] = None,
+        threshold_pct: Optional[float] = None,
+        t_threshold: float = 2.0,
+        volatility_ratio: float = 1.5,
+        min_points: int = 2
+    ):
+        self.window = window or int(os.getenv("TREND_WINDOW", "20"))
+        self.lookback = max(lookback or int(os.getenv("TREND_LOOKBACK", "120")), self.window + 1)
+        self.z_threshold = z_threshold or float(os.getenv("TREND_Z_THRESHOLD", "2.0"))
+        self.threshold_pct = threshold_pct if threshold_pct is not None else float(os.getenv("TREND_THRESHOLD_PCT", "0.1"))
+        self.t_threshold = t_threshold
+        self.volatility_ratio = volatility_ratio
+        self.min_points = min_points
+
+    def compute(self, series: Dict[str, np.ndarray]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量计算
+
+        Args:
+            series: 序列 ID -> 按时间排序的数值（只使用最近 lookback 个点，少于 min_points 的序列跳过）
+
+        Returns:
+            序列 ID -> {
+                "points", "last", "change_pct", "return_pct", "zscore", "return_zscore",
+                "volatility_pct", "slope_pct", "t_stat", "trend", "regime", "flags"
+            }
+            change_pct 为最近 window 个点首尾变化，slope_pct 为同一区间拟合直线的变化（均为百分比）；
+            区间首值为 0 时首尾变化无意义，change_pct 改用 slope_pct（以最新值为基准）；
+            t_stat 截断在 ±T_STAT_CAP 以内（完美拟合为 ±T_STAT_CAP）
+        """
+        ids = [key for key, values in series.items() if len(values) >= self.min_points]
+        if not ids:
+            return {}
+
+        width = min(self.lookback, max(len(series[key]) for key in ids))
+        raw = np.full((len(ids), width), np.nan)
+        for row, key in enumerate(ids):
+            tail = np.asarray(series[key][-width:], dtype=np.float64)
+            raw[row, width - len(tail):] = tail
+
+        # 以最新值为基准归一化：z-score 与斜率不受量纲影响，方差计算也避免大数相消
+        last = raw[:, -1]
+        scale = np.where(np.abs(last) > 0, np.abs(last), 1.0)
+        relative = (raw - last[:, None]) / scale[:, None]
+        points = (~np.isnan(raw)).sum(axis=1)
+
+        # 收益率与波动率
+        base = raw[:, :-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = np.where(base != 0, np.diff(raw, axis=1) / np.abs(base), np.nan)
+        _, _, short_vol = _row_stats(returns[:, -self.window:])
+        long_count, _, long_vol = _row_stats(returns)
+
+        # 滚动 z-score：最新值 / 最新收益率相对之前 window 个点
+        level_z = _latest_zscore(relative, self.window, 3)
+        return_z = _latest_zscore(returns, self.window, 3)
+
+        # 最近 window 个点的最小二乘斜率
+        recent = relative[:, -self.window:]
+        valid = ~np.isnan(recent)
+        x = np.broadcast_to(np.arange(recent.shape[1], dtype=np.float64), recent.shape)
+        y = np.where(valid, recent, 0.0)
+        xv = np.where(valid, x, 0.0)
+        n = valid.sum(axis=1).astype(np.float64)
+        sx, sy = xv.sum(axis=1), y.sum(axis=1)
+        sxx, sxy = (xv * xv).sum(axis=1), (xv * y).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sxx_centered = sxx - sx * sx / n
+            slope = (sxy - sx * sy / n) / sxx_centered
+            intercept = (sy - slope * sx) / n
+            residuals = np.where(valid, recent - (intercept[:, None] + slope[:, None] * x), 0.0)
+            residual_var = (residuals * residuals).sum(axis=1) / (n - 2)
+            t_stat = slope / np.sqrt(residual_var / sxx_centered)
+        # 两点无残差自由度；完美拟合（残差为 0）视为显著
+        t_stat = np.where(n > 2, t_stat, np.nan)
+        perfect = (n > 2) & (residual_var <= 1e-18) & (slope != 0)
+        t_stat = np.where(perfect, np.where(slope > 0, np.inf, -np.inf), t_stat)
+
+        first_x = np.argmax(valid, axis=1)
+        span = (recent.shape[1] - 1) - first_x
+        slope_pct = slope * span * 100
+        first_value = raw[np.arange(len(ids)), raw.shape[1] - recent.shape[1] + first_x]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            change_pct = np.where(first_value != 0, (last - first_value) / np.abs(first_value) * 100, slope_pct)
+
+        # 趋势与状态
+        significant = (n < 4) | (np.abs(np.nan_to_num(t_stat)) >= self.t_threshold)
+        moving = np.where(n < 4, change_pct, slope_pct)
+        trend = np.full(len(ids), "stable", dtype=object)
+        trend[(moving > self.threshold_pct) & significant] = "rising"
+        trend[(moving < -self.threshold_pct) & significant] = "falling"
+
+        anomaly = np.abs(np.nan_to_num(level_z)) >= self.z_threshold
+        shock = np.abs(np.nan_to_num(return_z)) >= self.z_threshold
+        volatile = (long_count >= 2 * self.window) & (short_vol > self.volatility_ratio * long_vol)
+        trending = (n >= 4) & (np.abs(np.nan_to_num(t_stat)) >= self.t_threshold)
+
+        regime = np.where(
+            anomaly | shock, "anomaly",
+            np.where(volatile, "volatile", np.where(trending, "trending", "ranging"))
+        ).tolist()
+        flag_names = np.array(["anomaly", "shock", "volatile", "trending"])
+        flag_matrix = np.stack([anomaly, shock, volatile, trending], axis=1)
+
+        columns = {
+            "last": _column(last, 6),
+            "change_pct": _column(change_pct, 4),
+            "return_pct": _column(returns[:, -1] * 100, 4),
+            "zscore": _column(level_z, 3),
+            "return_zscore": _column(return_z, 3),
+            "volatility_pct": _column(short_vol * 100, 4),
+            "slope_pct": _column(slope_pct, 4),
+            "t_stat": _column(np.clip(t_stat, -T_STAT_CAP, T_STAT_CAP), 3)
+        }
+        points = points.tolist()
+        trend = trend.tolist()
+
+        results = {}
+        for row, key in enumerate(ids):
+            stats = {"points": points[row]}
+            for name, column in columns.items():
+                stats[name] = column[row]
+            stats["trend"] = trend[row]
+            stats["regime"] = regime[row]
+            stats["flags"] = flag_names[flag_matrix[row]].tolist()
+            results[key] = stats
+        return results
+
+    @staticmethod
+    def describe(stats: Dict[str, Any]) -> str:
+        """一行中文摘要，供 LLM 提示词引用"""
+        parts = [f"近 {stats['points']} 次观测，最新 {stats['last']:g}"]
+        if stats["change_pct"] is not None:
+            parts.append(f"区间变化 {stats['change_pct']:+.2f}%")
+        if stats["zscore"] is not None:
+            parts.append(f"z-score {stats['zscore']:+.2f}")
+        if stats["volatility_pct"] is not None:
+            parts.append(f"波动率 {stats['volatility_pct']:.2f}%")
+        parts.append(f"趋势 {stats['trend']}（{stats['regime']}）")
+        return "，".join(parts)
+
+
+# 全局实例
+trend_engine = TrendEngine()
@@ -0,0 +1,89 @@
+"""
+TTL 缓存
+用于行情、拓扑、节点状态等热点数据的预热与复用。
+条目经缓存后端读写（app/utils/cache_backend.py）：默认进程内 LRU，
+CACHE_BACKEND=sqlite / redis 时在多个 worker 之间共享；异步代码使用 aget / aset / adelete，
+共享后端的读写在线程中执行。
+"""
+
+from typing import Any, Optional, Hashable
+
+from app.utils.cache_backend import CacheBackend, backend_for
+from app.utils.metrics import registry
+
+
+class TTLCache:
+    """
+    带过期时间与容量上限的缓存
+
+    - 每个条目可单独指定 TTL（默认使用 default_ttl）
+    - 进程内后端超出 max_size 时淘汰最久未使用的条目；共享后端按名称分区，容量由后端统一管理
+    - 值按 JSON 序列化存储，读出的是新对象（元组读出为列表）
+    - 统计命中/未命中次数，便于评估预热效果
+    """
+
+    def __init__(
+        self,
+        name: str,
+        default_ttl: float,
+        max_size: int = 1024,
+        backend: Optional[CacheBackend] = None
+    ):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.backend = backend or backend_for(name, max_entries=max_size)
+        self.hits = 0
+        self.misses = 0
+        registry.register_cache(self)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取未过期的值，未命中返回 None"""
+        value = self.backend.get(self.name, key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入缓存"""
+        self.backend.set(self.name, key, value, self.default_ttl if ttl is None else ttl)
+
+    def delete(self, key: Hashable):
+        self.backend.delete(self.name, key)
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        """get 的异步版本（共享后端不阻塞事件循环）"""
+        value = await self.backend.aget(self.name, key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    async def aset(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        await self.backend.aset(self.name, key, value, self.default_ttl if ttl is None else ttl)
+
+    async def adelete(self, key: Hashable):
+        await self.backend.adelete(self.name, key)
+
+    def clear(self):
+        self.backend.clear(self.name)
+
+    def __len__(self) -> int:
+        usage = self.backend.usage(self.name)
+        return usage[0] if usage else 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "backend": self.backend.kind,
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,125 @@
+"""
+序列化编解码基准测试
+对比标准库 json、orjson、msgpack 对 10 / 100 / 1000 节点富化图谱的编码与解码耗时
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_codec.py
+    python benchmarks/bench_codec.py --sizes 10 100 1000 5000 --repeat 200
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils import codec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def build_graph(node_count: int) -> dict:
+    """构造与 /analyze-v2 结构一致的富化图谱"""
+    rng = random.Random(node_count)
+    nodes = []
+    for i in range(node_count):
+        nodes.append({
+            "id": f"n{i}",
+            "label": f"因子{i}",
+            "type": rng.choice(["cause", "effect", "intermediate"]),
+            "description": "影响标的价格的核心因子，描述文本用于前端展示" * 2,
+            "search_query": f"factor {i} current value 2026",
+            "realtime_state": {
+                "latest_value": f"{rng.uniform(0, 200):.2f}",
+                "trend": rng.choice(["rising", "falling", "stable"]),
+                "change_percent": f"{rng.uniform(-5, 5):+.2f}%",
+                "narrative_context": "近期受政策与市场预期共同影响，走势出现分化",
+                "sources": [
+                    {
+                        "title": f"来源 {j}：因子{i}最新数据",
+                        "url": f"https://www.reuters.com/markets/{i}/{j}",
+                        "domain": "reuters.com"
+                    }
+                    for j in range(3)
+                ],
+                "updated_at": "2026-10-19T06:30:00",
+                "strategy_used": "two_stage_consensus",
+                "confidence": "cross_validated"
+            }
+        })
+
+    edges = [
+        {
+            "source": f"n{rng.randrange(node_count)}",
+            "target": f"n{rng.randrange(node_count)}",
+            "label": "推动",
+            "strength": round(rng.random(), 2)
+        }
+        for _ in range(node_count * 2)
+    ]
+
+    return {"nodes": nodes, "edges": edges, "explanation": "整体因果关系说明" * 20}
+
+
+def timeit(func, repeat: int) -> float:
+    """返回单次调用的平均耗时（毫秒）"""
+    func()  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="序列化编解码基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print(f"序列化编解码基准测试（codec 后端: {codec.backend()}，"
+          f"msgpack: {'可用' if msgpack else '未安装'}）")
+    print("=" * 78)
+    print(f"{'节点数':>6} {'实现':<10} {'大小(KB)':>10} {'编码(ms)':>10} {'解码(ms)':>10} {'编码加速':>8}")
+
+    for size in args.sizes:
+        graph = build_graph(size)
+        repeat = max(5, args.repeat * 100 // max(size, 100))
+
+        candidates = [(
+            "json",
+            lambda: json.dumps(graph, ensure_ascii=False).encode("utf-8"),
+            lambda data: json.loads(data)
+        )]
+        if orjson is not None:
+            candidates.append(("orjson", lambda: codec.dumps_bytes(graph), codec.loads))
+        if msgpack is not None:
+            candidates.append(("msgpack", lambda: codec.packb(graph), codec.unpackb))
+
+        baseline = None
+        for name, encode, decode in candidates:
+            data = encode()
+            encode_ms = timeit(encode, repeat)
+            decode_ms = timeit(lambda: decode(data), repeat)
+            baseline = baseline or encode_ms
+            print(
+                f"{size:>6} {name:<10} {len(data) / 1024:>10.1f} "
+                f"{encode_ms:>10.3f} {decode_ms:>10.3f} {baseline / encode_ms:>7.1f}x"
+            )
+
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
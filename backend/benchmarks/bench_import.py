@@ -0,0 +1,119 @@
+"""
+冷启动预算检查
+在全新子进程中导入 main（不处理请求），测量导入耗时与常驻内存（ru_maxrss），并检查重量级模块是否被提前导入。
+测量完成后再生成一次 OpenAPI 文档（/openapi.json），确保所有路由与响应类可被 FastAPI 正常描述。
+超出预算、导入了禁止模块或 OpenAPI 生成失败时以非零状态退出，可作为 CI 门禁。
+
+--services 额外测量各服务首次构建（首个请求触发）的耗时与内存增量，用于评估 SERVICE_WARMUP 的取舍。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --max-seconds 1.0 --max-rss-mib 64 --runs 7
+    python benchmarks/bench_import.py --services
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# 只服务部分接口的进程不应在导入阶段加载的模块
+DEFAULT_FORBIDDEN = ["openai", "aiohttp", "yfinance", "pandas", "numpy", "duckduckgo_search"]
+
+PROBE = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+result = {"seconds": elapsed, "rss_mib": rss, "loaded": [m for m in FORBIDDEN if m in sys.modules]}
+
+try:
+    result["openapi_paths"] = len(main.app.openapi()["paths"])
+except Exception as e:
+    result["openapi_error"] = f"{type(e).__name__}: {e}"
+
+if SERVICE:
+    from app.services.service_registry import services
+    start = time.perf_counter()
+    services.get(SERVICE)
+    result["service_seconds"] = time.perf_counter() - start
+    result["service_rss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - rss
+
+print("RESULT " + json.dumps(result))
+"""
+
+
+def probe(forbidden, service=None) -> dict:
+    """在新进程中执行一次测量（独立的任务 / 图谱存储，不触碰 data/）"""
+    workdir = tempfile.mkdtemp(prefix="bench_import_")
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "bench"),
+        "JOB_STORE_PATH": f"{workdir}/jobs.db",
+        "GRAPH_STORE_PATH": f"{workdir}/graphs.db",
+        "LOG_LEVEL": "WARNING",
+        "SERVICE_WARMUP": "",
+    }
+    code = f"FORBIDDEN = {forbidden!r}\nSERVICE = {service!r}\n" + PROBE
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    line = next(l for l in output.splitlines() if l.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动导入耗时与内存预算检查")
+    parser.add_argument("--runs", type=int, default=5, help="测量次数（取中位数）")
+    parser.add_argument("--max-seconds", type=float, default=1.5, help="import main 耗时预算（秒）")
+    parser.add_argument("--max-rss-mib", type=float, default=80.0, help="导入后常驻内存预算（MiB）")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBIDDEN, help="导入阶段禁止加载的模块")
+    parser.add_argument("--services", action="store_true", help="测量各服务首次构建的耗时与内存增量")
+    args = parser.parse_args()
+
+    runs = [probe(args.forbid) for _ in range(args.runs)]
+    seconds = statistics.median(r["seconds"] for r in runs)
+    rss = statistics.median(r["rss_mib"] for r in runs)
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    openapi_errors = sorted({r["openapi_error"] for r in runs if "openapi_error" in r})
+
+    print(f"import main: {seconds * 1000:.0f}ms（预算 {args.max_seconds * 1000:.0f}ms），"
+          f"RSS {rss:.1f}MiB（预算 {args.max_rss_mib:.0f}MiB），{args.runs} 次中位数")
+    if not openapi_errors:
+        print(f"OpenAPI: {runs[0]['openapi_paths']} 个路径")
+
+    if args.services:
+        from app.services.service_registry import services
+        print(f"\n  {'服务':<24}{'首次构建 ms':>14}{'RSS 增量 MiB':>16}")
+        for name in services.names:
+            result = probe(args.forbid, service=name)
+            print(f"  {name:<24}{result['service_seconds'] * 1000:>14.0f}{result['service_rss_mib']:>16.1f}")
+
+    failures = []
+    if seconds > args.max_seconds:
+        failures.append(f"导入耗时 {seconds:.3f}s 超出预算 {args.max_seconds}s")
+    if rss > args.max_rss_mib:
+        failures.append(f"常驻内存 {rss:.1f}MiB 超出预算 {args.max_rss_mib}MiB")
+    if loaded:
+        failures.append(f"导入阶段加载了禁止的模块: {', '.join(loaded)}")
+    for error in openapi_errors:
+        failures.append(f"OpenAPI 文档生成失败: {error}")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n冷启动在预算范围内")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(BACKEND_DIR))
+    main()
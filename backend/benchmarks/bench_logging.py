@@ -0,0 +1,188 @@
+"""
+日志开销基准测试
+模拟单个节点走完两阶段共识验证时输出的日志序列，对比：
+- before：logging.basicConfig + StreamHandler 同步写入，f-string 即时格式化（原实现）
+- after：configure_logging() 队列化输出，%-style 惰性格式化，过程性日志按 LOG_SAMPLE_RATE 抽样
+
+只统计调用方（事件循环线程）上的耗时；after 模式下后台线程的写出耗时单独列出。
+输出写入临时文件，避免终端渲染干扰结果。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --nodes 5000 --sample-rate 0.1
+    python benchmarks/bench_logging.py --sink-latency-us 50    # 模拟终端 / 日志管道阻塞
+"""
+
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.logging_setup import configure_logging, sampled_logger, _stop_listener
+
+logger = logging.getLogger("bench.node_sensing")
+
+
+def enrich_node_before(node_id: str, label: str, state: dict, queries: list):
+    """原实现：逐行 f-string，全部同步输出"""
+    logger.info(f"[节点感知 2.0] 开始处理节点: {node_id} ({label})")
+    logger.info(f"[节点感知] 节点 {node_id} 配置了 {len(queries)} 个搜索查询")
+    logger.info(f"[Stage 1] 白名单优先搜索 - 节点: {label}")
+    logger.info(f"[搜索引擎] 开始执行 {len(queries)} 个搜索查询 (max_results=3)")
+    logger.info(f"[搜索引擎] 搜索完成，获取 {6} 条有效结果")
+    logger.info(f"[Stage 1] 搜索结果: {6} 条 → 白名单过滤后: {0} 条")
+    logger.warning(f"[Stage 1] 白名单过滤后无结果，进入 Stage 2")
+    logger.info(f"[Stage 2] 全网搜索 + 三方交叉验证 - 节点: {label}")
+    logger.info(f"[搜索引擎] 开始执行 {len(queries)} 个搜索查询 (max_results=10)")
+    logger.info(f"[搜索引擎] 搜索完成，获取 {18} 条有效结果")
+    logger.info(f"[Stage 2] 全网搜索结果: {18} 条")
+    logger.info(f"[Stage 2 LLM] 开始解析节点 '{label}' 的状态（三方交叉验证）")
+    logger.info(
+        f"[Stage 2 LLM] 节点 '{label}' 解析成功: "
+        f"value={state['value']}, sources={len(state.get('sources', []))} "
+        f"(unique_domains={len(set(s.get('domain', '') for s in state.get('sources', [])))})"
+    )
+    logger.info(
+        f"[Stage 2] ✓ 三方交叉验证通过: {state['value']} "
+        f"(confidence: cross_validated, sources: {len(state.get('sources', []))})"
+    )
+
+
+def enrich_node_after(node_logger, node_id: str, label: str, state: dict, queries: list):
+    """新实现：惰性格式化 + 过程性日志抽样，结果类日志始终输出"""
+    extra = {"node": label}
+    node_logger.info("[节点感知 2.0] 开始处理节点: %s (%s)", node_id, label, extra=extra)
+    node_logger.info("[节点感知] 节点 %s 配置了 %d 个搜索查询", node_id, len(queries), extra=extra)
+    node_logger.info("[Stage 1] 白名单优先搜索 - 节点: %s", label, extra=extra)
+    node_logger.info("[搜索引擎] 开始执行 %d 个搜索查询 (max_results=%d)", len(queries), 3)
+    node_logger.info("[搜索引擎] 搜索完成，获取 %d 条有效结果", 6)
+    node_logger.info("[Stage 1] 搜索结果: %d 条 → 白名单过滤后: %d 条", 6, 0, extra=extra)
+    logger.warning("[Stage 1] 白名单过滤后无结果，进入 Stage 2", extra=extra)
+    node_logger.info("[Stage 2] 全网搜索 + 三方交叉验证 - 节点: %s", label, extra=extra)
+    node_logger.info("[搜索引擎] 开始执行 %d 个搜索查询 (max_results=%d)", len(queries), 10)
+    node_logger.info("[搜索引擎] 搜索完成，获取 %d 条有效结果", 18)
+    node_logger.info("[Stage 2] 全网搜索结果: %d 条", 18, extra=extra)
+    node_logger.info("[Stage 2 LLM] 开始解析节点 '%s' 的状态（三方交叉验证）", label, extra=extra)
+    node_logger.info(
+        "[Stage 2 LLM] 节点 '%s' 解析成功: value=%s, sources=%d",
+        label, state["value"], len(state.get("sources", [])), extra=extra
+    )
+    logger.info(
+        "[Stage 2] ✓ 三方交叉验证通过: %s (confidence: cross_validated, sources: %d)",
+        state["value"], len(state.get("sources", [])),
+        extra={"node": label, "event": "cross_validated"}
+    )
+
+
+def build_nodes(count: int) -> list:
+    return [
+        (
+            f"n{i}",
+            f"因子{i}",
+            {
+                "value": f"{100 + i * 0.01:.2f}",
+                "sources": [{"domain": f"site{j}.com"} for j in range(3)]
+            },
+            [f"factor {i} latest", f"factor {i} news"]
+        )
+        for i in range(count)
+    ]
+
+
+class SlowStream:
+    """模拟阻塞的输出端（终端渲染、被限速的日志管道）：每次 write 额外等待固定时长"""
+
+    def __init__(self, stream, latency: float):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, data: str):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def reset_root():
+    _stop_listener()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run_before(nodes: list, path: str, latency: float) -> float:
+    reset_root()
+    with open(path, "w", encoding="utf-8") as f:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+            stream=SlowStream(f, latency),
+            force=True
+        )
+        start = time.perf_counter()
+        for node in nodes:
+            enrich_node_before(*node)
+        elapsed = time.perf_counter() - start
+        reset_root()
+    return elapsed
+
+
+def run_after(nodes: list, path: str, fmt: str, sample_rate: float, latency: float):
+    reset_root()
+    with open(path, "w", encoding="utf-8") as f:
+        configure_logging(level="INFO", fmt=fmt, sample_rate=sample_rate, stream=SlowStream(f, latency))
+        node_logger = sampled_logger(logger)
+
+        start = time.perf_counter()
+        for node in nodes:
+            enrich_node_after(node_logger, *node)
+        caller = time.perf_counter() - start
+
+        # 停止监听线程会先写完队列中的剩余记录
+        _stop_listener()
+        drained = time.perf_counter() - start
+    reset_root()
+    return caller, drained
+
+
+def count_lines(path: str) -> int:
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志开销基准测试")
+    parser.add_argument("--nodes", type=int, default=2000, help="模拟的节点数")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="过程性日志保留比例")
+    parser.add_argument("--sink-latency-us", type=float, default=0.0, help="模拟输出端每次写入的阻塞时长（微秒）")
+    args = parser.parse_args()
+    latency = args.sink_latency_us / 1e6
+
+    nodes = build_nodes(args.nodes)
+    tmpdir = tempfile.mkdtemp(prefix="bench_logging_")
+
+    print(f"节点数: {args.nodes}，采样率: {args.sample_rate}，输出端延迟: {args.sink_latency_us}µs/行")
+    print(f"{'模式':<28}{'调用方 µs/节点':>16}{'含后台写出 µs/节点':>22}{'输出行数':>10}")
+
+    before_path = f"{tmpdir}/before.log"
+    before = run_before(nodes, before_path, latency)
+    print(f"{'before (sync, f-string)':<28}{before / args.nodes * 1e6:>16.1f}{'-':>22}"
+          f"{count_lines(before_path):>10}")
+
+    for fmt, rate in (("text", 1.0), ("text", args.sample_rate), ("json", args.sample_rate)):
+        path = f"{tmpdir}/after_{fmt}_{rate}.log"
+        caller, drained = run_after(nodes, path, fmt, rate, latency)
+        label = f"after ({fmt}, sample={rate})"
+        print(f"{label:<28}{caller / args.nodes * 1e6:>16.1f}{drained / args.nodes * 1e6:>22.1f}"
+              f"{count_lines(path):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,533 @@
+"""
+端到端压测工具
+对 /analyze、/analyze-v2、/extract-causality、/research-target(/stream)、/enrich-nodes 施加负载，报告：
+- 各负载级别的 p50 / p95 / p99 / max 延迟、错误率、吞吐
+- 流式接口的首事件时间（TTFE，收到第一个 data: 帧）
+- 饱和点：吞吐不再随负载增长（或错误率 / 达成率越界）的负载级别
+
+两种负载模式：
+- ramp（闭环）：并发数逐级递增，每个 worker 收到响应后立即发下一个请求
+- open（开环）：按固定到达率发送请求，与响应快慢无关；延迟从计划发送时刻算起，避免协调遗漏
+
+--local 会启动本地替身服务（standins/）与一个指向它的后端进程，不访问外部接口。
+结果写入 JSON，可用 --compare 与其他提交的结果对比。
+
+用法（在 backend 目录下）：
+    python benchmarks/loadtest.py --local --scenario analyze-v2 --concurrency 1 2 4 8 16
+    python benchmarks/loadtest.py --local --scenario research-target-stream --mode open --rps 0.5 1 2 4
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 --scenario all --output results.json
+    python benchmarks/loadtest.py --local --scenario analyze-v2 --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import signal
+import socket
+import asyncio
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# ================================================================
+# 场景
+# ================================================================
+
+QUERIES = ["黄金价格的影响因素", "美元指数走势", "原油价格波动", "A股市场情绪", "铜价与全球经济"]
+TARGETS = ["黄金", "中证1000指数", "布伦特原油", "比特币", "美国十年期国债"]
+NEWS = [
+    "美联储宣布维持利率不变，但暗示年内可能降息两次。受此影响，美元指数走弱，金价上涨至历史高位。",
+    "OPEC+ 宣布延长减产协议至明年一季度，国际油价应声上涨，航空股普遍承压。",
+    "央行下调存款准备金率 0.5 个百分点，释放长期流动性约一万亿元，A 股银行板块走强。",
+]
+SENSING_NODES = [
+    ("美联储利率", ["fed funds rate current", "FOMC decision latest"], "policy"),
+    ("美元指数", ["DXY dollar index latest"], "price"),
+    ("美国通胀", ["us cpi latest"], "macro"),
+    ("黄金价格", ["gold price today"], "price"),
+]
+
+
+# 每次压测运行的标识：unique 模式下与本次序号一起写入请求内容，重复运行也不会命中上一轮的缓存
+RUN_ID = uuid.uuid4().hex[:8]
+
+
+def _unique_tag(seq: int) -> str:
+    """
+    unique 模式的请求标记
+
+    语义拓扑缓存只允许"只差语序"的查询互相命中，不同标记的字符必然不同，
+    因此精确 / 相似查找、状态存储、负结果缓存与搜索缓存都无法命中，测冷路径
+    """
+    return f"loadtest {RUN_ID} {seq}"
+
+
+def _pick(pool: List[str], seq: int, unique: bool) -> str:
+    value = pool[seq % len(pool)]
+    return f"{value}（{_unique_tag(seq)}）" if unique else value
+
+
+def _enrich_payload(seq: int, unique: bool) -> Dict[str, Any]:
+    nodes = []
+    for i, (label, queries, state_type) in enumerate(SENSING_NODES):
+        if unique:
+            queries = [f"{query} {_unique_tag(seq)}" for query in queries]
+        nodes.append({
+            "id": f"n{i}",
+            "label": _pick([label], seq, unique),
+            "type": "cause",
+            "sensing_config": {"auto_queries": queries, "state_type": state_type}
+        })
+    # unique 模式同时显式跳过状态存储与负结果缓存
+    return {"nodes": nodes, "force_refresh": unique}
+
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "analyze": {
+        "path": "/api/v1/analyze",
+        "payload": lambda seq, unique: {"query": _pick(QUERIES, seq, unique), "max_depth": 3}
+    },
+    "analyze-v2": {
+        "path": "/api/v1/analyze-v2",
+        "payload": lambda seq, unique: {"query": _pick(QUERIES, seq, unique), "max_depth": 3}
+    },
+    "extract-causality": {
+        "path": "/api/v1/extract-causality",
+        "payload": lambda seq, unique: {"news_text": _pick(NEWS, seq, unique), "generate_summary": True}
+    },
+    "research-target": {
+        "path": "/api/v1/research-target",
+        "payload": lambda seq, unique: {"target": _pick(TARGETS, seq, unique)}
+    },
+    "research-target-stream": {
+        "path": "/api/v1/research-target/stream",
+        "payload": lambda seq, unique: {"target": _pick(TARGETS, seq, unique)},
+        "stream": True
+    },
+    "enrich-nodes": {
+        "path": "/api/v1/enrich-nodes",
+        "payload": _enrich_payload
+    },
+}
+
+
+# ================================================================
+# 单次请求
+# ================================================================
+
+async def send_request(
+    client: httpx.AsyncClient,
+    scenario: Dict[str, Any],
+    payload: Dict[str, Any],
+    scheduled: float
+) -> Dict[str, Any]:
+    """
+    发送一次请求并记录结果
+
+    Args:
+        scheduled: 计划发送时刻（perf_counter），延迟从此刻算起
+    """
+    result: Dict[str, Any] = {"ok": False, "status": None, "error": None, "ttfe": None}
+    try:
+        if scenario.get("stream"):
+            async with client.stream("POST", scenario["path"], json=payload) as response:
+                result["status"] = response.status_code
+                final_status = None
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    if result["ttfe"] is None:
+                        result["ttfe"] = time.perf_counter() - scheduled
+                    try:
+                        final_status = json.loads(line[5:]).get("status")
+                    except ValueError:
+                        continue
+                    if final_status in ("success", "error"):
+                        break
+                result["ok"] = response.status_code == 200 and final_status == "success"
+                if not result["ok"]:
+                    result["error"] = f"stream_{final_status or 'incomplete'}"
+        else:
+            response = await client.post(scenario["path"], json=payload)
+            await response.aread()
+            result["status"] = response.status_code
+            result["ok"] = response.status_code == 200
+            if not result["ok"]:
+                result["error"] = f"http_{response.status_code}"
+    except httpx.TimeoutException:
+        result["error"] = "timeout"
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+
+    result["latency"] = time.perf_counter() - scheduled
+    return result
+
+
+# ================================================================
+# 负载模式
+# ================================================================
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    scenario: Dict[str, Any],
+    concurrency: int,
+    duration: float,
+    next_seq: Callable[[], int],
+    unique: bool
+) -> List[Dict[str, Any]]:
+    """闭环：concurrency 个 worker 持续发送，直到 duration 结束（进行中的请求会等待完成）"""
+    deadline = time.perf_counter() + duration
+    results: List[Dict[str, Any]] = []
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            payload = scenario["payload"](next_seq(), unique)
+            results.append(await send_request(client, scenario, payload, time.perf_counter()))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    scenario: Dict[str, Any],
+    rps: float,
+    duration: float,
+    next_seq: Callable[[], int],
+    unique: bool,
+    poisson: bool,
+    rng: random.Random
+) -> List[Dict[str, Any]]:
+    """开环：按 rps 到达率发送（固定间隔或泊松到达），等待所有已发出的请求完成"""
+    start = time.perf_counter()
+    tasks = []
+    offset = 0.0
+
+    while offset < duration:
+        scheduled = start + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        payload = scenario["payload"](next_seq(), unique)
+        tasks.append(asyncio.create_task(send_request(client, scenario, payload, scheduled)))
+        offset += rng.expovariate(rps) if poisson else 1.0 / rps
+
+    return list(await asyncio.gather(*tasks))
+
+
+# ================================================================
+# 统计
+# ================================================================
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """最近秩百分位"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 1) if value is not None else None
+
+
+def summarize(results: List[Dict[str, Any]], elapsed: float, load: float, duration: float) -> Dict[str, Any]:
+    ok = [r for r in results if r["ok"]]
+    latencies = [r["latency"] for r in ok]
+    ttfes = [r["ttfe"] for r in results if r["ttfe"] is not None]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not r["ok"]:
+            errors[r["error"] or "unknown"] = errors.get(r["error"] or "unknown", 0) + 1
+
+    summary = {
+        "load": load,
+        "requests": len(results),
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "errors": errors,
+        "offered_rps": round(len(results) / duration, 3),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed > 0 else 0.0,
+        "elapsed_s": round(elapsed, 2),
+        "latency_ms": {
+            "p50": _ms(percentile(latencies, 50)),
+            "p95": _ms(percentile(latencies, 95)),
+            "p99": _ms(percentile(latencies, 99)),
+            "max": _ms(max(latencies) if latencies else None)
+        }
+    }
+    if ttfes:
+        summary["ttfe_ms"] = {
+            "p50": _ms(percentile(ttfes, 50)),
+            "p95": _ms(percentile(ttfes, 95)),
+            "p99": _ms(percentile(ttfes, 99))
+        }
+    return summary
+
+
+def find_saturation(steps: List[Dict[str, Any]], mode: str, args) -> Dict[str, Any]:
+    """
+    饱和点判定（按负载递增顺序，首个满足条件的级别）：
+    - 吞吐增幅低于负载增幅的 --scaling-threshold（默认 50%）
+    - 错误率超过 --max-error-rate
+    - 开环模式下达成吞吐低于实际发送速率的 90%（请求积压）
+    """
+    for previous, step in zip([None] + steps, steps):
+        reason = None
+        if step["error_rate"] > args.max_error_rate:
+            reason = f"error_rate {step['error_rate']:.1%} > {args.max_error_rate:.0%}"
+        elif mode == "open" and step["throughput_rps"] < 0.9 * step["offered_rps"]:
+            reason = f"throughput {step['throughput_rps']} < 90% of offered {step['offered_rps']} rps"
+        elif previous is not None and previous["throughput_rps"] > 0:
+            load_gain = step["load"] / previous["load"] - 1
+            throughput_gain = step["throughput_rps"] / previous["throughput_rps"] - 1
+            if throughput_gain < load_gain * args.scaling_threshold:
+                reason = (
+                    f"load +{load_gain:.0%} but throughput {throughput_gain:+.0%} "
+                    f"(< {args.scaling_threshold:.0%} of load gain)"
+                )
+        if reason:
+            return {
+                "saturated_at": step["load"],
+                "last_scaling_load": previous["load"] if previous else None,
+                "peak_throughput_rps": max(s["throughput_rps"] for s in steps),
+                "reason": reason
+            }
+    return {
+        "saturated_at": None,
+        "last_scaling_load": steps[-1]["load"] if steps else None,
+        "peak_throughput_rps": max((s["throughput_rps"] for s in steps), default=0.0),
+        "reason": "not saturated within tested range"
+    }
+
+
+# ================================================================
+# 本地替身环境
+# ================================================================
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(url, timeout=1.0)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"服务未就绪: {url}")
+
+
+class LocalEnvironment:
+    """启动替身服务与指向它的后端进程（独立的任务 / 图谱存储，避免污染本地数据）"""
+
+    def __init__(self, standin_config: Optional[str], seed: int, workdir: Path):
+        self.standin_port = _free_port()
+        self.backend_port = _free_port()
+        self.standin_config = standin_config
+        self.seed = seed
+        self.workdir = workdir
+        self.processes: List[subprocess.Popen] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.backend_port}"
+
+    async def __aenter__(self):
+        standin_url = f"http://127.0.0.1:{self.standin_port}"
+        command = [sys.executable, "-m", "standins.server", "--port", str(self.standin_port), "--seed", str(self.seed)]
+        if self.standin_config:
+            command += ["--config", self.standin_config]
+        self.processes.append(subprocess.Popen(command, cwd=BACKEND_DIR))
+        await _wait_ready(f"{standin_url}/_standin/stats")
+
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "standin",
+            "OPENAI_BASE_URL": f"{standin_url}/v1",
+            "TAVILY_API_KEY": "standin",
+            "TAVILY_BASE_URL": f"{standin_url}/tavily",
+            "SERPER_API_KEY": "standin",
+            "SERPER_BASE_URL": f"{standin_url}/serper",
+            "JOB_STORE_PATH": str(self.workdir / "jobs.db"),
+            "GRAPH_STORE_PATH": str(self.workdir / "graphs.db"),
+            "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+            # 替身服务没有账户配额，默认不限速，测量的是后端自身的容量（可显式设置以观察限速效果）
+            "RATE_LIMIT_ENABLED": os.getenv("RATE_LIMIT_ENABLED", "false"),
+        }
+        self.processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.backend_port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        ))
+        await _wait_ready(f"{self.base_url}/health")
+        print(f"本地环境就绪: 后端 {self.base_url}，替身服务 {standin_url}")
+        return self
+
+    async def __aexit__(self, *exc):
+        for process in reversed(self.processes):
+            process.send_signal(signal.SIGINT)
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# ================================================================
+# 主流程
+# ================================================================
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_step(name: str, mode: str, step: Dict[str, Any]):
+    load = f"c={int(step['load'])}" if mode == "ramp" else f"{step['load']}rps"
+    latency = step["latency_ms"]
+    ttfe = step.get("ttfe_ms", {}).get("p50")
+    print(
+        f"  {name:<24}{load:>9}{step['requests']:>7}{step['throughput_rps']:>9.2f}"
+        f"{step['error_rate']:>8.1%}{latency['p50'] or 0:>9.0f}{latency['p95'] or 0:>9.0f}"
+        f"{latency['p99'] or 0:>9.0f}{(f'{ttfe:.0f}' if ttfe is not None else '-'):>9}"
+    )
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    """按 (场景, 负载级别) 对比吞吐与 p95"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\n对比基线 {baseline_path}（commit {baseline.get('meta', {}).get('commit')}）")
+    print(f"  {'场景':<24}{'负载':>9}{'吞吐变化':>12}{'p95 变化':>12}")
+    for name, result in current["scenarios"].items():
+        base_steps = {s["load"]: s for s in baseline.get("scenarios", {}).get(name, {}).get("steps", [])}
+        for step in result["steps"]:
+            base = base_steps.get(step["load"])
+            if base is None:
+                continue
+            throughput = (step["throughput_rps"] / base["throughput_rps"] - 1) if base["throughput_rps"] else None
+            p95, base_p95 = step["latency_ms"]["p95"], base["latency_ms"]["p95"]
+            latency = (p95 / base_p95 - 1) if p95 and base_p95 else None
+            print(
+                f"  {name:<24}{step['load']:>9}"
+                f"{(f'{throughput:+.1%}' if throughput is not None else '-'):>12}"
+                f"{(f'{latency:+.1%}' if latency is not None else '-'):>12}"
+            )
+
+
+async def run(args) -> Dict[str, Any]:
+    names = list(SCENARIOS) if args.scenario == ["all"] else args.scenario
+    levels = args.concurrency if args.mode == "ramp" else args.rps
+    rng = random.Random(args.seed)
+    counter = iter(range(10 ** 9))
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "base_url": args.base_url,
+            "local": args.local,
+            "mode": args.mode,
+            "levels": levels,
+            "step_duration_s": args.duration,
+            "unique": args.unique
+        },
+        "scenarios": {}
+    }
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        print(f"  {'场景':<24}{'负载':>9}{'请求':>7}{'吞吐/s':>9}{'错误率':>8}"
+              f"{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'TTFE':>9}")
+        for name in names:
+            scenario = SCENARIOS[name]
+            steps = []
+            for _ in range(args.warmup):
+                await send_request(client, scenario, scenario["payload"](next(counter), args.unique), time.perf_counter())
+
+            for level in levels:
+                start = time.perf_counter()
+                if args.mode == "ramp":
+                    results = await run_closed_loop(
+                        client, scenario, int(level), args.duration, lambda: next(counter), args.unique
+                    )
+                else:
+                    results = await run_open_loop(
+                        client, scenario, level, args.duration, lambda: next(counter), args.unique,
+                        args.arrival == "poisson", rng
+                    )
+                step = summarize(results, time.perf_counter() - start, level, args.duration)
+                steps.append(step)
+                print_step(name, args.mode, step)
+
+            saturation = find_saturation(steps, args.mode, args)
+            report["scenarios"][name] = {"path": scenario["path"], "steps": steps, "saturation": saturation}
+            print(f"  → 饱和点: {saturation['saturated_at']}（{saturation['reason']}），"
+                  f"峰值吞吐 {saturation['peak_throughput_rps']} req/s")
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端压测")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="后端地址（--local 时忽略）")
+    parser.add_argument("--local", action="store_true", help="启动本地替身服务与后端进程")
+    parser.add_argument("--standin-config", help="替身服务配置文件，默认 config/standins.json")
+    parser.add_argument("--scenario", nargs="+", default=["analyze-v2"],
+                        choices=list(SCENARIOS) + ["all"], help="压测场景")
+    parser.add_argument("--mode", choices=["ramp", "open"], default="ramp", help="ramp：并发递增；open：固定到达率")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="ramp 模式的并发级别")
+    parser.add_argument("--rps", type=float, nargs="+", default=[0.5, 1, 2, 4, 8], help="open 模式的到达率级别")
+    parser.add_argument("--arrival", choices=["uniform", "poisson"], default="uniform", help="open 模式的到达分布")
+    parser.add_argument("--duration", type=float, default=30.0, help="每个负载级别持续时长（秒）")
+    parser.add_argument("--warmup", type=int, default=1, help="每个场景正式开始前的预热请求数")
+    parser.add_argument("--timeout", type=float, default=180.0, help="单个请求超时（秒）")
+    parser.add_argument("--unique", action="store_true", help="每个请求使用不同的查询内容（带本次运行标识），绕过拓扑 / 状态 / 搜索缓存")
+    parser.add_argument("--max-error-rate", type=float, default=0.05, help="错误率超过该值视为饱和")
+    parser.add_argument("--scaling-threshold", type=float, default=0.5,
+                        help="吞吐增幅低于负载增幅的该比例视为饱和")
+    parser.add_argument("--seed", type=int, default=0, help="泊松到达与替身服务的随机种子")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--compare", help="与之对比的历史结果 JSON")
+    args = parser.parse_args()
+
+    async def session():
+        if not args.local:
+            return await run(args)
+        workdir = BACKEND_DIR / "data" / "loadtest"
+        async with LocalEnvironment(args.standin_config, args.seed, workdir) as env:
+            args.base_url = env.base_url
+            return await run(args)
+
+    report = asyncio.run(session())
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n结果已写入 {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
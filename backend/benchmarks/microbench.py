@@ -0,0 +1,366 @@
+"""
+纯 Python 热路径微基准测试（带回归门禁）
+这些函数按节点 / 按搜索结果执行，耗时随图谱规模线性（或更快）增长：
+- NodeSensingService._filter_by_whitelist / _build_search_context_with_domains
+- YahooFinanceService.match_ticker
+- SearchService.build_context（perform_search 的上下文拼接）
+- NewsExtractionService._validate_result / TargetResearchService._validate_analysis（边引用校验）
+- SummaryGenerationService._build_simple_prompt / _build_complex_prompt
+
+每个基准在多个规模（10 / 100 / 1000）的合成数据上运行，记录单次调用耗时（多轮取最小值）与 tracemalloc 峰值内存。
+与基线 JSON 对比，任一基准耗时或内存超出容差即以非零状态退出，可直接用作 CI 门禁。
+
+用法（在 backend 目录下）：
+    python benchmarks/microbench.py                        # 与 benchmarks/baseline.json 对比
+    python benchmarks/microbench.py --save-baseline        # 重新生成基线（换机器后需要重新生成）
+
+对比基线时默认沿用基线记录的测量轮数（meta.rounds），保证门禁与生成基线时的测量方式一致。
+    python benchmarks/microbench.py --filter whitelist --sizes 100 1000 --tolerance 0.3
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import random
+import logging
+import platform
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Any, List, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# 服务构造时会创建 AsyncOpenAI 客户端，基准测试不发起调用
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.services.node_sensing_service import NodeSensingService
+from app.services.yahoo_finance_service import YahooFinanceService
+from app.services.search_service import SearchService
+from app.services.news_extraction_service import NewsExtractionService
+from app.services.target_research_service import TargetResearchService
+from app.services.summary_service import SummaryGenerationService
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_ROUNDS = 5
+
+# 只测函数本身的 CPU 开销，日志输出开销见 bench_logging.py
+logging.disable(logging.CRITICAL)
+
+# ================================================================
+# 合成数据
+# ================================================================
+
+OTHER_DOMAINS = ["someblog.net", "contentfarm.io", "forum.example.com", "news.aggregator.cn", "wiki.example.org"]
+LABEL_WORDS = ["黄金", "美元指数", "原油", "通胀", "利率", "就业", "铜价", "比特币", "国债收益率", "PMI", "消费", "地产"]
+
+
+def build_search_results(size: int, whitelist: List[str], rng: random.Random) -> List[Dict[str, Any]]:
+    """约一半来自白名单域名（含子域名），其余为非权威来源"""
+    results = []
+    for i in range(size):
+        if whitelist and rng.random() < 0.5:
+            domain = rng.choice(["", "www.", "markets."]) + rng.choice(whitelist)
+        else:
+            domain = rng.choice(OTHER_DOMAINS)
+        results.append({
+            "title": f"市场快讯 {i}: {rng.choice(LABEL_WORDS)}最新动态",
+            "snippet": f"据报道，{rng.choice(LABEL_WORDS)}在最近一个交易日出现波动，分析人士认为短期仍受政策预期影响。" * 2,
+            "url": f"https://{domain}/articles/{i}",
+            "domain": domain
+        })
+    return results
+
+
+def build_labels(size: int, rng: random.Random) -> List[str]:
+    """节点标签：部分精确命中映射表，部分模糊命中，其余不命中（走完整扫描）"""
+    keys = list(YahooFinanceService.TICKER_MAPPING)
+    labels = []
+    for i in range(size):
+        roll = rng.random()
+        if roll < 0.3:
+            labels.append(rng.choice(keys))
+        elif roll < 0.6:
+            labels.append(f"{rng.choice(keys)}走势")
+        else:
+            labels.append(f"{rng.choice(LABEL_WORDS)}因子{i}")
+    return labels
+
+
+def build_graph(size: int, rng: random.Random) -> Dict[str, Any]:
+    """size 个节点、约 1.5 × size 条边、引用全部合法的因果图"""
+    nodes = [
+        {
+            "id": f"n{i}",
+            "label": f"{rng.choice(LABEL_WORDS)}{i}",
+            "type": rng.choice(["cause", "effect", "intermediate"]),
+            "description": "节点描述：该因子通过预期与资金流影响下游资产价格。"
+        }
+        for i in range(size)
+    ]
+    edges = []
+    for i in range(1, size):
+        edges.append({"source": f"n{rng.randrange(i)}", "target": f"n{i}", "label": "推升", "strength": 0.7})
+        if rng.random() < 0.5:
+            edges.append({"source": f"n{rng.randrange(i)}", "target": f"n{i}", "label": "压制", "strength": 0.4})
+    return {"nodes": nodes, "edges": edges, "explanation": "整体因果关系的文字解释。"}
+
+
+def build_query_results(size: int, rng: random.Random):
+    """size 条结果平均分布在 size // 5 个查询上，含少量失败与空结果"""
+    query_count = max(1, size // 5)
+    queries = [f"{rng.choice(LABEL_WORDS)} latest news {i}" for i in range(query_count)]
+    all_results: List[Any] = []
+    for i in range(query_count):
+        if i % 10 == 9:
+            all_results.append(Exception("timeout"))
+        elif i % 10 == 8:
+            all_results.append([])
+        else:
+            all_results.append(build_search_results(5, [], rng))
+    return queries, all_results
+
+
+# ================================================================
+# 基准注册
+# ================================================================
+
+def build_benchmarks() -> Dict[str, Callable[[int], Callable[[], Any]]]:
+    """基准名 → (size → 无参调用)"""
+    sensing = NodeSensingService()
+    yahoo = YahooFinanceService()
+    search = SearchService()
+    news = NewsExtractionService()
+    target = TargetResearchService()
+    summary = SummaryGenerationService()
+
+    def whitelist_filter(size):
+        results = build_search_results(size, sensing.whitelist_domains, random.Random(size))
+        return lambda: sensing._filter_by_whitelist(results)
+
+    def domain_context(size):
+        results = build_search_results(size, sensing.whitelist_domains, random.Random(size))
+        return lambda: sensing._build_search_context_with_domains(results)
+
+    def ticker_match(size):
+        labels = build_labels(size, random.Random(size))
+        return lambda: [yahoo.match_ticker(label) for label in labels]
+
+    def search_context(size):
+        queries, all_results = build_query_results(size, random.Random(size))
+        return lambda: search.build_context(queries, all_results)
+
+    def news_validate(size):
+        graph = build_graph(size, random.Random(size))
+        return lambda: news._validate_result(graph)
+
+    def target_validate(size):
+        graph = build_graph(size, random.Random(size))
+        return lambda: target._validate_analysis(graph)
+
+    def summary_simple_prompt(size):
+        graph = build_graph(size, random.Random(size))
+        return lambda: summary._build_simple_prompt(graph)
+
+    def summary_complex_prompt(size):
+        graph = build_graph(size, random.Random(size))
+        return lambda: summary._build_complex_prompt(graph)
+
+    return {
+        "node_sensing.filter_by_whitelist": whitelist_filter,
+        "node_sensing.build_search_context_with_domains": domain_context,
+        "yahoo.match_ticker": ticker_match,
+        "search.build_context": search_context,
+        "news_extraction.validate_result": news_validate,
+        "target_research.validate_analysis": target_validate,
+        "summary.build_simple_prompt": summary_simple_prompt,
+        "summary.build_complex_prompt": summary_complex_prompt,
+    }
+
+
+# ================================================================
+# 测量
+# ================================================================
+
+def measure_time(func: Callable[[], Any], rounds: int, min_round_time: float) -> float:
+    """自动标定每轮调用次数，返回多轮中最小的单次耗时（秒）；与 timeit 一样测量期间关闭 GC"""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure_time(func, rounds, min_round_time)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _measure_time(func: Callable[[], Any], rounds: int, min_round_time: float) -> float:
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, int(min_round_time / elapsed) + 1)
+
+    best = elapsed / loops
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def measure_memory(func: Callable[[], Any]) -> float:
+    """单次调用的 tracemalloc 峰值（KiB），包含返回值"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak / 1024
+
+
+def prepare_benchmarks(args) -> Dict[str, Callable[[], Any]]:
+    """按 --filter / --sizes 生成待测调用，键形如 "summary.build_simple_prompt[100]" """
+    calls: Dict[str, Callable[[], Any]] = {}
+    for name, factory in build_benchmarks().items():
+        if args.filter and args.filter not in name:
+            continue
+        for size in args.sizes:
+            calls[f"{name}[{size}]"] = factory(size)
+    return calls
+
+
+def measure(func: Callable[[], Any], args) -> Dict[str, float]:
+    return {
+        "time_us": round(measure_time(func, args.rounds, args.min_round_time) * 1e6, 3),
+        "peak_kib": round(measure_memory(func), 2)
+    }
+
+
+def check_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    memory_tolerance: float,
+    verbose: bool = True
+) -> Dict[str, str]:
+    """返回超出容差的基准（键 → 描述）；基线中没有的基准只提示不判定"""
+    failures: Dict[str, str] = {}
+    base_results = baseline.get("results", {})
+
+    for key, current in results.items():
+        base = base_results.get(key)
+        if base is None:
+            if verbose:
+                print(f"  {key:<56}{'(基线中不存在)':>28}")
+            continue
+
+        time_ratio = current["time_us"] / base["time_us"] if base["time_us"] else 1.0
+        memory_ratio = current["peak_kib"] / base["peak_kib"] if base["peak_kib"] else 1.0
+        flags = []
+        if time_ratio > 1 + tolerance:
+            flags.append("TIME")
+        if memory_ratio > 1 + memory_tolerance:
+            flags.append("MEM")
+        if verbose:
+            print(f"  {key:<56}{time_ratio - 1:>+13.1%}{memory_ratio - 1:>+13.1%}  {' '.join(flags)}")
+        if flags:
+            failures[key] = (
+                f"time {base['time_us']}µs → {current['time_us']}µs, "
+                f"peak {base['peak_kib']}KiB → {current['peak_kib']}KiB"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="纯 Python 热路径微基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="合成数据规模")
+    parser.add_argument("--filter", help="只运行名称包含该子串的基准")
+    parser.add_argument(
+        "--rounds", type=int, default=None,
+        help=f"每个基准的测量轮数（取最小值）；默认沿用基线的 meta.rounds，无基线或生成基线时为 {DEFAULT_ROUNDS}"
+    )
+    parser.add_argument("--min-round-time", type=float, default=0.05, help="每轮最短耗时（秒）")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="基线 JSON 路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写为基线（与已有基线合并）")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="耗时回归容差（0.25 = 慢 25%% 以内视为通过）")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="峰值内存回归容差")
+    parser.add_argument("--retries", type=int, default=3, help="超标基准的重测次数（排除偶发抖动）")
+    parser.add_argument("--output", help="本次结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = None
+    if not args.save_baseline and baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if args.rounds is None:
+        args.rounds = int((baseline or {}).get("meta", {}).get("rounds", DEFAULT_ROUNDS))
+
+    print(f"测量轮数: {args.rounds}")
+    print(f"  {'基准':<56}{'耗时 µs':>14}{'峰值 KiB':>14}")
+    calls = prepare_benchmarks(args)
+    results: Dict[str, Dict[str, float]] = {}
+    for key, func in calls.items():
+        results[key] = measure(func, args)
+        print(f"  {key:<56}{results[key]['time_us']:>14.2f}{results[key]['peak_kib']:>14.1f}")
+    meta = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "rounds": args.rounds
+    }
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps({"meta": meta, "results": results}, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+    if args.save_baseline:
+        existing = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+        merged = {"meta": meta, "results": {**existing.get("results", {}), **results}}
+        baseline_path.write_text(json.dumps(merged, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\n基线已写入 {baseline_path}")
+        return
+
+    if baseline is None:
+        print(f"\n基线不存在: {baseline_path}（使用 --save-baseline 生成）")
+        return
+
+    print(f"\n对比基线（{baseline.get('meta', {}).get('created_at', '?')}，"
+          f"容差 时间 {args.tolerance:.0%} / 内存 {args.memory_tolerance:.0%}）")
+    failures = check_regressions(results, baseline, args.tolerance, args.memory_tolerance)
+
+    # 共享 / 虚拟化机器上偶发的调度抖动会造成单次超标：只重测超标项，耗时取各次最小值
+    for attempt in range(args.retries):
+        if not failures:
+            break
+        print(f"\n重测 {len(failures)} 个超标基准（第 {attempt + 1}/{args.retries} 次）")
+        for key in failures:
+            retry = measure(calls[key], args)
+            results[key] = {
+                "time_us": min(results[key]["time_us"], retry["time_us"]),
+                "peak_kib": min(results[key]["peak_kib"], retry["peak_kib"])
+            }
+        failures = check_regressions(
+            {key: results[key] for key in failures}, baseline, args.tolerance, args.memory_tolerance
+        )
+
+    if failures:
+        print(f"\n{len(failures)} 个基准超出容差：")
+        for key, detail in failures.items():
+            print(f"  - {key}: {detail}")
+        sys.exit(1)
+    print("\n全部基准在容差范围内")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,32 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+# 日志必须在导入服务模块之前配置（队列化异步输出，见 app/utils/logging_setup.py）
+from app.utils.logging_setup import configure_logging, bind_request_id, reset_request_id
+configure_logging()
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import time
+import uuid
+
+from app.utils.load_monitor import load_monitor
+from app.utils import codec
+from app.utils.compression import CompressionMiddleware
+from app.utils.metrics import registry, Gauge, PROMETHEUS_CONTENT_TYPE
+from app.utils.cache_backend import refresh_usage as refresh_cache_usage
+from app.utils import tracing
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds", "HTTP 请求耗时（秒，流式响应只计到响应头发出）", ["method", "route", "status"]
+)
 
 app = FastAPI(
     title="因果推演引擎 API",
     description="基于大模型的因果推演引擎后端服务",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=codec.CodecResponse  # orjson 编码，可协商 MessagePack
 )
 
 # 配置 CORS
@@ -21,6 +39,97 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（gzip / brotli，超过 COMPRESSION_MIN_SIZE 字节的非流式响应）
+app.add_middleware(CompressionMiddleware)
+
+# 统计交互请求负载（后台预热任务据此让路）
+# 流式响应（SSE 推演等）在响应体发送完毕后才计为结束
+@app.middleware("http")
+async def track_interactive_load(request: Request, call_next):
+    load_monitor.request_started()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    except BaseException:
+        load_monitor.request_finished()
+        raise
+    finally:
+        # 按路由模板聚合，避免 /graphs/{graph_id} 之类的路径参数造成标签爆炸
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+    body_iterator = response.body_iterator
+
+    async def finish_after_body():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            load_monitor.request_finished()
+
+    response.body_iterator = finish_after_body()
+    return response
+
+def _collect_load() -> list:
+    in_flight = Gauge("http_requests_in_flight", "进行中的 HTTP 请求数")
+    in_flight.set(load_monitor.in_flight)
+    return [in_flight]
+
+registry.register_collector(_collect_load)
+
+# 响应格式协商（Accept: application/msgpack）
+@app.middleware("http")
+async def negotiate_response_codec(request: Request, call_next):
+    token = codec.negotiate(request.headers.get("accept"))
+    try:
+        return await call_next(request)
+    finally:
+        codec.reset(token)
+
+# 请求追踪：Server-Timing 响应头 + 慢请求 Span 树落盘（/debug/traces）
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if not tracing.TRACING_ENABLED:
+        return await call_next(request)
+
+    with tracing.start_trace(f"{request.method} {request.url.path}") as trace:
+        response = await call_next(request)
+        response.headers["Server-Timing"] = trace.server_timing()
+
+    # 流式响应在响应体发送完毕后才结束追踪
+    body_iterator = response.body_iterator
+
+    async def finish_after_body():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            trace.finish()
+            if tracing.slow_trace_buffer.should_keep(trace):
+                await tracing.slow_trace_buffer.add(trace)
+
+    response.body_iterator = finish_after_body()
+    return response
+
+# 请求 ID：沿用上游传入的 X-Request-ID，写入本请求的所有日志并回传
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:12]
+    token = bind_request_id(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_id(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 @app.get("/")
 async def root():
     return {"message": "因果推演引擎 API"}
@@ -29,12 +138,37 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 抓取端点（共享缓存后端的占用统计先在线程中查询，渲染在事件循环上进行）"""
+    await refresh_cache_usage()
+    return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # 导入路由
-from app.api import causal_router
+from app.api import causal_router, job_router, debug_router
+from app.services.service_registry import services
 
 app.include_router(causal_router.router, prefix="/api/v1", tags=["causal"])
+app.include_router(job_router.router, prefix="/api/v1", tags=["jobs"])
+# /debug/traces 暴露完整请求追踪（查询内容、上游耗时），默认不挂载，仅在受信任环境中显式开启
+if os.getenv("DEBUG_ENDPOINTS_ENABLED", "false").lower() == "true":
+    app.include_router(debug_router.router, prefix="/debug", tags=["debug"])
+
+@app.on_event("startup")
+async def start_background_workers():
+    await services.warm_up()
+    await job_router.job_service.start()
+    # 关注列表预热依赖双阶段与节点感知服务，未启用时不构建
+    if os.getenv("WATCHLIST_ENABLED", "false").lower() == "true":
+        scheduler = await services.aget("watchlist_scheduler")
+        await scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    if services.is_built("watchlist_scheduler"):
+        await services.get("watchlist_scheduler").stop()
+    await job_router.job_service.stop()
 
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
-
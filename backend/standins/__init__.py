@@ -0,0 +1 @@
+"""本地替身服务：OpenAI 兼容 Chat 与 Tavily / Serper 搜索接口（见 standins/server.py）"""
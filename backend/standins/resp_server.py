@@ -0,0 +1,291 @@
+"""
+Redis 协议替身 (RESP Stand-in)
+单进程内存键值服务，实现缓存后端（app/utils/cache_backend.py 的 RedisBackend）用到的 RESP2 命令子集，
+用于在没有 Redis 的环境中验证多 worker 共享缓存：
+- PING · AUTH（接受任意密码）· SELECT · GET · SET（EX / PX / NX / XX）· DEL · EXISTS · SCAN（MATCH / COUNT）
+- WATCH · UNWATCH · MULTI · EXEC · DISCARD（乐观事务，供共享令牌桶的原子读改写使用）
+- DBSIZE · FLUSHDB · FLUSHALL · INFO（keyspace 与 used_memory）
+
+可选 --latency-ms 为每条命令注入固定延迟，模拟跨机房访问。
+
+用法（在 backend 目录下）：
+    python -m standins.resp_server --port 6380
+
+后端指向替身服务：
+    CACHE_BACKEND=redis
+    CACHE_REDIS_URL=redis://127.0.0.1:6380/0
+"""
+
+import sys
+import time
+import fnmatch
+import asyncio
+import argparse
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger("standins.resp")
+
+
+class RespError(Exception):
+    """以 -ERR 回复客户端的错误"""
+
+
+# EXEC 因 WATCH 的键被修改而放弃时的回复（*-1，区别于空字符串回复 $-1）
+NULL_ARRAY = object()
+
+
+class RespStandin:
+    """内存键值存储 + RESP2 协议处理"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        # db -> key -> (value, 过期时间 或 None)
+        self._dbs: Dict[int, Dict[bytes, Tuple[bytes, Optional[float]]]] = {}
+        # (db, key) -> 修改版本号，WATCH 据此判断事务期间键是否被修改；FLUSH 使所有版本失效
+        self._versions: Dict[Tuple[int, bytes], int] = {}
+        self._epoch = 0
+        self.commands = 0
+
+    def _db(self, index: int) -> Dict[bytes, Tuple[bytes, Optional[float]]]:
+        return self._dbs.setdefault(index, {})
+
+    def _live(self, db: Dict[bytes, Tuple[bytes, Optional[float]]], key: bytes) -> Optional[bytes]:
+        entry = db.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del db[key]
+            return None
+        return value
+
+    # ================================================================
+    # 协议
+    # ================================================================
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        state: Dict[str, Any] = {"db": 0, "watched": {}, "multi": None}
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                if self.latency_ms:
+                    await asyncio.sleep(self.latency_ms / 1000)
+                self.commands += 1
+                try:
+                    reply = self.execute(command, state)
+                except RespError as e:
+                    reply = e
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # 内联命令（如 telnet / redis-cli 手动输入）
+            return line.strip().split()
+        parts = []
+        for _ in range(int(line[1:-2])):
+            header = await reader.readline()
+            length = int(header[1:-2])
+            data = await reader.readexactly(length + 2)
+            parts.append(data[:-2])
+        return parts
+
+    def _encode(self, reply: Any) -> bytes:
+        if reply is NULL_ARRAY:
+            return b"*-1\r\n"
+        if isinstance(reply, RespError):
+            return f"-ERR {reply}\r\n".encode()
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if isinstance(reply, bytes):
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(self._encode(item) for item in reply)
+        raise TypeError(f"无法编码的回复: {type(reply)}")
+
+    # ================================================================
+    # 命令
+    # ================================================================
+
+    def _version(self, db_index: int, key: bytes) -> Tuple[int, int]:
+        return self._epoch, self._versions.get((db_index, key), 0)
+
+    def _touch(self, db_index: int, key: bytes):
+        self._versions[(db_index, key)] = self._versions.get((db_index, key), 0) + 1
+
+    def execute(self, command: List[bytes], state: Dict[str, Any]) -> Any:
+        if not command:
+            raise RespError("empty command")
+        name = command[0].decode().upper()
+        args = command[1:]
+
+        # 事务：MULTI 之后的命令排队，EXEC 时检查 WATCH 的键并依次执行
+        if state["multi"] is not None and name not in ("EXEC", "DISCARD", "MULTI", "WATCH"):
+            state["multi"].append(command)
+            return "QUEUED"
+        if name == "WATCH":
+            if state["multi"] is not None:
+                raise RespError("WATCH inside MULTI is not allowed")
+            for key in args:
+                state["watched"][(state["db"], key)] = self._version(state["db"], key)
+            return "OK"
+        if name == "UNWATCH":
+            state["watched"] = {}
+            return "OK"
+        if name == "MULTI":
+            if state["multi"] is not None:
+                raise RespError("MULTI calls can not be nested")
+            state["multi"] = []
+            return "OK"
+        if name == "DISCARD":
+            if state["multi"] is None:
+                raise RespError("DISCARD without MULTI")
+            state["multi"], state["watched"] = None, {}
+            return "OK"
+        if name == "EXEC":
+            if state["multi"] is None:
+                raise RespError("EXEC without MULTI")
+            queued, watched = state["multi"], state["watched"]
+            state["multi"], state["watched"] = None, {}
+            if any(self._version(*item) != version for item, version in watched.items()):
+                return NULL_ARRAY
+            replies = []
+            for queued_command in queued:
+                try:
+                    replies.append(self.execute(queued_command, state))
+                except RespError as e:
+                    replies.append(e)
+            return replies
+
+        db = self._db(state["db"])
+
+        if name == "PING":
+            return args[0] if args else "PONG"
+        if name == "AUTH":
+            return "OK"
+        if name == "SELECT":
+            state["db"] = int(args[0])
+            return "OK"
+        if name == "GET":
+            return self._live(db, args[0])
+        if name == "SET":
+            reply = self._set(db, args)
+            if reply is not None:
+                self._touch(state["db"], args[0])
+            return reply
+        if name == "DEL":
+            deleted = [key for key in args if self._live(db, key) is not None and db.pop(key, None) is not None]
+            for key in deleted:
+                self._touch(state["db"], key)
+            return len(deleted)
+        if name == "EXISTS":
+            return sum(1 for key in args if self._live(db, key) is not None)
+        if name == "SCAN":
+            return self._scan(db, args)
+        if name == "DBSIZE":
+            return sum(1 for key in list(db) if self._live(db, key) is not None)
+        if name == "FLUSHDB":
+            db.clear()
+            self._epoch += 1
+            return "OK"
+        if name == "FLUSHALL":
+            self._dbs.clear()
+            self._epoch += 1
+            return "OK"
+        if name == "INFO":
+            return self._info().encode()
+        raise RespError(f"unknown command '{name}'")
+
+    def _set(self, db: Dict[bytes, Tuple[bytes, Optional[float]]], args: List[bytes]) -> Any:
+        if len(args) < 2:
+            raise RespError("wrong number of arguments for 'set' command")
+        key, value = args[0], args[1]
+        expires_at, only_new, only_existing = None, False, False
+        options = [arg.decode().upper() for arg in args[2:]]
+        i = 0
+        while i < len(options):
+            option = options[i]
+            if option in ("EX", "PX"):
+                amount = float(options[i + 1])
+                expires_at = time.time() + (amount if option == "EX" else amount / 1000)
+                i += 2
+                continue
+            if option == "NX":
+                only_new = True
+            elif option == "XX":
+                only_existing = True
+            else:
+                raise RespError("syntax error")
+            i += 1
+
+        exists = self._live(db, key) is not None
+        if (only_new and exists) or (only_existing and not exists):
+            return None
+        db[key] = (value, expires_at)
+        return "OK"
+
+    def _scan(self, db: Dict[bytes, Tuple[bytes, Optional[float]]], args: List[bytes]) -> List[Any]:
+        cursor = int(args[0])
+        pattern, count = "*", 10
+        options = args[1:]
+        for i in range(0, len(options) - 1, 2):
+            option = options[i].decode().upper()
+            if option == "MATCH":
+                pattern = options[i + 1].decode()
+            elif option == "COUNT":
+                count = int(options[i + 1])
+
+        # 游标为键列表中的偏移量（扫描期间的增删可能导致重复或遗漏，与 Redis 的保证一致）
+        keys = sorted(db)
+        batch = keys[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(keys) else 0
+        matched = [key for key in batch if self._live(db, key) is not None and fnmatch.fnmatchcase(key.decode(), pattern)]
+        return [str(next_cursor).encode(), matched]
+
+    def _info(self) -> str:
+        used = sum(len(k) + len(v) for db in self._dbs.values() for k, (v, _) in db.items())
+        lines = ["# Memory", f"used_memory:{used}", "# Stats", f"total_commands_processed:{self.commands}", "# Keyspace"]
+        for index, db in sorted(self._dbs.items()):
+            if db:
+                lines.append(f"db{index}:keys={len(db)}")
+        return "\r\n".join(lines) + "\r\n"
+
+
+async def serve(host: str, port: int, latency_ms: float = 0.0):
+    standin = RespStandin(latency_ms=latency_ms)
+    server = await asyncio.start_server(standin.handle, host, port)
+    logger.info("RESP 替身服务监听 %s:%s", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis 协议（RESP）本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每条命令的固定延迟（毫秒）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, args.latency_ms))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
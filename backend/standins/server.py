@@ -0,0 +1,496 @@
+"""
+本地替身服务 (Stand-in Servers)
+在一个进程内模拟后端依赖的外部接口，用于离线压测、吞吐测量与故障注入，不消耗真实 Token / 搜索额度：
+- OpenAI 兼容 Chat：POST /v1/chat/completions（支持 JSON 模式与 stream=True 流式输出）
+- Tavily：POST /tavily/search
+- Serper：POST /serper/search
+- 结构化数据 API（structured_api_adapters.py 的上游）：
+  FRED GET /fred/series/observations · Tushare POST /tushare ·
+  SEC EDGAR GET /sec/submissions/CIK{cik}.json · CCXT（Binance 兼容）GET /ccxt/api/v3/ticker/24hr ·
+  Polygon GET /polygon/v2/snapshot/locale/us/markets/stocks/tickers
+
+延迟分布、错误与 429 注入、响应模板由 config/standins.json 配置，运行中可通过管理接口调整：
+- GET /_standin/config · PATCH /_standin/config（深度合并）· GET /_standin/stats · POST /_standin/reset
+
+用法（在 backend 目录下）：
+    python -m standins.server --port 8900
+
+后端指向替身服务：
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+    TAVILY_BASE_URL=http://127.0.0.1:8900/tavily
+    SERPER_BASE_URL=http://127.0.0.1:8900/serper
+    TAVILY_API_KEY=standin          # 任意非空值，使服务走真实搜索分支
+    FRED_BASE_URL=http://127.0.0.1:8900/fred            FRED_API_KEY=standin
+    TUSHARE_BASE_URL=http://127.0.0.1:8900/tushare      TUSHARE_TOKEN=standin
+    SEC_EDGAR_BASE_URL=http://127.0.0.1:8900/sec        SEC_USER_AGENT="standin admin@example.com"
+    CCXT_BASE_URL=http://127.0.0.1:8900/ccxt
+    POLYGON_BASE_URL=http://127.0.0.1:8900/polygon      POLYGON_API_KEY=standin
+"""
+
+import re
+import sys
+import copy
+import json
+import math
+import time
+import uuid
+import zlib
+import random
+import asyncio
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+logger = logging.getLogger("standins")
+
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / "config" / "standins.json"
+
+
+def _deep_merge(base: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _deep_merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估算 Token 数（中英文混合按 2 字符 / Token）"""
+    return max(1, math.ceil(len(text) / 2))
+
+
+_LINE_COMMENT = re.compile(r"(?<=\s)//[^\n]*")
+
+
+def example_from_prompt(prompt: str) -> Optional[Any]:
+    """从提示词中提取首个可解析的 JSON 对象示例（通常位于"JSON 格式"说明之后，忽略 // 行注释）"""
+    decoder = json.JSONDecoder()
+    prompt = _LINE_COMMENT.sub("", prompt)
+    start = prompt.find("JSON")
+    index = prompt.find("{", max(start, 0))
+    while index != -1:
+        try:
+            value, _ = decoder.raw_decode(prompt[index:])
+            if isinstance(value, dict) and value:
+                return value
+        except ValueError:
+            pass
+        index = prompt.find("{", index + 1)
+    return None
+
+
+class StandinState:
+    """替身服务的配置与统计"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.initial_config = copy.deepcopy(config)
+        self.config = config
+        self.rng = random.Random(config.get("seed"))
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def reset(self):
+        self.config = copy.deepcopy(self.initial_config)
+        self.rng = random.Random(self.config.get("seed"))
+        self.stats = {}
+
+    def endpoint(self, name: str) -> Dict[str, Any]:
+        return self.config.get("endpoints", {}).get(name, {})
+
+    def count(self, name: str, outcome: str, amount: int = 1):
+        bucket = self.stats.setdefault(name, {})
+        bucket[outcome] = bucket.get(outcome, 0) + amount
+
+    # ================================================================
+    # 延迟与故障注入
+    # ================================================================
+
+    def sample_latency(self, name: str) -> float:
+        """按配置分布采样延迟（秒）"""
+        latency = self.endpoint(name).get("latency", {})
+        distribution = latency.get("distribution", "fixed")
+
+        if distribution == "uniform":
+            ms = self.rng.uniform(latency.get("min_ms", 0), latency.get("max_ms", 0))
+        elif distribution == "lognormal":
+            ms = latency.get("median_ms", 0) * math.exp(self.rng.gauss(0, latency.get("sigma", 0.5)))
+        else:
+            ms = latency.get("ms", 0)
+
+        if "max_ms" in latency:
+            ms = min(ms, latency["max_ms"])
+        return max(ms, 0) / 1000
+
+    def inject_fault(self, name: str, error_body) -> Optional[JSONResponse]:
+        """按 rate_limit_rate / error_rate 返回 429 或 500；未命中返回 None"""
+        endpoint = self.endpoint(name)
+        roll = self.rng.random()
+        rate_limit_rate = endpoint.get("rate_limit_rate", 0.0)
+
+        if roll < rate_limit_rate:
+            self.count(name, "429")
+            return JSONResponse(
+                error_body("rate_limit_exceeded", "Rate limit reached (stand-in)"),
+                status_code=429,
+                headers={"Retry-After": str(endpoint.get("retry_after", 1))}
+            )
+        if roll < rate_limit_rate + endpoint.get("error_rate", 0.0):
+            self.count(name, "500")
+            return JSONResponse(error_body("server_error", "Injected failure (stand-in)"), status_code=500)
+        return None
+
+
+def _openai_error(error_type: str, message: str) -> Dict[str, Any]:
+    return {"error": {"message": message, "type": error_type, "code": error_type}}
+
+
+def _search_error(error_type: str, message: str) -> Dict[str, Any]:
+    return {"detail": {"error": message, "type": error_type}}
+
+
+# ================================================================
+# 应用
+# ================================================================
+
+def create_app(config: Dict[str, Any]) -> FastAPI:
+    state = StandinState(config)
+    app = FastAPI(title="Stand-in Servers", description="OpenAI / Tavily / Serper / 结构化数据 API 本地替身服务")
+    app.state.standin = state
+
+    # ------------------------------------------------------------
+    # OpenAI 兼容 Chat
+    # ------------------------------------------------------------
+
+    def render_content(body: Dict[str, Any]) -> str:
+        messages = body.get("messages", [])
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+
+        if not json_mode:
+            return state.config.get("text_response", "stand-in response")
+
+        for template in state.config.get("chat_templates", {}).get("templates", []):
+            if template.get("match") and template["match"] in text:
+                return json.dumps(template["response"], ensure_ascii=False)
+
+        # 优先使用 system prompt 中的格式示例，其次是 user 消息中的
+        for role in ("system", "user"):
+            prompt = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == role)
+            example = example_from_prompt(prompt)
+            if example is not None:
+                return json.dumps(example, ensure_ascii=False)
+        return "{}"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fault = state.inject_fault("chat", _openai_error)
+        if fault is not None:
+            return fault
+
+        content = render_content(body)
+        model = body.get("model", "stand-in")
+        prompt_tokens = _estimate_tokens("".join(str(m.get("content", "")) for m in body.get("messages", [])))
+        completion_tokens = _estimate_tokens(content)
+        tokens_per_second = state.endpoint("chat").get("tokens_per_second", 0)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        # 采样延迟视为首 Token 时间；其后按 tokens_per_second 输出
+        first_token = state.sample_latency("chat")
+
+        if body.get("stream"):
+            state.count("chat", "stream")
+            return StreamingResponse(
+                _stream_chat(completion_id, created, model, content, first_token, tokens_per_second),
+                media_type="text/event-stream"
+            )
+
+        generation = completion_tokens / tokens_per_second if tokens_per_second else 0
+        await asyncio.sleep(first_token + generation)
+        state.count("chat", "ok")
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    async def _stream_chat(completion_id, created, model, content, first_token, tokens_per_second):
+        def chunk(delta: Dict[str, Any], finish_reason=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        await asyncio.sleep(first_token)
+        yield chunk({"role": "assistant", "content": ""})
+
+        # 每个分片约 4 个 Token（8 个字符）
+        piece_size = 8
+        interval = (piece_size / 2) / tokens_per_second if tokens_per_second else 0
+        for i in range(0, len(content), piece_size):
+            yield chunk({"content": content[i:i + piece_size]})
+            if interval:
+                await asyncio.sleep(interval)
+
+        yield chunk({}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    # ------------------------------------------------------------
+    # Tavily / Serper
+    # ------------------------------------------------------------
+
+    def search_results(name: str, query: str, limit: int) -> List[Dict[str, Any]]:
+        search = state.config.get("search", {})
+        if state.rng.random() < state.endpoint(name).get("empty_rate", 0.0):
+            return []
+
+        for fixed in search.get("fixed_results", []):
+            if fixed.get("match") and fixed["match"].lower() in query.lower():
+                return copy.deepcopy(fixed["results"][:limit])
+
+        domains = search.get("domains") or ["example.com"]
+        count = min(limit, search.get("results_per_query", 5))
+        results = []
+        for i in range(count):
+            domain = state.rng.choice(domains)
+            value = round(state.rng.uniform(1, 200), 2)
+            results.append({
+                "title": f"{query} - 最新数据 ({domain})",
+                "url": f"https://www.{domain}/standin/{uuid.uuid4().hex[:8]}",
+                "content": f"最新数据显示，{query} 当前为 {value}，较前值{state.rng.choice(['上升', '下降', '持平'])}。"
+            })
+        return results
+
+    @app.post("/tavily/search")
+    async def tavily_search(request: Request):
+        body = await request.json()
+        fault = state.inject_fault("tavily", _search_error)
+        if fault is not None:
+            return fault
+
+        latency = state.sample_latency("tavily")
+        await asyncio.sleep(latency)
+        query = body.get("query", "")
+        results = search_results("tavily", query, body.get("max_results", 5))
+        state.count("tavily", "ok" if results else "empty")
+        return {
+            "query": query,
+            "answer": None,
+            "images": [],
+            "results": [
+                {**r, "score": round(0.95 - i * 0.05, 2), "published_date": time.strftime("%Y-%m-%d")}
+                for i, r in enumerate(results)
+            ],
+            "response_time": round(latency, 3)
+        }
+
+    @app.post("/serper/search")
+    async def serper_search(request: Request):
+        body = await request.json()
+        fault = state.inject_fault("serper", _search_error)
+        if fault is not None:
+            return fault
+
+        await asyncio.sleep(state.sample_latency("serper"))
+        query = body.get("q", "")
+        results = search_results("serper", query, body.get("num", 10))
+        state.count("serper", "ok" if results else "empty")
+        return {
+            "searchParameters": {"q": query, "type": "search", "engine": "google"},
+            "organic": [
+                {
+                    "title": r["title"],
+                    "link": r["url"],
+                    "snippet": r["content"],
+                    "position": i + 1,
+                    "domain": urlparse(r["url"]).netloc
+                }
+                for i, r in enumerate(results)
+            ]
+        }
+
+    # ------------------------------------------------------------
+    # 结构化数据 API
+    # ------------------------------------------------------------
+
+    def market_value(series_id: str) -> float:
+        """序列的模拟数值：配置的基准值（未配置时由 ID 哈希得出）上下随机波动"""
+        market = state.config.get("market_data", {})
+        base = market.get("base_values", {}).get(series_id)
+        if base is None:
+            base = 10 + zlib.crc32(series_id.encode()) % 5000 / 10
+        return base * (1 + state.rng.uniform(-1, 1) * market.get("volatility", 0.01))
+
+    async def structured_call(name: str, series_count: int) -> Optional[JSONResponse]:
+        """延迟与故障注入；stats 中 calls / series 之比即平均批量大小"""
+        fault = state.inject_fault(name, _search_error)
+        if fault is not None:
+            return fault
+        await asyncio.sleep(state.sample_latency(name))
+        state.count(name, "calls")
+        state.count(name, "series", series_count)
+        return None
+
+    @app.get("/fred/series/observations")
+    async def fred_observations(series_id: str, limit: int = 1):
+        fault = await structured_call("fred", 1)
+        if fault is not None:
+            return fault
+        today = time.time()
+        observations = [
+            {"date": time.strftime("%Y-%m-%d", time.gmtime(today - i * 86400)), "value": f"{market_value(series_id):.2f}"}
+            for i in range(limit)
+        ]
+        return {"count": len(observations), "limit": limit, "observations": observations}
+
+    @app.post("/tushare")
+    async def tushare(request: Request):
+        body = await request.json()
+        ts_codes = [code for code in (body.get("params") or {}).get("ts_code", "").split(",") if code]
+        fault = await structured_call("tushare", max(1, len(ts_codes)))
+        if fault is not None:
+            return fault
+
+        api_name = body.get("api_name", "")
+        if ts_codes:
+            trade_date = time.strftime("%Y%m%d")
+            fields = ["ts_code", "trade_date", "close", "bid_close", "pct_chg"]
+            items = []
+            for code in ts_codes:
+                close = round(market_value(code), 2)
+                items.append([code, trade_date, close, close, round(state.rng.uniform(-3, 3), 2)])
+        else:
+            # 月度宏观接口（cn_cpi / sf_month 等）
+            fields = ["month", "nt_yoy", "inc_month"]
+            items = [[time.strftime("%Y%m"), round(state.rng.uniform(-1, 3), 2), round(state.rng.uniform(1e4, 4e4), 1)]]
+        return {"request_id": uuid.uuid4().hex, "code": 0, "msg": "", "data": {"api_name": api_name, "fields": fields, "items": items}}
+
+    @app.get("/sec/submissions/CIK{cik}.json")
+    async def sec_submissions(cik: str):
+        fault = await structured_call("sec_edgar", 1)
+        if fault is not None:
+            return fault
+        forms = ["10-Q", "8-K", "10-K", "4"]
+        dates = [time.strftime("%Y-%m-%d", time.gmtime(time.time() - (i + 1) * 20 * 86400)) for i in range(len(forms))]
+        return {
+            "cik": cik.lstrip("0"),
+            "name": f"STAND-IN COMPANY {cik}",
+            "filings": {"recent": {
+                "form": forms,
+                "filingDate": dates,
+                "accessionNumber": [f"{cik}-{i:02d}-{zlib.crc32(cik.encode()) % 100000:06d}" for i in range(len(forms))]
+            }}
+        }
+
+    @app.get("/ccxt/api/v3/ticker/24hr")
+    async def ccxt_ticker(symbols: str):
+        symbol_list = json.loads(symbols)
+        fault = await structured_call("ccxt", len(symbol_list))
+        if fault is not None:
+            return fault
+        close_time = int(time.time() * 1000)
+        return [
+            {
+                "symbol": symbol,
+                "lastPrice": f"{market_value(symbol):.2f}",
+                "priceChangePercent": f"{state.rng.uniform(-5, 5):.3f}",
+                "closeTime": close_time
+            }
+            for symbol in symbol_list
+        ]
+
+    @app.get("/polygon/v2/snapshot/locale/us/markets/stocks/tickers")
+    async def polygon_snapshot(tickers: str = ""):
+        ticker_list = [ticker for ticker in tickers.split(",") if ticker]
+        fault = await structured_call("polygon", len(ticker_list))
+        if fault is not None:
+            return fault
+        updated = time.time_ns()
+        return {
+            "status": "OK",
+            "count": len(ticker_list),
+            "tickers": [
+                {
+                    "ticker": ticker,
+                    "lastTrade": {"p": round(market_value(ticker), 2)},
+                    "todaysChangePerc": round(state.rng.uniform(-3, 3), 3),
+                    "updated": updated
+                }
+                for ticker in ticker_list
+            ]
+        }
+
+    # ------------------------------------------------------------
+    # 管理接口
+    # ------------------------------------------------------------
+
+    @app.get("/_standin/config")
+    async def get_config():
+        return state.config
+
+    @app.patch("/_standin/config")
+    async def patch_config(request: Request):
+        """深度合并配置，例：{"endpoints": {"tavily": {"rate_limit_rate": 0.3}}}"""
+        _deep_merge(state.config, await request.json())
+        if "seed" in state.config:
+            state.rng.seed(state.config["seed"])
+        return state.config
+
+    @app.get("/_standin/stats")
+    async def get_stats():
+        return state.stats
+
+    @app.post("/_standin/reset")
+    async def reset():
+        state.reset()
+        return {"status": "reset"}
+
+    return app
+
+
+def load_config(path: Optional[str] = None) -> Dict[str, Any]:
+    with open(path or DEFAULT_CONFIG_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI / Tavily / Serper / 结构化数据 API 本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--config", default=None, help=f"配置文件（默认 {DEFAULT_CONFIG_PATH}）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，覆盖配置文件")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.seed is not None:
+        config["seed"] = args.seed
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    logger.info("[Standins] 监听 http://%s:%s", args.host, args.port)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
  * 主组件：整合图谱展示和侧边栏
  */
 
-import { useState, useEffect, useCallback, useMemo } from 'react'
+import { useState, useEffect, useCallback, useMemo, useRef } from 'react'
 import {
   ReactFlow,
   Background,
@@ -18,7 +18,7 @@ import '@xyflow/react/dist/style.css'
 import CustomNode from './CustomNode'
 import Sidebar from './Sidebar'
 import { convertAnalysisResult } from '../utils/dataTransform'
-import { getLayoutedElements } from '../utils/layoutUtils'
+import { relayoutGraph } from '../utils/layoutUtils'
 import { NODE_STYLES } from '../utils/dataTransform'
 
 /**
@@ -46,35 +46,56 @@ function CausalGraphViewer({
   const [edges, setEdges, onEdgesChange] = useEdgesState([])
   const [selectedNode, setSelectedNode] = useState(null)
   const [isLoading, setIsLoading] = useState(false)
+  // 上一次布局结果（拓扑与方向未变时沿用坐标）
+  const previousLayout = useRef(null)
 
   /**
    * 初始化图谱数据
    */
   useEffect(() => {
     if (!analysisResult) {
+      previousLayout.current = null
       setNodes([])
       setEdges([])
       return
     }
 
+    let cancelled = false
     setIsLoading(true)
 
-    try {
-      // 1. 转换后端数据为 React Flow 格式
-      const { nodes: convertedNodes, edges: convertedEdges } = 
-        convertAnalysisResult(analysisResult)
-
-      // 2. 使用 Dagre 计算布局
-      const { nodes: layoutedNodes, edges: layoutedEdges } = 
-        getLayoutedElements(convertedNodes, convertedEdges, layoutDirection)
-
-      // 3. 更新状态
-      setNodes(layoutedNodes)
-      setEdges(layoutedEdges)
-    } catch (error) {
-      console.error('图谱初始化失败:', error)
-    } finally {
-      setIsLoading(false)
+    const applyLayout = async () => {
+      try {
+        // 1. 转换后端数据为 React Flow 格式（带服务端布局坐标）
+        const { nodes: convertedNodes, edges: convertedEdges } = 
+          convertAnalysisResult(analysisResult)
+
+        // 2. 服务端布局优先；仅富化更新时沿用已有坐标；否则按需加载 dagre
+        const previous = previousLayout.current?.direction === layoutDirection
+          ? previousLayout.current
+          : null
+        const { nodes: layoutedNodes, edges: layoutedEdges } = await relayoutGraph(
+          convertedNodes,
+          convertedEdges,
+          layoutDirection,
+          previous,
+          analysisResult.layout
+        )
+        if (cancelled) return
+
+        // 3. 更新状态
+        previousLayout.current = { nodes: layoutedNodes, edges: layoutedEdges, direction: layoutDirection }
+        setNodes(layoutedNodes)
+        setEdges(layoutedEdges)
+      } catch (error) {
+        console.error('图谱初始化失败:', error)
+      } finally {
+        if (!cancelled) setIsLoading(false)
+      }
+    }
+
+    applyLayout()
+    return () => {
+      cancelled = true
     }
   }, [analysisResult, layoutDirection, setNodes, setEdges])
 
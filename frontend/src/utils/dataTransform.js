@@ -89,7 +89,7 @@ export function convertNodesToReactFlow(nodes) {
         confidence: node.confidence,
         originalData: node
       },
-      position: { x: 0, y: 0 }, // 初始位置，会被 Dagre 重新计算
+      position: node.position || { x: 0, y: 0 }, // 后端分层布局坐标；缺失时由 layoutUtils 计算
       style: {
         width: 220,
         height: 100
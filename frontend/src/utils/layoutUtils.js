@@ -1,31 +1,68 @@
 /**
- * Dagre 自动布局工具函数
+ * 自动布局工具函数
  * 用于计算因果图谱的节点位置
+ *
+ * 后端返回的图谱已带分层布局坐标（node.position + graph.layout，按拓扑哈希缓存），直接使用；
+ * 只有缺少服务端布局（旧图谱、方向不一致）时才按需加载 dagre 在本地计算。
+ * dagre 通过动态 import 拆分为独立 chunk，服务端布局可用时不会下载。
  */
 
-import dagre from 'dagre'
-
 /**
- * 节点尺寸配置
+ * 节点尺寸配置（与后端 app/utils/graph_layout.py 一致）
  */
 const NODE_WIDTH = 220
 const NODE_HEIGHT = 100
 
+let dagrePromise = null
+
 /**
- * 使用 Dagre 算法计算图布局
- * 
+ * 按需加载 dagre（只加载一次）
+ */
+function loadDagre() {
+  if (!dagrePromise) {
+    dagrePromise = import('dagre').then((module) => module.default || module)
+  }
+  return dagrePromise
+}
+
+/**
+ * 图谱拓扑键：节点 ID 与边端点（与顺序无关）
+ * 仅富化字段变化（节点状态、说明等）时拓扑键不变
+ *
  * @param {Array} nodes - React Flow 节点数组
  * @param {Array} edges - React Flow 边数组
- * @param {string} direction - 布局方向 ('LR' | 'TB' | 'RL' | 'BT')
- * @returns {Object} - 包含布局后的 nodes 和 edges
+ * @returns {string}
+ */
+export function topologyKey(nodes, edges) {
+  const nodeIds = nodes.map((node) => node.id).sort()
+  const edgeIds = edges.map((edge) => `${edge.source}->${edge.target}`).sort()
+  return `${nodeIds.join(',')}|${edgeIds.join(',')}`
+}
+
+/**
+ * 是否可直接使用服务端布局
+ *
+ * @param {Array} nodes - React Flow 节点数组（position 来自后端 node.position）
+ * @param {Object} layout - 后端返回的 graph.layout
+ * @param {string} direction - 布局方向
  */
-export function getLayoutedElements(nodes, edges, direction = 'LR') {
+export function hasServerLayout(nodes, layout, direction = 'LR') {
+  if (!layout || layout.direction !== direction) {
+    return false
+  }
+  return nodes.every((node) => node.data?.originalData?.position)
+}
+
+/**
+ * 使用 Dagre 算法计算图布局
+ */
+function dagreLayout(dagre, nodes, edges, direction) {
   // 创建 Dagre 图实例
   const dagreGraph = new dagre.graphlib.Graph()
-  
+
   // 设置图的默认配置
   dagreGraph.setDefaultEdgeLabel(() => ({}))
-  
+
   // 配置布局参数
   dagreGraph.setGraph({
     rankdir: direction,      // 布局方向：LR(左到右), TB(上到下), RL(右到左), BT(下到上)
@@ -35,7 +72,7 @@ export function getLayoutedElements(nodes, edges, direction = 'LR') {
     marginx: 20,             // 图的左右边距
     marginy: 20              // 图的上下边距
   })
-  
+
   // 添加节点到 Dagre 图
   nodes.forEach((node) => {
     dagreGraph.setNode(node.id, {
@@ -43,50 +80,91 @@ export function getLayoutedElements(nodes, edges, direction = 'LR') {
       height: NODE_HEIGHT
     })
   })
-  
+
   // 添加边到 Dagre 图
   edges.forEach((edge) => {
     dagreGraph.setEdge(edge.source, edge.target)
   })
-  
+
   // 执行布局计算
   dagre.layout(dagreGraph)
-  
+
   // 将计算后的位置应用到节点
-  const layoutedNodes = nodes.map((node) => {
+  return nodes.map((node) => {
     const nodeWithPosition = dagreGraph.node(node.id)
-    
+
     // Dagre 返回的是节点中心点坐标，需要转换为左上角坐标
     const x = nodeWithPosition.x - NODE_WIDTH / 2
     const y = nodeWithPosition.y - NODE_HEIGHT / 2
-    
+
     return {
       ...node,
       position: { x, y }
     }
   })
-  
-  return {
-    nodes: layoutedNodes,
-    edges
+}
+
+/**
+ * 网格布局（dagre 不可用时的兜底）
+ */
+function gridLayout(nodes) {
+  return nodes.map((node, index) => ({
+    ...node,
+    position: { x: (index % 3) * 300, y: Math.floor(index / 3) * 220 }
+  }))
+}
+
+/**
+ * 计算图布局
+ *
+ * @param {Array} nodes - React Flow 节点数组
+ * @param {Array} edges - React Flow 边数组
+ * @param {string} direction - 布局方向 ('LR' | 'TB' | 'RL' | 'BT')
+ * @param {Object} layout - 后端返回的 graph.layout（可选）
+ * @returns {Promise<Object>} - 包含布局后的 nodes 和 edges
+ */
+export async function getLayoutedElements(nodes, edges, direction = 'LR', layout = null) {
+  // 服务端布局可用：坐标已由 convertNodesToReactFlow 写入
+  if (hasServerLayout(nodes, layout, direction)) {
+    return { nodes, edges }
+  }
+
+  try {
+    const dagre = await loadDagre()
+    return { nodes: dagreLayout(dagre, nodes, edges, direction), edges }
+  } catch (error) {
+    console.warn('dagre 不可用，使用网格布局:', error)
+    return { nodes: gridLayout(nodes), edges }
   }
 }
 
 /**
  * 重新计算布局（用于动态更新）
- * 
+ *
+ * 拓扑未变化（仅节点状态等富化字段更新）时沿用已有坐标，不重新布局
+ *
  * @param {Array} nodes - 当前节点
  * @param {Array} edges - 当前边
  * @param {string} direction - 布局方向
- * @returns {Object} - 新的布局
+ * @param {Object} previous - 上一次布局结果 { nodes, edges }（可选）
+ * @param {Object} layout - 后端返回的 graph.layout（可选）
+ * @returns {Promise<Object>} - 新的布局
  */
-export function relayoutGraph(nodes, edges, direction = 'LR') {
-  return getLayoutedElements(nodes, edges, direction)
+export async function relayoutGraph(nodes, edges, direction = 'LR', previous = null, layout = null) {
+  if (previous && previous.nodes.length > 0 &&
+      topologyKey(nodes, edges) === topologyKey(previous.nodes, previous.edges)) {
+    const positions = new Map(previous.nodes.map((node) => [node.id, node.position]))
+    return {
+      nodes: nodes.map((node) => ({ ...node, position: positions.get(node.id) })),
+      edges
+    }
+  }
+  return getLayoutedElements(nodes, edges, direction, layout)
 }
 
 /**
  * 获取图的边界框（用于自动缩放）
- * 
+ *
  * @param {Array} nodes - 节点数组
  * @returns {Object} - 边界框 {minX, minY, maxX, maxY}
  */
@@ -94,12 +172,12 @@ export function getGraphBounds(nodes) {
   if (!nodes || nodes.length === 0) {
     return { minX: 0, minY: 0, maxX: 0, maxY: 0 }
   }
-  
+
   let minX = Infinity
   let minY = Infinity
   let maxX = -Infinity
   let maxY = -Infinity
-  
+
   nodes.forEach((node) => {
     const { x, y } = node.position
     minX = Math.min(minX, x)
@@ -107,14 +185,6 @@ export function getGraphBounds(nodes) {
     maxX = Math.max(maxX, x + NODE_WIDTH)
     maxY = Math.max(maxY, y + NODE_HEIGHT)
   })
-  
+
   return { minX, minY, maxX, maxY }
 }
-
-
-
-
-
-
-
-
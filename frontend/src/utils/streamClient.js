@@ -22,11 +22,18 @@ export interface StreamConfig {
   onComplete?: (data: any) => void
   onError?: (error: Error) => void
   signal?: AbortSignal
+  maxRetries?: number  // 断线后的最大续传次数，默认 3
 }
 
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms))
+
 /**
  * 流式请求标的研究
  * 
+ * 后端为每次运行分配 run_id（响应头 X-Run-Id），事件 id 为 "<run_id>:<seq>"。
+ * 网络中断时携带 Last-Event-ID 重连 GET /research-target/stream/{run_id}，
+ * 服务端补发错过的事件并继续跟随仍在运行的 Pipeline，无需重新执行。
+ * 
  * @param target - 标的名称
  * @param config - 配置选项
  * @returns Promise<void>
@@ -35,19 +42,15 @@ export async function streamResearchTarget(
   target: string,
   config: StreamConfig = {}
 ): Promise<void> {
-  const { onProgress, onComplete, onError, signal } = config
+  const { onProgress, onComplete, onError, signal, maxRetries = 3 } = config
 
-  try {
-    // 发起流式请求
-    const response = await fetch('/api/v1/research-target/stream', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ target }),
-      signal, // 支持取消请求
-    })
+  let runId: string | null = null
+  let lastEventId: string | null = null
+  let retryMs = 3000
+  let finished = false
 
+  // 读取一次 SSE 连接，直到流结束或出错
+  const readStream = async (response: Response) => {
     if (!response.ok) {
       throw new Error(`HTTP ${response.status}: ${response.statusText}`)
     }
@@ -56,6 +59,8 @@ export async function streamResearchTarget(
       throw new Error('响应体为空')
     }
 
+    runId = response.headers.get('X-Run-Id') || runId
+
     // 获取 ReadableStream
     const reader = response.body.getReader()
     const decoder = new TextDecoder('utf-8')
@@ -77,8 +82,20 @@ export async function streamResearchTarget(
       buffer = lines.pop() || '' // 保留不完整的行
 
       for (const line of lines) {
-        // 跳过空行
-        if (!line.trim()) {
+        // 跳过空行与心跳注释 (": heartbeat")
+        if (!line.trim() || line.startsWith(':')) {
+          continue
+        }
+
+        // 事件 ID (id: <run_id>:<seq>)，用于断线续传
+        if (line.startsWith('id: ')) {
+          lastEventId = line.slice(4).trim()
+          continue
+        }
+
+        // 服务端建议的重连间隔
+        if (line.startsWith('retry: ')) {
+          retryMs = parseInt(line.slice(7), 10) || retryMs
           continue
         }
 
@@ -86,37 +103,74 @@ export async function streamResearchTarget(
         if (line.startsWith('data: ')) {
           const jsonStr = line.slice(6) // 移除 "data: " 前缀
 
+          let event: StreamEvent
           try {
-            const event: StreamEvent = JSON.parse(jsonStr)
+            event = JSON.parse(jsonStr)
+          } catch (parseError) {
+            console.error('JSON 解析失败:', jsonStr, parseError)
+            continue
+          }
 
-            // 触发进度回调
-            if (onProgress) {
-              onProgress(event)
-            }
+          // 触发进度回调
+          if (onProgress) {
+            onProgress(event)
+          }
 
-            // 处理成功事件
-            if (event.status === 'success' && event.data) {
-              if (onComplete) {
-                onComplete(event.data)
-              }
+          // 处理成功事件
+          if (event.status === 'success' && event.data) {
+            finished = true
+            if (onComplete) {
+              onComplete(event.data)
             }
+          }
 
-            // 处理错误事件
-            if (event.status === 'error') {
-              throw new Error(event.message)
-            }
-          } catch (parseError) {
-            console.error('JSON 解析失败:', jsonStr, parseError)
+          // 处理错误事件
+          if (event.status === 'error') {
+            finished = true
+            throw new Error(event.message)
           }
         }
       }
     }
+  }
+
+  try {
+    // 发起流式请求
+    await readStream(
+      await fetch('/api/v1/research-target/stream', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ target }),
+        signal, // 支持取消请求
+      })
+    )
   } catch (error) {
-    if (error instanceof Error) {
-      if (onError) {
-        onError(error)
-      } else {
-        console.error('流式请求失败:', error)
+    if (finished || signal?.aborted || !runId) {
+      onError ? onError(error as Error) : console.error('流式请求失败:', error)
+      return
+    }
+  }
+
+  // 连接在 Pipeline 结束前中断：携带 Last-Event-ID 续传
+  for (let attempt = 1; !finished && runId && attempt <= maxRetries; attempt++) {
+    await sleep(retryMs)
+    if (signal?.aborted) {
+      return
+    }
+
+    try {
+      await readStream(
+        await fetch(`/api/v1/research-target/stream/${runId}`, {
+          headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+          signal,
+        })
+      )
+    } catch (error) {
+      if (finished || signal?.aborted || attempt === maxRetries) {
+        onError ? onError(error as Error) : console.error('流式请求失败:', error)
+        return
       }
     }
   }